@@ -0,0 +1,3 @@
+"""
+Load benchmarks for Agent CEO, run against local fake upstream providers
+"""
@@ -0,0 +1,359 @@
+"""
+Fake upstream providers for Agent CEO benchmarks
+Local stand-ins for OpenAI, Anthropic, n8n, the social APIs and SMTP with configurable latency and errors
+"""
+
+import json
+import logging
+import random
+import re
+import socketserver
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class UpstreamProfile:
+    """
+    Latency and error behaviour of one fake provider
+
+    Args:
+        latency_ms: Mean response latency
+        jitter_ms: Standard deviation of the latency (normal, clipped at 0)
+        error_rate: Share of requests answered with ``error_status``
+        error_status: HTTP status (or SMTP reply code) of injected errors
+    """
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self):
+        latency = random.gauss(self.latency_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms,
+                'error_rate': self.error_rate, 'error_status': self.error_status}
+
+# Named profiles per provider; 'realistic' approximates production latencies
+PROFILES: Dict[str, Dict[str, UpstreamProfile]] = {
+    'instant': {
+        'openai': UpstreamProfile(),
+        'anthropic': UpstreamProfile(),
+        'n8n': UpstreamProfile(),
+        'social': UpstreamProfile(),
+        'smtp': UpstreamProfile()
+    },
+    'fast': {
+        'openai': UpstreamProfile(latency_ms=50, jitter_ms=10),
+        'anthropic': UpstreamProfile(latency_ms=60, jitter_ms=10),
+        'n8n': UpstreamProfile(latency_ms=10, jitter_ms=2),
+        'social': UpstreamProfile(latency_ms=20, jitter_ms=5),
+        'smtp': UpstreamProfile(latency_ms=5, jitter_ms=1)
+    },
+    'realistic': {
+        'openai': UpstreamProfile(latency_ms=1200, jitter_ms=500, error_rate=0.01, error_status=429),
+        'anthropic': UpstreamProfile(latency_ms=1500, jitter_ms=600, error_rate=0.01, error_status=529),
+        'n8n': UpstreamProfile(latency_ms=80, jitter_ms=30, error_rate=0.005),
+        'social': UpstreamProfile(latency_ms=250, jitter_ms=100, error_rate=0.01, error_status=503),
+        'smtp': UpstreamProfile(latency_ms=120, jitter_ms=40, error_rate=0.005, error_status=451)
+    },
+    'degraded': {
+        'openai': UpstreamProfile(latency_ms=4000, jitter_ms=2000, error_rate=0.2, error_status=429),
+        'anthropic': UpstreamProfile(latency_ms=1500, jitter_ms=600, error_rate=0.02, error_status=529),
+        'n8n': UpstreamProfile(latency_ms=500, jitter_ms=300, error_rate=0.1, error_status=502),
+        'social': UpstreamProfile(latency_ms=800, jitter_ms=400, error_rate=0.1, error_status=503),
+        'smtp': UpstreamProfile(latency_ms=400, jitter_ms=200, error_rate=0.05, error_status=451)
+    }
+}
+
+FAKE_TEXT = ("Executive summary: revenue growth is concentrated in two segments. "
+             "Recommendation: prioritise retention, then expand the top-performing channel. ") * 4
+
+def _estimate_tokens(payload: Any) -> int:
+    return max(1, len(json.dumps(payload)) // 4)
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    """Routes requests to ``self.server.routes`` after applying the provider profile"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        try:
+            body = json.loads(raw) if raw else {}
+        except ValueError:
+            body = {}
+
+        server = self.server
+        server.count(self.path)
+        server.profile.delay()
+        if server.profile.should_fail():
+            status, payload = server.profile.error_status, {'error': {'type': 'injected', 'message': 'Injected failure'}}
+        else:
+            status, payload = server.handler(self.command, self.path.split('?', 1)[0], body)
+
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+class FakeHttpUpstream(ThreadingHTTPServer):
+    """A fake JSON API on 127.0.0.1; ``handler(method, path, body)`` returns (status, payload)"""
+
+    daemon_threads = True
+
+    def __init__(self, name: str, handler, profile: UpstreamProfile, port: int = 0):
+        super().__init__(('127.0.0.1', port), _JsonHandler)
+        self.name = name
+        self.handler = handler
+        self.profile = profile
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+def openai_handler(method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    if path.endswith('/chat/completions'):
+        prompt_tokens = _estimate_tokens(body.get('messages', []))
+        return 200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'gpt-4-turbo'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': FAKE_TEXT}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 60,
+                      'total_tokens': prompt_tokens + 60,
+                      'prompt_tokens_details': {'cached_tokens': 0}}
+        }
+    if path.endswith('/embeddings'):
+        inputs = body.get('input', [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        dimensions = body.get('dimensions') or 256
+        data = []
+        for index, text in enumerate(inputs):
+            rng = random.Random(str(text))
+            data.append({'object': 'embedding', 'index': index,
+                         'embedding': [rng.uniform(-1, 1) for _ in range(dimensions)]})
+        return 200, {'object': 'list', 'data': data, 'model': body.get('model'),
+                     'usage': {'prompt_tokens': _estimate_tokens(inputs), 'total_tokens': _estimate_tokens(inputs)}}
+    if path.endswith('/models'):
+        return 200, {'object': 'list', 'data': [{'id': 'gpt-4-turbo', 'object': 'model'}]}
+    return 404, {'error': {'message': f'Unknown path {path}'}}
+
+def anthropic_handler(method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    if path.endswith('/messages'):
+        system_tokens = _estimate_tokens(body.get('system', ''))
+        return 200, {
+            'id': f'msg_{uuid.uuid4().hex[:12]}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'claude-3-sonnet-20240229'),
+            'content': [{'type': 'text', 'text': FAKE_TEXT}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': _estimate_tokens(body.get('messages', [])), 'output_tokens': 60,
+                      'cache_read_input_tokens': system_tokens, 'cache_creation_input_tokens': 0}
+        }
+    return 404, {'error': {'type': 'not_found_error', 'message': f'Unknown path {path}'}}
+
+_EXECUTE = re.compile(r'^/api/v1/workflows/([^/]+)/execute$')
+_EXECUTION = re.compile(r'^/api/v1/executions/([^/]+)$')
+
+def n8n_handler(method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    if path == '/healthz':
+        return 200, {'status': 'ok'}
+    if path == '/api/v1/workflows':
+        return 200, {'data': [{'id': 'wf-1', 'name': 'Benchmark workflow', 'active': True}]}
+    if _EXECUTE.match(path):
+        return 200, {'executionId': uuid.uuid4().hex[:12], 'status': 'running'}
+    if _EXECUTION.match(path):
+        return 200, {'id': _EXECUTION.match(path).group(1), 'finished': True, 'status': 'success', 'data': {}}
+    if path.startswith('/webhook/'):
+        return 200, {'success': True, 'executionId': uuid.uuid4().hex[:12]}
+    return 404, {'message': f'Unknown path {path}'}
+
+def social_handler(method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+    if method == 'GET':
+        return 200, {'data': [], 'meta': {'result_count': 0}}
+    return 201, {'id': uuid.uuid4().hex[:16], 'data': {'id': uuid.uuid4().hex[:16]}, 'success': True}
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough ESMTP for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT (no STARTTLS)"""
+
+    def reply(self, line: str):
+        self.wfile.write((line + '\r\n').encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        self.reply('220 fake-smtp ESMTP ready')
+        while True:
+            raw = self.rfile.readline(65537)
+            if not raw:
+                return
+            command = raw.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'EHLO':
+                self.wfile.write(b'250-fake-smtp\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SIZE 52428800\r\n')
+            elif verb == 'HELO':
+                self.reply('250 fake-smtp')
+            elif verb == 'AUTH':
+                parts = command.split()
+                if len(parts) >= 2 and parts[1].upper() == 'LOGIN':
+                    if len(parts) == 2:
+                        self.reply('334 VXNlcm5hbWU6')
+                        self.rfile.readline()
+                    self.reply('334 UGFzc3dvcmQ6')
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply('334 ')
+                    self.rfile.readline()
+                self.reply('235 2.7.0 Authentication successful')
+            elif verb in ('MAIL', 'RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                with server.lock:
+                    server.recipients += 1
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while True:
+                    line = self.rfile.readline(65537)
+                    if not line or line in (b'.\r\n', b'.\n'):
+                        break
+                server.profile.delay()
+                if server.profile.should_fail():
+                    self.reply(f'{server.profile.error_status} Injected failure')
+                else:
+                    with server.lock:
+                        server.requests += 1
+                    self.reply(f'250 OK queued as {uuid.uuid4().hex[:10]}')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """Accepts and discards mail; ``requests`` counts delivered messages"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, profile: UpstreamProfile, port: int = 0):
+        super().__init__(('127.0.0.1', port), _SmtpHandler)
+        self.name = 'smtp'
+        self.profile = profile
+        self.requests = 0
+        self.recipients = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+class FakeUpstreams:
+    """
+    All fake providers, each on its own ephemeral port
+
+    ``env()`` returns the environment variables that point the backend at
+    them; it must be applied before ``src`` is imported, since services read
+    their configuration at import time.
+    """
+
+    def __init__(self, profile: str = 'fast', overrides: Optional[Dict[str, UpstreamProfile]] = None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown upstream profile {profile}; choose from {', '.join(PROFILES)}")
+        self.profile_name = profile
+        profiles = {**PROFILES[profile], **(overrides or {})}
+        self.servers = {
+            'openai': FakeHttpUpstream('openai', openai_handler, profiles['openai']),
+            'anthropic': FakeHttpUpstream('anthropic', anthropic_handler, profiles['anthropic']),
+            'n8n': FakeHttpUpstream('n8n', n8n_handler, profiles['n8n']),
+            'social': FakeHttpUpstream('social', social_handler, profiles['social']),
+            'smtp': FakeSmtpServer(profiles['smtp'])
+        }
+        self._threads = []
+
+    def start(self) -> 'FakeUpstreams':
+        for name, server in self.servers.items():
+            thread = threading.Thread(target=server.serve_forever, name=f'fake-{name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def env(self) -> Dict[str, str]:
+        social = self.servers['social'].url
+        return {
+            'OPENAI_API_KEY': 'sk-benchmark',
+            'OPENAI_BASE_URL': f"{self.servers['openai'].url}/v1",
+            'ANTHROPIC_API_KEY': 'sk-ant-benchmark',
+            'ANTHROPIC_BASE_URL': f"{self.servers['anthropic'].url}/v1",
+            'N8N_BASE_URL': self.servers['n8n'].url,
+            'N8N_API_KEY': 'benchmark',
+            'LINKEDIN_API_BASE': social,
+            'TWITTER_API_BASE': social,
+            'FACEBOOK_GRAPH_API_BASE': social,
+            'BUFFER_API_BASE': social,
+            'HOOTSUITE_API_BASE': social,
+            'SMTP_HOST': '127.0.0.1',
+            'SMTP_PORT': str(self.servers['smtp'].port),
+            'SMTP_USERNAME': 'bench@example.com',
+            'SMTP_PASSWORD': 'benchmark',
+            'SMTP_USE_TLS': 'false'
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: {'requests': server.requests, **server.profile.to_dict()}
+                for name, server in self.servers.items()}
+
+def main():
+    """Run the fakes standalone, e.g. to benchmark a separately started gunicorn"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run fake upstream providers')
+    parser.add_argument('--profile', default='fast', choices=sorted(PROFILES))
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.profile).start()
+    print('# Export these before starting the backend:')
+    for key, value in upstreams.env().items():
+        print(f'export {key}={value}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+if __name__ == '__main__':
+    main()
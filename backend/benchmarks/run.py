@@ -0,0 +1,261 @@
+"""
+Benchmark runner for Agent CEO
+Drives load scenarios against the backend (in-process by default, behind fake upstreams) and
+records p50/p99 latency and throughput to JSON, optionally comparing against a baseline
+
+Usage (from backend/):
+    python -m benchmarks.run                                   # all scenarios, compare with baseline.json
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --scenarios csv_upload --concurrency 4 --duration 10
+    python -m benchmarks.run --target http://127.0.0.1:8000    # an already running server
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from benchmarks.fake_upstreams import PROFILES, FakeUpstreams
+from benchmarks.scenarios import SCENARIOS, Scenario, get_scenarios
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def start_app(upstream_env: Dict[str, str], workdir: str) -> str:
+    """
+    Import the backend with its upstreams pointed at the fakes and serve it on a threaded server
+
+    Returns:
+        Base URL of the server
+    """
+    os.environ.update(upstream_env)
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'benchmark.db')}")
+    os.environ.setdefault('N8N_WEBHOOK_BUFFER_DIR', os.path.join(workdir, 'webhook_buffer'))
+
+    from werkzeug.serving import make_server
+    from src.main import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no per-request access log
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='benchmark-app', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+def run_scenario(scenario: Scenario, base_url: str, concurrency: int, duration: float,
+                 max_requests: Optional[int] = None, warmup: int = 2) -> Dict[str, Any]:
+    """
+    Run one scenario with ``concurrency`` closed-loop workers
+
+    Returns:
+        Request count, error rate, throughput and latency percentiles (ms)
+    """
+    setup_session = requests.Session()
+    scenario.setup(setup_session, base_url)
+    for iteration in range(warmup):
+        method, path, kwargs = scenario.next_request(setup_session, base_url, -1 - iteration)
+        setup_session.request(method, base_url + path, timeout=120, **kwargs)
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(max_requests if max_requests else sys.maxsize))
+    deadline = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_errors = [], {}
+        while time.monotonic() < deadline:
+            with lock:
+                iteration = next(counter, None)
+            if iteration is None:
+                break
+            try:
+                method, path, kwargs = scenario.next_request(session, base_url, iteration)
+                started = time.perf_counter()
+                response = session.request(method, base_url + path, timeout=120, **kwargs)
+                elapsed = time.perf_counter() - started
+                ok = scenario.is_success(response)
+                key = None if ok else f'status_{response.status_code}'
+            except Exception as e:
+                elapsed = None
+                key = type(e).__name__
+            if elapsed is not None:
+                local_latencies.append(elapsed * 1000)
+            if key:
+                local_errors[key] = local_errors.get(key, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for key, count in local_errors.items():
+                errors[key] = errors.get(key, 0) + count
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, name=f'bench-{scenario.name}-{n}') for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - started
+
+    latencies.sort()
+    total = len(latencies) + sum(count for key, count in errors.items() if not key.startswith('status_'))
+    failed = sum(errors.values())
+    return {
+        'description': scenario.description,
+        'requests': total,
+        'errors': failed,
+        'error_rate': round(failed / total, 4) if total else 0.0,
+        'error_kinds': errors,
+        'rps': round(total / wall, 2) if wall else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'p50_ms': _round(percentile(latencies, 0.50)),
+        'p90_ms': _round(percentile(latencies, 0.90)),
+        'p99_ms': _round(percentile(latencies, 0.99)),
+        'max_ms': _round(latencies[-1] if latencies else None),
+        'duration_s': round(wall, 2)
+    }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              timeout=5, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compare a run against a baseline
+
+    A scenario regresses when p50 or p99 grows, or throughput drops, by more
+    than ``tolerance`` (a fraction), or its error rate rises by more than one
+    percentage point.
+
+    Returns:
+        One message per regression
+    """
+    regressions = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if result.get(metric) and base.get(metric) and result[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {base[metric]} -> {result[metric]} '
+                                   f'(+{(result[metric] / base[metric] - 1) * 100:.0f}%)')
+        if base.get('rps') and result['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {base['rps']} -> {result['rps']} "
+                               f"({(result['rps'] / base['rps'] - 1) * 100:.0f}%)")
+        if result['error_rate'] > base.get('error_rate', 0.0) + 0.01:
+            regressions.append(f"{name}: error_rate {base.get('error_rate', 0.0)} -> {result['error_rate']}")
+    return regressions
+
+def print_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    header = f"{'scenario':<22}{'reqs':>7}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}{'err %':>8}"
+    if baseline:
+        header += f"{'base p50':>10}{'base p99':>10}{'base rps':>10}"
+    print(header)
+    for name, result in report['scenarios'].items():
+        line = (f"{name:<22}{result['requests']:>7}{result['rps']:>9}{str(result['p50_ms']):>10}"
+                f"{str(result['p99_ms']):>10}{result['error_rate'] * 100:>8.1f}")
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        if base:
+            line += f"{str(base.get('p50_ms')):>10}{str(base.get('p99_ms')):>10}{str(base.get('rps')):>10}"
+        print(line)
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Agent CEO load benchmarks')
+    parser.add_argument('--scenarios', nargs='*', choices=sorted(SCENARIOS), help='Scenarios to run (default: all)')
+    parser.add_argument('--profile', default='fast', choices=sorted(PROFILES), help='Fake upstream latency/error profile')
+    parser.add_argument('--concurrency', type=int, default=8, help='Closed-loop workers per scenario')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds per scenario')
+    parser.add_argument('--requests', type=int, default=None, help='Stop a scenario after this many requests')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed requests before each scenario')
+    parser.add_argument('--target', help='Benchmark a running server instead of an in-process one')
+    parser.add_argument('--output', help='Write this run as JSON')
+    parser.add_argument('--save-baseline', metavar='PATH', help='Write this run as the new baseline')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline to compare against')
+    parser.add_argument('--no-compare', action='store_true', help='Skip the baseline comparison')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative regression in p50/p99/rps before failing (default 0.25)')
+    args = parser.parse_args(argv)
+
+    upstreams = None
+    workdir = tempfile.mkdtemp(prefix='agent-ceo-bench-')
+    if args.target:
+        base_url = args.target.rstrip('/')
+    else:
+        upstreams = FakeUpstreams(args.profile).start()
+        base_url = start_app(upstreams.env(), workdir)
+
+    report = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'target': args.target or 'in-process',
+            'upstream_profile': args.profile,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration
+        },
+        'scenarios': {}
+    }
+
+    try:
+        for scenario in get_scenarios(args.scenarios):
+            print(f'Running {scenario.name} ...', file=sys.stderr)
+            report['scenarios'][scenario.name] = run_scenario(
+                scenario, base_url, args.concurrency, args.duration, args.requests, args.warmup
+            )
+    finally:
+        if upstreams is not None:
+            report['upstreams'] = upstreams.stats()
+            upstreams.stop()
+
+    baseline = None
+    if not args.no_compare and not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_table(report, baseline)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Wrote {path}', file=sys.stderr)
+
+    if baseline is not None:
+        if baseline.get('meta', {}).get('upstream_profile') != args.profile:
+            print(f"Warning: baseline used upstream profile {baseline.get('meta', {}).get('upstream_profile')}",
+                  file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print('\nRegressions against baseline:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print('\nNo regressions against baseline')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
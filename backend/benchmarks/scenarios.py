@@ -0,0 +1,150 @@
+"""
+Load scenarios for Agent CEO benchmarks
+Each scenario prepares its fixtures once, then yields one measured request per iteration
+"""
+
+import io
+import random
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+# (method, path, requests keyword arguments)
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+class Scenario:
+    """
+    A repeatable request against the backend
+
+    ``setup`` runs once before timing starts. ``next_request`` runs per
+    iteration outside the timed region, so per-iteration fixtures (e.g. a
+    fresh pending task) do not count towards the measured latency.
+    """
+
+    name = ''
+    description = ''
+
+    def setup(self, session: requests.Session, base_url: str):
+        pass
+
+    def next_request(self, session: requests.Session, base_url: str, iteration: int) -> RequestSpec:
+        raise NotImplementedError
+
+    def is_success(self, response: requests.Response) -> bool:
+        if response.status_code >= 400:
+            return False
+        if response.headers.get('Content-Type', '').startswith('application/json'):
+            body = response.json()
+            return not (isinstance(body, dict) and body.get('success') is False)
+        return True
+
+class DashboardPolling(Scenario):
+    name = 'dashboard_polling'
+    description = 'Dashboard stats, performance, automation status and health, round robin'
+
+    paths = ['/api/dashboard/stats', '/api/dashboard/performance', '/api/n8n/automation/status', '/api/health']
+
+    def setup(self, session, base_url):
+        _ensure_agents(session, base_url)
+
+    def next_request(self, session, base_url, iteration):
+        return 'GET', self.paths[iteration % len(self.paths)], {}
+
+    def is_success(self, response):
+        # /api/health answers 503 while optional providers are unconfigured; that is still a served poll
+        return response.status_code < 500 or response.request.path_url == '/api/health'
+
+class TaskExecution(Scenario):
+    name = 'task_execution'
+    description = 'Execute a pending content_creation task (one LLM call)'
+
+    def setup(self, session, base_url):
+        self.agent_id = _ensure_agents(session, base_url)
+
+    def next_request(self, session, base_url, iteration):
+        response = session.post(f'{base_url}/api/tasks', json={
+            'agent_id': self.agent_id,
+            'title': f'Benchmark post {iteration}',
+            'task_type': 'content_creation',
+            'parameters': {'content_type': 'blog_post', 'topic': 'Retention playbooks', 'tone': 'professional'}
+        }, timeout=30)
+        response.raise_for_status()
+        return 'POST', '/api/ai/agents/execute', {'json': {'task_id': response.json()['id']}}
+
+class CampaignSend(Scenario):
+    name = 'campaign_send'
+    description = 'Send a 25-recipient campaign over SMTP'
+
+    recipients = 25
+
+    def next_request(self, session, base_url, iteration):
+        recipients = [{'email': f'user{iteration}-{n}@example.com', 'name': f'User {n}', 'company_name': 'Acme'}
+                      for n in range(self.recipients)]
+        return 'POST', '/api/email/campaign', {'json': {
+            'campaign_id': f'bench-{iteration}',
+            'recipients': recipients,
+            'subject': 'Quarterly update for {name}',
+            'content': 'Hi {name}, here is what changed at {company_name} this quarter.',
+            'method': 'smtp'
+        }}
+
+    def is_success(self, response):
+        if not super().is_success(response):
+            return False
+        results = response.json().get('campaign_results', {})
+        return results.get('failed_sends', 1) == 0
+
+class CsvUpload(Scenario):
+    name = 'csv_upload'
+    description = 'Upload and analyze a 2,000-row CSV (profiling plus one LLM call)'
+
+    rows = 2000
+
+    def setup(self, session, base_url):
+        rng = random.Random(7)
+        lines = ['date,region,channel,orders,revenue,customers']
+        for n in range(self.rows):
+            lines.append(f'2024-{1 + n % 12:02d}-{1 + n % 28:02d},{rng.choice(["north", "south", "east", "west"])},'
+                         f'{rng.choice(["web", "retail", "partner"])},{rng.randint(1, 400)},'
+                         f'{rng.uniform(100, 25000):.2f},{rng.randint(1, 300)}')
+        self.payload = ('\n'.join(lines) + '\n').encode('utf-8')
+
+    def next_request(self, session, base_url, iteration):
+        return 'POST', '/api/data-analysis/upload', {
+            'files': {'file': ('sales.csv', io.BytesIO(self.payload), 'text/csv')},
+            # Analyze within the request: a background job would be deduplicated after the first run
+            'data': {'purpose': 'benchmark', 'industry': 'retail', 'async': 'false'}
+        }
+
+class StrategicGeneration(Scenario):
+    name = 'strategic_generation'
+    description = 'Strategic business analysis (system-prompted LLM call)'
+
+    def next_request(self, session, base_url, iteration):
+        return 'POST', '/api/strategic/business-analysis', {'json': {'context': {
+            'company_name': f'Acme {iteration % 10}',
+            'industry': 'B2B SaaS',
+            'revenue': 12_500_000,
+            'growth_rate': 0.18,
+            'challenges': ['rising churn in SMB', 'long enterprise sales cycles'],
+            'goals': ['net revenue retention above 110%', 'expand to EU']
+        }}}
+
+def _ensure_agents(session: requests.Session, base_url: str) -> int:
+    """Create the default agents once and return the id of the first"""
+    agents = session.get(f'{base_url}/api/agents', timeout=30).json()
+    if not agents:
+        session.post(f'{base_url}/api/ai/agents/create-default', timeout=30).raise_for_status()
+        agents = session.get(f'{base_url}/api/agents', timeout=30).json()
+    return agents[0]['id']
+
+SCENARIOS: Dict[str, type] = {
+    scenario.name: scenario
+    for scenario in (DashboardPolling, TaskExecution, CampaignSend, CsvUpload, StrategicGeneration)
+}
+
+def get_scenarios(names: List[str] = None) -> List[Scenario]:
+    unknown = [name for name in names or [] if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}; choose from {', '.join(SCENARIOS)}")
+    return [SCENARIOS[name]() for name in (names or SCENARIOS)]
@@ -0,0 +1,88 @@
+"""
+Gunicorn configuration for Agent CEO backend
+
+    gunicorn -c gunicorn.conf.py src.wsgi:app
+
+Most routes spend their time waiting on LLM providers, SMTP or n8n, so the
+defaults favour many concurrent requests per worker (threads, or gevent
+greenlets) over many processes. Every setting can be overridden from the
+environment; see docs/deployment-serving.md for the benchmark behind the defaults.
+"""
+
+import logging
+import os
+
+def _cores() -> int:
+    """CPUs this process may run on (respects container cpusets)"""
+    try:
+        return max(len(os.sched_getaffinity(0)), 1)
+    except AttributeError:
+        return os.cpu_count() or 1
+
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the app (and its locks, sockets and pools) is preloaded below
+    from gevent import monkey
+    monkey.patch_all()
+
+cores = _cores()
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+# One process per core (at least two, so one busy worker never stalls the service),
+# capped because each worker holds its own pandas/LangChain footprint
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(max(cores, 2), int(os.getenv('GUNICORN_MAX_WORKERS', '8'))))))
+
+# gthread: concurrent requests per worker; blocked LLM calls hold a thread, not a CPU
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+
+# gevent: concurrent requests per worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '256'))
+
+# LLM generations can run well past a minute; the worker is only killed after this
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '180'))
+
+# SIGTERM: stop accepting, let in-flight requests finish for up to this long, then drain buffers
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '60'))
+
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# Recycle workers periodically to bound slow leaks (0 disables)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+# Import the app, templates, prompt registry and tokenizers once in the master; workers
+# share those pages copy-on-write instead of each importing them again
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+# Background threads (drains, pollers, probes) must not start in the master: they
+# would not survive fork and would keep running in the arbiter
+os.environ.setdefault('DEFER_BACKGROUND_SERVICES', 'true')
+
+def post_fork(server, worker):
+    """Give the worker its own DB connections and background threads"""
+    from src.models.user import db
+    from src.wsgi import app, start_background_services
+
+    with app.app_context():
+        # Connections opened while preloading belong to the master; forget them without closing
+        db.engine.dispose(close=False)
+    start_background_services(app)
+
+def worker_exit(server, worker):
+    """After in-flight requests finish: flush buffered callbacks and usage, stop threads"""
+    from src.wsgi import shutdown_background_services
+
+    try:
+        shutdown_background_services(timeout=min(graceful_timeout, 15))
+    except Exception as e:
+        logging.getLogger('gunicorn.error').error(f"Background shutdown failed in worker {worker.pid}: {e}")
+
+def on_starting(server):
+    server.log.info(f"Serving with {workers} {worker_class} workers "
+                    f"({threads if worker_class == 'gthread' else worker_connections} concurrent each, {cores} cores)")
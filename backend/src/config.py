@@ -14,11 +14,20 @@ class Settings(BaseSettings):
     # Database Configuration
     database_url: str = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
     sqlalchemy_track_modifications: bool = False
+    # Per process; keep pool size + overflow at or above the worker's thread count
+    db_pool_size: int = 10
+    db_max_overflow: int = 30
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
     
     # API Configuration
     api_prefix: str = "/api"
     cors_origins: list[str] = ["*"]
     
+    # File uploads: rejected above upload_max_bytes, spooled to disk above upload_spool_bytes
+    upload_max_bytes: int = 100 * 1024 * 1024
+    upload_spool_bytes: int = 8 * 1024 * 1024
+    
     # External Services
     openai_api_key: Optional[str] = None
     anthropic_api_key: Optional[str] = None
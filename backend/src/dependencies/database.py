@@ -1,4 +1,5 @@
 from flask import g
+from sqlalchemy import text
 from src.models.user import db
 from contextlib import contextmanager
 from typing import Generator
@@ -32,6 +33,17 @@ def get_db_session() -> Generator:
         session.close()
 
 
+def check_database() -> dict:
+    """Health probe: run a trivial query and report pool usage."""
+    db.session.execute(text('SELECT 1'))
+    db.session.remove()
+    pool = db.engine.pool
+    return {
+        'success': True,
+        'pool_checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None
+    }
+
+
 def init_db(app):
     """Initialize database with Flask app."""
     app.teardown_appcontext(close_db) 
\ No newline at end of file
@@ -13,22 +13,86 @@ from src.routes.n8n import n8n_bp
 from src.routes.strategic import strategic_bp
 from src.routes.email import email_bp
 from src.routes.data_analysis import data_analysis_bp
+from src.routes.health import health_bp
+from src.routes.debug import debug_bp
+from src.routes.metrics import metrics_bp
 from src.config import settings
-from src.dependencies.database import init_db
+from src.dependencies.database import check_database, init_db
+from src.services.n8n_service import n8n_service
+from src.services.n8n_webhook_service import n8n_webhook_service
+from src.services.health_registry import health_registry
+from src.services.analysis_job_service import analysis_job_service
+from src.services.business_data_processor import business_data_processor
+from src.services.dedup_service import dedup_service
+from src.services.embedding_index import embedding_index
+from src.services.usage_ledger import usage_ledger
+from src.services.tracing import tracer
+from src.services.metrics import metrics
+from src.services.upload_service import UploadRequest
 
-def create_app():
+def start_background_services(app):
+    """
+    Start this process's background threads
+
+    Callback drain, execution poller, usage flush, health probes, the
+    analysis job pool, the embedding index and dedup syncs and the
+    business data processor are per process. Under a preloading server they are
+    started in each worker after fork (see gunicorn.conf.py), never in the
+    master.
+    """
+    n8n_webhook_service.init_app(app)
+    n8n_service.init_app(app)
+    usage_ledger.init_app(app)
+    health_registry.init_app(app)
+    analysis_job_service.init_app(app)
+    embedding_index.init_app(app)
+    dedup_service.init_app(app)
+    business_data_processor.init_app(app)
+
+
+def shutdown_background_services(timeout=10.0):
+    """Drain buffered callbacks and usage rows, then stop background threads"""
+    health_registry.shutdown()
+    business_data_processor.shutdown()
+    analysis_job_service.shutdown(timeout)
+    embedding_index.shutdown()
+    dedup_service.shutdown()
+    n8n_webhook_service.shutdown(timeout)
+    n8n_service.shutdown()
+    usage_ledger.shutdown(timeout)
+    tracer.shutdown()
+
+
+def create_app(start_background=True):
     """Application factory pattern for better testing and configuration."""
     app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    # Multipart file parts are spooled and hashed as they are read
+    app.request_class = UploadRequest
     
     # Load configuration from settings
     app.config['SECRET_KEY'] = settings.secret_key
     app.config['SQLALCHEMY_DATABASE_URI'] = settings.database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = settings.sqlalchemy_track_modifications
+    if not settings.database_url.startswith('sqlite'):
+        # Sized for a threaded worker: each in-flight request may hold a connection
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': settings.db_pool_size,
+            'max_overflow': settings.db_max_overflow,
+            'pool_timeout': settings.db_pool_timeout,
+            'pool_recycle': settings.db_pool_recycle,
+            'pool_pre_ping': True
+        }
     app.config['DEBUG'] = settings.debug
 
     # Enable CORS
     CORS(app, origins=settings.cors_origins)
 
+    # Opt-in request tracing and profiling (TRACING_ENABLED / PROFILING_ENABLED)
+    tracer.init_app(app)
+
+    # Request latency histograms and scrape-time gauges on /metrics
+    metrics.init_app(app)
+
     # Initialize database
     db.init_app(app)
     init_db(app)
@@ -41,15 +105,27 @@ def create_app():
     app.register_blueprint(strategic_bp, url_prefix=settings.api_prefix)
     app.register_blueprint(email_bp, url_prefix=settings.api_prefix)
     app.register_blueprint(data_analysis_bp, url_prefix=settings.api_prefix)
+    app.register_blueprint(health_bp, url_prefix=settings.api_prefix)
+    app.register_blueprint(debug_bp, url_prefix=settings.api_prefix)
+    # Served at the root, where Prometheus scrapes by default
+    app.register_blueprint(metrics_bp)
 
     # Create database tables
     with app.app_context():
         db.create_all()
 
+    # Readiness depends on the database
+    health_registry.register('database', check_database, interval=10, timeout=5, critical=True)
+
+    # Per-process background threads (see start_background_services)
+    if start_background:
+        start_background_services(app)
+
     return app
 
 
-app = create_app()
+# gunicorn.conf.py defers background threads to post_fork when preloading
+app = create_app(start_background=os.getenv('DEFER_BACKGROUND_SERVICES', 'false').lower() != 'true')
 
 
 @app.route('/', defaults={'path': ''})
@@ -70,4 +146,5 @@ def serve(path):
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=settings.debug)
+    # Development server only; production runs gunicorn with src.wsgi:app (see gunicorn.conf.py)
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')), debug=settings.debug)
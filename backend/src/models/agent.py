@@ -149,3 +149,98 @@ class BusinessData(db.Model):
         """Set data content from dictionary"""
         self.data_content = json.dumps(data_dict)
 
+class BusinessDataDuplicate(db.Model):
+    """Near-duplicate BusinessData record and the earliest record it duplicates"""
+    __tablename__ = 'business_data_duplicate'
+
+    data_id = db.Column(db.Integer, primary_key=True)  # the duplicate (deleted once merged)
+    canonical_id = db.Column(db.Integer, nullable=False, index=True)
+    similarity = db.Column(db.Float, nullable=False)  # estimated Jaccard similarity of content shingles
+    action = db.Column(db.String(10), nullable=False, default='marked')  # marked, merged
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BusinessDataDuplicate {self.data_id} of {self.canonical_id}>'
+
+    def to_dict(self):
+        return {
+            'data_id': self.data_id,
+            'canonical_id': self.canonical_id,
+            'similarity': self.similarity,
+            'action': self.action,
+            'detected_at': self.detected_at.isoformat() if self.detected_at else None
+        }
+
+class BusinessDataClaim(db.Model):
+    """Lease on an unprocessed BusinessData record held by a processor batch"""
+    __tablename__ = 'business_data_claim'
+
+    data_id = db.Column(db.Integer, primary_key=True)  # one claim per record: the key makes claims exclusive
+    batch_id = db.Column(db.String(32), nullable=False, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    lease_expires_at = db.Column(db.DateTime, nullable=False, index=True)  # claimable again afterwards
+    error = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<BusinessDataClaim {self.data_id} by {self.batch_id}>'
+
+class BusinessDataInsight(db.Model):
+    """Insight the batch processor derived from a BusinessData record"""
+    __tablename__ = 'business_data_insight'
+
+    id = db.Column(db.Integer, primary_key=True)
+    data_id = db.Column(db.Integer, nullable=False, index=True)
+    data_type = db.Column(db.String(50), nullable=False)
+    insight = db.Column(db.Text, nullable=False)
+    quality_score = db.Column(db.Float)
+    model = db.Column(db.String(100))
+    batch_id = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<BusinessDataInsight {self.id} for {self.data_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'data_id': self.data_id,
+            'data_type': self.data_type,
+            'insight': self.insight,
+            'quality_score': self.quality_score,
+            'model': self.model,
+            'batch_id': self.batch_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class ProcessorCheckpoint(db.Model):
+    """Run state and progress of a background processor, shared by all workers"""
+    __tablename__ = 'processor_checkpoint'
+
+    name = db.Column(db.String(50), primary_key=True)
+    enabled = db.Column(db.Boolean, nullable=False, default=False)
+    cursor = db.Column(db.Integer, nullable=False, default=0)  # highest record ID claimed in this pass
+    processed = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+    llm_calls = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ProcessorCheckpoint {self.name} {"on" if self.enabled else "off"}>'
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'enabled': self.enabled,
+            'cursor': self.cursor,
+            'processed': self.processed,
+            'failed': self.failed,
+            'llm_calls': self.llm_calls,
+            'prompt_tokens': self.prompt_tokens,
+            'last_error': self.last_error,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,63 @@
+from datetime import datetime
+from src.models.user import db
+
+class EmailList(db.Model):
+    """Mailing list that campaigns can be sent to"""
+    __tablename__ = 'email_list'
+
+    id = db.Column(db.Integer, primary_key=True)
+    list_id = db.Column(db.String(100), unique=True, nullable=False)  # public slug, e.g. newsletter_subscribers
+    name = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_campaign_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<EmailList {self.list_id}>'
+
+    def to_dict(self, subscriber_count=None):
+        return {
+            'list_id': self.list_id,
+            'name': self.name,
+            'description': self.description,
+            'subscriber_count': subscriber_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_campaign': self.last_campaign_at.isoformat() if self.last_campaign_at else None
+        }
+
+class EmailSubscriber(db.Model):
+    """Subscriber of an email list.
+
+    Reads are keyset-paginated on ``id`` within a list, so the composite
+    (list_id, status, id) index serves both the status filter and the ordering.
+    """
+    __tablename__ = 'email_subscriber'
+    __table_args__ = (
+        db.UniqueConstraint('list_id', 'email', name='uq_email_subscriber_list_email'),
+        db.Index('ix_email_subscriber_list_status', 'list_id', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    list_id = db.Column(db.String(100), db.ForeignKey('email_list.list_id'), nullable=False)
+    email = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(200))
+    status = db.Column(db.String(20), nullable=False, default='active')  # active, unsubscribed, bounced
+    subscribed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<EmailSubscriber {self.email} ({self.list_id})>'
+
+class EmailSubscriberTag(db.Model):
+    """Tag attached to a subscriber, one row per (subscriber, tag) pair"""
+    __tablename__ = 'email_subscriber_tag'
+    __table_args__ = (
+        db.Index('ix_email_subscriber_tag_tag', 'tag', 'subscriber_id'),
+    )
+
+    subscriber_id = db.Column(db.Integer, db.ForeignKey('email_subscriber.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(100), primary_key=True)
+
+    def __repr__(self):
+        return f'<EmailSubscriberTag {self.tag}>'
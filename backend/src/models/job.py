@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+from src.models.user import db
+
+class AnalysisJob(db.Model):
+    """Background analysis of an uploaded file, with stage progress and the persisted result"""
+    __tablename__ = 'analysis_job'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    # sha256 of (file hash, extension, sheet, analysis context): identical submissions share a job
+    dedupe_key = db.Column(db.String(64), unique=True, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, succeeded, failed
+    stage = db.Column(db.String(20), nullable=False, default='queued')  # queued, parsing/profiling, analyzing, saving, done
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    filename = db.Column(db.String(255))
+    file_extension = db.Column(db.String(10), nullable=False)
+    file_sha256 = db.Column(db.String(64), nullable=False)
+    file_size = db.Column(db.Integer)
+    params = db.Column(db.Text)  # JSON: analysis_context, sheet_name
+    input_path = db.Column(db.String(500))  # copy of the upload, removed once the job finishes
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # heartbeat while running
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<AnalysisJob {self.id} {self.status}:{self.stage}>'
+
+    def to_dict(self, include_result=False):
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'filename': self.filename,
+            'file_extension': self.file_extension,
+            'file_sha256': self.file_sha256,
+            'file_size': self.file_size,
+            'params': json.loads(self.params) if self.params else {},
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_result:
+            data['result'] = json.loads(self.result) if self.result else None
+        return data
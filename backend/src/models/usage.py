@@ -0,0 +1,42 @@
+from datetime import datetime
+from src.models.user import db
+
+class LLMUsage(db.Model):
+    """Token usage, latency and cost of one LLM provider call"""
+    __tablename__ = 'llm_usage'
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    route = db.Column(db.String(200), index=True)  # URL rule, e.g. /api/strategic/swot-analysis
+    call_site = db.Column(db.String(200), index=True)  # e.g. src.services.strategic_ai_service.competitive_strategy_analysis
+    agent_id = db.Column(db.Integer, index=True)
+    provider = db.Column(db.String(50), nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    prompt_tokens = db.Column(db.Integer, default=0)  # includes cached_tokens and cache_write_tokens
+    completion_tokens = db.Column(db.Integer, default=0)
+    cached_tokens = db.Column(db.Integer, default=0)
+    cache_write_tokens = db.Column(db.Integer, default=0)
+    latency_ms = db.Column(db.Float)
+    cost_usd = db.Column(db.Float, default=0.0)
+    success = db.Column(db.Boolean, default=True)
+
+    def __repr__(self):
+        return f'<LLMUsage {self.provider}:{self.model} {self.prompt_tokens}+{self.completion_tokens}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'route': self.route,
+            'call_site': self.call_site,
+            'agent_id': self.agent_id,
+            'provider': self.provider,
+            'model': self.model,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_tokens': self.cached_tokens,
+            'cache_write_tokens': self.cache_write_tokens,
+            'latency_ms': self.latency_ms,
+            'cost_usd': self.cost_usd,
+            'success': self.success
+        }
@@ -0,0 +1,13 @@
+from datetime import datetime
+from src.models.user import db
+
+class WebhookReceipt(db.Model):
+    """Dedupe key of an applied inbound webhook, making replays idempotent"""
+    __tablename__ = 'webhook_receipt'
+
+    dedupe_key = db.Column(db.String(255), primary_key=True)  # e.g. task-completed:<execution_id>
+    kind = db.Column(db.String(50), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<WebhookReceipt {self.dedupe_key}>'
@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
-from src.models.agent import Agent, Task, AgentMetric, BusinessData, db
+from src.models.agent import Agent, Task, AgentMetric, BusinessData, BusinessDataDuplicate, BusinessDataInsight, db
+from src.services.business_data_processor import business_data_processor
+from src.services.dedup_service import dedup_service, not_duplicate
+from src.services.embedding_index import embedding_index
 
 agent_bp = Blueprint('agent', __name__)
 
@@ -175,6 +178,7 @@ def get_business_data():
     data_type = request.args.get('data_type')
     source = request.args.get('source')
     processed = request.args.get('processed')
+    exclude_duplicates = request.args.get('exclude_duplicates', 'false').lower() == 'true'
     
     query = BusinessData.query
     
@@ -184,6 +188,8 @@ def get_business_data():
         query = query.filter_by(source=source)
     if processed is not None:
         query = query.filter_by(processed=processed.lower() == 'true')
+    if exclude_duplicates:
+        query = query.filter(not_duplicate())
     
     data = query.order_by(BusinessData.created_at.desc()).all()
     return jsonify([item.to_dict() for item in data])
@@ -207,12 +213,96 @@ def create_business_data():
     
     return jsonify(business_data.to_dict()), 201
 
+@agent_bp.route('/business-data/search', methods=['GET'])
+def search_business_data():
+    """Business data most relevant to a free-text query"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    data_types = request.args.getlist('data_type') or None
+    
+    records = embedding_index.retrieve(query, k=k, data_types=data_types)
+    return jsonify({'query': query, 'results': records, 'total': len(records)})
+
+@agent_bp.route('/business-data/index', methods=['GET'])
+def get_business_data_index():
+    """Embedding index status"""
+    return jsonify(embedding_index.stats())
+
+@agent_bp.route('/business-data/index/sync', methods=['POST'])
+def sync_business_data_index():
+    """Catch the embedding index up with business data now (or rebuild it)"""
+    data = request.get_json(silent=True) or {}
+    rebuild = bool(data.get('rebuild')) or request.args.get('rebuild', 'false').lower() == 'true'
+    try:
+        result = embedding_index.sync(rebuild=rebuild)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify({'success': True, **result})
+
+@agent_bp.route('/business-data/duplicates', methods=['GET'])
+def get_business_data_duplicates():
+    """Near-duplicate records found so far, newest first"""
+    canonical_id = request.args.get('canonical_id', type=int)
+    action = request.args.get('action')
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    
+    query = BusinessDataDuplicate.query
+    if canonical_id is not None:
+        query = query.filter_by(canonical_id=canonical_id)
+    if action:
+        query = query.filter_by(action=action)
+    
+    duplicates = query.order_by(BusinessDataDuplicate.detected_at.desc()).limit(limit).all()
+    return jsonify({'duplicates': [item.to_dict() for item in duplicates], 'total': len(duplicates)})
+
+@agent_bp.route('/business-data/dedup', methods=['GET'])
+def get_business_data_dedup():
+    """Near-duplicate detection status"""
+    return jsonify(dedup_service.stats())
+
+@agent_bp.route('/business-data/dedup/sync', methods=['POST'])
+def sync_business_data_dedup():
+    """Check business data for near-duplicates now (or re-check the whole table)"""
+    if not dedup_service.enabled:
+        return jsonify({'success': False, 'error': 'Deduplication is disabled (DEDUP_ENABLED=false)'}), 409
+    data = request.get_json(silent=True) or {}
+    rebuild = bool(data.get('rebuild')) or request.args.get('rebuild', 'false').lower() == 'true'
+    try:
+        result = dedup_service.sync(rebuild=rebuild)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+    return jsonify(result)
+
 @agent_bp.route('/business-data/<int:data_id>', methods=['GET'])
 def get_business_data_item(data_id):
     """Get a specific business data item"""
     data_item = BusinessData.query.get_or_404(data_id)
     return jsonify(data_item.to_dict())
 
+@agent_bp.route('/business-data/<int:data_id>/insights', methods=['GET'])
+def get_business_data_insights(data_id):
+    """Insights the batch processor derived from a business data item"""
+    BusinessData.query.get_or_404(data_id)
+    insights = BusinessDataInsight.query.filter_by(data_id=data_id).order_by(BusinessDataInsight.created_at.desc()).all()
+    return jsonify([item.to_dict() for item in insights])
+
+@agent_bp.route('/business-data/processor', methods=['GET'])
+def get_business_data_processor():
+    """Batch processor state, backlog and rate"""
+    return jsonify(business_data_processor.status())
+
+@agent_bp.route('/business-data/processor/start', methods=['POST'])
+def start_business_data_processor():
+    """Start draining unprocessed business data (on every worker)"""
+    return jsonify({'success': True, **business_data_processor.start()})
+
+@agent_bp.route('/business-data/processor/stop', methods=['POST'])
+def stop_business_data_processor():
+    """Stop the batch processor after the batches in flight"""
+    return jsonify({'success': True, **business_data_processor.stop()})
+
 @agent_bp.route('/business-data/<int:data_id>', methods=['PUT'])
 def update_business_data(data_id):
     """Update business data"""
@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from src.services.ai_service import ai_service
+from src.routes.health import cached_health_response
 from src.services.agent_service import agent_service
 
 ai_bp = Blueprint('ai', __name__)
@@ -99,11 +100,37 @@ def get_models():
     result = ai_service.get_available_models(provider)
     return jsonify(result)
 
+@ai_bp.route('/ai/routing', methods=['GET'])
+def get_routing_stats():
+    """Get rolling latency and error stats per provider/model"""
+    return jsonify(ai_service.get_routing_stats())
+
+@ai_bp.route('/ai/prompts', methods=['GET'])
+def list_prompt_templates():
+    """List registered prompt templates with versions and token sizes"""
+    from src.services.prompt_registry import prompt_registry
+    return jsonify({'success': True, 'templates': prompt_registry.describe()})
+
+@ai_bp.route('/ai/prompt-cache', methods=['GET'])
+def get_prompt_cache_stats():
+    """Get provider prompt-cache hits and cached input tokens per provider/model"""
+    return jsonify(ai_service.get_prompt_cache_stats())
+
+@ai_bp.route('/ai/usage', methods=['GET'])
+def get_usage_summary():
+    """Aggregate LLM tokens, cost and latency by route, call_site, agent, provider, model or day"""
+    from src.services.usage_ledger import usage_ledger
+    result = usage_ledger.summary(
+        group_by=request.args.get('group_by', 'route'),
+        days=request.args.get('days', 7, type=int),
+        limit=min(request.args.get('limit', 50, type=int), 500)
+    )
+    return jsonify(result), 200 if result['success'] else 400
+
 @ai_bp.route('/ai/health', methods=['GET'])
 def ai_health():
-    """Check AI service health"""
-    result = ai_service.health_check()
-    return jsonify(result)
+    """Check AI service health (cached background probe)"""
+    return cached_health_response('ai')
 
 # Agent Service Routes
 @ai_bp.route('/ai/agents/execute', methods=['POST'])
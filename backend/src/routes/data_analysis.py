@@ -1,8 +1,16 @@
-from flask import Blueprint, jsonify, request, current_app
-import os
-import tempfile
-from werkzeug.utils import secure_filename
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context, url_for
+import json
+import time
+import pandas as pd
+from werkzeug.exceptions import RequestEntityTooLarge
 from src.services.data_analysis_service import data_analysis_service
+from src.routes.health import cached_health_response
+from src.services.prompt_registry import prompt_registry
+from src.services.analytics_engine import analytics_engine
+from src.services.data_quality_service import data_quality_service
+from src.services.upload_service import upload_service
+from src.services.analysis_job_service import analysis_job_service
+from src.services.analysis_bundle_service import analysis_bundle_service
 
 data_analysis_bp = Blueprint('data_analysis', __name__)
 
@@ -14,11 +22,25 @@ def allowed_file(filename):
 
 @data_analysis_bp.route('/data-analysis/upload', methods=['POST'])
 def upload_and_analyze_file():
-    """Upload and analyze a data file"""
-    if 'file' not in request.files:
+    """
+    Upload a data file for analysis
+    
+    Parsing, profiling and the LLM analysis run as a background job: the response is
+    202 with the job ID and URLs to poll its progress and fetch its result. Identical
+    submissions (same file and form fields) share one job. Send async=false to analyze
+    within the request instead.
+    """
+    # Reject oversized bodies before they are read; the file is spooled and hashed as it arrives
+    upload_service.limit_request(request)
+    try:
+        files = request.files
+    except RequestEntityTooLarge:
+        return jsonify(upload_service.too_large()), 413
+    
+    if 'file' not in files:
         return jsonify({'error': 'No file provided'}), 400
     
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
@@ -32,48 +54,75 @@ def upload_and_analyze_file():
         'focus_area': request.form.get('focus_area', ''),
         'business_goals': request.form.get('business_goals', '')
     }
+    sheet_name = request.form.get('sheet_name')
+    run_async = request.values.get('async', 'true').lower() != 'false'
     
     try:
-        # Save file temporarily
-        filename = secure_filename(file.filename)
-        temp_dir = tempfile.mkdtemp()
-        file_path = os.path.join(temp_dir, filename)
-        file.save(file_path)
-        
-        # Determine file type and analyze
-        file_extension = filename.rsplit('.', 1)[1].lower()
-        
-        if file_extension == 'csv':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                csv_content = f.read()
-            result = data_analysis_service.parse_csv_data(csv_content, analysis_context)
-        
-        elif file_extension in ['xlsx', 'xls']:
-            sheet_name = request.form.get('sheet_name')
-            result = data_analysis_service.parse_excel_data(file_path, sheet_name, analysis_context)
-        
-        elif file_extension == 'json':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_content = f.read()
-            result = data_analysis_service.parse_json_data(json_content, analysis_context)
-        
-        elif file_extension == 'pdf':
-            result = data_analysis_service.parse_pdf_document(file_path, analysis_context)
-        
-        elif file_extension == 'docx':
-            result = data_analysis_service.parse_word_document(file_path, analysis_context)
-        
-        else:
-            result = {'success': False, 'error': 'Unsupported file type'}
-        
-        # Clean up temporary file
-        os.remove(file_path)
-        os.rmdir(temp_dir)
-        
-        return jsonify(result)
-        
+        # The spooled stream is closed however this block ends; jobs keep their own copy
+        with upload_service.receive(file) as upload:
+            if run_async:
+                submitted = analysis_job_service.submit(upload, analysis_context, sheet_name)
+            else:
+                result = data_analysis_service.analyze_file(upload.stream, upload.extension,
+                                                            analysis_context, sheet_name)
+                result['file'] = upload.describe()
+                return jsonify(result)
+    
+    except RequestEntityTooLarge:
+        return jsonify(upload_service.too_large()), 413
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    job = submitted['job']
+    status_url = url_for('data_analysis.get_analysis_job', job_id=job['id'])
+    response = jsonify({
+        'success': True,
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'progress': job['progress'],
+        'deduplicated': submitted['deduplicated'],
+        'file': upload.describe(),
+        'status_url': status_url,
+        'result_url': url_for('data_analysis.get_analysis_job_result', job_id=job['id'])
+    })
+    response.headers['Location'] = status_url
+    return response, 200 if job['status'] == 'succeeded' else 202
+
+@data_analysis_bp.route('/data-analysis/jobs', methods=['GET'])
+def list_analysis_jobs():
+    """List recent analysis jobs, optionally filtered by status"""
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    jobs = analysis_job_service.list_jobs(request.args.get('status'), limit)
+    return jsonify({'success': True, 'jobs': jobs})
+
+@data_analysis_bp.route('/data-analysis/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Get an analysis job's status, stage and progress"""
+    job = analysis_job_service.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+@data_analysis_bp.route('/data-analysis/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    """
+    Get an analysis job's result
+    
+    202 (with Retry-After) while the job is queued or running; once finished, the body
+    the synchronous upload would have returned (with 500 if the job failed).
+    """
+    job = analysis_job_service.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('queued', 'running'):
+        job.pop('result', None)
+        response = jsonify({'success': False, 'job': job})
+        response.headers['Retry-After'] = '2'
+        return response, 202
+    if job['status'] == 'failed':
+        return jsonify(job['result'] or {'success': False, 'error': job['error']}), 500
+    return jsonify(job['result'])
 
 @data_analysis_bp.route('/data-analysis/csv', methods=['POST'])
 def analyze_csv_data():
@@ -181,31 +230,89 @@ def market_analysis():
     
     return jsonify(result)
 
+@data_analysis_bp.route('/data-analysis/bundle', methods=['POST'])
+def analysis_bundle():
+    """
+    Run several analyses (competitive, financial, customer, market, market_opportunity) concurrently
+    
+    Streams NDJSON: a 'prepared' line, one 'result' line per analysis as it finishes,
+    then a 'done' line with the totals. Send stream=false for one JSON response instead.
+    """
+    data = request.json or {}
+    try:
+        plan = analysis_bundle_service.prepare(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if request.args.get('stream', 'true').lower() == 'false':
+        return jsonify(analysis_bundle_service.run_all(plan))
+    
+    def generate():
+        started = time.monotonic()
+        yield json.dumps({'event': 'prepared', **plan.describe()}) + '\n'
+        results = {}
+        for item in analysis_bundle_service.run(plan):
+            results[item['analysis']] = item
+            yield json.dumps({'event': 'result', **item}, default=str) + '\n'
+        summary = analysis_bundle_service.summarize(plan, results, started)
+        summary.pop('results')
+        yield json.dumps({'event': 'done', **summary}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @data_analysis_bp.route('/data-analysis/health', methods=['GET'])
 def data_analysis_health():
-    """Check data analysis service health"""
-    result = data_analysis_service.health_check()
-    return jsonify(result)
+    """Check data analysis service health (cached background probe)"""
+    return cached_health_response('data_analysis')
 
-# Advanced analysis endpoints
-@data_analysis_bp.route('/data-analysis/trends', methods=['POST'])
-def trend_analysis():
-    """Analyze trends in time-series data"""
-    data = request.json
+# Prompts for the advanced analysis endpoints; the raw data field is cut first when over budget
+ANALYSIS_PROMPTS = prompt_registry.register_many('advanced_analysis', {
+    'kpi_dashboard': """
+    Analyze the following KPI data and provide dashboard insights:
     
-    time_series_data = data.get('time_series_data', [])
-    metrics = data.get('metrics', [])
-    time_period = data.get('time_period', 'monthly')
+    KPI Data: {kpi_data}
+    Business Goals: {business_goals}
+    Time Frame: {time_frame}
     
-    if not time_series_data:
-        return jsonify({'error': 'time_series_data is required'}), 400
+    Provide:
+    1. KPI performance summary
+    2. Goal achievement analysis
+    3. Performance trends and patterns
+    4. Areas of concern and opportunity
+    5. Recommended actions for improvement
+    6. Dashboard visualization suggestions
     
-    from src.services.ai_service import ai_service
+    Focus on executive-level insights and actionable recommendations.
+    """,
+    
+    'sentiment': """
+    Analyze the sentiment and themes in the following text data:
+    
+    Text Data: {combined_text}
+    Context: {context}
     
-    prompt = f"""
-    Analyze the following time-series data for trends and patterns:
+    Provide:
+    1. Overall sentiment analysis (positive, negative, neutral percentages)
+    2. Key themes and topics identified
+    3. Emotional indicators and intensity
+    4. Specific concerns or praise points
+    5. Actionable insights for improvement
+    6. Recommendations for response strategy
     
-    Data: {time_series_data}
+    Focus on business-relevant insights and customer experience implications.
+    """
+}, priorities={'kpi_data': 1, 'combined_text': 1})
+
+# v2: the series and cohort prompts receive analytics_engine digests instead of the raw data,
+# so their size no longer depends on how many points or cohorts were posted
+ANALYSIS_PROMPTS.update(prompt_registry.register_many('advanced_analysis', {
+    'trends': """
+    Analyze the following time-series digest for trends and patterns. The figures were computed
+    from the full series: slopes are per period, seasonal indices are deviations from trend,
+    anomalies are residuals beyond the z-score or IQR limits, and the forecast is a linear
+    trend + seasonal baseline with 80% intervals and a holdout backtest.
+    
+    Digest: {digest}
     Metrics: {metrics}
     Time Period: {time_period}
     
@@ -217,11 +324,128 @@ def trend_analysis():
     5. Business implications
     6. Recommendations for optimization
     
-    Focus on actionable insights for business decision-making.
+    Use the digest figures rather than recomputing them. Focus on actionable insights for business decision-making.
+    """,
+    
+    'cohort': """
+    Perform cohort analysis on the following cohort digest. Rates are relative to cohort size
+    (or to each cohort's first period); the average curve is size-weighted over the cohorts that
+    reached each period, and recent cohorts show their first periods.
+    
+    Cohort Digest: {digest}
+    Analysis Type: {analysis_type}
+    Time Period: {time_period}
+    
+    Provide:
+    1. Cohort performance summary
+    2. Retention/conversion patterns by cohort
+    3. Trends across different time periods
+    4. Factors influencing cohort performance
+    5. Insights for customer lifecycle optimization
+    6. Recommendations for improving metrics
+    
+    Use the digest figures rather than recomputing them. Focus on actionable insights for customer retention and growth.
+    """,
+    
+    'predictive': """
+    Analyze the following historical data digest and provide predictive insights. The baseline
+    forecast (linear trend + seasonal indices, 80% intervals) and its holdout backtest error were
+    computed from the full history; treat them as the reference to adjust with judgement.
+    
+    Historical Digest: {digest}
+    Prediction Target: {prediction_target}
+    Time Horizon: {time_horizon}
+    Influencing Factors: {factors}
+    
+    Provide:
+    1. Trend analysis and pattern identification
+    2. Predictive insights for the target metric
+    3. Confidence levels and uncertainty factors
+    4. Scenario analysis (best case, worst case, most likely)
+    5. Key drivers and influencing factors
+    6. Recommendations for achieving desired outcomes
+    7. Risk factors and mitigation strategies
+    
+    Focus on actionable predictions that can guide business planning.
+    """,
+    
+    'quality_check': """
+    Explain the following data quality scorecard. Every figure was computed by rule-based checks
+    over the full dataset: completeness counts nulls and placeholder values, validity is type and
+    format conformity, uniqueness covers duplicate rows and keys, consistency covers referential
+    checks and stray whitespace, and outliers lie beyond the IQR fences.
+    
+    Scorecard: {scorecard}
+    Quality Criteria: {quality_criteria}
+    
+    Provide:
+    1. Overall assessment of the data quality score
+    2. The most serious issues and their likely causes
+    3. Impact on analysis and reporting
+    4. Suggested data cleaning steps, in priority order
+    5. Validation rules to add at the source
+    
+    Use the scorecard figures rather than estimating them. Focus on practical steps to improve data quality for analysis.
     """
+}, version=2, priorities={'digest': 1, 'scorecard': 1}))
+
+def _render_prompt(name, fields, max_tokens):
+    """Render an analysis prompt within the default model's input budget"""
+    from src.services.ai_service import ai_service
+    return ANALYSIS_PROMPTS[name].render(fields, model=ai_service.default_candidates[0][1],
+                                         max_tokens=max_tokens)
+
+def _digest_or_raw(digest, raw):
+    """The computed digest, or the raw payload (cut to budget) when it has no readable numbers"""
+    if digest.get('success'):
+        return {key: value for key, value in digest.items() if key != 'success'}
+    return {'note': digest.get('error'), 'raw_data': raw}
+
+def _season_length(data):
+    """The requested steps per seasonal cycle, or None to infer it; raises ValueError unless a positive integer"""
+    value = data.get('season_length')
+    if value is None or value == '':
+        return None
+    try:
+        length = int(str(value))
+    except ValueError:
+        length = 0
+    if length < 1:
+        raise ValueError('season_length must be a positive integer')
+    return length
+
+# Advanced analysis endpoints
+@data_analysis_bp.route('/data-analysis/trends', methods=['POST'])
+def trend_analysis():
+    """Analyze trends in time-series data"""
+    data = request.json
+    
+    time_series_data = data.get('time_series_data', [])
+    metrics = data.get('metrics', [])
+    time_period = data.get('time_period', 'monthly')
+    
+    if not time_series_data:
+        return jsonify({'error': 'time_series_data is required'}), 400
+    try:
+        season_length = _season_length(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    from src.services.ai_service import ai_service
+    
+    statistics = analytics_engine.series_digest(
+        time_series_data, metrics=metrics, time_period=time_period,
+        horizon=data.get('forecast_horizon'), season_length=season_length
+    )
+    
+    built = _render_prompt('trends', {
+        'digest': _digest_or_raw(statistics, time_series_data),
+        'metrics': metrics,
+        'time_period': time_period
+    }, max_tokens=1500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1500,
         temperature=0.3
     )
@@ -231,8 +455,10 @@ def trend_analysis():
             'success': True,
             'analysis_type': 'trend_analysis',
             'analysis': result['text'],
+            'statistics': statistics,
             'data_points': len(time_series_data),
             'time_period': time_period,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -252,26 +478,14 @@ def kpi_analysis():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Analyze the following KPI data and provide dashboard insights:
-    
-    KPI Data: {kpi_data}
-    Business Goals: {business_goals}
-    Time Frame: {time_frame}
-    
-    Provide:
-    1. KPI performance summary
-    2. Goal achievement analysis
-    3. Performance trends and patterns
-    4. Areas of concern and opportunity
-    5. Recommended actions for improvement
-    6. Dashboard visualization suggestions
-    
-    Focus on executive-level insights and actionable recommendations.
-    """
+    built = _render_prompt('kpi_dashboard', {
+        'kpi_data': kpi_data,
+        'business_goals': business_goals,
+        'time_frame': time_frame
+    }, max_tokens=1500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1500,
         temperature=0.3
     )
@@ -283,6 +497,7 @@ def kpi_analysis():
             'analysis': result['text'],
             'kpis_analyzed': len(kpi_data),
             'time_frame': time_frame,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -304,25 +519,13 @@ def sentiment_analysis():
     # Combine text data for analysis
     combined_text = '\n'.join(text_data) if isinstance(text_data, list) else str(text_data)
     
-    prompt = f"""
-    Analyze the sentiment and themes in the following text data:
-    
-    Text Data: {combined_text[:3000]}  # Limit for analysis
-    Context: {context}
-    
-    Provide:
-    1. Overall sentiment analysis (positive, negative, neutral percentages)
-    2. Key themes and topics identified
-    3. Emotional indicators and intensity
-    4. Specific concerns or praise points
-    5. Actionable insights for improvement
-    6. Recommendations for response strategy
-    
-    Focus on business-relevant insights and customer experience implications.
-    """
+    built = _render_prompt('sentiment', {
+        'combined_text': combined_text,
+        'context': context
+    }, max_tokens=1200)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1200,
         temperature=0.4
     )
@@ -334,6 +537,7 @@ def sentiment_analysis():
             'analysis': result['text'],
             'text_samples_analyzed': len(text_data) if isinstance(text_data, list) else 1,
             'context': context,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -353,26 +557,16 @@ def cohort_analysis():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Perform cohort analysis on the following customer data:
+    cohorts = analytics_engine.cohort_digest(cohort_data, analysis_type=analysis_type, time_period=time_period)
     
-    Cohort Data: {cohort_data}
-    Analysis Type: {analysis_type}
-    Time Period: {time_period}
-    
-    Provide:
-    1. Cohort performance summary
-    2. Retention/conversion patterns by cohort
-    3. Trends across different time periods
-    4. Factors influencing cohort performance
-    5. Insights for customer lifecycle optimization
-    6. Recommendations for improving metrics
-    
-    Focus on actionable insights for customer retention and growth.
-    """
+    built = _render_prompt('cohort', {
+        'digest': cohorts['digest'] if cohorts['success'] else _digest_or_raw(cohorts, cohort_data),
+        'analysis_type': analysis_type,
+        'time_period': time_period
+    }, max_tokens=1500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1500,
         temperature=0.3
     )
@@ -382,9 +576,12 @@ def cohort_analysis():
             'success': True,
             'analysis_type': 'cohort_analysis',
             'analysis': result['text'],
-            'cohorts_analyzed': len(cohort_data),
+            'statistics': cohorts.get('digest', cohorts),
+            'cohort_matrix': cohorts.get('matrix'),
+            'cohorts_analyzed': cohorts['digest']['cohorts'] if cohorts['success'] else len(cohort_data),
             'analysis_focus': analysis_type,
             'time_period': time_period,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -402,31 +599,27 @@ def predictive_analysis():
     
     if not historical_data:
         return jsonify({'error': 'historical_data is required'}), 400
+    try:
+        season_length = _season_length(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Analyze the following historical data and provide predictive insights:
-    
-    Historical Data: {historical_data}
-    Prediction Target: {prediction_target}
-    Time Horizon: {time_horizon}
-    Influencing Factors: {factors}
-    
-    Provide:
-    1. Trend analysis and pattern identification
-    2. Predictive insights for the target metric
-    3. Confidence levels and uncertainty factors
-    4. Scenario analysis (best case, worst case, most likely)
-    5. Key drivers and influencing factors
-    6. Recommendations for achieving desired outcomes
-    7. Risk factors and mitigation strategies
+    statistics = analytics_engine.series_digest(
+        historical_data, metrics=data.get('metrics') or prediction_target,
+        time_period=data.get('time_period'), horizon=time_horizon, season_length=season_length
+    )
     
-    Focus on actionable predictions that can guide business planning.
-    """
+    built = _render_prompt('predictive', {
+        'digest': _digest_or_raw(statistics, historical_data),
+        'prediction_target': prediction_target,
+        'time_horizon': time_horizon,
+        'factors': factors
+    }, max_tokens=1800)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1800,
         temperature=0.3
     )
@@ -436,9 +629,11 @@ def predictive_analysis():
             'success': True,
             'analysis_type': 'predictive_analysis',
             'analysis': result['text'],
+            'statistics': statistics,
             'data_points': len(historical_data),
             'prediction_target': prediction_target,
             'time_horizon': time_horizon,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -447,49 +642,97 @@ def predictive_analysis():
 # Data quality and validation endpoints
 @data_analysis_bp.route('/data-analysis/quality-check', methods=['POST'])
 def data_quality_check():
-    """Perform data quality analysis"""
-    data = request.json
-    
-    dataset = data.get('dataset', {})
-    quality_criteria = data.get('quality_criteria', ['completeness', 'accuracy', 'consistency'])
+    """
+    Score data quality with rule-based checks over the full dataset
+
+    Accepts JSON ({dataset, rules, quality_criteria, narrative}) or a multipart CSV upload
+    ('file', with 'rules' as a JSON form field); uploads are read in chunks. The LLM only
+    narrates the computed scorecard, and is skipped with narrative=false.
+    """
+    upload_service.limit_request(request)
+    try:
+        upload = request.files.get('file')
+    except RequestEntityTooLarge:
+        return jsonify(upload_service.too_large()), 413
+    if upload is not None:
+        if not upload.filename or upload.filename.rsplit('.', 1)[-1].lower() != 'csv':
+            return jsonify({'error': 'Only CSV files can be uploaded for quality checks'}), 400
+        try:
+            rules = json.loads(request.form.get('rules') or '{}')
+            quality_criteria = json.loads(request.form.get('quality_criteria') or 'null')
+        except ValueError:
+            return jsonify({'error': 'rules and quality_criteria must be JSON'}), 400
+        narrative = request.form.get('narrative', 'true').lower() not in ('false', '0', 'no')
+        try:
+            dataset = pd.read_csv(upload.stream, chunksize=data_quality_service.chunk_size, low_memory=False)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+            return jsonify({'success': False, 'error': f'Could not read CSV: {e}'}), 400
+    else:
+        data = request.json or {}
+        dataset = data.get('dataset', {})
+        rules = data.get('rules') or {}
+        quality_criteria = data.get('quality_criteria')
+        narrative = data.get('narrative', True)
+        if not dataset:
+            return jsonify({'error': 'dataset is required'}), 400
+    quality_criteria = quality_criteria or ['completeness', 'accuracy', 'consistency']
+    try:
+        rules = data_quality_service.validate_rules(rules)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     
-    if not dataset:
-        return jsonify({'error': 'dataset is required'}), 400
+    try:
+        assessment = data_quality_service.assess(dataset, rules=rules)
+    except (ValueError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        assessment = {'success': False, 'error': str(e)}
+    if not assessment['success'] and (upload is not None or not narrative):
+        return jsonify(assessment), 400
+    
+    response = {
+        'success': True,
+        'analysis_type': 'data_quality_check',
+        'quality_criteria': quality_criteria,
+        'overall_score': assessment.get('overall_score'),
+        'assessment': assessment
+    }
+    if not narrative:
+        return jsonify(response)
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Analyze the data quality of the following dataset:
-    
-    Dataset: {dataset}
-    Quality Criteria: {quality_criteria}
-    
-    Evaluate and provide:
-    1. Data completeness assessment
-    2. Data accuracy indicators
-    3. Consistency and format validation
-    4. Duplicate detection
-    5. Outlier identification
-    6. Data quality score and recommendations
-    7. Suggested data cleaning steps
-    
-    Focus on practical steps to improve data quality for analysis.
-    """
+    built = _render_prompt('quality_check', {
+        'scorecard': data_quality_service.digest(assessment) if assessment['success']
+                     else _digest_or_raw(assessment, dataset),
+        'quality_criteria': quality_criteria
+    }, max_tokens=1200)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1200,
         temperature=0.3
     )
     
     if result['success']:
-        return jsonify({
-            'success': True,
-            'analysis_type': 'data_quality_check',
+        response.update({
             'analysis': result['text'],
-            'quality_criteria': quality_criteria,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
+        return jsonify(response)
     else:
         return jsonify(result), 500
 
+@data_analysis_bp.route('/data-analysis/quality-score/business-data', methods=['POST'])
+def score_business_data():
+    """Recompute BusinessData.quality_score in bulk (optionally by data_type, ids or unscored rows only)"""
+    data = request.json or {}
+    ids = data.get('ids')
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids must be a list of integers'}), 400
+    
+    result = data_quality_service.score_business_data(
+        data_type=data.get('data_type'),
+        only_unscored=bool(data.get('only_unscored', False)),
+        ids=ids
+    )
+    return jsonify(result), 200 if result['success'] else 500
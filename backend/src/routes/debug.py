@@ -0,0 +1,46 @@
+from flask import Blueprint, Response, jsonify, request
+from src.services.tracing import tracer
+
+debug_bp = Blueprint('debug', __name__)
+
+@debug_bp.before_request
+def require_debug_access():
+    """Traces and profiles expose SQL and timings; require TRACE_DEBUG_TOKEN (or debug mode)"""
+    if not (tracer.enabled or tracer.profiling_enabled):
+        return jsonify({'error': 'Tracing is disabled'}), 404
+    if not tracer.authorized():
+        return jsonify({'error': 'Debug token required'}), 403
+
+@debug_bp.route('/debug/traces', methods=['GET'])
+def list_traces():
+    """Summaries of recent traces, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    min_ms = request.args.get('min_ms', 0.0, type=float)
+    
+    return jsonify({
+        'traces': tracer.recent(limit=limit, min_ms=min_ms),
+        'stats': tracer.stats()
+    })
+
+@debug_bp.route('/debug/traces/export', methods=['GET'])
+def export_traces():
+    """All buffered traces as OTLP/JSON"""
+    min_ms = request.args.get('min_ms', 0.0, type=float)
+    return jsonify(tracer.export(min_ms=min_ms))
+
+@debug_bp.route('/debug/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """One trace as OTLP/JSON"""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return jsonify({'error': 'Trace not found'}), 404
+    return jsonify(tracer.to_otlp([trace]))
+
+@debug_bp.route('/debug/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """A profile captured with the X-Profile request header"""
+    profile = tracer.get_profile(profile_id)
+    if profile is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    mimetype = 'text/html' if profile['format'] == 'html' else 'text/plain'
+    return Response(profile['body'], mimetype=mimetype)
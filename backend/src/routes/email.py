@@ -1,6 +1,10 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from datetime import datetime, timedelta
+import json
 from src.services.email_service import email_service
+from src.routes.health import cached_health_response
+from src.services.prompt_registry import prompt_registry
+from src.services.email_list_service import email_list_service, EmailListError, SUBSCRIBER_STATUSES
 
 email_bp = Blueprint('email', __name__)
 
@@ -40,6 +44,8 @@ def send_campaign():
     campaign_data = {
         'campaign_id': data.get('campaign_id'),
         'recipients': data.get('recipients', []),
+        'list_id': data.get('list_id'),
+        'tag': data.get('tag'),
         'subject': data.get('subject'),
         'content': data.get('content'),
         'template': data.get('template'),
@@ -47,8 +53,11 @@ def send_campaign():
         'method': data.get('method', 'auto')
     }
     
-    if not campaign_data['recipients'] or not campaign_data['subject'] or not campaign_data['content']:
-        return jsonify({'error': 'recipients, subject, and content are required'}), 400
+    if not (campaign_data['recipients'] or campaign_data['list_id']) or not campaign_data['subject'] or not campaign_data['content']:
+        return jsonify({'error': 'recipients (or list_id), subject, and content are required'}), 400
+    
+    if campaign_data['list_id'] and not email_list_service.get_list(campaign_data['list_id']):
+        return jsonify({'error': f"Email list '{campaign_data['list_id']}' not found"}), 404
     
     result = email_service.send_campaign(campaign_data)
     return jsonify(result)
@@ -136,25 +145,12 @@ def get_email_report():
 
 @email_bp.route('/email/health', methods=['GET'])
 def email_health():
-    """Check email service health"""
-    result = email_service.health_check()
-    return jsonify(result)
+    """Check email service health (cached background probe)"""
+    return cached_health_response('email')
 
 # AI-powered email content generation
-@email_bp.route('/email/generate-content', methods=['POST'])
-def generate_email_content():
-    """Generate email content using AI"""
-    data = request.json
-    
-    purpose = data.get('purpose', 'general')  # newsletter, lead_nurture, follow_up, etc.
-    audience = data.get('audience', 'general')
-    tone = data.get('tone', 'professional')
-    key_points = data.get('key_points', [])
-    company_info = data.get('company_info', {})
-    
-    from src.services.ai_service import ai_service
-    
-    prompt = f"""
+EMAIL_PROMPTS = prompt_registry.register_many('email', {
+    'generate_content': """
     Generate professional email content for the following specifications:
     
     Purpose: {purpose}
@@ -169,10 +165,96 @@ def generate_email_content():
     3. Call-to-action suggestions
     
     The email should be engaging, professional, and tailored to the specified audience and purpose.
+    """,
+    
+    'personalize': """
+    Personalize the following email template for the specific recipient:
+    
+    Template Content: {template_content}
+    Recipient Data: {recipient_data}
+    
+    Personalize the content by:
+    1. Using the recipient's name and information naturally
+    2. Tailoring the message to their interests/industry if available
+    3. Adjusting the tone based on their profile
+    4. Making the content more relevant and engaging
+    
+    Return the personalized email content.
+    """,
+    
+    'campaign_optimization': """
+    Analyze the following email campaign performance and provide optimization recommendations:
+    
+    Campaign Data: {campaign_data}
+    Current Performance Metrics: {performance_metrics}
+    Target Metrics: {target_metrics}
+    
+    Provide specific recommendations for:
+    1. Subject line optimization
+    2. Content improvements
+    3. Send time optimization
+    4. Audience segmentation
+    5. Call-to-action improvements
+    6. Overall strategy adjustments
+    
+    Focus on actionable insights that can improve open rates, click rates, and conversions.
+    """,
+    
+    'lead_nurture_sequence': """
+    Create a lead nurturing email sequence with the following specifications:
+    
+    Lead Information: {lead_data}
+    Sequence Type: {sequence_type}
+    Duration: {duration_days} days
+    Email Frequency: {email_frequency}
+    
+    Generate a sequence of 5-7 emails including:
+    1. Welcome/Introduction email
+    2. Value-driven content emails
+    3. Social proof/case study email
+    4. Educational content email
+    5. Soft pitch/demo offer email
+    6. Follow-up emails
+    
+    For each email, provide:
+    - Subject line
+    - Email content outline
+    - Call-to-action
+    - Send timing (day in sequence)
+    
+    Tailor the content to the lead's industry and interests if available.
     """
+})
+
+def _render_prompt(name, fields, max_tokens):
+    """Render an email prompt within the default model's input budget"""
+    from src.services.ai_service import ai_service
+    return EMAIL_PROMPTS[name].render(fields, model=ai_service.default_candidates[0][1],
+                                      max_tokens=max_tokens)
+
+@email_bp.route('/email/generate-content', methods=['POST'])
+def generate_email_content():
+    """Generate email content using AI"""
+    data = request.json
+    
+    purpose = data.get('purpose', 'general')  # newsletter, lead_nurture, follow_up, etc.
+    audience = data.get('audience', 'general')
+    tone = data.get('tone', 'professional')
+    key_points = data.get('key_points', [])
+    company_info = data.get('company_info', {})
+    
+    from src.services.ai_service import ai_service
+    
+    built = _render_prompt('generate_content', {
+        'purpose': purpose,
+        'audience': audience,
+        'tone': tone,
+        'key_points': key_points,
+        'company_info': company_info
+    }, max_tokens=1500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1500,
         temperature=0.7
     )
@@ -184,6 +266,7 @@ def generate_email_content():
             'purpose': purpose,
             'audience': audience,
             'tone': tone,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -204,23 +287,13 @@ def personalize_email():
     if personalization_level == 'ai_powered':
         from src.services.ai_service import ai_service
         
-        prompt = f"""
-        Personalize the following email template for the specific recipient:
-        
-        Template Content: {template_content}
-        Recipient Data: {recipient_data}
-        
-        Personalize the content by:
-        1. Using the recipient's name and information naturally
-        2. Tailoring the message to their interests/industry if available
-        3. Adjusting the tone based on their profile
-        4. Making the content more relevant and engaging
-        
-        Return the personalized email content.
-        """
+        built = _render_prompt('personalize', {
+            'template_content': template_content,
+            'recipient_data': recipient_data
+        }, max_tokens=1000)
         
         result = ai_service.generate_text(
-            prompt=prompt,
+            prompt=built.prompt,
             max_tokens=1000,
             temperature=0.6
         )
@@ -253,26 +326,14 @@ def optimize_email_campaign():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Analyze the following email campaign performance and provide optimization recommendations:
-    
-    Campaign Data: {campaign_data}
-    Current Performance Metrics: {performance_metrics}
-    Target Metrics: {target_metrics}
-    
-    Provide specific recommendations for:
-    1. Subject line optimization
-    2. Content improvements
-    3. Send time optimization
-    4. Audience segmentation
-    5. Call-to-action improvements
-    6. Overall strategy adjustments
-    
-    Focus on actionable insights that can improve open rates, click rates, and conversions.
-    """
+    built = _render_prompt('campaign_optimization', {
+        'campaign_data': campaign_data,
+        'performance_metrics': performance_metrics,
+        'target_metrics': target_metrics
+    }, max_tokens=1500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=1500,
         temperature=0.4
     )
@@ -283,6 +344,7 @@ def optimize_email_campaign():
             'optimization_recommendations': result['text'],
             'campaign_data': campaign_data,
             'performance_metrics': performance_metrics,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -301,33 +363,15 @@ def create_lead_nurture_sequence():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    Create a lead nurturing email sequence with the following specifications:
-    
-    Lead Information: {lead_data}
-    Sequence Type: {sequence_type}
-    Duration: {duration_days} days
-    Email Frequency: {email_frequency}
-    
-    Generate a sequence of 5-7 emails including:
-    1. Welcome/Introduction email
-    2. Value-driven content emails
-    3. Social proof/case study email
-    4. Educational content email
-    5. Soft pitch/demo offer email
-    6. Follow-up emails
-    
-    For each email, provide:
-    - Subject line
-    - Email content outline
-    - Call-to-action
-    - Send timing (day in sequence)
-    
-    Tailor the content to the lead's industry and interests if available.
-    """
+    built = _render_prompt('lead_nurture_sequence', {
+        'lead_data': lead_data,
+        'sequence_type': sequence_type,
+        'duration_days': duration_days,
+        'email_frequency': email_frequency
+    }, max_tokens=2000)
     
     result = ai_service.generate_text(
-        prompt=prompt,
+        prompt=built.prompt,
         max_tokens=2000,
         temperature=0.6
     )
@@ -339,6 +383,7 @@ def create_lead_nurture_sequence():
             'lead_data': lead_data,
             'sequence_type': sequence_type,
             'duration_days': duration_days,
+            'prompt_usage': built.report(),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -369,33 +414,19 @@ def trigger_lead_nurture():
     })
 
 # Email list management
+def _parse_subscriber_filters():
+    """Read status/tag filters shared by the subscriber read endpoints"""
+    status = request.args.get('status', 'active')
+    if status == 'all':
+        status = None
+    elif status not in SUBSCRIBER_STATUSES:
+        raise EmailListError(f'Invalid status: {status}')
+    return status, request.args.get('tag')
+
 @email_bp.route('/email/lists', methods=['GET'])
 def get_email_lists():
     """Get all email lists"""
-    # Mock email lists data
-    lists = [
-        {
-            'list_id': 'newsletter_subscribers',
-            'name': 'Newsletter Subscribers',
-            'subscriber_count': 1250,
-            'created_at': '2024-01-15T10:00:00Z',
-            'last_campaign': '2025-01-20T14:30:00Z'
-        },
-        {
-            'list_id': 'leads_tech_industry',
-            'name': 'Tech Industry Leads',
-            'subscriber_count': 340,
-            'created_at': '2024-02-01T09:00:00Z',
-            'last_campaign': '2025-01-18T11:00:00Z'
-        },
-        {
-            'list_id': 'customers_active',
-            'name': 'Active Customers',
-            'subscriber_count': 890,
-            'created_at': '2024-01-01T00:00:00Z',
-            'last_campaign': '2025-01-22T16:00:00Z'
-        }
-    ]
+    lists = email_list_service.get_lists()
     
     return jsonify({
         'success': True,
@@ -403,57 +434,127 @@ def get_email_lists():
         'total_lists': len(lists)
     })
 
+@email_bp.route('/email/lists', methods=['POST'])
+def create_email_list():
+    """Create a new email list"""
+    data = request.json
+    
+    list_id = data.get('list_id')
+    name = data.get('name')
+    
+    if not list_id or not name:
+        return jsonify({'error': 'list_id and name are required'}), 400
+    
+    try:
+        email_list = email_list_service.create_list(list_id, name, data.get('description'))
+    except EmailListError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({
+        'success': True,
+        'list': email_list.to_dict(subscriber_count=0)
+    }), 201
+
 @email_bp.route('/email/lists/<list_id>/subscribers', methods=['GET'])
 def get_list_subscribers(list_id):
-    """Get subscribers for a specific email list"""
-    # Mock subscriber data
-    subscribers = [
-        {
-            'email': 'john.doe@example.com',
-            'name': 'John Doe',
-            'subscribed_at': '2024-03-15T10:30:00Z',
-            'status': 'active',
-            'tags': ['tech', 'ceo']
-        },
-        {
-            'email': 'jane.smith@company.com',
-            'name': 'Jane Smith',
-            'subscribed_at': '2024-03-20T14:15:00Z',
-            'status': 'active',
-            'tags': ['marketing', 'director']
-        }
-    ]
+    """Get one keyset page of subscribers for a specific email list"""
+    if not email_list_service.get_list(list_id):
+        return jsonify({'error': f"Email list '{list_id}' not found"}), 404
+    
+    try:
+        status, tag = _parse_subscriber_filters()
+    except EmailListError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    after_id = request.args.get('after', 0, type=int)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+    
+    subscribers, next_cursor = email_list_service.get_subscriber_page(
+        list_id, status=status, tag=tag, after_id=after_id, limit=limit
+    )
     
     return jsonify({
         'success': True,
         'list_id': list_id,
         'subscribers': subscribers,
-        'total_subscribers': len(subscribers)
+        'next_cursor': next_cursor,
+        'total_subscribers': email_list_service.count_subscribers(list_id, status=status, tag=tag)
     })
 
+@email_bp.route('/email/lists/<list_id>/subscribers/export', methods=['GET'])
+def export_list_subscribers(list_id):
+    """Stream all matching subscribers of a list as NDJSON"""
+    if not email_list_service.get_list(list_id):
+        return jsonify({'error': f"Email list '{list_id}' not found"}), 404
+    
+    try:
+        status, tag = _parse_subscriber_filters()
+    except EmailListError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    after_id = request.args.get('after', 0, type=int)
+    
+    def generate():
+        for subscriber in email_list_service.iter_subscribers(list_id, status=status, tag=tag, after_id=after_id):
+            yield json.dumps(subscriber) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={list_id}-subscribers.ndjson'}
+    )
+
 @email_bp.route('/email/lists/<list_id>/subscribers', methods=['POST'])
 def add_subscriber(list_id):
-    """Add subscriber to email list"""
-    data = request.json
+    """
+    Add subscribers to an email list
     
-    email = data.get('email')
-    name = data.get('name')
-    tags = data.get('tags', [])
+    Accepts a single subscriber object, ``{"subscribers": [...]}`` for bulk
+    imports, or an ``application/x-ndjson`` body that is imported while it streams in.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        def ndjson_records():
+            for line in request.stream:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+        records, single = ndjson_records(), None
+    else:
+        data = request.json or {}
+        if 'subscribers' in data:
+            records, single = data.get('subscribers') or [], None
+        else:
+            if not data.get('email'):
+                return jsonify({'error': 'email is required'}), 400
+            records, single = [data], data
     
-    if not email:
-        return jsonify({'error': 'email is required'}), 400
+    try:
+        stats = email_list_service.import_subscribers(list_id, records)
+    except EmailListError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    if single is not None:
+        if not stats['upserted']:
+            return jsonify({'error': 'Invalid subscriber'}), 400
+        return jsonify({
+            'success': True,
+            'message': 'Subscriber added successfully',
+            'list_id': list_id,
+            'subscriber': {
+                'email': single['email'].strip().lower(),
+                'name': single.get('name'),
+                'tags': single.get('tags', []),
+                'subscribed_at': datetime.utcnow().isoformat(),
+                'status': single.get('status', 'active')
+            }
+        })
     
-    # Mock subscriber addition
     return jsonify({
         'success': True,
-        'message': 'Subscriber added successfully',
+        'message': 'Subscribers imported',
         'list_id': list_id,
-        'subscriber': {
-            'email': email,
-            'name': name,
-            'tags': tags,
-            'subscribed_at': datetime.utcnow().isoformat(),
-            'status': 'active'
-        }
+        'import': stats
     })
-
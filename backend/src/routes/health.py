@@ -0,0 +1,56 @@
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from src.config import settings
+from src.services.health_registry import health_registry
+
+health_bp = Blueprint('health', __name__)
+
+def cached_health_response(name):
+    """Serve a service's last background probe result; ?refresh=true reruns it (rate limited per probe)"""
+    if request.args.get('refresh', 'false').lower() == 'true':
+        entry = health_registry.refresh(name)
+    else:
+        entry = health_registry.get(name)
+    if entry is None:
+        return jsonify({'service_status': 'unknown', 'error': f'No health probe registered for {name}'}), 404
+    
+    body = dict(entry['result']) if isinstance(entry['result'], dict) else {}
+    if entry['status'] != 'healthy':
+        body['service_status'] = entry['status']
+    body['health_check'] = {
+        'status': entry['status'],
+        'checked_at': entry['checked_at'],
+        'age_seconds': entry['age_seconds'],
+        'stale': entry['stale'],
+        'duration_ms': entry['duration_ms']
+    }
+    
+    return jsonify(body), 200 if entry['healthy'] else 503
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """Aggregate health of all registered probes (served from memory)"""
+    probes = health_registry.snapshot()
+    ready = health_registry.is_ready()
+    
+    return jsonify({
+        'status': 'healthy' if all(entry['healthy'] for entry in probes.values()) else ('degraded' if ready else 'unhealthy'),
+        'ready': ready,
+        'service': settings.app_name,
+        'timestamp': datetime.utcnow().isoformat(),
+        'services': {name: entry['status'] for name, entry in probes.items()},
+        'probes': probes
+    }), 200 if ready else 503
+
+@health_bp.route('/health/live', methods=['GET'])
+def liveness():
+    """Liveness: the process is serving requests and the probe scheduler is running"""
+    alive = health_registry.is_alive()
+    return jsonify({'status': 'alive' if alive else 'scheduler_stopped'}), 200 if alive else 503
+
+@health_bp.route('/health/ready', methods=['GET'])
+def readiness():
+    """Readiness: every critical probe last reported healthy"""
+    ready = health_registry.is_ready()
+    critical = {name: entry['status'] for name, entry in health_registry.snapshot().items() if entry['critical']}
+    return jsonify({'status': 'ready' if ready else 'not_ready', 'critical': critical}), 200 if ready else 503
@@ -0,0 +1,11 @@
+from flask import Blueprint, Response, jsonify
+from src.services.metrics import CONTENT_TYPE, metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), mimetype=None, content_type=CONTENT_TYPE)
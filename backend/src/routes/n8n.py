@@ -1,6 +1,14 @@
-from flask import Blueprint, jsonify, request
-from src.services.n8n_service import n8n_service
+import json
+import os
+import time
+from datetime import datetime
+from flask import Blueprint, Response, jsonify, request
+from src.services.n8n_service import EXECUTION_STATUS_MAP, n8n_service
+from src.routes.health import cached_health_response
 from src.services.social_media_service import social_media_service
+from src.services.n8n_webhook_service import n8n_webhook_service
+from src.services.swr_cache import SWRCache, run_probes
+from src.services.webhook_buffer import BufferFullError
 
 n8n_bp = Blueprint('n8n', __name__)
 
@@ -27,17 +35,102 @@ def trigger_webhook(webhook_name):
     result = n8n_service.trigger_webhook(webhook_name, data)
     return jsonify(result)
 
+def _tracked_execution(execution_id):
+    """
+    Get an execution from the registry, seeding it from the n8n API on first sight
+    
+    Returns:
+        Tuple of (execution, failed lookup); execution is None when n8n could not provide it
+    """
+    execution = n8n_service.executions.get(execution_id)
+    if execution is not None:
+        return execution, None
+    
+    result = n8n_service.get_workflow_status(execution_id)
+    if not result.get('success'):
+        return None, result
+    
+    return n8n_service.executions.track(
+        execution_id,
+        status=EXECUTION_STATUS_MAP.get(str(result.get('status')).lower(), 'running'),
+        data=result.get('execution_data'),
+        source='poll'
+    ), None
+
+def _execution_lookup_failed(result):
+    """404 only when n8n says the execution is unknown; 502/503 when n8n itself failed"""
+    status_code = result.get('status_code')
+    if status_code == 404:
+        return jsonify({'success': False, 'error': f"Execution not found: {result.get('error')}"}), 404
+    if status_code is None:
+        return jsonify({'success': False, 'error': f"n8n unavailable: {result.get('error')}"}), 503
+    return jsonify({'success': False, 'error': f"n8n execution lookup failed: {result.get('error')}"}), 502
+
+def _execution_response(execution):
+    return {
+        'success': True,
+        'status': execution['status'],
+        'done': execution['done'],
+        'execution': execution,
+        'execution_data': execution['execution_data']
+    }
+
 @n8n_bp.route('/n8n/executions/<execution_id>/status', methods=['GET'])
 def get_execution_status(execution_id):
     """Get the status of a workflow execution"""
-    result = n8n_service.get_workflow_status(execution_id)
-    return jsonify(result)
+    execution, failed = _tracked_execution(execution_id)
+    if execution is None:
+        return _execution_lookup_failed(failed)
+    
+    return jsonify(_execution_response(execution))
+
+@n8n_bp.route('/n8n/executions/<execution_id>/wait', methods=['GET'])
+def wait_for_execution(execution_id):
+    """Long-poll until a workflow execution finishes or the timeout passes"""
+    timeout = min(max(request.args.get('timeout', 30, type=float), 0), 60)
+    
+    execution, failed = _tracked_execution(execution_id)
+    if execution is None:
+        return _execution_lookup_failed(failed)
+    
+    execution = n8n_service.executions.wait(execution_id, timeout)
+    return jsonify(_execution_response(execution))
+
+@n8n_bp.route('/n8n/executions/<execution_id>/events', methods=['GET'])
+def stream_execution_events(execution_id):
+    """Stream execution status changes as server-sent events until it finishes"""
+    max_duration = min(max(request.args.get('timeout', 300, type=float), 1), 900)
+    
+    execution, failed = _tracked_execution(execution_id)
+    if execution is None:
+        return _execution_lookup_failed(failed)
+    
+    def generate(execution):
+        deadline = time.monotonic() + max_duration
+        yield f"event: status\ndata: {json.dumps(execution, default=str)}\n\n"
+        
+        while not execution['done']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            
+            version = execution['version']
+            execution = n8n_service.executions.wait(execution_id, min(remaining, 15), since_version=version)
+            if execution is None:
+                return
+            if execution['version'] > version:
+                yield f"event: status\ndata: {json.dumps(execution, default=str)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+    
+    return Response(generate(execution), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @n8n_bp.route('/n8n/health', methods=['GET'])
 def n8n_health():
-    """Check n8n service health"""
-    result = n8n_service.health_check()
-    return jsonify(result)
+    """Check n8n service health (cached background probe)"""
+    return cached_health_response('n8n')
 
 # Social Media Automation Routes
 @n8n_bp.route('/n8n/social-media/post', methods=['POST'])
@@ -210,88 +303,113 @@ def schedule_content_calendar():
     return jsonify(result)
 
 # Automation Status Routes
-@n8n_bp.route('/n8n/automation/status', methods=['GET'])
-def get_automation_status():
-    """Get overall automation system status"""
-    
-    # Check n8n health
-    n8n_health = n8n_service.health_check()
-    
-    # Check social media service health
-    social_health = social_media_service.health_check()
-    
-    # Get workflow list
-    workflows = n8n_service.list_workflows()
-    
-    status = {
-        'timestamp': n8n_health.get('timestamp'),
+def _load_automation_status():
+    """Probe n8n, social media and the workflow list concurrently"""
+    probe_timeout = float(os.getenv('AUTOMATION_PROBE_TIMEOUT_SECONDS', '5'))
+    
+    results = run_probes({
+        'n8n_service': n8n_service.health_check,
+        'social_media_service': social_media_service.health_check,
+        'workflows': n8n_service.list_workflows
+    }, default_timeout=probe_timeout)
+    
+    n8n_health = results['n8n_service']
+    return {
+        'timestamp': n8n_health.get('timestamp') or datetime.utcnow().isoformat(),
         'n8n_service': n8n_health,
-        'social_media_service': social_health,
-        'workflows': workflows,
+        'social_media_service': results['social_media_service'],
+        'workflows': results['workflows'],
         'overall_status': 'healthy' if n8n_health.get('success') else 'degraded'
     }
+
+automation_status_cache = SWRCache(
+    'automation-status',
+    _load_automation_status,
+    ttl=float(os.getenv('AUTOMATION_STATUS_TTL_SECONDS', '15'))
+)
+
+@n8n_bp.route('/n8n/automation/status', methods=['GET'])
+def get_automation_status():
+    """Get overall automation system status (cached, refreshed in the background)"""
+    cached = automation_status_cache.get()
+    if cached['value'] is None:
+        return jsonify({'overall_status': 'unknown', 'error': 'Status probe failed', 'cache': cached['cache']}), 503
     
-    return jsonify(status)
+    return jsonify({**cached['value'], 'cache': cached['cache']})
 
 # Webhook Endpoints for n8n to call back
+def _saturated_response(error):
+    """429 telling n8n when to retry a callback the intake could not accept"""
+    response = jsonify({'success': False, 'error': 'Webhook intake is saturated', 'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+def _invalid_response(error):
+    """400 for a callback body that can never be applied"""
+    return jsonify({'success': False, 'error': str(error)}), 400
+
 @n8n_bp.route('/n8n/webhooks/task-completed', methods=['POST'])
 def handle_task_completed():
     """Handle task completion webhook from n8n"""
-    data = request.json
-    
-    task_id = data.get('task_id')
-    workflow_id = data.get('workflow_id')
-    execution_id = data.get('execution_id')
-    result = data.get('result', {})
-    status = data.get('status', 'completed')
-    
-    # Log the completion
-    print(f"n8n task completed: {task_id}, workflow: {workflow_id}, status: {status}")
+    data = request.json or {}
     
-    # Here you could update your database, send notifications, etc.
+    try:
+        queued = n8n_webhook_service.ingest('task-completed', data)
+    except ValueError as e:
+        return _invalid_response(e)
+    except BufferFullError as e:
+        return _saturated_response(e)
     
     return jsonify({
         'success': True,
-        'message': 'Task completion processed',
-        'task_id': task_id
-    })
+        'message': 'Task completion queued' if queued else 'Duplicate task completion ignored',
+        'duplicate': not queued,
+        'task_id': data.get('task_id')
+    }), 202 if queued else 200
 
 @n8n_bp.route('/n8n/webhooks/workflow-error', methods=['POST'])
 def handle_workflow_error():
     """Handle workflow error webhook from n8n"""
-    data = request.json
-    
-    workflow_id = data.get('workflow_id')
-    execution_id = data.get('execution_id')
-    error = data.get('error', {})
-    
-    # Log the error
-    print(f"n8n workflow error: {workflow_id}, execution: {execution_id}, error: {error}")
+    data = request.json or {}
     
-    # Here you could send alerts, update status, etc.
+    try:
+        queued = n8n_webhook_service.ingest('workflow-error', data)
+    except ValueError as e:
+        return _invalid_response(e)
+    except BufferFullError as e:
+        return _saturated_response(e)
     
     return jsonify({
         'success': True,
-        'message': 'Error processed',
-        'workflow_id': workflow_id
-    })
+        'message': 'Error queued' if queued else 'Duplicate error ignored',
+        'duplicate': not queued,
+        'workflow_id': data.get('workflow_id')
+    }), 202 if queued else 200
 
 @n8n_bp.route('/n8n/webhooks/lead-generated', methods=['POST'])
 def handle_lead_generated():
     """Handle new lead webhook from n8n"""
-    data = request.json
-    
-    lead_data = data.get('lead', {})
-    source = data.get('source', 'n8n_workflow')
-    
-    # Process the new lead
-    print(f"New lead generated: {lead_data.get('email', 'unknown')} from {source}")
+    data = request.json or {}
     
-    # Here you could save to database, trigger follow-up workflows, etc.
+    try:
+        queued = n8n_webhook_service.ingest('lead-generated', data)
+    except ValueError as e:
+        return _invalid_response(e)
+    except BufferFullError as e:
+        return _saturated_response(e)
     
     return jsonify({
         'success': True,
-        'message': 'Lead processed',
-        'lead_id': lead_data.get('id')
-    })
+        'message': 'Lead queued' if queued else 'Duplicate lead ignored',
+        'duplicate': not queued,
+        'lead_id': (data.get('lead') or {}).get('id')
+    }), 202 if queued else 200
 
+@n8n_bp.route('/n8n/webhooks/stats', methods=['GET'])
+def webhook_buffer_stats():
+    """Get webhook intake buffer statistics for this worker"""
+    return jsonify({
+        'success': True,
+        'buffer': n8n_webhook_service.buffer.stats(),
+        'executions': n8n_service.executions.stats()
+    })
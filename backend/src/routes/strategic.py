@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from src.services.strategic_ai_service import strategic_ai_service
+from src.routes.health import cached_health_response
 
 strategic_bp = Blueprint('strategic', __name__)
 
@@ -174,26 +175,16 @@ def quick_strategic_insights():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    As a strategic business advisor, provide immediate strategic insights for this urgent business question:
-    
-    Question: {business_question}
-    Context: {context}
-    Urgency Level: {urgency}
-    
-    Provide:
-    1. Key strategic considerations
-    2. Immediate recommendations
-    3. Potential risks and opportunities
-    4. Next steps and timeline
-    
-    Keep response focused and actionable given the {urgency} urgency level.
-    """
+    built = strategic_ai_service.render_prompt('quick_insights', {
+        'business_question': business_question,
+        'context': context,
+        'urgency': urgency
+    }, max_tokens=max_tokens)
     
     result = ai_service.generate_text(
-        prompt=prompt,
-        provider='openai',
-        model='gpt-4.5-turbo',
+        prompt=built.prompt,
+        system=built.system,
+        candidates=strategic_ai_service.strategic_candidates,
         max_tokens=max_tokens,
         temperature=temperature
     )
@@ -205,6 +196,8 @@ def quick_strategic_insights():
             'question': business_question,
             'urgency': urgency,
             'context': context,
+            'prompt_usage': built.report(),
+            'prompt_cache': result.get('prompt_cache'),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -223,41 +216,15 @@ def swot_analysis():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    As a strategic analyst, conduct a comprehensive SWOT analysis:
-    
-    Company Information: {company_info}
-    Market Context: {market_context}
-    
-    Provide a detailed SWOT analysis with:
-    
-    STRENGTHS:
-    - Internal capabilities and advantages
-    - Unique value propositions
-    - Competitive advantages
-    
-    WEAKNESSES:
-    - Internal limitations and gaps
-    - Areas for improvement
-    - Competitive disadvantages
-    
-    OPPORTUNITIES:
-    - Market opportunities
-    - Emerging trends to leverage
-    - Strategic partnerships potential
-    
-    THREATS:
-    - Market threats and challenges
-    - Competitive threats
-    - External risks
-    
-    For each category, provide specific, actionable insights with strategic implications.
-    """
+    built = strategic_ai_service.render_prompt('swot_analysis', {
+        'company_info': company_info,
+        'market_context': market_context
+    }, max_tokens=2000)
     
     result = ai_service.generate_text(
-        prompt=prompt,
-        provider='openai',
-        model='gpt-4.5-turbo',
+        prompt=built.prompt,
+        system=built.system,
+        candidates=strategic_ai_service.strategic_candidates,
         max_tokens=2000,
         temperature=0.3
     )
@@ -268,6 +235,8 @@ def swot_analysis():
             'swot_analysis': result['text'],
             'company_info': company_info,
             'market_context': market_context,
+            'prompt_usage': built.report(),
+            'prompt_cache': result.get('prompt_cache'),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -287,46 +256,16 @@ def scenario_planning():
     
     from src.services.ai_service import ai_service
     
-    prompt = f"""
-    As a scenario planning expert, develop strategic scenarios for planning purposes:
-    
-    Base Scenario: {base_scenario}
-    Key Variables: {variables}
-    Time Horizon: {time_horizon}
-    
-    Develop 3-4 distinct scenarios:
-    
-    1. OPTIMISTIC SCENARIO
-       - Best-case assumptions
-       - Favorable market conditions
-       - Strategic implications and opportunities
-    
-    2. PESSIMISTIC SCENARIO
-       - Worst-case assumptions
-       - Challenging market conditions
-       - Risk mitigation strategies
-    
-    3. MOST LIKELY SCENARIO
-       - Realistic assumptions
-       - Expected market conditions
-       - Balanced strategic approach
-    
-    4. DISRUPTIVE SCENARIO (if applicable)
-       - Unexpected market disruptions
-       - Technology or regulatory changes
-       - Adaptive strategies required
-    
-    For each scenario, provide:
-    - Key assumptions and drivers
-    - Strategic implications
-    - Recommended actions
-    - Success metrics
-    """
+    built = strategic_ai_service.render_prompt('scenario_planning', {
+        'base_scenario': base_scenario,
+        'variables': variables,
+        'time_horizon': time_horizon
+    }, max_tokens=2500)
     
     result = ai_service.generate_text(
-        prompt=prompt,
-        provider='openai',
-        model='gpt-4.5-turbo',
+        prompt=built.prompt,
+        system=built.system,
+        candidates=strategic_ai_service.strategic_candidates,
         max_tokens=2500,
         temperature=0.4
     )
@@ -338,6 +277,8 @@ def scenario_planning():
             'base_scenario': base_scenario,
             'variables': variables,
             'time_horizon': time_horizon,
+            'prompt_usage': built.report(),
+            'prompt_cache': result.get('prompt_cache'),
             'generated_at': result.get('timestamp')
         })
     else:
@@ -345,23 +286,6 @@ def scenario_planning():
 
 @strategic_bp.route('/strategic/health', methods=['GET'])
 def strategic_health():
-    """Check strategic AI service health"""
-    from src.services.ai_service import ai_service
-    
-    # Test strategic AI capabilities
-    test_result = ai_service.generate_text(
-        prompt="Provide a brief strategic insight about business growth.",
-        provider='openai',
-        model='gpt-4.5-turbo',
-        max_tokens=100,
-        temperature=0.3
-    )
-    
-    return jsonify({
-        'service_status': 'healthy',
-        'strategic_models_available': strategic_ai_service.strategic_models,
-        'default_provider': strategic_ai_service.default_strategic_provider,
-        'test_generation': test_result.get('success', False),
-        'timestamp': test_result.get('timestamp')
-    })
+    """Check strategic AI service health (cached background probe)"""
+    return cached_health_response('strategic')
 
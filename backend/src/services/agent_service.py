@@ -5,10 +5,17 @@ Manages AI agents, their tasks, and coordination
 
 import json
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
-from src.models.agent import Agent, Task, AgentMetric, BusinessData, db
+from sqlalchemy import select
+from src.models.agent import Agent, Task, AgentMetric, BusinessData, BusinessDataClaim, db
 from src.services.ai_service import ai_service
+from src.services.dedup_service import not_duplicate
+from src.services.embedding_index import embedding_index, records_for_prompt
+from src.services.metrics import family, metrics
+from src.services.prompt_builder import fit_json
+from src.services.usage_ledger import usage_scope
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +70,10 @@ class AgentService:
                 }
             }
         }
+        
+        # Business records retrieved per task, and their share of the prompt
+        self.business_data_top_k = int(os.getenv('BUSINESS_DATA_TOP_K', '8'))
+        self.business_data_prompt_tokens = int(os.getenv('BUSINESS_DATA_PROMPT_TOKENS', '1000'))
     
     def create_agent(self, name: str, agent_type: str, description: str = None, 
                     custom_config: Dict[str, Any] = None) -> Agent:
@@ -163,8 +174,9 @@ class AgentService:
         db.session.commit()
         
         try:
-            # Execute task based on type
-            result = self._execute_task_by_type(task)
+            # Execute task based on type, attributing its LLM usage to the agent
+            with usage_scope(agent_id=task.agent_id):
+                result = self._execute_task_by_type(task)
             
             # Update task with result
             task.status = 'completed'
@@ -212,9 +224,9 @@ class AgentService:
         elif task_type == 'lead_generation':
             return self._execute_lead_generation(parameters)
         elif task_type == 'data_analysis':
-            return self._execute_data_analysis(parameters)
+            return self._execute_data_analysis(task, parameters)
         elif task_type == 'strategic_planning':
-            return self._execute_strategic_planning(parameters)
+            return self._execute_strategic_planning(task, parameters)
         elif task_type == 'social_media_post':
             return self._execute_social_media_post(parameters)
         elif task_type == 'email_campaign':
@@ -277,16 +289,50 @@ class AgentService:
             'type': 'lead_generation'
         }
     
-    def _execute_data_analysis(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    def _task_query(self, task: Task, parameters: Dict[str, Any]) -> str:
+        """Retrieval query for a task: an explicit 'query' parameter, else what the task is about"""
+        if parameters.get('query'):
+            return str(parameters['query'])
+        parts = [task.title, task.description] + [str(parameters[key]) for key in ('analysis_type', 'focus_areas', 'topic')
+                                                  if parameters.get(key)]
+        return ' '.join(part for part in parts if part)
+    
+    def _retrieve_records(self, task: Task, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Business records for a task, with 'top_k' clamped to 1-100 and 'data_types' a name or list of names"""
+        try:
+            k = min(max(int(parameters.get('top_k', self.business_data_top_k)), 1), 100)
+        except (TypeError, ValueError):
+            raise ValueError('top_k must be an integer')
+        data_types = parameters.get('data_types')
+        if isinstance(data_types, str):
+            data_types = [data_types]
+        elif data_types is not None and not (isinstance(data_types, list)
+                                             and all(isinstance(name, str) for name in data_types)):
+            raise ValueError('data_types must be a data type name or a list of them')
+        return embedding_index.retrieve(self._task_query(task, parameters), k=k, data_types=data_types or None)
+    
+    def _execute_data_analysis(self, task: Task, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Execute data analysis task"""
         
         data_source = parameters.get('data_source', 'business_data')
         analysis_type = parameters.get('analysis_type', 'general')
+        record_ids = None
+        backlog = []
         
-        # Get business data for analysis
+        # Get business data for analysis: the records most relevant to the task,
+        # or the next unprocessed records while the embedding index is empty
+        # (skipping any the batch processor has claimed or given up on)
         if data_source == 'business_data':
-            business_data = BusinessData.query.filter_by(processed=False).limit(10).all()
-            data_for_analysis = [item.get_data_content() for item in business_data]
+            records = self._retrieve_records(task, parameters)
+            if records:
+                data_for_analysis = [record['data_content'] for record in records]
+                record_ids = [record['id'] for record in records]
+            else:
+                backlog = BusinessData.query.filter_by(processed=False).filter(
+                    not_duplicate(), BusinessData.id.notin_(select(BusinessDataClaim.data_id))
+                ).order_by(BusinessData.id).limit(10).all()
+                data_for_analysis = [item.get_data_content() for item in backlog]
+                record_ids = [item.id for item in backlog]
         else:
             data_for_analysis = parameters.get('data', {})
         
@@ -297,21 +343,29 @@ class AgentService:
         )
         
         if result['success']:
+            # Analyzed backlog records are done, so the next task moves on to the following ones
+            for item in backlog:
+                item.processed = True
+            if backlog:
+                db.session.commit()
             return {
                 'analysis': result['analysis'],
                 'data_source': data_source,
                 'analysis_type': analysis_type,
+                'business_data_ids': record_ids,
                 'type': 'data_analysis'
             }
         else:
             raise Exception(f"Data analysis failed: {result.get('error')}")
     
-    def _execute_strategic_planning(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    def _execute_strategic_planning(self, task: Task, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """Execute strategic planning task"""
         
         planning_horizon = parameters.get('horizon', '3 months')
         focus_areas = parameters.get('focus_areas', ['growth', 'efficiency'])
         
+        records = self._retrieve_records(task, parameters)
+        
         prompt = f"""
         Create a strategic plan for the next {planning_horizon} focusing on {', '.join(focus_areas)}.
         
@@ -324,6 +378,12 @@ class AgentService:
         
         Provide a comprehensive but concise strategic plan.
         """
+        if records:
+            # Compact JSON, cut to the data budget by whole records
+            prompt += f"""
+        Relevant business records:
+        {fit_json(records_for_prompt(records), self.business_data_prompt_tokens, ai_service.default_candidates[0][1])}
+        """
         
         result = ai_service.generate_text(prompt, max_tokens=1500, temperature=0.6)
         
@@ -559,3 +619,9 @@ class AgentService:
 # Global agent service instance
 agent_service = AgentService()
 
+def _collect_task_metrics():
+    counts = db.session.query(Task.status, db.func.count(Task.id)).group_by(Task.status).all()
+    return [family('agent_tasks', 'Agent tasks by status', [({'status': status or 'unknown'}, count)
+                                                           for status, count in counts])]
+
+metrics.register_collector('agent_tasks', _collect_task_metrics)
@@ -6,9 +6,18 @@ Handles integration with various LLM providers and AI capabilities
 import os
 import json
 import requests
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
 import logging
+import sys
+import threading
+import time
+from src.services.health_registry import health_registry
+from src.services.llm_router import LLMRouter
+from src.services.metrics import family, metrics
+from src.services.prompt_builder import fit_json
+from src.services.tracing import tracer
+from src.services.usage_ledger import capture_scope, usage_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -19,54 +28,165 @@ class AIService:
         self.providers = {
             'openai': {
                 'api_key': os.getenv('OPENAI_API_KEY'),
-                'base_url': 'https://api.openai.com/v1',
+                'base_url': os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1').rstrip('/'),
                 'models': ['gpt-4.5-turbo', 'gpt-4-turbo', 'gpt-4', 'gpt-3.5-turbo']
             },
             'anthropic': {
                 'api_key': os.getenv('ANTHROPIC_API_KEY'),
-                'base_url': 'https://api.anthropic.com/v1',
+                'base_url': os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com/v1').rstrip('/'),
                 'models': ['claude-3-opus-20240229', 'claude-3-sonnet-20240229', 'claude-3-haiku-20240307']
             }
         }
         self.default_provider = 'openai'
         self.default_model = 'gpt-4.5-turbo'  # Prioritize GPT-4.5 for strategic reasoning
+        
+        # Candidates tried in order when the caller does not pin a provider,
+        # e.g. LLM_CANDIDATES="openai:gpt-4.5-turbo,anthropic:claude-3-sonnet-20240229"
+        self.default_candidates = self._parse_candidates(
+            os.getenv('LLM_CANDIDATES', f'{self.default_provider}:{self.default_model},anthropic:claude-3-sonnet-20240229')
+        )
+        if not self.default_candidates:
+            # Callers rely on default_candidates[0] for the model to budget prompts against
+            logger.warning(f"LLM_CANDIDATES has no known providers, using {self.default_provider}:{self.default_model}")
+            self.default_candidates = [(self.default_provider, self.default_model)]
+        
+        self.router = LLMRouter(
+            call=self._generate_with_provider,
+            hedge=os.getenv('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+        )
+        
+        # Mark system blocks for Anthropic prompt caching (OpenAI caches prefixes automatically)
+        self.anthropic_prompt_cache = os.getenv('ANTHROPIC_PROMPT_CACHE', 'true').lower() == 'true'
+        self._prompt_cache_stats = {}
+        self._prompt_cache_lock = threading.Lock()
+    
+    def _parse_candidates(self, value: str) -> List[tuple]:
+        """Parse 'provider:model,provider:model' into (provider, model) pairs"""
+        candidates = []
+        for item in value.split(','):
+            provider, _, model = item.strip().partition(':')
+            if provider in self.providers:
+                candidates.append((provider, model or self.providers[provider]['models'][0]))
+        return candidates
     
     def generate_text(self, prompt: str, provider: str = None, model: str = None, 
-                     max_tokens: int = 1000, temperature: float = 0.7) -> Dict[str, Any]:
+                     max_tokens: int = 1000, temperature: float = 0.7,
+                     candidates: List[tuple] = None,
+                     system: Union[str, List[str], None] = None) -> Dict[str, Any]:
         """
-        Generate text using specified AI provider and model
+        Generate text, routing to the best available provider and model
         
         Args:
             prompt: Input prompt for text generation
-            provider: AI provider to use (openai, anthropic)
+            provider: AI provider to pin (openai, anthropic); disables failover
             model: Specific model to use
             max_tokens: Maximum tokens to generate
             temperature: Creativity/randomness (0-1)
+            candidates: (provider, model) pairs to route between, in preference order
+            system: Fixed system prompt, or blocks ordered most-shared first. Sent
+                ahead of the prompt so providers can serve it from their prompt cache
             
         Returns:
             Dictionary with generated text and metadata
         """
-        provider = provider or self.default_provider
-        model = model or self.default_model
-        
-        try:
-            if provider == 'openai':
-                return self._generate_openai(prompt, model, max_tokens, temperature)
-            elif provider == 'anthropic':
-                return self._generate_anthropic(prompt, model, max_tokens, temperature)
+        if candidates is None:
+            if provider:
+                candidates = [(provider, model or self.providers.get(provider, {}).get('models', [self.default_model])[0])]
+            elif model:
+                candidates = [(self.default_provider, model)]
             else:
-                raise ValueError(f"Unsupported provider: {provider}")
-                
-        except Exception as e:
-            logger.error(f"Text generation failed: {str(e)}")
+                candidates = self.default_candidates
+        
+        # Skip providers without credentials unless nothing else is left
+        configured = [c for c in candidates if self.providers.get(c[0], {}).get('api_key')]
+        
+        if isinstance(system, str):
+            system = [system]
+        
+        # Attribute usage to the route and calling function before routing moves to pool threads
+        caller = sys._getframe(1)
+        scope = capture_scope(call_site=f"{caller.f_globals.get('__name__')}.{caller.f_code.co_name}")
+        
+        with tracer.span('llm.generate', **{'code.function': scope.get('call_site')}) as span:
+            result = self.router.generate(configured or candidates, prompt=prompt, system=system or None,
+                                          max_tokens=max_tokens, temperature=temperature, usage_scope=scope)
+            if span is not None:
+                span.attributes.update({'llm.provider': result.get('provider'), 'llm.model': result.get('model'),
+                                        'llm.success': bool(result.get('success'))})
+        if not result.get('success'):
+            logger.error(f"Text generation failed: {result.get('error')}")
+        return result
+    
+    def _generate_with_provider(self, provider: str, model: str, prompt: str,
+                                max_tokens: int, temperature: float,
+                                system: Optional[List[str]] = None,
+                                usage_scope: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one generation against a single provider, recording its usage"""
+        started = time.monotonic()
+        try:
+            with tracer.span(f'llm {provider}', **{'llm.provider': provider, 'llm.model': model}):
+                if provider == 'openai':
+                    result = self._generate_openai(prompt, model, max_tokens, temperature, system)
+                elif provider == 'anthropic':
+                    result = self._generate_anthropic(prompt, model, max_tokens, temperature, system)
+                else:
+                    raise ValueError(f"Unsupported provider: {provider}")
+        except Exception:
+            usage_ledger.record(provider, model, {}, (time.monotonic() - started) * 1000,
+                                success=False, scope=usage_scope)
+            raise
+        
+        usage = self._normalize_usage(provider, result.get('usage') or {})
+        usage_ledger.record(provider, model, usage, (time.monotonic() - started) * 1000, scope=usage_scope)
+        result['prompt_cache'] = {
+            'input_tokens': usage['prompt_tokens'],
+            'cached_tokens': usage['cached_tokens'],
+            'cache_write_tokens': usage['cache_write_tokens']
+        }
+        self._record_prompt_cache(provider, model, result['prompt_cache'])
+        return result
+    
+    def _normalize_usage(self, provider: str, usage: Dict[str, Any]) -> Dict[str, int]:
+        """Normalize provider usage into prompt (incl. cached), completion, cache-read and cache-write tokens"""
+        if provider == 'anthropic':
+            # Anthropic's input_tokens excludes tokens read from or written to the cache
+            cached = usage.get('cache_read_input_tokens') or 0
+            written = usage.get('cache_creation_input_tokens') or 0
             return {
-                'success': False,
-                'error': str(e),
-                'text': '',
-                'usage': {}
+                'prompt_tokens': (usage.get('input_tokens') or 0) + cached + written,
+                'completion_tokens': usage.get('output_tokens') or 0,
+                'cached_tokens': cached,
+                'cache_write_tokens': written
             }
+        details = usage.get('prompt_tokens_details') or {}
+        return {
+            'prompt_tokens': usage.get('prompt_tokens') or 0,
+            'completion_tokens': usage.get('completion_tokens') or 0,
+            'cached_tokens': details.get('cached_tokens') or 0,
+            'cache_write_tokens': 0
+        }
+    
+    def _record_prompt_cache(self, provider: str, model: str, cache_usage: Dict[str, int]):
+        key = f'{provider}:{model}'
+        with self._prompt_cache_lock:
+            stats = self._prompt_cache_stats.setdefault(key, {
+                'calls': 0, 'cache_hits': 0, 'input_tokens': 0, 'cached_tokens': 0, 'cache_write_tokens': 0
+            })
+            stats['calls'] += 1
+            stats['cache_hits'] += 1 if cache_usage['cached_tokens'] else 0
+            for field in ('input_tokens', 'cached_tokens', 'cache_write_tokens'):
+                stats[field] += cache_usage[field]
     
-    def _generate_openai(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    def get_prompt_cache_stats(self) -> Dict[str, Any]:
+        """Get per provider/model prompt-cache token counts since startup"""
+        with self._prompt_cache_lock:
+            models = {key: dict(stats) for key, stats in self._prompt_cache_stats.items()}
+        for stats in models.values():
+            stats['cached_ratio'] = round(stats['cached_tokens'] / stats['input_tokens'], 3) if stats['input_tokens'] else 0.0
+        return {'success': True, 'anthropic_cache_control': self.anthropic_prompt_cache, 'models': models}
+    
+    def _generate_openai(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                         system: Optional[List[str]] = None) -> Dict[str, Any]:
         """Generate text using OpenAI API"""
         api_key = self.providers['openai']['api_key']
         if not api_key:
@@ -77,9 +197,13 @@ class AIService:
             'Content-Type': 'application/json'
         }
         
+        # Fixed system text first: OpenAI caches the longest previously seen prefix
+        messages = [{'role': 'system', 'content': '\n\n'.join(system)}] if system else []
+        messages.append({'role': 'user', 'content': prompt})
+        
         data = {
             'model': model,
-            'messages': [{'role': 'user', 'content': prompt}],
+            'messages': messages,
             'max_tokens': max_tokens,
             'temperature': temperature
         }
@@ -103,7 +227,8 @@ class AIService:
         else:
             raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
     
-    def _generate_anthropic(self, prompt: str, model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    def _generate_anthropic(self, prompt: str, model: str, max_tokens: int, temperature: float,
+                            system: Optional[List[str]] = None) -> Dict[str, Any]:
         """Generate text using Anthropic API"""
         api_key = self.providers['anthropic']['api_key']
         if not api_key:
@@ -121,6 +246,16 @@ class AIService:
             'temperature': temperature,
             'messages': [{'role': 'user', 'content': prompt}]
         }
+        if system:
+            # One cache breakpoint after the last fixed block caches the whole system
+            # prefix. Prefixes shorter than the model's minimum (1024 tokens, 2048
+            # for Haiku) are processed but not cached.
+            last = len(system) - 1
+            data['system'] = [
+                {'type': 'text', 'text': block, **({'cache_control': {'type': 'ephemeral'}}
+                                                    if self.anthropic_prompt_cache and index == last else {})}
+                for index, block in enumerate(system)
+            ]
         
         response = requests.post(
             f"{self.providers['anthropic']['base_url']}/messages",
@@ -261,8 +396,6 @@ class AIService:
             analysis_type: Type of analysis (general, sales, marketing, financial)
         """
         
-        data_summary = json.dumps(data, indent=2)[:2000]  # Limit data size
-        
         analysis_prompts = {
             'general': "Analyze this business data and provide key insights, trends, and recommendations:",
             'sales': "Analyze this sales data and provide insights on performance, trends, and opportunities:",
@@ -270,6 +403,10 @@ class AIService:
             'financial': "Analyze this financial data and provide insights on performance and recommendations:"
         }
         
+        # Compact JSON, cut to the data budget by whole records where possible
+        data_summary = fit_json(data, int(os.getenv('BUSINESS_DATA_PROMPT_TOKENS', '1000')),
+                                self.default_candidates[0][1])
+        
         prompt = f"""
         {analysis_prompts.get(analysis_type, analysis_prompts['general'])}
         
@@ -298,6 +435,10 @@ class AIService:
         else:
             return result
     
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-model latency/error stats used for routing"""
+        return self.router.stats()
+    
     def get_available_models(self, provider: str = None) -> Dict[str, List[str]]:
         """Get list of available models for each provider"""
         if provider:
@@ -324,3 +465,21 @@ class AIService:
 # Global AI service instance
 ai_service = AIService()
 
+health_registry.register('ai', ai_service.health_check, interval=60, timeout=5)
+
+def _collect_ai_metrics():
+    router_stats = ai_service.router.stats()
+    prompt_cache = ai_service.get_prompt_cache_stats()['models']
+    ratios = []
+    for key, stats in prompt_cache.items():
+        provider, model = key.split(':', 1)
+        ratios.append(({'provider': provider, 'model': model},
+                       stats['cache_hits'] / stats['calls'] if stats['calls'] else None))
+    return [
+        family('llm_router_events_total', 'LLM router calls, failovers and hedges',
+               [({'event': event}, router_stats[event]) for event in ('calls', 'failovers', 'hedges', 'hedge_wins')],
+               metric_type='counter'),
+        family('llm_prompt_cache_hit_ratio', 'Share of LLM calls that read from the provider prompt cache', ratios)
+    ]
+
+metrics.register_collector('ai', _collect_ai_metrics)
@@ -0,0 +1,253 @@
+"""
+Analysis Bundle Service for Agent CEO system
+Runs several business analyses (competitive, financial, customer, market, market opportunity)
+concurrently from one request, with shared input preparation and per-provider concurrency caps
+"""
+
+import contextvars
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List
+
+from src.services.data_analysis_service import data_analysis_service
+from src.services.prompt_builder import compact_json
+from src.services.strategic_ai_service import strategic_ai_service
+from src.services.usage_ledger import capture_scope, usage_scope
+
+logger = logging.getLogger(__name__)
+
+class _Analysis:
+    """One analysis a bundle can run: the datasets it needs and how to call it"""
+
+    def __init__(self, datasets: List[str], provider: Callable[[], str],
+                 call: Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]],
+                 echoes: tuple = ()):
+        self.datasets = datasets
+        self.provider = provider
+        self.call = call
+        self.echoes = echoes  # input keys the result repeats back, dropped from bundle output
+
+# Shared context defaults match the single-analysis endpoints
+ANALYSES = {
+    'competitive': _Analysis(
+        ['competitor_data'], lambda: 'openai',
+        lambda data, context: data_analysis_service.generate_competitive_analysis(
+            competitor_data=data['competitor_data'],
+            company_focus=context.get('company_focus', 'general business'))),
+    'financial': _Analysis(
+        ['financial_data'], lambda: 'openai',
+        lambda data, context: data_analysis_service.generate_financial_analysis(
+            financial_data=data['financial_data'],
+            time_period=context.get('time_period', 'current period'),
+            context=context.get('business_context', 'general financial analysis'))),
+    'customer': _Analysis(
+        ['customer_data'], lambda: 'openai',
+        lambda data, context: data_analysis_service.generate_customer_analysis(
+            customer_data=data['customer_data'],
+            focus=context.get('customer_focus', 'customer behavior'),
+            goals=context.get('goals', 'improve customer experience'))),
+    'market': _Analysis(
+        ['market_data'], lambda: 'openai',
+        lambda data, context: data_analysis_service.generate_market_analysis(
+            market_data=data['market_data'],
+            scope=context.get('scope', 'market overview'),
+            industry=context.get('industry', 'technology'))),
+    'market_opportunity': _Analysis(
+        ['market_data', 'company_capabilities'], lambda: strategic_ai_service.strategic_candidates[0][0],
+        lambda data, context: strategic_ai_service.market_opportunity_analysis(
+            market_data=data['market_data'],
+            company_capabilities=data['company_capabilities']),
+        echoes=('market_data', 'company_capabilities'))
+}
+
+class BundlePlan:
+    """Prepared bundle: the analyses to run, their datasets and the shared context"""
+
+    def __init__(self, analyses: List[str], data: Dict[str, Any], context: Dict[str, Any],
+                 datasets: Dict[str, Dict[str, Any]]):
+        self.analyses = analyses
+        self.data = data
+        self.context = context
+        self.datasets = datasets
+
+    def describe(self) -> Dict[str, Any]:
+        return {'analyses': self.analyses, 'datasets': self.datasets}
+
+class AnalysisBundleService:
+    """
+    Concurrent bundle of business analyses
+
+    Inputs are prepared once per bundle: each distinct dataset (by content)
+    is serialized a single time and shared by every analysis that uses it.
+    The analyses then run on a per-process pool, each holding its
+    provider's semaphore for the duration of its LLM call, so concurrent
+    calls per provider stay capped across all bundles in the process.
+    """
+
+    def __init__(self, max_workers: int = 8, provider_concurrency: int = 3, timeout: float = 300.0):
+        self.max_workers = max_workers
+        self.provider_concurrency = provider_concurrency
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._pool = None
+        self._pool_pid = None
+
+    def prepare(self, payload: Dict[str, Any]) -> BundlePlan:
+        """
+        Resolve a bundle request into the analyses to run and their prepared inputs
+
+        Args:
+            payload: Request body: optional ``analyses`` (default: every analysis whose
+                datasets are present), a shared ``context`` and the datasets
+                (competitor_data, financial_data, customer_data, market_data,
+                company_capabilities)
+
+        Returns:
+            BundlePlan
+
+        Raises:
+            ValueError: for unknown analyses or missing datasets
+        """
+        requested = payload.get('analyses')
+        if requested is not None and not isinstance(requested, list):
+            raise ValueError('analyses must be a list of analysis names')
+        if requested is None:
+            requested = [name for name, analysis in ANALYSES.items()
+                         if all(payload.get(key) for key in analysis.datasets)]
+            if not requested:
+                raise ValueError(f"No analysis has its datasets; known analyses: {', '.join(ANALYSES)}")
+        unknown = [name for name in requested if name not in ANALYSES]
+        if unknown:
+            raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+        requested = list(dict.fromkeys(requested))
+        for name in requested:
+            missing = [key for key in ANALYSES[name].datasets if not payload.get(key)]
+            if missing:
+                raise ValueError(f"{name} requires {', '.join(missing)}")
+
+        # Serialize each distinct dataset once; lists stay as values so prompt
+        # budgeting can still cut them by whole items
+        prepared: Dict[str, Any] = {}
+        by_digest: Dict[str, str] = {}
+        datasets: Dict[str, Dict[str, Any]] = {}
+        for key in dict.fromkeys(key for name in requested for key in ANALYSES[name].datasets):
+            value = payload[key]
+            text = compact_json(value)
+            digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+            prepared[key] = prepared[by_digest[digest]] if digest in by_digest \
+                else value if isinstance(value, list) else text
+            datasets[key] = {
+                'digest': digest,
+                'chars': len(text),
+                'used_by': [name for name in requested if key in ANALYSES[name].datasets]
+            }
+            if digest in by_digest:
+                datasets[key]['same_as'] = by_digest[digest]
+            else:
+                by_digest[digest] = key
+
+        return BundlePlan(requested, prepared, dict(payload.get('context') or {}), datasets)
+
+    def run(self, plan: BundlePlan) -> Iterator[Dict[str, Any]]:
+        """
+        Run a bundle's analyses concurrently, yielding each result as it finishes
+
+        Analyses still running after the bundle timeout are reported as timed out.
+
+        Args:
+            plan: Bundle from ``prepare``
+
+        Yields:
+            {'analysis', 'result', 'provider', 'queued_ms', 'elapsed_ms'} per analysis
+        """
+        started = time.monotonic()
+        pool = self._get_pool()
+        # Attribute LLM usage to the calling route, and nest trace spans under it
+        with usage_scope(**capture_scope()):
+            futures = {pool.submit(contextvars.copy_context().run, self._execute, name, plan, started): name
+                       for name in plan.analyses}
+        try:
+            for future in as_completed(futures, timeout=self.timeout):
+                yield future.result()
+        except FuturesTimeout:
+            for future, name in futures.items():
+                if not future.done():
+                    future.cancel()
+                    yield {
+                        'analysis': name,
+                        'result': {'success': False, 'error': f'Timed out after {self.timeout:g}s'},
+                        'provider': ANALYSES[name].provider(),
+                        'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+                    }
+        finally:
+            # Client went away or timed out: don't start analyses nobody will read
+            for future in futures:
+                future.cancel()
+
+    def run_all(self, plan: BundlePlan) -> Dict[str, Any]:
+        """Run a bundle and return every result at once"""
+        started = time.monotonic()
+        results = {item['analysis']: item for item in self.run(plan)}
+        return self.summarize(plan, results, started)
+
+    def summarize(self, plan: BundlePlan, results: Dict[str, Dict[str, Any]], started: float) -> Dict[str, Any]:
+        """Bundle totals in the shape of other fan-out endpoints"""
+        succeeded = sum(1 for item in results.values() if item['result'].get('success'))
+        return {
+            'success': succeeded == len(plan.analyses),
+            'partial': 0 < succeeded < len(plan.analyses),
+            'succeeded': succeeded,
+            'failed': len(plan.analyses) - succeeded,
+            'results': {name: results[name] for name in plan.analyses if name in results},
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+            'generated_at': datetime.utcnow().isoformat()
+        }
+
+    def _execute(self, name: str, plan: BundlePlan, started: float) -> Dict[str, Any]:
+        analysis = ANALYSES[name]
+        provider = analysis.provider()
+        with self._semaphore(provider):
+            queued_ms = round((time.monotonic() - started) * 1000, 1)
+            try:
+                result = analysis.call(plan.data, plan.context)
+            except Exception as e:
+                logger.error(f"Bundle analysis {name} failed: {str(e)}")
+                result = {'success': False, 'error': str(e)}
+        for key in analysis.echoes:
+            result.pop(key, None)
+        return {
+            'analysis': name,
+            'result': result,
+            'provider': provider,
+            'queued_ms': queued_ms,
+            'elapsed_ms': round((time.monotonic() - started) * 1000, 1)
+        }
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                self._semaphores[provider] = threading.BoundedSemaphore(self.provider_concurrency)
+            return self._semaphores[provider]
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Get the analysis pool, recreating it after a fork"""
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-bundle')
+                self._pool_pid = os.getpid()
+                self._semaphores = {}
+            return self._pool
+
+# Global analysis bundle service instance
+analysis_bundle_service = AnalysisBundleService(
+    max_workers=int(os.getenv('ANALYSIS_BUNDLE_WORKERS', '8')),
+    provider_concurrency=int(os.getenv('ANALYSIS_BUNDLE_PROVIDER_CONCURRENCY', '3')),
+    timeout=float(os.getenv('ANALYSIS_BUNDLE_TIMEOUT_SECONDS', '300'))
+)
@@ -0,0 +1,334 @@
+"""
+Analysis Job Service for Agent CEO system
+Runs uploaded-file analysis (parsing, profiling, LLM) on a background pool with persisted
+stage progress and results, deduplicating identical submissions onto one job
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from src.models.job import AnalysisJob
+from src.models.user import db
+from src.services.data_analysis_service import data_analysis_service
+from src.services.tracing import traced
+from src.services.upload_service import Upload
+from src.services.usage_ledger import capture_scope, usage_scope
+
+logger = logging.getLogger(__name__)
+
+# Progress reported when each stage begins
+STAGE_PROGRESS = {'queued': 0.0, 'parsing': 0.1, 'profiling': 0.1, 'analyzing': 0.5, 'saving': 0.9, 'done': 1.0}
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+def dedupe_key(file_sha256: str, extension: str, params: Dict[str, Any]) -> str:
+    """Key shared by submissions of the same file with the same parameters"""
+    canonical = json.dumps({'sha256': file_sha256, 'extension': extension, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class AnalysisJobService:
+    """
+    Background analysis jobs for uploaded files
+
+    The upload is copied out of the request's spool into the job directory, a
+    job row is committed, and the job runs on a small per-process pool inside
+    the app context. Each stage commits its progress, which doubles as the
+    job's heartbeat: a queued or running job whose heartbeat is older than the
+    lease (its worker died or was recycled) is requeued when a worker starts
+    or when its status is polled, up to ``max_attempts`` runs.
+    """
+
+    def __init__(self, directory: str, max_workers: int = 2, lease_seconds: float = 900.0,
+                 max_attempts: int = 2, copy_chunk: int = 1024 * 1024):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.copy_chunk = copy_chunk
+
+        self.app = None
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._futures = set()
+
+    def init_app(self, app):
+        """Bind the Flask app, start the pool and requeue jobs orphaned by dead workers"""
+        self.app = app
+        self._ensure_started()
+        atexit.register(self.shutdown)
+        try:
+            with app.app_context():
+                self.recover()
+        except Exception as e:
+            logger.error(f"Analysis job recovery failed: {str(e)}")
+
+    def _ensure_started(self):
+        """Create the pool for this process (fork-safe)"""
+        if self._pid == os.getpid() and self._pool is not None:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._pool is not None:
+                return
+            # Forked: jobs queued on the parent's pool are recovered from their rows
+            self._pid = os.getpid()
+            self._futures = set()
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-job')
+
+    @traced()
+    def submit(self, upload: Upload, analysis_context: Dict[str, Any],
+               sheet_name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue analysis of an upload, or return the job already holding the same submission
+
+        Must be called while ``upload.stream`` is open; the file is copied before returning.
+        A failed job is retried in place when the same submission arrives again.
+
+        Args:
+            upload: Received file
+            analysis_context: Context for analysis
+            sheet_name: Worksheet to analyze (Excel only, optional)
+
+        Returns:
+            Dictionary with the job and whether the submission was deduplicated
+        """
+        if self.app is None:
+            self.app = current_app._get_current_object()
+
+        params = {'analysis_context': analysis_context, 'sheet_name': sheet_name}
+        key = dedupe_key(upload.sha256, upload.extension, params)
+        job = AnalysisJob.query.filter_by(dedupe_key=key).first()
+        if job is not None and job.status != 'failed':
+            return {'success': True, 'job': job.to_dict(), 'deduplicated': True}
+
+        # Every submission writes its own file; only the one whose row commits keeps it
+        path = self._store(upload)
+        now = datetime.utcnow()
+        if job is None:
+            job = AnalysisJob(id=uuid.uuid4().hex, dedupe_key=key, filename=upload.filename,
+                              file_extension=upload.extension, file_sha256=upload.sha256,
+                              file_size=upload.size, params=json.dumps(params, default=str),
+                              input_path=path, created_at=now, updated_at=now)
+            db.session.add(job)
+            try:
+                db.session.commit()
+                taken = True
+            except IntegrityError:
+                db.session.rollback()
+                taken = False
+        else:
+            taken = AnalysisJob.query.filter_by(id=job.id, status='failed').update({
+                'status': 'queued', 'stage': 'queued', 'progress': 0.0, 'result': None, 'error': None,
+                'attempts': 0, 'input_path': path, 'started_at': None, 'finished_at': None, 'updated_at': now
+            }, synchronize_session=False) > 0
+            db.session.commit()
+
+        if not taken:
+            # A concurrent identical submission created or retried the job first
+            self._remove(path)
+            job = AnalysisJob.query.filter_by(dedupe_key=key).first()
+            return {'success': True, 'job': job.to_dict(), 'deduplicated': True}
+
+        db.session.refresh(job)
+        self._enqueue(job.id, capture_scope())
+        return {'success': True, 'job': job.to_dict(), 'deduplicated': False}
+
+    def get(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Get a job (None if unknown), requeueing it first if its worker has gone away"""
+        job = db.session.get(AnalysisJob, job_id)
+        if job is None:
+            return None
+        if job.status in ACTIVE_STATUSES and self._is_stale(job):
+            self._reclaim(job)
+            db.session.refresh(job)
+        return job.to_dict(include_result=include_result)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by status"""
+        query = AnalysisJob.query
+        if status:
+            query = query.filter_by(status=status)
+        return [job.to_dict() for job in query.order_by(AnalysisJob.created_at.desc()).limit(limit)]
+
+    def _enqueue(self, job_id: str, scope: Optional[Dict[str, Any]] = None):
+        self._ensure_started()
+        try:
+            future = self._pool.submit(self._run, job_id, scope or {})
+        except RuntimeError:
+            # Pool shut down: the row stays queued and is recovered once its lease expires
+            logger.warning(f"Analysis job {job_id} not started: pool is shut down")
+            return
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def _forget(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(self, job_id: str, scope: Dict[str, Any]):
+        with self.app.app_context():
+            try:
+                self._execute(job_id, scope)
+            except Exception as e:
+                logger.error(f"Analysis job {job_id} crashed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def _execute(self, job_id: str, scope: Dict[str, Any]):
+        now = datetime.utcnow()
+        claimed = AnalysisJob.query.filter_by(id=job_id, status='queued').update({
+            'status': 'running', 'stage': 'parsing', 'progress': STAGE_PROGRESS['parsing'],
+            'attempts': AnalysisJob.attempts + 1, 'started_at': now, 'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return  # already claimed by another worker
+        job = db.session.get(AnalysisJob, job_id)
+        params = json.loads(job.params)
+        path, extension = job.input_path, job.file_extension
+        file_info = {'filename': job.filename, 'size': job.file_size, 'sha256': job.file_sha256}
+        current = {'stage': 'parsing'}
+
+        def on_stage(stage: str):
+            current['stage'] = stage
+            self._progress(job_id, stage)
+
+        result, error = None, None
+        try:
+            with usage_scope(**scope), open(path, 'rb') as stream:
+                result = data_analysis_service.analyze_file(
+                    stream, extension, params.get('analysis_context'), params.get('sheet_name'), on_stage=on_stage
+                )
+            result['file'] = file_info
+            if result.get('success'):
+                on_stage('saving')
+            else:
+                error = result.get('error') or 'Analysis failed'
+        except Exception as e:
+            logger.error(f"Analysis job {job_id} failed in {current['stage']}: {str(e)}")
+            error = str(e)
+
+        succeeded = error is None
+        AnalysisJob.query.filter_by(id=job_id).update({
+            'status': 'succeeded' if succeeded else 'failed',
+            'stage': 'done' if succeeded else current['stage'],
+            'progress': STAGE_PROGRESS['done'] if succeeded else STAGE_PROGRESS[current['stage']],
+            'result': json.dumps(result, default=str) if result is not None else None,
+            'error': error,
+            'input_path': None,
+            'finished_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        self._remove(path)
+
+    def _progress(self, job_id: str, stage: str):
+        """Commit a stage change, which also renews the job's lease"""
+        AnalysisJob.query.filter_by(id=job_id).update({
+            'stage': stage, 'progress': STAGE_PROGRESS[stage], 'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def recover(self) -> int:
+        """
+        Requeue stale queued/running jobs (requires an app context)
+
+        Returns:
+            Number of jobs requeued
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        stale = AnalysisJob.query.filter(AnalysisJob.status.in_(ACTIVE_STATUSES),
+                                         AnalysisJob.updated_at < cutoff).all()
+        requeued = sum(1 for job in stale if self._reclaim(job))
+        if stale:
+            logger.info(f"Recovered {requeued} of {len(stale)} stale analysis jobs")
+        return requeued
+
+    def _is_stale(self, job: AnalysisJob) -> bool:
+        return job.updated_at < datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+
+    def _reclaim(self, job: AnalysisJob) -> bool:
+        """Take over a stale job: requeue it, or fail it when out of attempts or its input is gone"""
+        if job.attempts >= self.max_attempts:
+            status, error = 'failed', f'Interrupted {job.attempts} times'
+        elif not job.input_path or not os.path.exists(job.input_path):
+            status, error = 'failed', 'Upload is no longer available; submit the file again'
+        else:
+            status, error = 'queued', None
+        # Compare-and-set on the heartbeat so only one worker takes the job over
+        taken = AnalysisJob.query.filter_by(id=job.id, status=job.status, updated_at=job.updated_at).update({
+            'status': status, 'stage': 'queued' if status == 'queued' else job.stage, 'error': error,
+            'finished_at': datetime.utcnow() if status == 'failed' else None, 'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not taken:
+            return False
+        if status == 'queued':
+            self._enqueue(job.id)
+            return True
+        logger.warning(f"Analysis job {job.id} failed on recovery: {error}")
+        self._remove(job.input_path)
+        return False
+
+    def _store(self, upload: Upload) -> str:
+        """Copy the upload out of the request's spool, which is closed when the request ends"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{uuid.uuid4().hex}.{upload.extension}')
+        upload.stream.seek(0)
+        try:
+            with open(path, 'wb') as target:
+                shutil.copyfileobj(upload.stream, target, self.copy_chunk)
+        except Exception:
+            self._remove(path)
+            raise
+        return path
+
+    @staticmethod
+    def _remove(path: Optional[str]):
+        if not path:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to remove analysis job input {path}: {str(e)}")
+
+    def shutdown(self, timeout: float = 10.0):
+        """
+        Stop taking jobs and wait up to ``timeout`` seconds for running ones
+
+        Queued jobs stay in the database, as do jobs still running at the
+        deadline; both are recovered by the next worker once their lease expires.
+        """
+        if self._pid != os.getpid() or self._pool is None:
+            return
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            running = [future for future in self._futures if not future.cancelled()]
+        _, unfinished = wait(running, timeout=timeout)
+        if unfinished:
+            logger.warning(f"{len(unfinished)} analysis jobs still running at shutdown")
+
+# Global analysis job service instance
+analysis_job_service = AnalysisJobService(
+    directory=os.getenv('ANALYSIS_JOB_DIR') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'database', 'analysis_jobs'),
+    max_workers=int(os.getenv('ANALYSIS_JOB_WORKERS', '2')),
+    lease_seconds=float(os.getenv('ANALYSIS_JOB_LEASE_SECONDS', '900')),
+    max_attempts=int(os.getenv('ANALYSIS_JOB_MAX_ATTEMPTS', '2'))
+)
@@ -0,0 +1,696 @@
+"""
+Analytics Engine for Agent CEO system
+Vectorized trend, seasonality, anomaly, cohort and forecast statistics, condensed into
+fixed-size digests so analysis prompts do not grow with the length of the data
+"""
+
+import logging
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+# Step length in days per granularity, used to infer granularity from dates and to read horizons
+PERIOD_DAYS = {'hourly': 1 / 24, 'daily': 1.0, 'weekly': 7.0, 'monthly': 30.44, 'quarterly': 91.31, 'yearly': 365.25}
+
+# Steps per seasonal cycle for each granularity (None: no seasonality checked)
+SEASON_LENGTHS = {'hourly': 24, 'daily': 7, 'weekly': 52, 'monthly': 12, 'quarterly': 4, 'yearly': None}
+
+GRANULARITY_ALIASES = {
+    'hour': 'hourly', 'day': 'daily', 'week': 'weekly', 'month': 'monthly',
+    'quarter': 'quarterly', 'year': 'yearly', 'annual': 'yearly', 'annually': 'yearly'
+}
+
+# Column names that usually hold the time axis / the cohort label / the period offset
+DATE_HINTS = ('date', 'time', 'timestamp', 'period', 'month', 'week', 'day', 'ds', 'year', 'quarter')
+COHORT_KEYS = ('cohort', 'cohort_name', 'cohort_month', 'cohort_date', 'signup_month', 'acquisition_month', 'name')
+COHORT_SIZE_KEYS = ('size', 'cohort_size', 'users', 'customers', 'initial', 'initial_users', 'count')
+PERIOD_KEYS = ('period', 'period_number', 'period_index', 'age', 'month_number', 'months_since', 'week_number', 'offset')
+VALUE_KEYS = ('retained', 'active', 'active_users', 'users', 'customers', 'count', 'retention', 'rate', 'value', 'revenue')
+USER_KEYS = ('user_id', 'customer_id', 'user', 'customer', 'account_id', 'id')
+ACTIVITY_KEYS = ('activity_date', 'event_date', 'order_date', 'purchase_date', 'date', 'timestamp', 'created_at')
+SIGNUP_KEYS = ('signup_date', 'first_date', 'cohort_date', 'acquired_at', 'registered_at', 'joined_at')
+
+# Two-sided 80% normal quantile for forecast intervals
+Z_80 = 1.2816
+
+def _sig(value: Any, digits: int = 4) -> Any:
+    """Round to significant digits for the digest; NaN/inf become None"""
+    if value is None:
+        return None
+    if isinstance(value, (np.integer, int)) and not isinstance(value, bool):
+        return int(value)
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    if not math.isfinite(value):
+        return None
+    if value == 0:
+        return 0.0
+    return round(value, max(digits - 1 - int(math.floor(math.log10(abs(value)))), 0))
+
+def _label(value: Any) -> Any:
+    """JSON-friendly label for an index value (dates without a time part as YYYY-MM-DD)"""
+    if isinstance(value, pd.Timestamp):
+        if pd.isna(value):
+            return None
+        return value.strftime('%Y-%m-%d') if value == value.normalize() else value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _find_key(columns: List[Any], candidates: Tuple[str, ...]) -> Optional[Any]:
+    """First column whose lowercased name equals a candidate, in candidate order"""
+    lowered = {str(column).lower(): column for column in columns}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    return None
+
+def _parse_dates(column: pd.Series, name: Any = None) -> Optional[pd.Series]:
+    """Parse a column as dates if at least 80% of its values parse, else None"""
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return column
+    if pd.api.types.is_numeric_dtype(column):
+        # Only bare years are taken as dates from numbers; anything else would be read as epoch nanoseconds
+        values = pd.to_numeric(column, errors='coerce')
+        if str(name).lower() == 'year' and values.between(1800, 2200).mean() >= 0.8:
+            return pd.to_datetime(values.astype('Int64').astype(str), format='%Y', errors='coerce')
+        return None
+    parsed = pd.to_datetime(column.astype(str), errors='coerce', format='mixed')
+    if parsed.notna().mean() >= 0.8:
+        return parsed
+    return None
+
+def normalize_granularity(time_period: Optional[str]) -> Optional[str]:
+    """Map 'monthly', 'month', 'Monthly data' etc. to a PERIOD_DAYS key"""
+    if not time_period:
+        return None
+    text = str(time_period).lower()
+    for key in PERIOD_DAYS:
+        if key in text:
+            return key
+    for alias, key in GRANULARITY_ALIASES.items():
+        if alias in text:
+            return key
+    return None
+
+def parse_horizon(horizon: Union[str, int, float, None], step_days: float, default: int) -> int:
+    """
+    Convert a horizon such as '3 months' or '90 days' into a number of series steps
+
+    Args:
+        horizon: Free-text horizon, or a step count
+        step_days: Length of one series step in days
+        default: Steps to use when the horizon cannot be read
+
+    Returns:
+        Number of steps, at least 1
+    """
+    if isinstance(horizon, (int, float)) and not isinstance(horizon, bool):
+        return max(int(horizon), 1)
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(hour|day|week|month|quarter|year)', str(horizon or '').lower())
+    if not match:
+        return max(default, 1)
+    days = float(match.group(1)) * PERIOD_DAYS[GRANULARITY_ALIASES[match.group(2)]]
+    return max(int(math.ceil(days / step_days - 1e-9)), 1)
+
+class AnalyticsEngine:
+    """Local numeric analysis of time series and cohort data"""
+
+    def __init__(self, z_threshold: float = 3.0, max_anomalies: int = 5, max_metrics: int = 6,
+                 max_forecast_points: int = 12, max_horizon: int = 60):
+        self.z_threshold = z_threshold
+        self.max_anomalies = max_anomalies
+        self.max_metrics = max_metrics
+        self.max_forecast_points = max_forecast_points
+        self.max_horizon = max_horizon
+
+    def to_frame(self, data: Any, metrics: Union[str, List[str], None] = None
+                 ) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        """
+        Normalize request data into numeric metric columns and an optional date axis
+
+        Accepts a list of numbers, a list of records, a list of rows, a dict of
+        metric -> values or a dict of date -> value. Rows are sorted by date
+        when a date column is found.
+
+        Returns:
+            (numeric DataFrame with a positional index, dates or None)
+        """
+        if isinstance(data, dict):
+            if data and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in data.values()):
+                frame = pd.DataFrame({'date': list(data.keys()), 'value': list(data.values())})
+            else:
+                frame = pd.DataFrame({key: pd.Series(value) for key, value in data.items()
+                                      if isinstance(value, (list, tuple))})
+        elif isinstance(data, (list, tuple)) and data and all(
+                isinstance(value, (int, float)) and not isinstance(value, bool) or value is None for value in data):
+            frame = pd.DataFrame({'value': data})
+        elif isinstance(data, (list, tuple)) and data and all(isinstance(row, dict) for row in data):
+            frame = pd.DataFrame.from_records(data)
+        elif isinstance(data, (list, tuple)) and data and all(isinstance(row, (list, tuple)) for row in data):
+            frame = pd.DataFrame(list(data))
+        else:
+            raise ValueError('Expected a list of numbers or records, or a dict of series')
+
+        if frame.empty:
+            raise ValueError('No data points')
+
+        dates = None
+        date_column = None
+        candidates = [c for c in frame.columns if any(hint in str(c).lower() for hint in DATE_HINTS)]
+        candidates += [c for c in frame.columns if c not in candidates and frame[c].dtype == object]
+        for column in candidates:
+            parsed = _parse_dates(frame[column], column)
+            if parsed is not None:
+                dates, date_column = parsed, column
+                break
+
+        numeric = {}
+        for column in frame.columns:
+            if column == date_column:
+                continue
+            values = pd.to_numeric(frame[column], errors='coerce')
+            if values.notna().mean() >= 0.5:
+                numeric[str(column)] = values.astype(float)
+        if not numeric:
+            raise ValueError('No numeric columns found')
+        values = pd.DataFrame(numeric)
+
+        if metrics:
+            wanted = [metrics] if isinstance(metrics, str) else [str(m) for m in metrics if isinstance(m, (str, int))]
+            lowered = {column.lower(): column for column in values.columns}
+            selected = [lowered[m.lower()] for m in wanted if m.lower() in lowered]
+            if selected:
+                values = values[selected]
+
+        if dates is not None:
+            order = np.argsort(dates.values, kind='stable')
+            dates = dates.iloc[order].reset_index(drop=True)
+            values = values.iloc[order].reset_index(drop=True)
+            keep = dates.notna().values
+            dates, values = dates[keep].reset_index(drop=True), values[keep].reset_index(drop=True)
+
+        return values, dates
+
+    def _granularity(self, dates: Optional[pd.Series], time_period: Optional[str]) -> Tuple[Optional[str], float]:
+        """Granularity name and step length in days, from the dates or the requested time period"""
+        if dates is not None and len(dates) >= 2:
+            steps = np.diff(dates.values.astype('datetime64[s]').astype(np.int64)) / 86400.0
+            steps = steps[steps > 0]
+            if len(steps):
+                step_days = float(np.median(steps))
+                name = min(PERIOD_DAYS, key=lambda key: abs(math.log(step_days / PERIOD_DAYS[key])))
+                return name, step_days
+        name = normalize_granularity(time_period)
+        return name, PERIOD_DAYS.get(name, 30.44)
+
+    @staticmethod
+    def _linear_fit(y: np.ndarray, x: np.ndarray = None) -> Dict[str, Any]:
+        """Ordinary least squares line with fit quality and slope t-statistic"""
+        n = len(y)
+        x = np.arange(n, dtype=float) if x is None else x
+        x_mean, y_mean = x.mean(), y.mean()
+        sxx = float(((x - x_mean) ** 2).sum())
+        slope = float(((x - x_mean) * (y - y_mean)).sum() / sxx) if sxx else 0.0
+        intercept = float(y_mean - slope * x_mean)
+        fitted = intercept + slope * x
+        ss_res = float(((y - fitted) ** 2).sum())
+        ss_tot = float(((y - y_mean) ** 2).sum())
+        se = math.sqrt(ss_res / (n - 2) / sxx) if n > 2 and sxx else float('nan')
+        return {
+            'slope': slope,
+            'intercept': intercept,
+            'fitted': fitted,
+            'r2': 1 - ss_res / ss_tot if ss_tot else (1.0 if ss_res == 0 else 0.0),
+            't': slope / se if se and math.isfinite(se) else (float('inf') if slope else 0.0),
+            'x_mean': x_mean,
+            'sxx': sxx
+        }
+
+    @staticmethod
+    def _decompose(y: np.ndarray, season_length: int) -> Dict[str, Any]:
+        """Classical additive decomposition (centered moving average trend, median seasonal indices)"""
+        series = pd.Series(y)
+        if season_length % 2:
+            trend = series.rolling(season_length, center=True).mean()
+        else:
+            trend = series.rolling(season_length).mean().rolling(2).mean().shift(-(season_length // 2))
+        phase = np.arange(len(y)) % season_length
+        detrended = series - trend
+        # Medians, so a single spike does not shift its season's index
+        indices = detrended.groupby(phase).median().reindex(range(season_length)).fillna(0.0).values
+        indices = indices - indices.mean()
+        seasonal = indices[phase]
+        resid = (detrended - seasonal).values
+        both = resid + seasonal
+        var_both = np.nanvar(both)
+        strength = max(0.0, 1 - np.nanvar(resid) / var_both) if var_both > 0 else 0.0
+        return {'trend': trend.values, 'indices': indices, 'seasonal': seasonal, 'resid': resid, 'strength': strength}
+
+    def _fit_predict(self, y: np.ndarray, season_length: Optional[int], horizon: int) -> Dict[str, Any]:
+        """Linear trend (on the deseasonalized series when seasonal) plus seasonal indices, with 80% intervals"""
+        n = len(y)
+        seasonal_fit = season_length if season_length and n >= 2 * season_length else None
+        indices = None
+        adjusted = y
+        if seasonal_fit:
+            indices = self._decompose(y, seasonal_fit)['indices']
+            adjusted = y - indices[np.arange(n) % seasonal_fit]
+        fit = self._linear_fit(adjusted)
+        future = np.arange(n, n + horizon, dtype=float)
+        point = fit['intercept'] + fit['slope'] * future
+        in_sample = fit['fitted']
+        if seasonal_fit:
+            point = point + indices[future.astype(int) % seasonal_fit]
+            in_sample = in_sample + indices[np.arange(n) % seasonal_fit]
+        dof = max(n - 2 - (seasonal_fit or 0), 1)
+        sigma = math.sqrt(float(((y - in_sample) ** 2).sum()) / dof)
+        spread = Z_80 * sigma * np.sqrt(1 + 1 / n + ((future - fit['x_mean']) ** 2) / (fit['sxx'] or 1.0))
+        return {'point': point, 'lower': point - spread, 'upper': point + spread, 'sigma': sigma,
+                'seasonal': bool(seasonal_fit)}
+
+    def _backtest(self, y: np.ndarray, season_length: Optional[int], horizon: int) -> Optional[Dict[str, Any]]:
+        """Hold out the last ``horizon`` points and score the baseline against a last-value forecast"""
+        h = min(horizon, len(y) // 3)
+        if h < 1 or len(y) - h < 4:
+            return None
+        train, actual = y[:-h], y[-h:]
+        predicted = self._fit_predict(train, season_length, h)['point']
+        nonzero = actual != 0
+        if not nonzero.any():
+            return None
+        mape = float(np.mean(np.abs((actual - predicted)[nonzero] / actual[nonzero])))
+        naive = float(np.mean(np.abs((actual - train[-1])[nonzero] / actual[nonzero])))
+        return {'holdout': h, 'mape': _sig(mape, 3), 'naive_mape': _sig(naive, 3)}
+
+    def analyze_series(self, values: pd.Series, dates: Optional[pd.Series] = None,
+                       season_length: Optional[int] = None, horizon: int = 3,
+                       granularity: Optional[str] = None, step_days: float = 30.44) -> Dict[str, Any]:
+        """
+        Trend, seasonality, rolling statistics, anomalies and a baseline forecast for one series
+
+        Args:
+            values: Numeric values in time order (gaps are interpolated)
+            dates: Matching dates, used for labels and forecast dates
+            season_length: Steps per seasonal cycle, or None to skip seasonality
+            horizon: Forecast steps
+            granularity: Step granularity, for calendar-aligned forecast dates
+            step_days: Length of one step in days, used when the granularity is not calendar based
+
+        Returns:
+            Fixed-size summary (does not grow with the series)
+        """
+        missing = int(values.isna().sum())
+        y = values.interpolate(limit_direction='both').to_numpy(dtype=float)
+        n = len(y)
+        labels = dates.reset_index(drop=True) if dates is not None else None
+
+        def at(position: int) -> Any:
+            return _label(labels.iloc[position]) if labels is not None else int(position)
+
+        mean = float(y.mean())
+        result: Dict[str, Any] = {
+            'points': n,
+            'missing': missing,
+            'first': _sig(y[0]),
+            'last': _sig(y[-1]),
+            'mean': _sig(mean),
+            'std': _sig(y.std(ddof=1) if n > 1 else 0.0),
+            'min': {'value': _sig(y.min()), 'at': at(int(y.argmin()))},
+            'max': {'value': _sig(y.max()), 'at': at(int(y.argmax()))},
+            'change_pct': _sig((y[-1] / y[0] - 1) * 100, 3) if y[0] else None
+        }
+        if n < 3:
+            result['note'] = 'Too few points for trend analysis'
+            return result
+
+        # Trend over the whole series and over its most recent quarter
+        fit = self._linear_fit(y)
+        recent = max(3, n // 4)
+        recent_fit = self._linear_fit(y[-recent:])
+        result['trend'] = {
+            'direction': ('up' if fit['slope'] > 0 else 'down') if abs(fit['t']) >= 2 else 'flat',
+            'slope_per_period': _sig(fit['slope']),
+            'slope_pct_of_mean': _sig(fit['slope'] / abs(mean) * 100, 3) if mean else None,
+            'r2': _sig(fit['r2'], 3),
+            'recent_slope_per_period': _sig(recent_fit['slope']),
+            'recent_window': recent
+        }
+
+        # Seasonality: needs two full cycles
+        decomposition = None
+        if season_length and season_length >= 2:
+            if n >= 2 * season_length:
+                decomposition = self._decompose(y, season_length)
+                indices = decomposition['indices']
+                phase_labels = self._phase_labels(labels, season_length)
+                result['seasonality'] = {
+                    'season_length': season_length,
+                    'strength': _sig(decomposition['strength'], 3),
+                    'detected': bool(decomposition['strength'] >= 0.3),
+                    'peak': phase_labels[int(indices.argmax())],
+                    'trough': phase_labels[int(indices.argmin())],
+                    'amplitude': _sig(indices.max() - indices.min())
+                }
+                if season_length <= 12:
+                    result['seasonality']['indices'] = {str(phase_labels[p]): _sig(indices[p], 3)
+                                                        for p in range(season_length)}
+            else:
+                result['seasonality'] = {'season_length': season_length, 'detected': False,
+                                         'note': f'Needs at least {2 * season_length} points'}
+
+        # Rolling window statistics: latest window against the one before it
+        window = season_length if season_length and 2 <= season_length <= n // 2 else max(2, min(7, n // 3))
+        rolling = pd.Series(y).rolling(window)
+        last_mean = float(rolling.mean().iloc[-1])
+        last_std = float(rolling.std().iloc[-1])
+        previous_mean = float(y[-2 * window:-window].mean()) if n >= 2 * window else None
+        result['rolling'] = {
+            'window': window,
+            'mean': _sig(last_mean),
+            'std': _sig(last_std),
+            'cv': _sig(last_std / abs(last_mean), 3) if last_mean else None,
+            'previous_mean': _sig(previous_mean),
+            'change_pct': _sig((last_mean / previous_mean - 1) * 100, 3) if previous_mean else None
+        }
+
+        # Anomalies: residuals after trend (and seasonality when strong enough), by z-score or IQR fence
+        if decomposition is not None and decomposition['strength'] >= 0.3:
+            resid = decomposition['resid']
+            expected = y - resid
+        else:
+            resid = y - fit['fitted']
+            expected = fit['fitted']
+        valid = ~np.isnan(resid)
+        if valid.sum() >= 4:
+            resid_std = float(np.nanstd(resid, ddof=1))
+            z = (resid - np.nanmean(resid)) / resid_std if resid_std > 0 else np.zeros(n)
+            q1, q3 = np.nanpercentile(resid, [25, 75])
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            by_z = valid & (np.abs(z) > self.z_threshold)
+            by_iqr = valid & ((resid < low) | (resid > high))
+            flagged = np.flatnonzero(by_z | by_iqr)
+            flagged = flagged[np.argsort(-np.abs(z[flagged]))]
+            result['anomalies'] = {
+                'count': int(len(flagged)),
+                'z_threshold': self.z_threshold,
+                'items': [{
+                    'at': at(int(p)),
+                    'value': _sig(y[p]),
+                    'expected': _sig(expected[p]),
+                    'z': _sig(z[p], 3),
+                    'kind': 'spike' if resid[p] > 0 else 'dip',
+                    'method': 'z+iqr' if by_z[p] and by_iqr[p] else ('z' if by_z[p] else 'iqr')
+                } for p in flagged[:self.max_anomalies]]
+            }
+
+        # Baseline forecast with 80% intervals, plus a holdout score so its reliability is explicit
+        horizon = min(max(int(horizon), 1), self.max_horizon)
+        forecast = self._fit_predict(y, season_length, horizon)
+        shown = np.unique(np.linspace(0, horizon - 1, min(horizon, self.max_forecast_points)).round().astype(int))
+        if labels is not None and not pd.isna(labels.iloc[-1]):
+            future_labels = [_label(self._step_date(labels.iloc[-1], int(s) + 1, granularity, step_days)) for s in shown]
+        else:
+            future_labels = [int(n + s) for s in shown]
+        result['forecast'] = {
+            'method': 'linear trend + seasonal indices' if forecast['seasonal'] else 'linear trend',
+            'horizon': horizon,
+            'points': [{'at': future_labels[i], 'value': _sig(forecast['point'][s]),
+                        'low': _sig(forecast['lower'][s]), 'high': _sig(forecast['upper'][s])}
+                       for i, s in enumerate(shown)],
+            'backtest': self._backtest(y, season_length, horizon)
+        }
+        return result
+
+    @staticmethod
+    def _step_date(last: pd.Timestamp, steps: int, granularity: Optional[str], step_days: float) -> pd.Timestamp:
+        """Date ``steps`` periods after ``last``, keeping month-based series on the same day of month"""
+        months = {'monthly': 1, 'quarterly': 3, 'yearly': 12}.get(granularity)
+        if months:
+            return last + pd.DateOffset(months=months * steps)
+        return last + pd.Timedelta(days=step_days * steps)
+
+    @staticmethod
+    def _phase_labels(labels: Optional[pd.Series], season_length: int) -> List[Any]:
+        """Name seasonal positions by calendar where the cycle is one (months, weekdays, quarters)"""
+        if labels is not None and len(labels) >= season_length and pd.api.types.is_datetime64_any_dtype(labels):
+            head = labels.iloc[:season_length]
+            if season_length == 12:
+                return list(head.dt.strftime('%b'))
+            if season_length == 7:
+                return list(head.dt.strftime('%a'))
+            if season_length == 4:
+                return [f'Q{q}' for q in head.dt.quarter]
+            if season_length == 24:
+                return list(head.dt.strftime('%H:00'))
+        return list(range(season_length))
+
+    @traced()
+    def series_digest(self, data: Any, metrics: Union[str, List[str], None] = None,
+                      time_period: Optional[str] = None, horizon: Union[str, int, None] = None,
+                      season_length: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Analyze every metric in a time series payload
+
+        Args:
+            data: Series payload (see ``to_frame``)
+            metrics: Metric names to restrict to (others are ignored)
+            time_period: Reporting granularity, used when there are no dates
+            horizon: Forecast horizon, e.g. '3 months' or a step count
+            season_length: Override for the steps per seasonal cycle
+
+        Returns:
+            Dictionary with success status and the per-metric digest
+        """
+        try:
+            values, dates = self.to_frame(data, metrics)
+        except (ValueError, TypeError) as e:
+            return {'success': False, 'error': f'Could not read numeric series: {str(e)}'}
+
+        granularity, step_days = self._granularity(dates, time_period)
+        if season_length is None:
+            season_length = SEASON_LENGTHS.get(granularity)
+        default_horizon = season_length if season_length and season_length <= 12 else 3
+        steps = min(parse_horizon(horizon, step_days, default_horizon), self.max_horizon)
+
+        columns = list(values.columns)
+        digest = {
+            'success': True,
+            'points': len(values),
+            'granularity': granularity,
+            'metrics': {}
+        }
+        if dates is not None and len(dates):
+            digest['date_range'] = [_label(dates.iloc[0]), _label(dates.iloc[-1])]
+        for column in columns[:self.max_metrics]:
+            digest['metrics'][column] = self.analyze_series(values[column], dates, season_length, steps,
+                                                               granularity, step_days)
+        if len(columns) > self.max_metrics:
+            digest['omitted_metrics'] = columns[self.max_metrics:]
+        if len(columns) > 1:
+            correlations = values[columns[:self.max_metrics]].corr()
+            pairs = [(a, b, correlations.loc[a, b]) for i, a in enumerate(correlations.columns)
+                     for b in correlations.columns[i + 1:] if pd.notna(correlations.loc[a, b])]
+            pairs.sort(key=lambda pair: -abs(pair[2]))
+            digest['strongest_correlations'] = [{'metrics': [a, b], 'r': _sig(r, 3)} for a, b, r in pairs[:5]]
+        return digest
+
+    def cohort_matrix(self, cohort_data: Any, time_period: Optional[str] = None
+                      ) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        """
+        Build a cohort x period matrix of counts (or rates) from any of the accepted shapes
+
+        Accepted shapes:
+            - {'cohort': ..., 'size': ..., 'retention': [..]} rows (any list-valued field)
+            - wide rows with numbered period columns, e.g. month_0, month_1, ...
+            - long rows of cohort, period and value
+            - user events (user id and activity date, optional signup date)
+            - a dict of cohort -> list of values
+
+        Returns:
+            (matrix indexed by cohort with integer period columns, cohort sizes or None)
+        """
+        if isinstance(cohort_data, dict):
+            cohort_data = [{'cohort': key, 'values': value} for key, value in cohort_data.items()]
+        if not isinstance(cohort_data, (list, tuple)) or not cohort_data or not all(isinstance(r, dict) for r in cohort_data):
+            raise ValueError('Expected a list of cohort records')
+        frame = pd.DataFrame.from_records(cohort_data)
+        columns = list(frame.columns)
+        cohort_key = _find_key(columns, COHORT_KEYS)
+        size_key = _find_key(columns, COHORT_SIZE_KEYS)
+
+        # Rows carrying a list of per-period values
+        list_key = next((c for c in columns if frame[c].map(lambda v: isinstance(v, (list, tuple))).all()), None)
+        if list_key is not None:
+            rows = frame[list_key].map(lambda v: [pd.to_numeric(x, errors='coerce') for x in v])
+            matrix = pd.DataFrame(rows.tolist()).astype(float)
+            matrix.index = frame[cohort_key] if cohort_key is not None else range(len(frame))
+            sizes = pd.to_numeric(frame[size_key], errors='coerce') if size_key is not None else None
+            return matrix, (sizes.set_axis(matrix.index) if sizes is not None else None)
+
+        # Wide rows: numbered period columns
+        numbered = {c: int(m.group(1)) for c in columns
+                    if (m := re.search(r'(?:^|[_\s-])(\d+)$', str(c)) or re.fullmatch(r'(\d+)', str(c)))}
+        if len(numbered) >= 2:
+            ordered = sorted(numbered, key=numbered.get)
+            matrix = frame[ordered].apply(pd.to_numeric, errors='coerce').astype(float)
+            matrix.columns = [numbered[c] for c in ordered]
+            matrix.index = frame[cohort_key] if cohort_key is not None else range(len(frame))
+            sizes = pd.to_numeric(frame[size_key], errors='coerce') if size_key is not None and size_key not in numbered else None
+            return matrix, (sizes.set_axis(matrix.index) if sizes is not None else None)
+
+        # Long rows: cohort, period offset, value
+        period_key = _find_key(columns, PERIOD_KEYS)
+        value_key = _find_key([c for c in columns if c not in (cohort_key, period_key)], VALUE_KEYS)
+        if cohort_key is not None and period_key is not None and value_key is not None:
+            long = pd.DataFrame({
+                'cohort': frame[cohort_key],
+                'period': pd.to_numeric(frame[period_key], errors='coerce'),
+                'value': pd.to_numeric(frame[value_key], errors='coerce')
+            }).dropna(subset=['period'])
+            matrix = long.pivot_table(index='cohort', columns='period', values='value', aggfunc='sum', sort=True)
+            matrix.columns = matrix.columns.astype(int)
+            return matrix.astype(float), None
+
+        # User events: cohort = first period seen (or signup), period = offset of each activity
+        user_key = _find_key(columns, USER_KEYS)
+        activity_key = _find_key([c for c in columns if c != user_key], ACTIVITY_KEYS)
+        if user_key is not None and activity_key is not None:
+            activity = _parse_dates(frame[activity_key], activity_key)
+            if activity is None:
+                raise ValueError(f'Could not parse dates in {activity_key}')
+            events = pd.DataFrame({'user': frame[user_key], 'at': activity}).dropna()
+            signup_key = _find_key(columns, SIGNUP_KEYS)
+            first = events.groupby('user')['at'].transform('min')
+            if signup_key is not None and signup_key != activity_key:
+                signup = _parse_dates(frame[signup_key], signup_key)
+                if signup is not None:
+                    first = signup.loc[events.index].fillna(first)
+            granularity = normalize_granularity(time_period) or 'monthly'
+            if granularity == 'weekly':
+                cohort = first.dt.to_period('W').dt.start_time
+                period = (events['at'].dt.to_period('W').dt.start_time - cohort).dt.days // 7
+            elif granularity == 'daily':
+                cohort = first.dt.normalize()
+                period = (events['at'].dt.normalize() - cohort).dt.days
+            else:
+                cohort = first.dt.to_period('M').dt.start_time
+                period = ((events['at'].dt.year - cohort.dt.year) * 12 + events['at'].dt.month - cohort.dt.month)
+            events = events.assign(cohort=cohort.dt.strftime('%Y-%m-%d'), period=period)
+            events = events[events['period'] >= 0]
+            matrix = events.groupby(['cohort', 'period'])['user'].nunique().unstack('period').sort_index()
+            return matrix.astype(float), None
+
+        raise ValueError('Unrecognized cohort format: expected per-cohort period values, '
+                         'cohort/period/value rows or user activity events')
+
+    @traced()
+    def cohort_digest(self, cohort_data: Any, analysis_type: str = 'retention',
+                      time_period: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Retention matrix and the headline cohort statistics
+
+        Args:
+            cohort_data: Cohort payload (see ``cohort_matrix``)
+            analysis_type: e.g. 'retention' or 'revenue'; recorded in the digest
+            time_period: Period granularity, used to bucket raw user events
+
+        Returns:
+            Dictionary with success status, the digest and the full rate matrix
+        """
+        try:
+            matrix, sizes = self.cohort_matrix(cohort_data, time_period)
+        except (ValueError, TypeError, KeyError) as e:
+            return {'success': False, 'error': f'Could not read cohort data: {str(e)}'}
+        if matrix.empty:
+            return {'success': False, 'error': 'Could not read cohort data: no values'}
+
+        matrix = matrix.reindex(columns=range(int(matrix.columns.min()), int(matrix.columns.max()) + 1))
+        values = matrix.to_numpy(dtype=float)
+
+        # Rates against cohort size when given, else against each cohort's first period
+        if sizes is not None and sizes.notna().any() and np.nanmax(values) > 1:
+            base = sizes.to_numpy(dtype=float)
+        elif np.nanmax(values) <= 1:
+            base = np.ones(len(values))
+        else:
+            base = values[:, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = values / base[:, None]
+        rates[~np.isfinite(rates)] = np.nan
+        weights = np.where(np.isnan(rates), 0.0, np.nan_to_num(base, nan=0.0)[:, None])
+
+        # Size-weighted average curve over the cohorts that have reached each period
+        with np.errstate(invalid='ignore'):
+            curve = np.nansum(np.nan_to_num(rates) * weights, axis=0) / weights.sum(axis=0)
+        periods = list(matrix.columns)
+        cohorts = [_label(c) for c in matrix.index]
+        shown = min(len(periods), 12)
+
+        digest: Dict[str, Any] = {
+            'analysis_type': analysis_type,
+            'cohorts': len(cohorts),
+            'periods': len(periods),
+            'cohort_range': [cohorts[0], cohorts[-1]],
+            'average_curve': {str(periods[p]): _sig(curve[p], 3) for p in range(shown)}
+        }
+        if sizes is not None:
+            digest['total_size'] = _sig(float(np.nansum(base)))
+
+        below_half = np.flatnonzero(curve < 0.5)
+        digest['half_life_period'] = int(periods[below_half[0]]) if len(below_half) else None
+        if len(curve) > 1:
+            drops = curve[:-1] - curve[1:]
+            if np.isfinite(drops).any():
+                steepest = int(np.nanargmax(drops))
+                digest['steepest_drop'] = {'from_period': int(periods[steepest]), 'to_period': int(periods[steepest + 1]),
+                                           'points': _sig(drops[steepest] * 100, 3)}
+
+        # Compare cohorts at the latest period most of them have reached
+        reached = (~np.isnan(rates)).sum(axis=0)
+        candidates = [p for p in range(1, len(periods)) if reached[p] >= max(2, len(cohorts) // 2)]
+        if candidates:
+            k = candidates[min(2, len(candidates) - 1)]
+            at_k = rates[:, k]
+            ranked = np.flatnonzero(~np.isnan(at_k))
+            best, worst = ranked[np.nanargmax(at_k[ranked])], ranked[np.nanargmin(at_k[ranked])]
+            digest['comparison_period'] = int(periods[k])
+            digest['best_cohort'] = {'cohort': cohorts[best], 'rate': _sig(at_k[best], 3)}
+            digest['worst_cohort'] = {'cohort': cohorts[worst], 'rate': _sig(at_k[worst], 3)}
+            if len(ranked) >= 3:
+                trend = self._linear_fit(at_k[ranked], ranked.astype(float))
+                digest['cohort_trend'] = {
+                    'direction': ('improving' if trend['slope'] > 0 else 'declining') if abs(trend['t']) >= 2 else 'stable',
+                    'points_per_cohort': _sig(trend['slope'] * 100, 3)
+                }
+
+        digest['recent_cohorts'] = {
+            str(cohorts[i]): [_sig(r, 3) for r in rates[i, :shown]] for i in range(max(len(cohorts) - 6, 0), len(cohorts))
+        }
+
+        return {
+            'success': True,
+            'digest': digest,
+            'matrix': {
+                'cohorts': cohorts,
+                'periods': [int(p) for p in periods],
+                'rates': [[_sig(r, 4) for r in row] for row in rates]
+            }
+        }
+
+# Global analytics engine instance
+analytics_engine = AnalyticsEngine(
+    z_threshold=float(os.getenv('ANALYTICS_Z_THRESHOLD', '3.0')),
+    max_anomalies=int(os.getenv('ANALYTICS_MAX_ANOMALIES', '5')),
+    max_metrics=int(os.getenv('ANALYTICS_MAX_METRICS', '6'))
+)
@@ -0,0 +1,132 @@
+"""
+Append Log for Agent CEO system
+Append-only log of numpy array batches that sits next to a snapshot file shared by the workers
+"""
+
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b'ALG1'
+FRAME = struct.Struct('<4sIQ')  # magic, header bytes, payload bytes
+
+Entry = Tuple[Dict[str, Any], Dict[str, np.ndarray]]
+
+class AppendLog:
+    """
+    Changes made since the last snapshot, one frame per batch
+
+    Each frame holds a JSON header and the raw bytes of a few arrays. The
+    first frame names the snapshot ``generation`` the log extends; writing a
+    new snapshot starts a new log, so a reader that finds another generation
+    knows its position is void. Readers keep the offset they have applied up
+    to and read only the frames after it. A frame cut short by a crashed
+    writer is never returned, and the next append overwrites it.
+
+    Appends must be serialized by the caller (the services hold a file lock).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read(self, generation: int, offset: Optional[int] = None) -> Optional[Tuple[List[Entry], int]]:
+        """
+        Frames after ``offset`` (None for all of them)
+
+        Returns:
+            (entries, offset after the last complete frame), or None if the log
+            is missing or belongs to another generation
+        """
+        try:
+            handle = open(self.path, 'rb')
+        except FileNotFoundError:
+            return None
+        with handle:
+            first = self._read_frame(handle)
+            if first is None or first[0].get('generation') != generation:
+                return None
+            start = handle.tell()
+            if offset is not None and offset > start:
+                handle.seek(offset)
+            entries = []
+            position = handle.tell()
+            while True:
+                frame = self._read_frame(handle)
+                if frame is None:
+                    return entries, position
+                entries.append(frame)
+                position = handle.tell()
+
+    def reset(self, generation: int) -> int:
+        """Replace the log with an empty one for a new snapshot generation, returning its end offset"""
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as handle:
+            handle.write(self._encode({'generation': generation}, {}))
+            end = handle.tell()
+        os.replace(temporary, self.path)
+        return end
+
+    def append(self, generation: int, offset: Optional[int], header: Dict[str, Any],
+               arrays: Dict[str, np.ndarray]) -> int:
+        """
+        Append one frame after ``offset``, the end of the frames the caller has applied
+
+        Anything past ``offset`` (a torn frame) is overwritten. A missing log,
+        or one left from another generation, is started afresh.
+
+        Returns:
+            Offset after the new frame
+        """
+        if offset is None or self._generation() != generation:
+            offset = self.reset(generation)
+        with open(self.path, 'r+b') as handle:
+            handle.seek(offset)
+            handle.truncate()
+            handle.write(self._encode(header, arrays))
+            handle.flush()
+            return handle.tell()
+
+    def _generation(self) -> Optional[int]:
+        try:
+            with open(self.path, 'rb') as handle:
+                first = self._read_frame(handle)
+        except FileNotFoundError:
+            return None
+        return first[0].get('generation') if first is not None else None
+
+    def _encode(self, header: Dict[str, Any], arrays: Dict[str, np.ndarray]) -> bytes:
+        arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+        header = {**header, 'arrays': [[name, array.dtype.str, list(array.shape)] for name, array in arrays.items()]}
+        encoded = json.dumps(header, default=str).encode('utf-8')
+        payload = b''.join(array.tobytes() for array in arrays.values())
+        return FRAME.pack(MAGIC, len(encoded), len(payload)) + encoded + payload
+
+    def _read_frame(self, handle) -> Optional[Entry]:
+        prefix = handle.read(FRAME.size)
+        if len(prefix) < FRAME.size:
+            return None
+        magic, header_size, payload_size = FRAME.unpack(prefix)
+        if magic != MAGIC:
+            return None
+        encoded = handle.read(header_size)
+        payload = handle.read(payload_size)
+        if len(encoded) < header_size or len(payload) < payload_size:
+            return None
+        header = json.loads(encoded.decode('utf-8'))
+        arrays = {}
+        position = 0
+        for name, dtype, shape in header.pop('arrays'):
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=position).reshape(shape)
+            position += count * dtype.itemsize
+        return header, arrays
@@ -0,0 +1,449 @@
+"""
+Business Data Processor for Agent CEO system
+Drains unprocessed BusinessData in the background: claims records in batches, scores them
+with token-budgeted LLM calls per data type and writes insights and quality scores back in bulk
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from src.models.agent import BusinessData, BusinessDataClaim, BusinessDataInsight, ProcessorCheckpoint, db
+from src.services.ai_service import ai_service
+from src.services.dedup_service import not_duplicate
+from src.services.prompt_builder import compact_json, count_tokens, truncate_tokens
+from src.services.prompt_registry import prompt_registry
+from src.services.usage_ledger import usage_scope
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT = 'business_data'
+
+PROCESSOR_TEMPLATES = prompt_registry.register_many('business_data', {
+    'process': {
+        'system': """
+        You review business data records collected by scrapers, integrations and users.
+
+        For every record the user sends, return:
+        - quality_score: 0 to 1, how complete, plausible and usable for business decisions the record is
+        - insight: one or two sentences on what the record means for the business (opportunity, risk or next step)
+
+        Respond with only a JSON array, one object per record, in the order given:
+        [{"id": <record id>, "quality_score": <0-1>, "insight": "<text>"}]
+        """,
+        'prompt': """
+        Data Type: {data_type}
+        Records (one JSON object per line):
+        {records}
+        """
+    }
+})
+
+def parse_results(text: str) -> Dict[int, Dict[str, Any]]:
+    """Per-record results from a model response, keyed by record ID; malformed entries are dropped"""
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end <= start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except ValueError:
+        return {}
+    results = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            record_id = int(item['id'])
+            score = min(max(float(item['quality_score']), 0.0), 1.0)
+        except (KeyError, TypeError, ValueError):
+            continue
+        insight = str(item.get('insight') or '').strip()
+        if insight:
+            results[record_id] = {'quality_score': score, 'insight': insight}
+    return results
+
+class BusinessDataProcessor:
+    """
+    Background processor for unprocessed BusinessData
+
+    Every worker runs a processor thread; the shared checkpoint row says
+    whether they should work, so start and stop apply to all workers.
+    Workers claim records in ID order from a checkpointed cursor: the
+    claim query locks rows with ``FOR UPDATE SKIP LOCKED`` where the
+    database supports it, and the ``business_data_claim`` primary key keeps
+    claims exclusive everywhere. A claim is a lease; records of a worker
+    that dies are claimed again once it expires.
+
+    Claimed records are grouped by data type and packed into prompts up to
+    a token budget. Each call's results are written in bulk (quality
+    scores, ``processed`` and one insight row per record) and the
+    checkpoint counters are updated in the same commit. Calls are paced to
+    a fixed rate per worker, so a backlog drains at a predictable rate.
+    """
+
+    def __init__(self, claim_size: int = 200, batch_tokens: int = 3000, record_tokens: int = 300,
+                 output_tokens_per_record: int = 80, max_output_tokens: int = 4000,
+                 calls_per_minute: float = 30.0, lease_seconds: float = 600.0, retry_seconds: float = 60.0,
+                 max_attempts: int = 3, poll_seconds: float = 5.0, enabled_by_default: bool = False):
+        self.claim_size = claim_size
+        self.batch_tokens = batch_tokens
+        self.record_tokens = record_tokens
+        self.output_tokens_per_record = output_tokens_per_record
+        self.max_output_tokens = max_output_tokens
+        # Records per call: as many as fit the input budget and the completion limit
+        self.max_batch_records = max(1, (max_output_tokens - 200) // output_tokens_per_record)
+        self.calls_per_minute = calls_per_minute
+        self.lease_seconds = lease_seconds
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.enabled_by_default = enabled_by_default
+        self.app = None
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._next_call = 0.0
+        self._recent: deque = deque()  # (monotonic time, records processed) in this process
+
+    def init_app(self, app):
+        """Bind the Flask app and start this process's processor thread"""
+        self.app = app
+        self._ensure_started()
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        """Start the processor thread in this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='business-data-processor', daemon=True)
+            self._thread.start()
+
+    def start(self) -> Dict[str, Any]:
+        """Enable processing on every worker"""
+        checkpoint = self._checkpoint()
+        if not checkpoint.enabled:
+            checkpoint.enabled = True
+            checkpoint.started_at = datetime.utcnow()
+            checkpoint.updated_at = datetime.utcnow()
+            db.session.commit()
+        if self.app is not None:
+            self._ensure_started()
+        self._wakeup.set()
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Disable processing; workers finish the claim they are working on"""
+        checkpoint = self._checkpoint()
+        if checkpoint.enabled:
+            checkpoint.enabled = False
+            checkpoint.updated_at = datetime.utcnow()
+            db.session.commit()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        """Run state, backlog, claims in flight and the recent processing rate"""
+        now = datetime.utcnow()
+        backlog = db.session.query(func.count(BusinessData.id)).filter(
+            BusinessData.processed.is_(False), not_duplicate()).scalar()
+        in_flight = db.session.query(func.count(BusinessDataClaim.data_id)).filter(
+            BusinessDataClaim.lease_expires_at > now).scalar()
+        gave_up = db.session.query(func.count(BusinessDataClaim.data_id)).filter(
+            BusinessDataClaim.attempts >= self.max_attempts, BusinessDataClaim.lease_expires_at <= now).scalar()
+        rate = self._rate()
+        return {
+            **self._checkpoint().to_dict(),
+            'backlog': backlog,
+            'in_flight': in_flight,
+            'gave_up': gave_up,
+            'worker_rate_per_minute': round(rate, 1),
+            'worker_eta_minutes': round(backlog / rate, 1) if rate > 0 else None,
+            'settings': {
+                'claim_size': self.claim_size,
+                'batch_tokens': self.batch_tokens,
+                'max_batch_records': self.max_batch_records,
+                'calls_per_minute': self.calls_per_minute,
+                'lease_seconds': self.lease_seconds,
+                'max_attempts': self.max_attempts
+            }
+        }
+
+    def _checkpoint(self) -> ProcessorCheckpoint:
+        checkpoint = db.session.get(ProcessorCheckpoint, CHECKPOINT)
+        if checkpoint is None:
+            try:
+                db.session.add(ProcessorCheckpoint(name=CHECKPOINT, enabled=self.enabled_by_default,
+                                                   started_at=datetime.utcnow() if self.enabled_by_default else None))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()  # another worker created it
+            checkpoint = db.session.get(ProcessorCheckpoint, CHECKPOINT)
+        return checkpoint
+
+    def _rate(self) -> float:
+        """Records per minute processed by this worker over the last ten minutes"""
+        horizon = time.monotonic() - 600
+        while self._recent and self._recent[0][0] < horizon:
+            self._recent.popleft()
+        if not self._recent:
+            return 0.0
+        elapsed = max(time.monotonic() - self._recent[0][0], 60.0)
+        return sum(count for _, count in self._recent) * 60.0 / elapsed
+
+    def _run(self):
+        while not self._stopping.is_set():
+            worked = False
+            try:
+                with self.app.app_context():
+                    try:
+                        if self._checkpoint().enabled:
+                            worked = self.run_once() > 0
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                logger.error(f"Business data processor failed: {str(e)}")
+            if not worked:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def run_once(self) -> int:
+        """
+        Claim one batch of records and process it (requires an app context)
+
+        Returns:
+            Number of records claimed
+        """
+        batch_id, rows = self._claim()
+        if not rows:
+            return 0
+        attempted = set()
+        with usage_scope(call_site='src.services.business_data_processor.process'):
+            for data_type, batch in self._pack(rows):
+                if self._stopping.is_set():
+                    break
+                attempted.update(record_id for record_id, _ in batch)
+                if not self._process(batch_id, data_type, batch):
+                    break  # provider failing: hand the rest back instead of burning through it
+        # Records not sent (shutdown, provider failure) are released without counting an attempt
+        unsent = [row.id for row in rows if row.id not in attempted]
+        if unsent:
+            self._release(batch_id, unsent, 'Not processed', delay=0.0, count_attempt=False)
+            db.session.commit()
+        return len(rows)
+
+    def _claim(self) -> Tuple[Optional[str], list]:
+        """Lease the next unprocessed records after the cursor, wrapping around once at the end"""
+        now = datetime.utcnow()
+        cursor = self._checkpoint().cursor
+        ids = self._claimable(cursor, now)
+        if not ids and cursor > 0:
+            # Passed the end: start over for records released or added behind the cursor
+            db.session.execute(update(ProcessorCheckpoint).where(
+                ProcessorCheckpoint.name == CHECKPOINT, ProcessorCheckpoint.cursor == cursor).values(cursor=0))
+            db.session.commit()
+            ids = self._claimable(0, now)
+        if not ids:
+            db.session.commit()
+            return None, []
+
+        batch_id = uuid.uuid4().hex
+        lease = now + timedelta(seconds=self.lease_seconds)
+        expired = {data_id for (data_id,) in db.session.query(BusinessDataClaim.data_id).filter(
+            BusinessDataClaim.data_id.in_(ids))}  # claimable, so their leases have run out
+        try:
+            fresh = [data_id for data_id in ids if data_id not in expired]
+            if fresh:
+                db.session.execute(insert(BusinessDataClaim), [
+                    {'data_id': data_id, 'batch_id': batch_id, 'attempts': 1, 'claimed_at': now,
+                     'lease_expires_at': lease} for data_id in fresh
+                ])
+            if expired:
+                # Compare-and-set on the expiry so a claim taken meanwhile is left alone
+                db.session.execute(update(BusinessDataClaim).where(
+                    BusinessDataClaim.data_id.in_(expired), BusinessDataClaim.lease_expires_at <= now
+                ).values(batch_id=batch_id, attempts=BusinessDataClaim.attempts + 1, claimed_at=now,
+                         lease_expires_at=lease, error=None))
+            db.session.execute(update(ProcessorCheckpoint).where(
+                ProcessorCheckpoint.name == CHECKPOINT, ProcessorCheckpoint.cursor < max(ids)
+            ).values(cursor=max(ids)))
+            db.session.commit()
+        except (IntegrityError, OperationalError) as e:
+            # Another worker claimed some of these first; try again on the next round
+            db.session.rollback()
+            logger.info(f"Business data claim lost a race: {str(e).splitlines()[0]}")
+            return None, []
+
+        rows = db.session.execute(
+            select(BusinessData.id, BusinessData.data_type, BusinessData.source, BusinessData.data_content)
+            .join(BusinessDataClaim, BusinessDataClaim.data_id == BusinessData.id)
+            .where(BusinessDataClaim.batch_id == batch_id).order_by(BusinessData.id)
+        ).all()
+        return batch_id, rows
+
+    def _claimable(self, cursor: int, now: datetime) -> List[int]:
+        query = (
+            select(BusinessData.id)
+            .outerjoin(BusinessDataClaim, BusinessDataClaim.data_id == BusinessData.id)
+            .where(
+                BusinessData.processed.is_(False),
+                BusinessData.id > cursor,
+                not_duplicate(),
+                or_(BusinessDataClaim.data_id.is_(None),
+                    and_(BusinessDataClaim.lease_expires_at <= now,
+                         BusinessDataClaim.attempts < self.max_attempts))
+            )
+            .order_by(BusinessData.id)
+            .limit(self.claim_size)
+            # Row locks where supported (PostgreSQL, MySQL); other workers skip rather than wait
+            .with_for_update(skip_locked=True, of=BusinessData)
+        )
+        return list(db.session.execute(query).scalars())
+
+    def _pack(self, rows: list) -> List[Tuple[str, List[Tuple[int, str]]]]:
+        """Group rows by data type into batches of serialized records within the token budget"""
+        by_type: Dict[str, List[Tuple[int, str]]] = {}
+        for row in rows:
+            by_type.setdefault(row.data_type, []).append((row.id, self._serialize(row)))
+
+        model = ai_service.default_candidates[0][1]
+        batches = []
+        for data_type, records in by_type.items():
+            batch, used = [], 0
+            for record_id, text in records:
+                tokens = count_tokens(text, model)
+                if batch and (used + tokens > self.batch_tokens or len(batch) >= self.max_batch_records):
+                    batches.append((data_type, batch))
+                    batch, used = [], 0
+                batch.append((record_id, text))
+                used += tokens
+            if batch:
+                batches.append((data_type, batch))
+        return batches
+
+    def _serialize(self, row) -> str:
+        """One record as a JSON line, its content cut to the per-record token limit"""
+        try:
+            content = json.loads(row.data_content) if row.data_content else {}
+        except ValueError:
+            content = row.data_content
+        text = compact_json({'id': row.id, 'source': row.source, 'data': content})
+        if count_tokens(text) <= self.record_tokens:
+            return text
+        data = truncate_tokens(compact_json(content), self.record_tokens - 20)
+        return compact_json({'id': row.id, 'source': row.source, 'data': data, 'truncated': True})
+
+    def _process(self, batch_id: str, data_type: str, batch: List[Tuple[int, str]]) -> bool:
+        """
+        Score one packed batch with a single LLM call and write the results back
+
+        Returns:
+            False if the call itself failed
+        """
+        ids = [record_id for record_id, _ in batch]
+        model = ai_service.default_candidates[0][1]
+        max_tokens = min(self.max_output_tokens, 200 + self.output_tokens_per_record * len(batch))
+        built = PROCESSOR_TEMPLATES['process'].render({
+            'data_type': data_type,
+            'records': '\n'.join(text for _, text in batch)
+        }, model=model, max_tokens=max_tokens)
+
+        self._pace()
+        result = ai_service.generate_text(prompt=built.prompt, system=built.system, max_tokens=max_tokens,
+                                          temperature=0.2)
+        results = parse_results(result.get('text') or '') if result.get('success') else {}
+        done = [record_id for record_id in ids if record_id in results]
+        missing = [record_id for record_id in ids if record_id not in results]
+        now = datetime.utcnow()
+
+        if done:
+            # Content is unchanged, so updated_at is kept: the embedding and dedup catch-ups key on it
+            table = BusinessData.__table__
+            db.session.execute(
+                table.update().where(table.c.id == bindparam('record_id')).values(
+                    quality_score=bindparam('score'), processed=True, updated_at=table.c.updated_at),
+                [{'record_id': record_id, 'score': results[record_id]['quality_score']} for record_id in done]
+            )
+            db.session.execute(insert(BusinessDataInsight), [
+                {'data_id': record_id, 'data_type': data_type, 'insight': results[record_id]['insight'],
+                 'quality_score': results[record_id]['quality_score'], 'model': result.get('model'),
+                 'batch_id': batch_id, 'created_at': now}
+                for record_id in done
+            ])
+            db.session.execute(BusinessDataClaim.__table__.delete().where(BusinessDataClaim.data_id.in_(done)))
+        error = None
+        if not result.get('success'):
+            # Provider trouble is not the records' fault: retry them later without counting an attempt
+            error = result.get('error') or 'Generation failed'
+            self._release(batch_id, missing, error, delay=self.retry_seconds, count_attempt=False)
+            self._next_call = max(self._next_call, time.monotonic() + self.retry_seconds)
+        elif missing:
+            error = 'Record missing from model response'
+            self._release(batch_id, missing, error, delay=self.retry_seconds, count_attempt=True)
+
+        db.session.execute(update(ProcessorCheckpoint).where(ProcessorCheckpoint.name == CHECKPOINT).values(
+            processed=ProcessorCheckpoint.processed + len(done),
+            failed=ProcessorCheckpoint.failed + len(missing),
+            llm_calls=ProcessorCheckpoint.llm_calls + 1,
+            prompt_tokens=ProcessorCheckpoint.prompt_tokens + built.tokens,
+            last_error=error if error else ProcessorCheckpoint.last_error,
+            updated_at=now
+        ))
+        db.session.commit()
+        self._recent.append((time.monotonic(), len(done)))
+        if missing:
+            logger.warning(f"Business data batch {batch_id} ({data_type}): {len(missing)} of {len(ids)} "
+                           f"records not processed: {error}")
+        return bool(result.get('success'))
+
+    def _release(self, batch_id: str, ids: List[int], error: str, delay: float, count_attempt: bool):
+        """Give claims back, claimable again after ``delay`` seconds"""
+        if not ids:
+            return
+        values = {'lease_expires_at': datetime.utcnow() + timedelta(seconds=delay), 'error': error}
+        if not count_attempt:
+            values['attempts'] = BusinessDataClaim.attempts - 1
+        db.session.execute(update(BusinessDataClaim).where(
+            BusinessDataClaim.batch_id == batch_id, BusinessDataClaim.data_id.in_(ids)).values(**values))
+
+    def _pace(self):
+        """Wait for this worker's next LLM call slot"""
+        if self.calls_per_minute <= 0:
+            return
+        delay = self._next_call - time.monotonic()
+        if delay > 0:
+            self._stopping.wait(delay)
+        self._next_call = max(self._next_call, time.monotonic()) + 60.0 / self.calls_per_minute
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the processor thread; unfinished claims are released or expire"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+# Global business data processor instance
+business_data_processor = BusinessDataProcessor(
+    claim_size=int(os.getenv('BUSINESS_DATA_PROCESSOR_CLAIM_SIZE', '200')),
+    batch_tokens=int(os.getenv('BUSINESS_DATA_PROCESSOR_BATCH_TOKENS', '3000')),
+    record_tokens=int(os.getenv('BUSINESS_DATA_PROCESSOR_RECORD_TOKENS', '300')),
+    max_output_tokens=int(os.getenv('BUSINESS_DATA_PROCESSOR_MAX_OUTPUT_TOKENS', '4000')),
+    calls_per_minute=float(os.getenv('BUSINESS_DATA_PROCESSOR_CALLS_PER_MINUTE', '30')),
+    lease_seconds=float(os.getenv('BUSINESS_DATA_PROCESSOR_LEASE_SECONDS', '600')),
+    max_attempts=int(os.getenv('BUSINESS_DATA_PROCESSOR_MAX_ATTEMPTS', '3')),
+    enabled_by_default=os.getenv('BUSINESS_DATA_PROCESSOR_ENABLED', 'false').lower() == 'true'
+)
@@ -0,0 +1,751 @@
+"""
+Data Quality Service for Agent CEO system
+Rule-based, vectorized quality checks over chunked tabular data, producing per-column scorecards
+and per-row scores for BusinessData
+"""
+
+import json
+import logging
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+
+from src.models.agent import BusinessData
+from src.models.user import db
+from src.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+COLUMN_TYPES = ('number', 'integer', 'boolean', 'date', 'email', 'url', 'phone', 'string')
+
+# Values that stand in for "missing" in exported data
+PLACEHOLDERS = {'', 'null', 'none', 'nan', 'n/a', 'na', '-', '--', '?', 'undefined', '#n/a'}
+
+EMAIL_PATTERN = r'[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}'
+URL_PATTERN = r'(?:https?://)?(?:[A-Za-z0-9\-]+\.)+[A-Za-z]{2,}(?::\d+)?(?:[/?#]\S*)?'
+# 7-15 digits in total, with the usual separators and an optional extension
+PHONE_PATTERN = r'(?=(?:\D*\d){7,15}\D*$)[\d\s\-().+/]+(?:\s*(?:ext|x)\.?\s*\d+)?'
+BOOLEAN_VALUES = {'true', 'false', 't', 'f', 'yes', 'no', 'y', 'n', '0', '1'}
+
+# Column names that imply a type regardless of content
+NAME_TYPES = (
+    (re.compile(r'e-?mail'), 'email'),
+    (re.compile(r'(^|_)(url|website|link|homepage)($|_)'), 'url'),
+    (re.compile(r'phone|mobile|(^|_)tel($|_)'), 'phone'),
+    (re.compile(r'(^|_)(date|dob|birthday)($|_)|_(at|on|date)$'), 'date'),
+)
+KEY_PATTERN = re.compile(r'^(id|uuid|.*_id|.*_key)$')
+
+# Dates outside this window are treated as format errors (typos such as 2204 or 0023)
+MIN_PLAUSIBLE_DATE = pd.Timestamp('1900-01-01')
+
+DIMENSIONS = ('completeness', 'validity', 'uniqueness', 'consistency')
+
+# Case variants, so placeholder and boolean checks are hash lookups rather than per-value lowercasing
+PLACEHOLDER_VARIANTS = {variant for value in PLACEHOLDERS for variant in (value, value.upper(), value.title())}
+BOOLEAN_VARIANTS = {variant for value in BOOLEAN_VALUES for variant in (value, value.upper(), value.title())}
+
+def _strings(series: pd.Series) -> pd.Series:
+    """Non-null values as stripped strings"""
+    return series.astype(str).str.strip()
+
+def _is_native(series: pd.Series) -> bool:
+    """Numeric, boolean or datetime dtype (no text conversion needed)"""
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series) or \
+        pd.api.types.is_datetime64_any_dtype(series)
+
+def _hash_rows(frame: pd.DataFrame) -> np.ndarray:
+    """64-bit hash per row; falls back to string form for unhashable cells (lists, dicts)"""
+    try:
+        return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    except TypeError:
+        return pd.util.hash_pandas_object(frame.astype(str), index=False).to_numpy()
+
+class _ColumnAccumulator:
+    """Single-pass statistics for one column, merged chunk by chunk"""
+
+    # Smallest/largest values kept exactly per numeric column
+    EXTREMES = 100
+
+    def __init__(self, name: str, column_type: str, reservoir_size: int, rng: np.random.Generator):
+        self.name = name
+        self.type = column_type
+        self.rows = 0
+        self.nulls = 0
+        self.placeholders = 0
+        self.invalid = 0
+        self.untrimmed = 0
+        self.rule_violations = defaultdict(int)
+        self.invalid_examples: List[str] = []
+        # Numeric moments (Chan et al. parallel merge) and a reservoir sample for quantiles
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self._reservoir = np.empty(0)
+        self._lowest = np.empty(0)
+        self._highest = np.empty(0)
+        self._reservoir_size = reservoir_size
+        self._rng = rng
+
+    def update(self, column: pd.Series, date_format: Optional[str], rules: Dict[str, Any]) -> np.ndarray:
+        """
+        Fold a chunk into the statistics
+
+        Returns:
+            Boolean mask of cells that are present and valid (used for row scores)
+        """
+        self.rows += len(column)
+        null = column.isna().to_numpy()
+        present = ~null
+        self.nulls += int(null.sum())
+
+        # Text is only materialized for object/string columns; native numbers and dates are checked as they are
+        text = None
+        if not _is_native(column):
+            raw = column[present].astype(str)
+            text = raw.str.strip()
+            blank = text.isin(PLACEHOLDER_VARIANTS).to_numpy()
+            if self.type not in ('number', 'integer'):
+                self.untrimmed += int(((text != raw).to_numpy() & ~blank).sum())
+            self.placeholders += int(blank.sum())
+            present[np.flatnonzero(present)[blank]] = False
+            text = text[~blank]
+
+        valid = present.copy()
+        if present.any():
+            values = column[present]
+            checks = self._conforms(values, text, date_format)
+            if not checks.all() and len(self.invalid_examples) < 5:
+                shown = text if text is not None else values.astype(str)
+                self.invalid_examples.extend(shown[~checks].head(5 - len(self.invalid_examples)).tolist())
+
+            for rule, failed in self._rule_failures(values, text, rules):
+                self.rule_violations[rule] += int(failed.sum())
+                checks = checks & ~failed
+            valid[present] = checks
+            self.invalid += int((~checks).sum())
+
+            if self.type in ('number', 'integer'):
+                numbers = values.to_numpy(dtype=float) if text is None else \
+                    pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+                self._fold_numbers(numbers[~np.isnan(numbers)])
+
+        if rules.get('required'):
+            self.rule_violations['required'] += int((~present).sum())
+        return valid
+
+    @staticmethod
+    def _rule_failures(values: pd.Series, text: Optional[pd.Series], rules: Dict[str, Any]):
+        """Yield (rule, failed mask) for the explicit rules configured on this column"""
+        if not rules.keys() & {'allowed_values', 'range', 'pattern'}:
+            return
+        text = text if text is not None else values.astype(str)
+        if rules.get('allowed_values') is not None:
+            yield 'allowed_values', ~text.isin([str(v) for v in rules['allowed_values']]).to_numpy()
+        if rules.get('range') is not None:
+            numbers = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+            low, high = rules['range']
+            failed = np.zeros(len(numbers), dtype=bool)
+            with np.errstate(invalid='ignore'):
+                if low is not None:
+                    failed |= numbers < low
+                if high is not None:
+                    failed |= numbers > high
+            yield 'range', failed
+        if rules.get('pattern'):
+            yield 'pattern', ~text.str.fullmatch(rules['pattern']).fillna(False).to_numpy(dtype=bool)
+
+    def _conforms(self, values: pd.Series, text: Optional[pd.Series], date_format: Optional[str]) -> np.ndarray:
+        """Type/format check for present values (``text`` is None for native numeric/date columns)"""
+        if text is None:
+            if self.type == 'number' and pd.api.types.is_numeric_dtype(values):
+                return np.ones(len(values), dtype=bool)
+            if self.type == 'integer' and pd.api.types.is_numeric_dtype(values):
+                numbers = values.to_numpy(dtype=float)
+                return numbers == np.floor(numbers)
+            if self.type == 'date' and pd.api.types.is_datetime64_any_dtype(values):
+                return self._plausible(values)
+            if self.type == 'boolean' and pd.api.types.is_bool_dtype(values):
+                return np.ones(len(values), dtype=bool)
+            text = values.astype(str).str.strip()
+        # Exports repeat values heavily (statuses, countries, dates): check each distinct value once
+        codes, uniques = pd.factorize(text)
+        if len(uniques) < len(text):
+            return self._check_text(pd.Series(uniques, dtype=object), date_format)[codes]
+        return self._check_text(text, date_format)
+
+    def _check_text(self, text: pd.Series, date_format: Optional[str]) -> np.ndarray:
+        if self.type == 'number':
+            return pd.to_numeric(text, errors='coerce').notna().to_numpy()
+        if self.type == 'integer':
+            numbers = pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+            with np.errstate(invalid='ignore'):
+                return ~np.isnan(numbers) & (numbers == np.floor(numbers))
+        if self.type == 'boolean':
+            return text.isin(BOOLEAN_VARIANTS).to_numpy()
+        if self.type == 'date':
+            return self._plausible(pd.to_datetime(text, errors='coerce', format=date_format or 'mixed'))
+        if self.type == 'email':
+            return text.str.fullmatch(EMAIL_PATTERN).fillna(False).to_numpy(dtype=bool)
+        if self.type == 'url':
+            return text.str.fullmatch(URL_PATTERN).fillna(False).to_numpy(dtype=bool)
+        if self.type == 'phone':
+            return text.str.fullmatch(PHONE_PATTERN).fillna(False).to_numpy(dtype=bool)
+        return np.ones(len(text), dtype=bool)
+
+    @staticmethod
+    def _plausible(dates: pd.Series) -> np.ndarray:
+        latest = pd.Timestamp(datetime.utcnow() + timedelta(days=366))
+        if getattr(dates.dt, 'tz', None) is not None:
+            dates = dates.dt.tz_localize(None)
+        return (dates.notna() & (dates >= MIN_PLAUSIBLE_DATE) & (dates <= latest)).to_numpy()
+
+    def _fold_numbers(self, values: np.ndarray):
+        if not len(values):
+            return
+        count = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.n + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.n * count / total
+        self.min = float(values.min()) if self.min is None else min(self.min, float(values.min()))
+        self.max = float(values.max()) if self.max is None else max(self.max, float(values.max()))
+
+        # Exact extremes: rare outliers are counted exactly even when the sample misses them
+        k = self.EXTREMES
+        lowest = np.concatenate([self._lowest, values])
+        highest = np.concatenate([self._highest, values])
+        self._lowest = np.partition(lowest, k - 1)[:k] if len(lowest) > k else lowest
+        self._highest = np.partition(highest, len(highest) - k)[-k:] if len(highest) > k else highest
+
+        # Reservoir sampling (algorithm R), vectorized over the chunk
+        free = self._reservoir_size - len(self._reservoir)
+        if free > 0:
+            self._reservoir = np.concatenate([self._reservoir, values[:free]])
+        rest = values[max(free, 0):]
+        if len(rest) and self._reservoir_size:
+            seen_before = self.n + max(free, 0)
+            slots = self._rng.integers(0, seen_before + np.arange(1, len(rest) + 1))
+            keep = slots < self._reservoir_size
+            self._reservoir[slots[keep]] = rest[keep]
+        self.n = total
+
+    def scorecard(self, outlier_iqr: float) -> Dict[str, Any]:
+        present = self.rows - self.nulls - self.placeholders
+        completeness = present / self.rows if self.rows else 1.0
+        validity = (present - self.invalid) / present if present else 1.0
+        card = {
+            'type': self.type,
+            'rows': self.rows,
+            'nulls': self.nulls,
+            'placeholders': self.placeholders,
+            'invalid': self.invalid,
+            'completeness': round(completeness, 4),
+            'validity': round(validity, 4)
+        }
+        if self.untrimmed:
+            card['untrimmed'] = self.untrimmed
+        if self.rule_violations:
+            card['rule_violations'] = dict(self.rule_violations)
+        if self.invalid_examples:
+            card['invalid_examples'] = self.invalid_examples[:5]
+
+        parts = [completeness, validity]
+        if self.n:
+            std = (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+            card['numeric'] = {'mean': round(self.mean, 4), 'std': round(std, 4), 'min': self.min, 'max': self.max}
+            if len(self._reservoir) >= 8:
+                q1, q3 = np.percentile(self._reservoir, [25, 75])
+                low, high = q1 - outlier_iqr * (q3 - q1), q3 + outlier_iqr * (q3 - q1)
+                count = int(((self._reservoir < low) | (self._reservoir > high)).sum())
+                estimated = False
+                if self.n > len(self._reservoir):
+                    # Exact while fewer than EXTREMES values lie beyond each fence, scaled from the sample otherwise
+                    below, above = int((self._lowest < low).sum()), int((self._highest > high).sum())
+                    estimated = max(below, above) >= self.EXTREMES
+                    count = max(int(round(count / len(self._reservoir) * self.n)), below + above) if estimated \
+                        else below + above
+                rate = count / self.n
+                card['outliers'] = {
+                    'rate': round(rate, 6),
+                    'count': count,
+                    'bounds': [round(float(low), 4), round(float(high), 4)],
+                    'estimated': estimated
+                }
+                parts.append(1 - rate)
+        card['score'] = round(float(np.mean(parts)), 4)
+        return card
+
+class DataQualityService:
+    """Deterministic data quality scoring (the LLM only narrates the result)"""
+
+    def __init__(self, chunk_size: int = 50000, reservoir_size: int = 20000, outlier_iqr: float = 3.0,
+                 batch_size: int = 1000):
+        self.chunk_size = chunk_size
+        self.reservoir_size = reservoir_size
+        # Fence multiplier for outliers; 3.0 flags "far out" values only
+        self.outlier_iqr = outlier_iqr
+        self.batch_size = batch_size
+
+    def iter_chunks(self, dataset: Any) -> Iterator[pd.DataFrame]:
+        """
+        Yield DataFrame chunks from records, a dict of columns, a DataFrame or an iterable of DataFrames
+
+        Raises:
+            ValueError: if the dataset is not tabular
+        """
+        if isinstance(dataset, pd.DataFrame):
+            for start in range(0, len(dataset), self.chunk_size):
+                yield dataset.iloc[start:start + self.chunk_size]
+            return
+        if isinstance(dataset, dict):
+            for key in ('records', 'rows', 'data'):
+                if isinstance(dataset.get(key), list):
+                    yield from self.iter_chunks(dataset[key])
+                    return
+            if dataset and all(isinstance(v, list) for v in dataset.values()):
+                yield from self.iter_chunks(pd.DataFrame({k: pd.Series(v) for k, v in dataset.items()}))
+                return
+            dataset = [dataset]
+        if isinstance(dataset, list):
+            if not dataset or not all(isinstance(row, dict) for row in dataset):
+                raise ValueError('Expected a list of records, a dict of columns or {"records": [...]}')
+            for start in range(0, len(dataset), self.chunk_size):
+                yield pd.json_normalize(dataset[start:start + self.chunk_size], max_level=1)
+            return
+        if isinstance(dataset, Iterable) and not isinstance(dataset, (str, bytes)):
+            for chunk in dataset:
+                if not isinstance(chunk, pd.DataFrame):
+                    raise ValueError('Chunk iterables must yield DataFrames')
+                yield chunk
+            return
+        raise ValueError('Unsupported dataset type')
+
+    def infer_types(self, frame: pd.DataFrame, overrides: Dict[str, str] = None) -> Dict[str, str]:
+        """Expected type per column: explicit override, then column name, then content of the sample"""
+        overrides = overrides or {}
+        types = {}
+        for column in frame.columns:
+            name = str(column)
+            if overrides.get(name) in COLUMN_TYPES:
+                types[name] = overrides[name]
+                continue
+            lowered = name.lower()
+            by_name = next((kind for pattern, kind in NAME_TYPES if pattern.search(lowered)), None)
+            if by_name:
+                types[name] = by_name
+                continue
+            series = frame[column]
+            present = series[series.notna()].head(1000)
+            if pd.api.types.is_bool_dtype(series):
+                types[name] = 'boolean'
+            elif pd.api.types.is_integer_dtype(series):
+                types[name] = 'integer'
+            elif pd.api.types.is_numeric_dtype(series):
+                types[name] = 'number'
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                types[name] = 'date'
+            elif len(present) == 0 or present.map(lambda v: isinstance(v, (list, dict))).any():
+                types[name] = 'string'
+            else:
+                text = _strings(present)
+                text = text[~text.isin(PLACEHOLDER_VARIANTS)]
+                types[name] = self._infer_text_type(text)
+        return types
+
+    @staticmethod
+    def _infer_text_type(sample: pd.Series) -> str:
+        """Most specific type that at least 90% of the sampled values satisfy"""
+        if sample.empty:
+            return 'string'
+        numbers = pd.to_numeric(sample, errors='coerce')
+        if numbers.notna().mean() >= 0.9:
+            whole = numbers.dropna()
+            return 'integer' if (whole == np.floor(whole)).all() and not sample.str.contains(r'\.').any() else 'number'
+        if sample.str.lower().isin(BOOLEAN_VALUES).mean() >= 0.9 and sample.str.lower().nunique() <= 2:
+            return 'boolean'
+        if sample.str.fullmatch(EMAIL_PATTERN).mean() >= 0.9:
+            return 'email'
+        if sample.str.contains(r'[-/:]|\d{8}').mean() >= 0.9 and \
+                pd.to_datetime(sample, errors='coerce', format='mixed').notna().mean() >= 0.9:
+            return 'date'
+        if sample.str.fullmatch(r'https?://\S+').mean() >= 0.9:
+            return 'url'
+        return 'string'
+
+    @staticmethod
+    def _date_format(series: pd.Series) -> Optional[str]:
+        """Guess one strftime format from the first value, so chunks parse without per-value inference"""
+        from pandas.tseries.api import guess_datetime_format
+        first = _strings(series.dropna().head(100))
+        first = first[~first.isin(PLACEHOLDER_VARIANTS)]
+        return guess_datetime_format(first.iloc[0]) if len(first) else None
+
+    def validate_rules(self, rules: Any) -> Dict[str, Any]:
+        """
+        Check the shape of ``assess`` rules before any data is read
+
+        Returns:
+            The rules, or an empty dict for None
+
+        Raises:
+            ValueError: naming the first malformed rule
+        """
+        if rules is None:
+            return {}
+        if not isinstance(rules, dict):
+            raise ValueError('rules must be an object')
+        for name in ('types', 'allowed_values', 'ranges', 'patterns'):
+            if not isinstance(rules.get(name) or {}, dict):
+                raise ValueError(f'rules.{name} must be an object keyed by column')
+        for name in ('key_columns', 'required', 'references'):
+            if not isinstance(rules.get(name) or [], list):
+                raise ValueError(f'rules.{name} must be a list')
+        for column, values in (rules.get('allowed_values') or {}).items():
+            if not isinstance(values, list):
+                raise ValueError(f'rules.allowed_values.{column} must be a list')
+        for column, bounds in (rules.get('ranges') or {}).items():
+            if not (isinstance(bounds, list) and len(bounds) == 2 and all(
+                    bound is None or (isinstance(bound, (int, float)) and not isinstance(bound, bool))
+                    for bound in bounds)):
+                raise ValueError(f'rules.ranges.{column} must be [min, max] with numbers or null')
+        for column, pattern in (rules.get('patterns') or {}).items():
+            if not isinstance(pattern, str):
+                raise ValueError(f'rules.patterns.{column} must be a string')
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f'rules.patterns.{column} is not a valid regex: {e}')
+        for ref in rules.get('references') or []:
+            if not isinstance(ref, dict) or not isinstance(ref.get('column'), str):
+                raise ValueError('rules.references entries must be objects with a column')
+            if not isinstance(ref.get('values') or [], list):
+                raise ValueError(f"rules.references values for {ref['column']} must be a list")
+        return rules
+
+    @traced()
+    def assess(self, dataset: Any, rules: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Score a dataset in one pass over its chunks
+
+        Args:
+            dataset: Records, dict of columns, DataFrame or iterable of DataFrame chunks
+            rules: Optional checks:
+                types: {column: type} overrides (see COLUMN_TYPES)
+                key_columns: columns that must be unique together (default: id-like columns)
+                required: columns that must be present
+                allowed_values: {column: [values]}
+                ranges: {column: [min, max]} (either bound may be null)
+                patterns: {column: regex}
+                references: [{'column': c, 'in_column': other}] or [{'column': c, 'values': [...]}]
+
+        Returns:
+            Dictionary with dataset-level dimension scores, the per-column scorecard and issues
+        """
+        try:
+            rules = self.validate_rules(rules)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        try:
+            chunks = self.iter_chunks(dataset)
+            first = next(chunks, None)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        if first is None or first.empty:
+            return {'success': False, 'error': 'Dataset is empty'}
+
+        types = self.infer_types(first, rules.get('types'))
+        date_formats = {name: self._date_format(first[name]) for name, kind in types.items() if kind == 'date'}
+        keys = [k for k in rules.get('key_columns') or self._detect_key(first, types) if k in types]
+        column_rules = self._column_rules(rules)
+        references = rules.get('references') or []
+
+        rng = np.random.default_rng(0)
+        columns = {name: _ColumnAccumulator(name, kind, self.reservoir_size, rng) for name, kind in types.items()}
+        row_hashes, key_hashes = [], []
+        ref_values = [[] for _ in references]
+        ref_targets = [[] for _ in references]
+        rows = 0
+        chunk_count = 0
+        unexpected = set()
+
+        for chunk in self._chain(first, chunks):
+            chunk_count += 1
+            rows += len(chunk)
+            chunk.columns = [str(c) for c in chunk.columns]
+            unexpected.update(c for c in chunk.columns if c not in columns)
+            for name, accumulator in columns.items():
+                column = chunk[name] if name in chunk.columns else pd.Series([None] * len(chunk), index=chunk.index)
+                accumulator.update(column, date_formats.get(name), column_rules.get(name, {}))
+
+            row_hashes.append(_hash_rows(chunk.reindex(columns=list(columns))))
+            if keys:
+                key_frame = chunk.reindex(columns=keys)
+                key_hashes.append(_hash_rows(key_frame[key_frame.notna().all(axis=1)]))
+            for i, ref in enumerate(references):
+                if ref['column'] not in chunk.columns:
+                    continue
+                values = chunk[ref['column']].dropna().astype(str).str.strip()
+                ref_values[i].append(pd.util.hash_pandas_object(values, index=False).to_numpy())
+                if ref.get('in_column') in chunk.columns:
+                    targets = chunk[ref['in_column']].dropna().astype(str).str.strip()
+                    ref_targets[i].append(pd.util.hash_pandas_object(targets, index=False).to_numpy())
+
+        scorecard = {name: accumulator.scorecard(self.outlier_iqr) for name, accumulator in columns.items()}
+
+        all_rows = np.concatenate(row_hashes) if row_hashes else np.empty(0, dtype=np.uint64)
+        duplicate_rows = int(len(all_rows) - len(np.unique(all_rows)))
+        duplicates = {'rows': duplicate_rows, 'row_rate': round(duplicate_rows / rows, 4) if rows else 0.0}
+        uniqueness = [1 - duplicates['row_rate']]
+        if keys:
+            all_keys = np.concatenate(key_hashes) if key_hashes else np.empty(0, dtype=np.uint64)
+            duplicate_keys = int(len(all_keys) - len(np.unique(all_keys)))
+            duplicates.update({'key_columns': keys, 'keys': duplicate_keys,
+                               'key_rate': round(duplicate_keys / len(all_keys), 4) if len(all_keys) else 0.0})
+            uniqueness.append(1 - duplicates['key_rate'])
+
+        referential = []
+        for i, ref in enumerate(references):
+            values = np.concatenate(ref_values[i]) if ref_values[i] else np.empty(0, dtype=np.uint64)
+            if ref.get('in_column'):
+                targets = np.concatenate(ref_targets[i]) if ref_targets[i] else np.empty(0, dtype=np.uint64)
+            else:
+                allowed = pd.Series([str(v).strip() for v in ref.get('values') or []], dtype=object)
+                targets = pd.util.hash_pandas_object(allowed, index=False).to_numpy()
+            orphans = int((~np.isin(values, targets)).sum()) if len(values) else 0
+            referential.append({
+                'column': ref['column'],
+                'references': ref.get('in_column') or f"{len(ref.get('values') or [])} allowed values",
+                'checked': int(len(values)),
+                'orphans': orphans,
+                'pass_rate': round(1 - orphans / len(values), 4) if len(values) else 1.0
+            })
+
+        consistency = [r['pass_rate'] for r in referential]
+        for name, card in scorecard.items():
+            if card.get('untrimmed') and card['rows']:
+                consistency.append(1 - card['untrimmed'] / card['rows'])
+        dimensions = {
+            'completeness': round(float(np.mean([c['completeness'] for c in scorecard.values()])), 4),
+            'validity': round(float(np.mean([c['validity'] for c in scorecard.values()])), 4),
+            'uniqueness': round(float(np.mean(uniqueness)), 4),
+            'consistency': round(float(np.mean(consistency)), 4) if consistency else 1.0
+        }
+        outliers = [c['outliers']['rate'] for c in scorecard.values() if 'outliers' in c]
+        result = {
+            'success': True,
+            'rows': rows,
+            'columns': len(scorecard),
+            'chunks': chunk_count,
+            'overall_score': round(float(np.mean(list(dimensions.values()))), 4),
+            'dimensions': dimensions,
+            'duplicates': duplicates,
+            'referential': referential,
+            'scorecard': scorecard,
+            'issues': self._issues(scorecard, duplicates, referential)
+        }
+        if outliers:
+            result['outlier_rate'] = round(float(np.mean(outliers)), 4)
+        if unexpected:
+            result['unexpected_columns'] = sorted(unexpected)[:20]
+        return result
+
+    @staticmethod
+    def _detect_key(frame: pd.DataFrame, types: Dict[str, str]) -> List[str]:
+        """An id-like column that is (nearly) unique in the first chunk ('id' preferred), or none"""
+        candidates = sorted((c for c in types if KEY_PATTERN.match(c.lower())), key=lambda c: c.lower() != 'id')
+        for column in candidates:
+            values = frame[column].dropna()
+            if len(values) and values.nunique() >= 0.99 * len(values):
+                return [column]
+        return []
+
+    @staticmethod
+    def _chain(first: pd.DataFrame, rest: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        yield first
+        yield from rest
+
+    @staticmethod
+    def _column_rules(rules: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Regroup per-rule dicts into per-column rule dicts"""
+        per_column = defaultdict(dict)
+        for column in rules.get('required') or []:
+            per_column[str(column)]['required'] = True
+        for column, values in (rules.get('allowed_values') or {}).items():
+            per_column[str(column)]['allowed_values'] = values
+        for column, bounds in (rules.get('ranges') or {}).items():
+            per_column[str(column)]['range'] = bounds
+        for column, pattern in (rules.get('patterns') or {}).items():
+            per_column[str(column)]['pattern'] = pattern
+        return per_column
+
+    @staticmethod
+    def _issues(scorecard: Dict[str, Dict[str, Any]], duplicates: Dict[str, Any],
+                referential: List[Dict[str, Any]], limit: int = 15) -> List[Dict[str, Any]]:
+        """The most significant problems, worst first"""
+        issues = []
+        for name, card in scorecard.items():
+            missing = card['nulls'] + card['placeholders']
+            if missing:
+                issues.append({'column': name, 'issue': 'missing', 'count': missing, 'rate': round(1 - card['completeness'], 4)})
+            if card['invalid']:
+                issues.append({'column': name, 'issue': f"invalid {card['type']}", 'count': card['invalid'],
+                               'rate': round(1 - card['validity'], 4), 'examples': card.get('invalid_examples', [])[:3]})
+            if card.get('outliers', {}).get('count'):
+                issues.append({'column': name, 'issue': 'outliers', 'count': card['outliers']['count'],
+                               'rate': card['outliers']['rate']})
+            if card.get('untrimmed'):
+                issues.append({'column': name, 'issue': 'leading/trailing whitespace', 'count': card['untrimmed'],
+                               'rate': round(card['untrimmed'] / card['rows'], 4)})
+        if duplicates['rows']:
+            issues.append({'issue': 'duplicate rows', 'count': duplicates['rows'], 'rate': duplicates['row_rate']})
+        if duplicates.get('keys'):
+            issues.append({'column': ','.join(duplicates['key_columns']), 'issue': 'duplicate keys',
+                           'count': duplicates['keys'], 'rate': duplicates['key_rate']})
+        for ref in referential:
+            if ref['orphans']:
+                issues.append({'column': ref['column'], 'issue': f"orphaned references to {ref['references']}",
+                               'count': ref['orphans'], 'rate': round(1 - ref['pass_rate'], 4)})
+        issues.sort(key=lambda issue: -issue['rate'])
+        return issues[:limit]
+
+    def digest(self, assessment: Dict[str, Any], max_columns: int = 15) -> Dict[str, Any]:
+        """Compact view of an assessment for a prompt: totals, dimensions, issues and the worst columns"""
+        worst = sorted(assessment['scorecard'].items(), key=lambda item: item[1]['score'])[:max_columns]
+        return {
+            'rows': assessment['rows'],
+            'columns': assessment['columns'],
+            'overall_score': assessment['overall_score'],
+            'dimensions': assessment['dimensions'],
+            'duplicates': assessment['duplicates'],
+            'referential': assessment['referential'],
+            'issues': assessment['issues'],
+            'lowest_scoring_columns': {
+                name: {key: card[key] for key in ('type', 'score', 'completeness', 'validity') if key in card}
+                for name, card in worst
+            }
+        }
+
+    def row_scores(self, frame: pd.DataFrame, types: Dict[str, str] = None) -> np.ndarray:
+        """
+        Score each row 0-1: the share of its expected fields that are present and valid
+
+        Args:
+            frame: Rows to score
+            types: Expected column types (inferred from ``frame`` when omitted)
+
+        Returns:
+            Array of scores aligned with ``frame``
+        """
+        if frame.empty:
+            return np.zeros(0)
+        types = types or self.infer_types(frame)
+        rng = np.random.default_rng(0)
+        valid = np.zeros((len(frame), len(types)), dtype=bool)
+        for i, (name, kind) in enumerate(types.items()):
+            column = frame[name] if name in frame.columns else pd.Series([None] * len(frame), index=frame.index)
+            date_format = self._date_format(column) if kind == 'date' else None
+            valid[:, i] = _ColumnAccumulator(name, kind, 0, rng).update(column, date_format, {})
+        return valid.mean(axis=1) if len(types) else np.zeros(len(frame))
+
+    @traced()
+    def score_business_data(self, data_type: Optional[str] = None, only_unscored: bool = False,
+                            ids: List[int] = None) -> Dict[str, Any]:
+        """
+        Recompute BusinessData.quality_score in bulk
+
+        Rows are read in keyset-paginated batches and scored per data_type
+        (expected fields and types come from the first batch of each type).
+        Exact duplicates of an earlier row of the same type score half.
+
+        Args:
+            data_type: Only score this data_type
+            only_unscored: Only score rows whose quality_score is 0 or null
+            ids: Only score these ids
+
+        Returns:
+            Dictionary with success status and counts
+        """
+        stats = {'success': True, 'scored': 0, 'batches': 0, 'duplicates': 0, 'by_type': {}}
+        types_by_data_type: Dict[str, Dict[str, str]] = {}
+        seen_by_data_type: Dict[str, set] = defaultdict(set)
+        last_id = 0
+
+        try:
+            while True:
+                query = select(BusinessData.id, BusinessData.data_type, BusinessData.data_content) \
+                    .where(BusinessData.id > last_id).order_by(BusinessData.id).limit(self.batch_size)
+                if data_type:
+                    query = query.where(BusinessData.data_type == data_type)
+                if only_unscored:
+                    query = query.where((BusinessData.quality_score == 0) | (BusinessData.quality_score.is_(None)))
+                if ids:
+                    query = query.where(BusinessData.id.in_(ids))
+                batch = db.session.execute(query).all()
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                updates = []
+                grouped = defaultdict(list)
+                for row in batch:
+                    grouped[row.data_type].append(row)
+                for kind, rows in grouped.items():
+                    records = [self._record(row.data_content) for row in rows]
+                    frame = pd.json_normalize(records, max_level=1)
+                    frame.columns = [str(c) for c in frame.columns]
+                    if kind not in types_by_data_type:
+                        types_by_data_type[kind] = self.infer_types(frame)
+                    scores = self.row_scores(frame, types_by_data_type[kind])
+
+                    hashes = _hash_rows(frame)
+                    seen = seen_by_data_type[kind]
+                    for row, score, row_hash in zip(rows, scores, hashes):
+                        if row_hash in seen:
+                            score *= 0.5
+                            stats['duplicates'] += 1
+                        seen.add(row_hash)
+                        updates.append({'id': row.id, 'quality_score': round(float(score), 4)})
+                    by_type = stats['by_type'].setdefault(kind, {'scored': 0, 'mean_score': 0.0})
+                    by_type['mean_score'] = (by_type['mean_score'] * by_type['scored'] + float(scores.sum())) / \
+                        (by_type['scored'] + len(scores))
+                    by_type['scored'] += len(scores)
+
+                # Bulk UPDATE by primary key (one executemany per batch)
+                db.session.execute(update(BusinessData), updates)
+                db.session.commit()
+                stats['scored'] += len(updates)
+                stats['batches'] += 1
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Bulk quality scoring failed after {stats['scored']} rows: {str(e)}")
+            return {**stats, 'success': False, 'error': str(e)}
+
+        for by_type in stats['by_type'].values():
+            by_type['mean_score'] = round(by_type['mean_score'], 4)
+        return stats
+
+    @staticmethod
+    def _record(content: Optional[str]) -> Dict[str, Any]:
+        """Parse a BusinessData payload into one flat-ish record"""
+        try:
+            value = json.loads(content) if content else {}
+        except (TypeError, ValueError):
+            return {'value': content}
+        return value if isinstance(value, dict) else {'value': value}
+
+# Global data quality service instance
+data_quality_service = DataQualityService(
+    chunk_size=int(os.getenv('DATA_QUALITY_CHUNK_ROWS', '50000')),
+    outlier_iqr=float(os.getenv('DATA_QUALITY_OUTLIER_IQR', '3.0'))
+)
@@ -0,0 +1,752 @@
+"""
+Dedup Service for Agent CEO system
+Finds near-duplicate BusinessData records with MinHash signatures and LSH banding, marking or
+merging them as records are committed and in batch runs over the whole table
+"""
+
+import atexit
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.orm import Session
+
+from src.models.agent import BusinessData, BusinessDataDuplicate
+from src.models.user import db
+from src.services.append_log import AppendLog
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 31) - 1  # keeps a * x below 2**62 for 31-bit a and x
+SHINGLE_BASE = np.uint64(1099511628211)
+BAND_PRIME = np.uint64(0x100000001b3)
+NON_WORD = re.compile(r'[^a-z0-9@.]+')
+
+# Fields that differ between copies of the same scraped record
+DEFAULT_IGNORE_FIELDS = 'id,scraped_at,fetched_at,timestamp,created_at,updated_at,execution_id'
+
+def shingle_text(data_content: Optional[str], ignore_fields: Sequence[str] = (), max_chars: int = 4000) -> str:
+    """
+    Normalized text compared for a BusinessData row
+
+    Only values are kept (every record of a type shares its keys), ordered by
+    key path so field order does not matter, lowercased and with punctuation
+    collapsed.
+    """
+    try:
+        content = json.loads(data_content) if data_content else {}
+    except ValueError:
+        content = data_content
+    ignored = {field.lower() for field in ignore_fields}
+    values: List[Tuple[str, str]] = []
+    stack: List[Tuple[str, Any]] = [('', content)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend((f'{path}.{key}', item) for key, item in value.items() if str(key).lower() not in ignored)
+        elif isinstance(value, list):
+            stack.extend((f'{path}[{index}]', item) for index, item in enumerate(value))
+        elif value not in (None, ''):
+            values.append((path, str(value)))
+    text = ' '.join(value for _, value in sorted(values))
+    return NON_WORD.sub(' ', text.lower()).strip()[:max_chars]
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows per band) for a similarity threshold
+
+    Picks the steepest banding whose candidate threshold (1/b)^(1/r) sits about
+    10% below the similarity threshold, favouring recall: candidates are
+    verified against the full signatures anyway.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1.0 / bands) ** (1.0 / rows) <= 0.9 * threshold:
+            best = (bands, rows)
+    return best
+
+def not_duplicate():
+    """Filter clause excluding BusinessData rows marked as near-duplicates"""
+    return BusinessData.id.not_in(select(BusinessDataDuplicate.data_id))
+
+class MinHashLSH:
+    """
+    Array-backed MinHash signatures with an LSH band index
+
+    Signatures are ``uint32`` rows of one array (512 bytes per record at
+    128 permutations). Band keys, which also encode the record's data type,
+    live in one sorted ``uint64`` array searched with ``searchsorted``, plus
+    a small dict of recent inserts folded in once it grows, so a lookup
+    costs O(bands * log n). Removed records are tombstoned until ``compact``.
+    IDs added or removed since the last ``take_changes`` are tracked for the
+    signature log.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, rows: int = 8, shingle_size: int = 5,
+                 seed: int = 1, merge_size: int = 65536):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.merge_size = merge_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._band_seeds = rng.integers(1, np.iinfo(np.int64).max, size=bands, dtype=np.uint64)
+
+        self.size = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.types = np.zeros(0, dtype=np.int16)
+        self.alive = np.zeros(0, dtype=bool)
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self.type_names: List[str] = []
+        self._rows: Dict[int, int] = {}
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._key_rows = np.zeros(0, dtype=np.int64)
+        self._delta: Dict[int, List[int]] = {}
+        self.changed: set = set()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def tombstones(self) -> int:
+        return self.size - len(self._rows)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.ids.nbytes + self.types.nbytes + self.alive.nbytes + self.signatures.nbytes
+                + self._keys.nbytes + self._key_rows.nbytes)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash of a text's character shingles; None for empty text"""
+        data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+        if len(data) == 0:
+            return None
+        width = min(self.shingle_size, len(data))
+        count = len(data) - width + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(width):
+            hashes = hashes * SHINGLE_BASE + data[offset:offset + count]
+        shingles = np.unique(hashes % np.uint64(MERSENNE_PRIME))
+        permuted = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def row(self, record_id: int) -> Optional[int]:
+        return self._rows.get(record_id)
+
+    def _type_code(self, data_type: str) -> int:
+        if data_type not in self.type_names:
+            self.type_names.append(data_type)
+        return self.type_names.index(data_type)
+
+    def band_keys(self, signatures: np.ndarray, type_codes: np.ndarray) -> np.ndarray:
+        """(n, bands) uint64 bucket keys; records of different types never share a bucket"""
+        bands = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = self._band_seeds[None, :] ^ (type_codes.astype(np.uint64)[:, None] + np.uint64(1)) * BAND_PRIME
+        for column in range(self.rows):
+            keys = (keys ^ bands[:, :, column]) * BAND_PRIME
+        return keys
+
+    def candidates(self, signature: np.ndarray, data_type: str) -> np.ndarray:
+        """Rows of live records sharing at least one band bucket with a signature"""
+        if data_type not in self.type_names or self.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        keys = self.band_keys(signature[None, :], np.asarray([self.type_names.index(data_type)]))[0]
+        found = []
+        if len(self._keys):
+            starts = np.searchsorted(self._keys, keys, side='left')
+            ends = np.searchsorted(self._keys, keys, side='right')
+            found.extend(self._key_rows[start:end] for start, end in zip(starts, ends) if end > start)
+        for key in keys.tolist():
+            rows = self._delta.get(key)
+            if rows:
+                found.append(np.asarray(rows, dtype=np.int64))
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.unique(np.concatenate(found))
+        return rows[self.alive[rows]]
+
+    def similarity(self, signature: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity: the share of matching signature positions"""
+        return (self.signatures[rows] == signature[None, :]).mean(axis=1)
+
+    def _reserve(self, extra: int):
+        capacity = len(self.ids)
+        if self.size + extra <= capacity:
+            return
+        capacity = max(self.size + extra, capacity * 2, 1024)
+        for name in ('ids', 'types', 'alive'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+        signatures = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+        signatures[:self.size] = self.signatures[:self.size]
+        self.signatures = signatures
+
+    def add(self, record_id: int, data_type: str, signature: np.ndarray):
+        """Insert a record (replacing any previous signature for it)"""
+        self.remove(record_id)
+        self._reserve(1)
+        row = self.size
+        self.size += 1
+        code = self._type_code(data_type)
+        self.ids[row] = record_id
+        self.types[row] = code
+        self.alive[row] = True
+        self.signatures[row] = signature
+        self._rows[record_id] = row
+        self.changed.add(int(record_id))
+        for key in self.band_keys(signature[None, :], np.asarray([code]))[0].tolist():
+            self._delta.setdefault(key, []).append(row)
+        if len(self._delta) >= self.merge_size:
+            self._merge_delta()
+
+    def remove(self, record_id: int) -> bool:
+        """Tombstone a record"""
+        row = self._rows.pop(record_id, None)
+        if row is None:
+            return False
+        self.alive[row] = False
+        self.changed.add(int(record_id))
+        return True
+
+    def _merge_delta(self):
+        """Fold recent inserts into the sorted key array"""
+        if not self._delta:
+            return
+        keys = np.fromiter((key for key, rows in self._delta.items() for _ in rows), dtype=np.uint64)
+        rows = np.fromiter((row for bucket in self._delta.values() for row in bucket), dtype=np.int64)
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], rows[order]
+        positions = np.searchsorted(self._keys, keys, side='right')
+        self._keys = np.insert(self._keys, positions, keys)
+        self._key_rows = np.insert(self._key_rows, positions, rows)
+        self._delta = {}
+
+    def _build_bands(self):
+        """Rebuild the band index from the live rows"""
+        rows = np.flatnonzero(self.alive[:self.size])
+        keys = self.band_keys(self.signatures[rows], self.types[rows]).ravel()
+        key_rows = np.repeat(rows, self.bands)
+        order = np.argsort(keys, kind='stable')
+        self._keys, self._key_rows = keys[order], key_rows[order]
+        self._delta = {}
+
+    def compact(self):
+        """Drop tombstoned rows and rebuild the band index"""
+        live = np.flatnonzero(self.alive[:self.size])
+        self.ids = self.ids[live]
+        self.types = self.types[live]
+        self.signatures = self.signatures[live]
+        self.alive = np.ones(len(live), dtype=bool)
+        self.size = len(live)
+        self._rows = {int(record_id): row for row, record_id in enumerate(self.ids)}
+        self._build_bands()
+
+    def take_changes(self) -> Dict[str, np.ndarray]:
+        """Records added and IDs removed since the last call"""
+        changed, self.changed = sorted(self.changed), set()
+        rows = np.asarray([self._rows[record_id] for record_id in changed if record_id in self._rows], dtype=np.int64)
+        return {
+            'ids': self.ids[rows], 'types': self.types[rows], 'signatures': self.signatures[rows],
+            'type_names': np.asarray(self.type_names, dtype=str),
+            'removed': np.asarray([record_id for record_id in changed if record_id not in self._rows], dtype=np.int64)
+        }
+
+    def apply_changes(self, changes: Dict[str, np.ndarray]):
+        """Replay changes taken from another process's store"""
+        type_names = [str(name) for name in changes['type_names']]
+        removed = changes['removed'].tolist()
+        ids = changes['ids'].tolist()
+        for record_id in removed:
+            self.remove(record_id)
+        for record_id, code, signature in zip(ids, changes['types'].tolist(), changes['signatures']):
+            self.add(record_id, type_names[code], signature)
+        # Already persisted by the process that made them
+        self.changed.difference_update(removed + ids)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        live = np.flatnonzero(self.alive[:self.size])
+        return {
+            'ids': self.ids[live], 'types': self.types[live], 'signatures': self.signatures[live],
+            'type_names': np.asarray(self.type_names, dtype=str)
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        """Replace the contents with stored arrays (band keys are recomputed, not stored)"""
+        self.ids = arrays['ids'].astype(np.int64)
+        self.types = arrays['types'].astype(np.int16)
+        self.signatures = arrays['signatures'].astype(np.uint32)
+        self.type_names = [str(name) for name in arrays['type_names']]
+        self.size = len(self.ids)
+        self.alive = np.ones(self.size, dtype=bool)
+        self._rows = {int(record_id): row for row, record_id in enumerate(self.ids)}
+        self.changed = set()
+        self._build_bands()
+
+class DedupService:
+    """
+    Near-duplicate detection for BusinessData
+
+    Each record is reduced to a MinHash signature of its normalized content
+    and looked up in the LSH band index against earlier records of the same
+    data type. A candidate whose estimated similarity reaches the threshold
+    makes the record a duplicate of that candidate's canonical (earliest)
+    record: ``mark`` mode records it in ``business_data_duplicate``, and
+    retrieval and analysis skip it; ``merge`` mode fills the canonical
+    record's missing fields from it and deletes it.
+
+    Commits that insert or change BusinessData queue their row IDs for a
+    background sync, and ``sync()`` catches up with (or, with ``rebuild``,
+    re-runs over) the whole table. Signatures persist like the embedding
+    index: a snapshot file plus a log of each sync's changes, shared by the
+    workers under a file lock.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5,
+                 mode: str = 'mark', ignore_fields: Sequence[str] = (), max_chars: int = 4000,
+                 batch_size: int = 500, sync_delay: float = 1.0, enabled: bool = True,
+                 min_compact_bytes: int = 1 << 20):
+        if mode not in ('mark', 'merge'):
+            raise ValueError(f"Invalid dedup mode: {mode}")
+        self.path = path
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.mode = mode
+        self.ignore_fields = list(ignore_fields)
+        self.max_chars = max_chars
+        self.batch_size = batch_size
+        self.sync_delay = sync_delay
+        self.enabled = enabled
+        self.min_compact_bytes = min_compact_bytes
+        self.bands, self.rows_per_band = lsh_bands(num_perm, threshold)
+        self.app = None
+
+        self._store = self._new_store()
+        self._meta: Dict[str, Any] = self._new_meta()
+        self._log = AppendLog(f'{path}.log')
+        self._loaded_mtime = None  # of the snapshot
+        self._snapshot_bytes = 0
+        self._generation = None  # snapshot generation whose log we replay; None to skip the log
+        self._log_offset = None
+        self._needs_snapshot = False
+        self._lock = threading.Lock()  # one sync at a time in this process
+        self._pending: set = set()
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {'checked': 0, 'unchanged': 0, 'marked': 0, 'merged': 0, 'removed': 0,
+                       'syncs': 0, 'failed_syncs': 0}
+
+    def init_app(self, app):
+        """Bind the Flask app, start the sync thread and catch up with rows added while stopped"""
+        if not self.enabled:
+            return
+        self.app = app
+        self._ensure_started()
+        self.request_sync()
+        atexit.register(self.shutdown)
+
+    def _new_store(self) -> MinHashLSH:
+        return MinHashLSH(num_perm=self.num_perm, bands=self.bands, rows=self.rows_per_band,
+                          shingle_size=self.shingle_size)
+
+    def _new_meta(self) -> Dict[str, Any]:
+        return {'fingerprint': self._store_fingerprint(), 'last_id': 0, 'synced_at': None}
+
+    def _store_fingerprint(self) -> str:
+        """Settings a stored signature depends on"""
+        return f"minhash:{self.num_perm}:{self.shingle_size}:{self.max_chars}:{','.join(sorted(self.ignore_fields))}"
+
+    def request_sync(self, ids: Optional[Sequence[int]] = None):
+        """Queue a background sync (of specific row IDs, or a catch-up when None)"""
+        if not self.enabled:
+            return
+        self._ensure_started()
+        with self._pending_lock:
+            if ids is None:
+                self._pending.add(None)
+            else:
+                self._pending.update(ids)
+        self._wakeup.set()
+
+    def sync(self, ids: Optional[Sequence[int]] = None, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Check records for near-duplicates (requires an app context)
+
+        Args:
+            ids: Only these rows (inserted, changed or deleted); None catches up
+                with every row added or updated since the last sync
+            rebuild: Forget all signatures and ``marked`` duplicates and check
+                every row again, in ID order
+
+        Returns:
+            Dictionary with counts of checked, unchanged, marked, merged and removed rows
+        """
+        with self._lock, self._file_lock():
+            self._load()
+            counts = {'checked': 0, 'unchanged': 0, 'marked': 0, 'merged': 0, 'removed': 0}
+            db.session.info['dedup_running'] = True
+            try:
+                if rebuild:
+                    self._store, self._meta = self._new_store(), self._new_meta()
+                    self._needs_snapshot = True
+                    BusinessDataDuplicate.query.filter_by(action='marked').delete()
+                    db.session.commit()
+
+                if ids is not None:
+                    ids = sorted(set(ids))
+                    rows = db.session.execute(self._columns().where(BusinessData.id.in_(ids))).all()
+                    gone = sorted(set(ids) - {row.id for row in rows})
+                    recheck = self._forget(gone, counts)
+                    self._check(rows, counts, recheck)
+                    db.session.commit()
+                else:
+                    for rows in self._changed_batches():
+                        self._check(rows, counts)
+                        db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.info.pop('dedup_running', None)
+
+            if any(counts[key] for key in ('checked', 'removed')) or rebuild:
+                self._save()
+            for key, value in counts.items():
+                self._stats[key] += value
+            self._stats['syncs'] += 1
+            return {'success': True, **counts, 'records': len(self._store)}
+
+    def _columns(self):
+        return select(BusinessData.id, BusinessData.data_type, BusinessData.data_content, BusinessData.updated_at)
+
+    def _changed_batches(self) -> Iterator[list]:
+        """Rows past the last checked ID, then rows updated since the last sync, in ID order"""
+        synced_at = self._meta.get('synced_at')
+        condition = BusinessData.id > self._meta.get('last_id', 0)
+        if synced_at is not None:
+            condition = or_(condition, BusinessData.updated_at >= datetime.fromisoformat(synced_at))
+        last_id = 0
+        while True:
+            rows = db.session.execute(self._columns().where(condition, BusinessData.id > last_id)
+                                      .order_by(BusinessData.id).limit(self.batch_size)).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+
+    def _forget(self, ids: Sequence[int], counts: Dict[str, int]) -> List[int]:
+        """Drop deleted rows; returns the duplicates of deleted rows, which need checking again"""
+        if not ids:
+            return []
+        for record_id in ids:
+            if self._store.remove(record_id):
+                counts['removed'] += 1
+        BusinessDataDuplicate.query.filter(BusinessDataDuplicate.data_id.in_(ids),
+                                           BusinessDataDuplicate.action == 'marked').delete()
+        return self._release_dependents(ids)
+
+    def _release_dependents(self, canonical_ids: Sequence[int]) -> List[int]:
+        """Unmark the records marked as duplicates of these, returning their IDs"""
+        dependents = [data_id for (data_id,) in db.session.query(BusinessDataDuplicate.data_id).filter(
+            BusinessDataDuplicate.canonical_id.in_(canonical_ids), BusinessDataDuplicate.action == 'marked')]
+        if dependents:
+            BusinessDataDuplicate.query.filter(BusinessDataDuplicate.data_id.in_(dependents)).delete()
+        return dependents
+
+    def _check(self, rows: list, counts: Dict[str, int], recheck: Sequence[int] = ()):
+        """Check rows in ID order against the records before them"""
+        force = set(recheck)
+        queue = list(rows)
+        if force:
+            queue += db.session.execute(self._columns().where(BusinessData.id.in_(sorted(force)))).all()
+        queue = deque(sorted(queue, key=lambda row: row.id))
+        canonical_of: Dict[int, int] = {}  # marks made in this batch
+        seen = set()
+        while queue:
+            row = queue.popleft()
+            if row.id in seen:
+                continue
+            seen.add(row.id)
+            released = self._check_row(row, counts, canonical_of, force=row.id in force)
+            if released:
+                # The record changed: its duplicates are checked again after it
+                force.update(released)
+                queue.extend(db.session.execute(self._columns().where(BusinessData.id.in_(released))).all())
+                seen.difference_update(released)
+        if rows:
+            self._meta['last_id'] = max(self._meta.get('last_id', 0), max(row.id for row in rows))
+            updated = [row.updated_at for row in rows if row.updated_at is not None]
+            if updated:
+                latest = max(updated).isoformat()
+                self._meta['synced_at'] = max(self._meta.get('synced_at') or latest, latest)
+
+    def _check_row(self, row, counts: Dict[str, int], canonical_of: Dict[int, int], force: bool = False) -> List[int]:
+        signature = self._store.signature(shingle_text(row.data_content, self.ignore_fields, self.max_chars))
+        existing = self._store.row(row.id)
+        released: List[int] = []
+        if existing is not None:
+            if not force and signature is not None and np.array_equal(self._store.signatures[existing], signature):
+                counts['unchanged'] += 1
+                return released
+            self._store.remove(row.id)
+            BusinessDataDuplicate.query.filter_by(data_id=row.id, action='marked').delete()
+            if not force:
+                released = self._release_dependents([row.id])
+        counts['checked'] += 1
+        if signature is None:
+            return released
+
+        match, similarity = self._best_match(row, signature)
+        if match is None:
+            self._store.add(row.id, row.data_type, signature)
+            return released
+
+        canonical_id = self._canonical(match, canonical_of)
+        if self.mode == 'merge' and self._merge(row.id, canonical_id, similarity):
+            counts['merged'] += 1
+            return released
+        self._store.add(row.id, row.data_type, signature)
+        db.session.merge(BusinessDataDuplicate(data_id=row.id, canonical_id=canonical_id,
+                                               similarity=round(similarity, 4), action='marked',
+                                               detected_at=datetime.utcnow()))
+        canonical_of[row.id] = canonical_id
+        counts['marked'] += 1
+        return released
+
+    def _best_match(self, row, signature: np.ndarray) -> Tuple[Optional[int], float]:
+        """The most similar earlier record at or above the threshold"""
+        rows = self._store.candidates(signature, row.data_type)
+        rows = rows[self._store.ids[rows] < row.id]
+        if len(rows) == 0:
+            return None, 0.0
+        similarities = self._store.similarity(signature, rows)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None, 0.0
+        return int(self._store.ids[rows[best]]), float(similarities[best])
+
+    def _canonical(self, record_id: int, canonical_of: Dict[int, int]) -> int:
+        if record_id in canonical_of:
+            return canonical_of[record_id]
+        mark = db.session.get(BusinessDataDuplicate, record_id)
+        return mark.canonical_id if mark is not None and mark.action == 'marked' else record_id
+
+    def _merge(self, record_id: int, canonical_id: int, similarity: float) -> bool:
+        """Fold a duplicate into its canonical record and delete it"""
+        duplicate = db.session.get(BusinessData, record_id)
+        canonical = db.session.get(BusinessData, canonical_id)
+        if duplicate is None or canonical is None:
+            return False
+        content = canonical.get_data_content()
+        if isinstance(content, dict):
+            merged = _fill_missing(dict(content), duplicate.get_data_content())
+            if merged != content:
+                canonical.set_data_content(merged)
+                # The canonical record's text changed: refresh its signature
+                signature = self._store.signature(shingle_text(canonical.data_content, self.ignore_fields,
+                                                               self.max_chars))
+                if signature is not None:
+                    self._store.add(canonical.id, canonical.data_type, signature)
+        canonical.quality_score = max(canonical.quality_score or 0.0, duplicate.quality_score or 0.0)
+        db.session.delete(duplicate)
+        db.session.merge(BusinessDataDuplicate(data_id=record_id, canonical_id=canonical_id,
+                                               similarity=round(similarity, 4), action='merged',
+                                               detected_at=datetime.utcnow()))
+        return True
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Reload a rewritten snapshot, then replay log frames saved by other workers since we last looked"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            with np.load(self.path, allow_pickle=False) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+            meta = json.loads(str(arrays.pop('meta')))
+            self._loaded_mtime, self._snapshot_bytes, self._log_offset = mtime, os.path.getsize(self.path), None
+            if meta.get('fingerprint') != self._store_fingerprint():
+                # Signatures from other MinHash parameters are not comparable: start over
+                logger.warning("Dedup signatures were built with other MinHash settings; checking every record again")
+                self._store, self._meta = self._new_store(), self._new_meta()
+                self._generation, self._needs_snapshot = None, True
+                return
+            store = self._new_store()
+            store.load_arrays(arrays)
+            self._store, self._meta = store, meta
+            self._generation = meta.get('generation', 0)
+
+        tail = self._log.read(self._generation, self._log_offset) if self._generation is not None else None
+        if tail is None:
+            return
+        entries, self._log_offset = tail
+        for header, changes in entries:
+            self._store.apply_changes(changes)
+            self._meta = header['meta']
+        self._compact_store()
+
+    def _save(self):
+        """Append this sync's changes to the log, or rewrite the snapshot once the log outgrows it"""
+        changes = self._store.take_changes()
+        self._compact_store()
+        if (self._needs_snapshot or self._generation is None
+                or self._log.size() > max(self._snapshot_bytes, self.min_compact_bytes)):
+            self._write_snapshot()
+        else:
+            self._log_offset = self._log.append(self._generation, self._log_offset, {'meta': self._meta}, changes)
+
+    def _compact_store(self):
+        """Drop tombstoned rows from memory once they are a quarter of the store"""
+        if self._store.tombstones > max(1024, self._store.size // 4):
+            self._store.compact()
+
+    def _write_snapshot(self):
+        generation = time.time_ns()
+        self._meta['generation'] = generation
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as handle:
+            np.savez(handle, meta=np.asarray(json.dumps(self._meta)), **self._store.to_arrays())
+        os.replace(temporary, self.path)
+        # Readers that see the new snapshot before the new log skip the old log's generation
+        self._log_offset = self._log.reset(generation)
+        self._generation = generation
+        self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        self._snapshot_bytes = os.path.getsize(self.path)
+        self._needs_snapshot = False
+
+    def _ensure_started(self):
+        """Start the sync thread in this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._pending_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='dedup-sync', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Let a burst of commits collect into one sync
+            if self._stopping.wait(self.sync_delay):
+                return
+            with self._pending_lock:
+                pending, self._pending = self._pending, set()
+            if not pending or self.app is None:
+                continue
+            try:
+                with self.app.app_context():
+                    if None in pending:
+                        self.sync()
+                    ids = [record_id for record_id in pending if record_id is not None]
+                    if ids:
+                        self.sync(ids)
+            except Exception as e:
+                self._stats['failed_syncs'] += 1
+                logger.error(f"Dedup sync failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Settings, this process's signature store and duplicate counts (requires an app context)"""
+        store = self._store
+        duplicates = dict(db.session.query(BusinessDataDuplicate.action, func.count())
+                          .group_by(BusinessDataDuplicate.action).all())
+        return {
+            'enabled': self.enabled,
+            'mode': self.mode,
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'rows_per_band': self.rows_per_band,
+            'records': len(store),
+            'store_bytes': store.nbytes,
+            'log_bytes': self._log.size(),
+            'last_id': self._meta.get('last_id', 0),
+            'synced_at': self._meta.get('synced_at'),
+            'duplicates': {'marked': duplicates.get('marked', 0), 'merged': duplicates.get('merged', 0)},
+            'pending': len(self._pending),
+            'totals': dict(self._stats)
+        }
+
+    def shutdown(self, timeout: float = 2.0):
+        """Stop the sync thread"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+def _fill_missing(target: Dict[str, Any], source: Any) -> Dict[str, Any]:
+    """Copy fields from source that target lacks or leaves empty (recursing into dicts)"""
+    if not isinstance(source, dict):
+        return target
+    for key, value in source.items():
+        current = target.get(key)
+        if current in (None, '', [], {}):
+            target[key] = value
+        elif isinstance(current, dict) and isinstance(value, dict):
+            target[key] = _fill_missing(dict(current), value)
+    return target
+
+# Global dedup service instance
+dedup_service = DedupService(
+    path=os.getenv('DEDUP_INDEX_PATH') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'database', 'dedup_signatures.npz'),
+    threshold=float(os.getenv('DEDUP_THRESHOLD', '0.8')),
+    num_perm=int(os.getenv('DEDUP_NUM_PERM', '128')),
+    shingle_size=int(os.getenv('DEDUP_SHINGLE_SIZE', '5')),
+    mode=os.getenv('DEDUP_MODE', 'mark').lower(),
+    ignore_fields=[field.strip() for field in os.getenv('DEDUP_IGNORE_FIELDS', DEFAULT_IGNORE_FIELDS).split(',')
+                   if field.strip()],
+    enabled=os.getenv('DEDUP_ENABLED', 'true').lower() == 'true'
+)
+
+@event.listens_for(BusinessData, 'after_insert')
+@event.listens_for(BusinessData, 'after_update')
+@event.listens_for(BusinessData, 'after_delete')
+def _track_business_data(mapper, connection, target):
+    session = Session.object_session(target)
+    # The sync's own merges are already reflected in the store
+    if session is not None and target.id is not None and not session.info.get('dedup_running'):
+        session.info.setdefault('dedup_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _check_committed_business_data(session):
+    ids = session.info.pop('dedup_ids', None)
+    if ids:
+        dedup_service.request_sync(ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_business_data(session):
+    session.info.pop('dedup_ids', None)
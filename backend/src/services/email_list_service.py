@@ -0,0 +1,333 @@
+"""
+Email List Service for Agent CEO system
+Persists mailing lists and subscribers, with batched imports and keyset-paginated reads
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, func, select
+from src.models.email import EmailList, EmailSubscriber, EmailSubscriberTag
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_STATUSES = ('active', 'unsubscribed', 'bounced')
+
+class EmailListError(ValueError):
+    """Raised for invalid list operations (unknown list, bad input)"""
+
+class EmailListService:
+    """Service for email list and subscriber management"""
+
+    def __init__(self, batch_size: int = 1000):
+        # Rows per upsert statement and per keyset page
+        self.batch_size = batch_size
+
+    def get_list(self, list_id: str) -> Optional[EmailList]:
+        """Get a list by its public id"""
+        return EmailList.query.filter_by(list_id=list_id).first()
+
+    def create_list(self, list_id: str, name: str, description: str = None) -> EmailList:
+        """Create a new email list"""
+        if self.get_list(list_id):
+            raise EmailListError(f"Email list '{list_id}' already exists")
+
+        email_list = EmailList(list_id=list_id, name=name, description=description)
+        db.session.add(email_list)
+        db.session.commit()
+
+        logger.info(f"Created email list: {list_id}")
+        return email_list
+
+    def get_lists(self) -> List[Dict[str, Any]]:
+        """Get all lists with their active subscriber counts (one grouped query)"""
+        rows = db.session.execute(
+            select(EmailList, func.count(EmailSubscriber.id))
+            .outerjoin(EmailSubscriber, and_(
+                EmailSubscriber.list_id == EmailList.list_id,
+                EmailSubscriber.status == 'active'
+            ))
+            .group_by(EmailList.id)
+            .order_by(EmailList.created_at)
+        ).all()
+
+        return [email_list.to_dict(subscriber_count=count) for email_list, count in rows]
+
+    def mark_campaign_sent(self, list_id: str):
+        """Record that a campaign was sent to the list"""
+        email_list = self.get_list(list_id)
+        if email_list:
+            email_list.last_campaign_at = datetime.utcnow()
+            db.session.commit()
+
+    def import_subscribers(self, list_id: str, subscribers: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Upsert subscribers into a list in batches
+
+        The input is consumed lazily, so callers can pass a generator over a
+        request stream. Existing subscribers keep their status unless the
+        incoming record sets one explicitly.
+
+        Args:
+            list_id: Target list id
+            subscribers: Iterable of dicts with email and optional name, status, tags
+
+        Returns:
+            Dictionary with import counts
+        """
+        if not self.get_list(list_id):
+            raise EmailListError(f"Email list '{list_id}' not found")
+
+        stats = {'received': 0, 'upserted': 0, 'skipped': 0, 'batches': 0}
+        batch = []
+
+        for subscriber in subscribers:
+            stats['received'] += 1
+            row = self._normalize_subscriber(subscriber)
+            if row is None:
+                stats['skipped'] += 1
+                continue
+
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                stats['upserted'] += self._upsert_batch(list_id, batch)
+                stats['batches'] += 1
+                batch = []
+
+        if batch:
+            stats['upserted'] += self._upsert_batch(list_id, batch)
+            stats['batches'] += 1
+
+        return stats
+
+    def _normalize_subscriber(self, subscriber: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Validate and normalize one incoming subscriber record"""
+        if not isinstance(subscriber, dict):
+            return None
+
+        email = (subscriber.get('email') or '').strip().lower()
+        if '@' not in email:
+            return None
+
+        status = subscriber.get('status')
+        if status is not None and status not in SUBSCRIBER_STATUSES:
+            return None
+
+        tags = subscriber.get('tags') or []
+        if isinstance(tags, str):
+            tags = tags.split(',')
+
+        return {
+            'email': email,
+            'name': subscriber.get('name'),
+            'status': status,
+            'tags': sorted({str(tag).strip().lower() for tag in tags if str(tag).strip()})
+        }
+
+    def _upsert_batch(self, list_id: str, batch: List[Dict[str, Any]]) -> int:
+        """Upsert one batch of normalized subscribers and their tags"""
+        # A single INSERT .. ON CONFLICT cannot touch the same row twice
+        by_email = {row['email']: row for row in batch}
+        now = datetime.utcnow()
+
+        try:
+            insert = self._dialect_insert()
+            if insert is None:
+                self._merge_batch(list_id, by_email, now)
+            else:
+                # Rows with an explicit status overwrite it, the rest keep theirs
+                with_status = [row for row in by_email.values() if row['status']]
+                without_status = [row for row in by_email.values() if not row['status']]
+
+                for rows, update_status in ((with_status, True), (without_status, False)):
+                    if not rows:
+                        continue
+                    values = [{
+                        'list_id': list_id,
+                        'email': row['email'],
+                        'name': row['name'],
+                        'status': row['status'] or 'active',
+                        'subscribed_at': now,
+                        'updated_at': now
+                    } for row in rows]
+
+                    stmt = insert(EmailSubscriber.__table__).values(values)
+                    update_set = {
+                        'name': func.coalesce(stmt.excluded.name, EmailSubscriber.__table__.c.name),
+                        'updated_at': stmt.excluded.updated_at
+                    }
+                    if update_status:
+                        update_set['status'] = stmt.excluded.status
+                    db.session.execute(stmt.on_conflict_do_update(
+                        index_elements=['list_id', 'email'],
+                        set_=update_set
+                    ))
+
+            self._upsert_tags(list_id, by_email, insert)
+            db.session.commit()
+            return len(by_email)
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _upsert_tags(self, list_id: str, by_email: Dict[str, Dict[str, Any]], insert):
+        """Attach tags for a batch; existing tags are kept"""
+        tagged = {email: row['tags'] for email, row in by_email.items() if row['tags']}
+        if not tagged:
+            return
+
+        ids = db.session.execute(
+            select(EmailSubscriber.email, EmailSubscriber.id).where(
+                EmailSubscriber.list_id == list_id,
+                EmailSubscriber.email.in_(list(tagged))
+            )
+        ).all()
+
+        values = [
+            {'subscriber_id': subscriber_id, 'tag': tag}
+            for email, subscriber_id in ids
+            for tag in tagged.get(email, [])
+        ]
+        if not values:
+            return
+
+        if insert is None:
+            existing = set(db.session.execute(
+                select(EmailSubscriberTag.subscriber_id, EmailSubscriberTag.tag).where(
+                    EmailSubscriberTag.subscriber_id.in_([subscriber_id for _, subscriber_id in ids])
+                )
+            ).all())
+            db.session.add_all(
+                EmailSubscriberTag(**value) for value in values
+                if (value['subscriber_id'], value['tag']) not in existing
+            )
+        else:
+            db.session.execute(
+                insert(EmailSubscriberTag.__table__).values(values).on_conflict_do_nothing()
+            )
+
+    def _merge_batch(self, list_id: str, by_email: Dict[str, Dict[str, Any]], now: datetime):
+        """Portable upsert for dialects without ON CONFLICT support"""
+        existing = {
+            subscriber.email: subscriber
+            for subscriber in EmailSubscriber.query.filter(
+                EmailSubscriber.list_id == list_id,
+                EmailSubscriber.email.in_(list(by_email))
+            )
+        }
+
+        for email, row in by_email.items():
+            subscriber = existing.get(email)
+            if subscriber is None:
+                db.session.add(EmailSubscriber(
+                    list_id=list_id,
+                    email=email,
+                    name=row['name'],
+                    status=row['status'] or 'active',
+                    subscribed_at=now
+                ))
+            else:
+                subscriber.name = row['name'] or subscriber.name
+                subscriber.status = row['status'] or subscriber.status
+                subscriber.updated_at = now
+
+        db.session.flush()
+
+    def _dialect_insert(self):
+        """Return the dialect's INSERT construct if it supports ON CONFLICT"""
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            return insert
+        return None
+
+    def _subscriber_query(self, list_id: str, status: Optional[str], tag: Optional[str]):
+        """Base SELECT for a list's subscribers, filtered by status and tag"""
+        query = select(
+            EmailSubscriber.id,
+            EmailSubscriber.email,
+            EmailSubscriber.name,
+            EmailSubscriber.status,
+            EmailSubscriber.subscribed_at
+        ).where(EmailSubscriber.list_id == list_id)
+
+        if status:
+            query = query.where(EmailSubscriber.status == status)
+        if tag:
+            query = query.join(
+                EmailSubscriberTag,
+                and_(EmailSubscriberTag.subscriber_id == EmailSubscriber.id,
+                     EmailSubscriberTag.tag == tag.strip().lower())
+            )
+        return query
+
+    def get_subscriber_page(self, list_id: str, status: Optional[str] = 'active', tag: str = None,
+                            after_id: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Get one keyset page of subscribers
+
+        Returns:
+            Tuple of (subscribers, next_cursor); next_cursor is None on the last page
+        """
+        rows = db.session.execute(
+            self._subscriber_query(list_id, status, tag)
+            .where(EmailSubscriber.id > after_id)
+            .order_by(EmailSubscriber.id)
+            .limit(limit)
+        ).all()
+
+        subscribers = self._rows_to_dicts(rows)
+        next_cursor = rows[-1].id if len(rows) == limit else None
+        return subscribers, next_cursor
+
+    def count_subscribers(self, list_id: str, status: Optional[str] = 'active', tag: str = None) -> int:
+        """Count subscribers matching the filters"""
+        query = self._subscriber_query(list_id, status, tag).with_only_columns(func.count(EmailSubscriber.id))
+        return db.session.execute(query).scalar() or 0
+
+    def iter_subscribers(self, list_id: str, status: Optional[str] = 'active', tag: str = None,
+                         after_id: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Stream subscribers page by page
+
+        Only one page is held in memory at a time, so this is suitable for
+        exports and campaign sends over very large lists.
+        """
+        cursor = after_id
+        while True:
+            subscribers, next_cursor = self.get_subscriber_page(
+                list_id, status=status, tag=tag, after_id=cursor, limit=self.batch_size
+            )
+            yield from subscribers
+            if next_cursor is None:
+                return
+            cursor = next_cursor
+
+    def _rows_to_dicts(self, rows) -> List[Dict[str, Any]]:
+        """Convert subscriber rows to dicts, loading tags for the page in one query"""
+        if not rows:
+            return []
+
+        tags_by_id: Dict[int, List[str]] = {}
+        for subscriber_id, tag in db.session.execute(
+            select(EmailSubscriberTag.subscriber_id, EmailSubscriberTag.tag)
+            .where(EmailSubscriberTag.subscriber_id.in_([row.id for row in rows]))
+        ):
+            tags_by_id.setdefault(subscriber_id, []).append(tag)
+
+        return [{
+            'id': row.id,
+            'email': row.email,
+            'name': row.name,
+            'status': row.status,
+            'subscribed_at': row.subscribed_at.isoformat() if row.subscribed_at else None,
+            'tags': sorted(tags_by_id.get(row.id, []))
+        } for row in rows]
+
+# Global email list service instance
+email_list_service = EmailListService()
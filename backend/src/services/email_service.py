@@ -20,9 +20,14 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 import pickle
+from src.services.email_list_service import email_list_service
+from src.services.health_registry import health_registry
+from src.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+campaign_sends = metrics.counter('email_campaign_sends_total', 'Campaign emails attempted by result', ('result',))
+
 class EmailService:
     """Service for email automation and campaign management"""
     
@@ -45,6 +50,9 @@ class EmailService:
             'use_tls': os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
         }
         
+        # Failed sends reported individually per campaign; the rest are only counted
+        self.max_reported_failures = int(os.getenv('EMAIL_CAMPAIGN_MAX_REPORTED_FAILURES', '100'))
+        
         # Email templates
         self.templates = {
             'welcome': {
@@ -331,6 +339,12 @@ class EmailService:
         """
         Send email campaign to multiple recipients
         
+        Recipients may be any iterable (including a generator); when no
+        recipients are given but a ``list_id`` is, the list's active
+        subscribers are streamed page by page instead of loaded up front.
+        Results are kept as counters plus the first ``max_reported_failures``
+        failures, so memory does not grow with the list.
+        
         Args:
             campaign_data: Campaign configuration and recipient data
             
@@ -338,7 +352,13 @@ class EmailService:
             Dictionary with campaign results
         """
         try:
-            recipients = campaign_data.get('recipients', [])
+            recipients = campaign_data.get('recipients')
+            list_id = campaign_data.get('list_id')
+            if not recipients and list_id:
+                recipients = email_list_service.iter_subscribers(
+                    list_id, status='active', tag=campaign_data.get('tag')
+                )
+            recipients = recipients or []
             subject_template = campaign_data.get('subject', 'Campaign Email')
             content_template = campaign_data.get('content', '')
             template = campaign_data.get('template')
@@ -346,14 +366,16 @@ class EmailService:
             
             results = {
                 'campaign_id': campaign_data.get('campaign_id', f"campaign_{int(datetime.utcnow().timestamp())}"),
-                'total_recipients': len(recipients),
+                'list_id': list_id,
+                'total_recipients': 0,
                 'successful_sends': 0,
                 'failed_sends': 0,
-                'results': [],
+                'failures': [],
                 'started_at': datetime.utcnow().isoformat()
             }
             
             for recipient in recipients:
+                results['total_recipients'] += 1
                 try:
                     # Personalize content
                     recipient_vars = recipient.copy()
@@ -372,28 +394,21 @@ class EmailService:
                         method=method
                     )
                     
-                    results['results'].append({
-                        'email': recipient['email'],
-                        'success': result['success'],
-                        'result': result
-                    })
-                    
                     if result['success']:
                         results['successful_sends'] += 1
+                        campaign_sends.inc(result='sent')
                     else:
-                        results['failed_sends'] += 1
+                        self._record_failure(results, recipient['email'], result.get('error'))
                         
                 except Exception as e:
-                    results['results'].append({
-                        'email': recipient.get('email', 'unknown'),
-                        'success': False,
-                        'error': str(e)
-                    })
-                    results['failed_sends'] += 1
+                    self._record_failure(results, recipient.get('email', 'unknown'), str(e))
             
             results['completed_at'] = datetime.utcnow().isoformat()
             results['success_rate'] = results['successful_sends'] / results['total_recipients'] if results['total_recipients'] > 0 else 0
             
+            if list_id:
+                email_list_service.mark_campaign_sent(list_id)
+            
             return {
                 'success': True,
                 'campaign_results': results
@@ -403,6 +418,15 @@ class EmailService:
             logger.error(f"Email campaign error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _record_failure(self, results: Dict[str, Any], email: str, error: Optional[str]):
+        """Count a failed send, keeping details for only the first few"""
+        results['failed_sends'] += 1
+        campaign_sends.inc(result='failed')
+        if len(results['failures']) < self.max_reported_failures:
+            results['failures'].append({'email': email, 'error': error})
+        else:
+            results['failures_truncated'] = True
+    
     def generate_email_report(self, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
         """
         Generate email activity report
@@ -571,7 +595,7 @@ class EmailService:
         # Test SMTP connection
         if health_status['smtp_configured']:
             try:
-                server = smtplib.SMTP(self.smtp_config['host'], self.smtp_config['port'])
+                server = smtplib.SMTP(self.smtp_config['host'], self.smtp_config['port'], timeout=10)
                 if self.smtp_config['use_tls']:
                     server.starttls()
                 server.login(self.smtp_config['username'], self.smtp_config['password'])
@@ -587,3 +611,12 @@ class EmailService:
 # Global email service instance
 email_service = EmailService()
 
+# Opens a real SMTP login in every worker, so runs rarely; /email/health?refresh=true checks now
+health_registry.register(
+    'email',
+    email_service.health_check,
+    interval=float(os.getenv('EMAIL_HEALTH_INTERVAL_SECONDS', '3600')),
+    timeout=30,
+    is_healthy=lambda result: result.get('smtp_connection') in ('healthy', 'not_configured')
+)
+
@@ -0,0 +1,717 @@
+"""
+Embedding Index for Agent CEO system
+Keeps a persisted NumPy vector index (flat, or IVF once large) over BusinessData content,
+updated incrementally as rows are committed, for top-k retrieval into prompts
+"""
+
+import atexit
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import requests
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from src.models.agent import BusinessData
+from src.models.user import db
+from src.services.append_log import AppendLog
+from src.services.dedup_service import not_duplicate
+from src.services.http_client import CircuitBreaker, CircuitOpenError
+from src.services.usage_ledger import capture_scope, usage_ledger
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def record_text(data_type: str, source: str, data_content: Optional[str], max_chars: int = 2000) -> str:
+    """Text embedded for a BusinessData row: its type, source and flattened ``key: value`` content"""
+    try:
+        content = json.loads(data_content) if data_content else {}
+    except ValueError:
+        content = data_content
+    lines = [f'type: {data_type}', f'source: {source}']
+    stack: List[Tuple[str, Any]] = [('', content)]
+    size = sum(len(line) for line in lines)
+    while stack and size < max_chars:
+        prefix, value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend((f'{prefix}.{key}' if prefix else str(key), item) for key, item in reversed(list(value.items())))
+        elif isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            stack.extend((prefix, item) for item in reversed(value))
+        elif value not in (None, '', [], {}):
+            text = ', '.join(map(str, value)) if isinstance(value, list) else str(value)
+            line = f'{prefix}: {text}' if prefix else text
+            lines.append(line)
+            size += len(line)
+    return '\n'.join(lines)[:max_chars]
+
+def content_digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def records_for_prompt(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Retrieved records reduced to what a prompt needs"""
+    return [{'type': record['data_type'], 'source': record['source'], 'relevance': record['relevance'],
+             'data': record['data_content']} for record in records]
+
+class HashingEmbedder:
+    """
+    Local feature-hashing embeddings (unigrams and bigrams, signed, log-scaled)
+
+    No network or model download; a lexical fallback when no embedding API is configured.
+    Uses crc32 rather than ``hash()`` so vectors agree across processes.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.model = f'hashing-{dim}'
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(feature.encode('utf-8')) for feature in features),
+                                 dtype=np.uint64, count=len(features))
+            signs = np.where(hashes & (1 << 31), -1.0, 1.0)
+            counts = np.bincount((hashes % self.dim).astype(np.int64), weights=signs, minlength=self.dim)
+            vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return vectors
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+class OpenAIEmbedder:
+    """
+    OpenAI embeddings API, batched, with usage recorded in the LLM usage ledger
+
+    Calls go through a circuit breaker, and single-query embeddings (made
+    while a request or task waits) use the shorter ``query_timeout``.
+    """
+
+    def __init__(self, api_key: str, base_url: str, model: str = 'text-embedding-3-small',
+                 batch_size: int = 256, timeout: float = 30.0, query_timeout: float = 5.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.query_timeout = query_timeout
+        self.session = requests.Session()
+        self.breaker = CircuitBreaker()
+
+    def embed(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        batches = []
+        scope = capture_scope('src.services.embedding_index.OpenAIEmbedder.embed')
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start:start + self.batch_size])
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.base_url, self.breaker.retry_in())
+            started = time.monotonic()
+            try:
+                response = self.session.post(
+                    f'{self.base_url}/embeddings',
+                    headers={'Authorization': f'Bearer {self.api_key}', 'Content-Type': 'application/json'},
+                    json={'model': self.model, 'input': batch},
+                    timeout=timeout or self.timeout
+                )
+                if response.status_code != 200:
+                    raise Exception(f"OpenAI embeddings error: {response.status_code} - {response.text}")
+                body = response.json()
+            except Exception:
+                self.breaker.record_failure()
+                usage_ledger.record('openai', self.model, {}, (time.monotonic() - started) * 1000,
+                                    success=False, scope=scope)
+                raise
+            self.breaker.record_success()
+            usage_ledger.record('openai', self.model,
+                                {'prompt_tokens': (body.get('usage') or {}).get('prompt_tokens', 0)},
+                                (time.monotonic() - started) * 1000, scope=scope)
+            items = sorted(body['data'], key=lambda item: item['index'])
+            batches.append(np.asarray([item['embedding'] for item in items], dtype=np.float32))
+        return np.vstack(batches) if batches else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.embed([text], timeout=self.query_timeout)[0]
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index over unit vectors, keyed by integer ID
+
+    Searches are exact (one matrix-vector product) until the index reaches
+    ``ivf_min_rows``; from then on rows are clustered with spherical k-means
+    and a search only scores the rows of the ``nprobe`` nearest clusters.
+    New rows are assigned to their nearest existing cluster, and clusters are
+    retrained once the index has doubled since the last training. IDs
+    upserted or removed since the last ``take_changes`` are tracked so they
+    can be appended to the index log.
+    """
+
+    def __init__(self, dim: int, ivf_min_rows: int = 20000, nprobe: int = 8):
+        self.dim = dim
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+
+        self.size = 0
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.digests = np.zeros(0, dtype=np.uint64)
+        self.types = np.zeros(0, dtype=np.int16)
+        self.type_names: List[str] = []
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self.changed: set = set()
+        self._rows: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def digest(self, record_id: int) -> Optional[int]:
+        row = self._rows.get(record_id)
+        return int(self.digests[row]) if row is not None else None
+
+    def _type_code(self, data_type: str) -> int:
+        if data_type not in self.type_names:
+            self.type_names.append(data_type)
+        return self.type_names.index(data_type)
+
+    def _reserve(self, extra: int):
+        capacity = len(self.ids)
+        if self.size + extra <= capacity:
+            return
+        capacity = max(self.size + extra, capacity * 2, 1024)
+        for name in ('ids', 'digests', 'types', 'assignments'):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        self.vectors = vectors
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, digests: Sequence[int], data_types: Sequence[str]):
+        """Insert or replace rows"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self._reserve(len(ids))
+        for record_id, vector, digest, data_type in zip(ids, vectors, digests, data_types):
+            row = self._rows.get(record_id)
+            if row is None:
+                row = self.size
+                self.size += 1
+                self._rows[record_id] = row
+                self.ids[row] = record_id
+            self.vectors[row] = vector
+            self.digests[row] = digest
+            self.types[row] = self._type_code(data_type)
+            self.changed.add(int(record_id))
+            if self.centroids is not None:
+                self.assignments[row] = int(np.argmax(self.centroids @ vector))
+        if self.size >= self.ivf_min_rows and self.size >= 2 * self.trained_size:
+            self.train()
+
+    def remove(self, ids: Sequence[int]) -> int:
+        """Delete rows by ID (the last row moves into each freed slot)"""
+        removed = 0
+        for record_id in ids:
+            row = self._rows.pop(record_id, None)
+            if row is None:
+                continue
+            self.changed.add(int(record_id))
+            last = self.size - 1
+            if row != last:
+                for array in (self.ids, self.vectors, self.digests, self.types, self.assignments):
+                    array[row] = array[last]
+                self._rows[int(self.ids[row])] = row
+            self.size -= 1
+            removed += 1
+        return removed
+
+    def train(self, iterations: int = 10, sample: int = 50000, seed: int = 7):
+        """Cluster the rows with spherical k-means (about 4 * sqrt(n) clusters)"""
+        if self.size < self.ivf_min_rows:
+            self.centroids = None
+            self.trained_size = 0
+            return
+        rng = np.random.default_rng(seed)
+        vectors = self.vectors[:self.size]
+        nlist = int(min(max(4 * np.sqrt(self.size), 16), 4096))
+        training = vectors[rng.choice(self.size, size=min(sample, self.size), replace=False)]
+        centroids = training[rng.choice(len(training), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(training @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, training)
+            filled = np.bincount(labels, minlength=nlist) > 0
+            centroids[filled] = _normalize(sums[filled])
+        self.centroids = centroids
+        self.assignments[:self.size] = self._assign(vectors)
+        self.trained_size = self.size
+
+    def _assign(self, vectors: np.ndarray, batch: int = 8192) -> np.ndarray:
+        return np.concatenate([np.argmax(vectors[start:start + batch] @ self.centroids.T, axis=1)
+                               for start in range(0, len(vectors), batch)]).astype(np.int32)
+
+    def search(self, query: np.ndarray, k: int = 10, data_types: Optional[Sequence[str]] = None) -> List[Tuple[int, float]]:
+        """Top-k (id, cosine similarity) pairs, best first"""
+        if self.size == 0 or k <= 0:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        candidates = None
+        if self.centroids is not None:
+            probes = np.argpartition(-(self.centroids @ query), min(self.nprobe, len(self.centroids) - 1))[:self.nprobe]
+            candidates = np.isin(self.assignments[:self.size], probes)
+        if data_types:
+            codes = [self.type_names.index(name) for name in data_types if name in self.type_names]
+            if not codes:
+                return []
+            in_types = np.isin(self.types[:self.size], codes)
+            candidates = in_types if candidates is None else candidates & in_types
+        rows = np.arange(self.size) if candidates is None else np.flatnonzero(candidates)
+        if len(rows) == 0:
+            return []
+        scores = self.vectors[rows] @ query
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+    def take_changes(self) -> Dict[str, np.ndarray]:
+        """Rows upserted and IDs removed since the last call"""
+        changed, self.changed = sorted(self.changed), set()
+        rows = np.asarray([self._rows[record_id] for record_id in changed if record_id in self._rows], dtype=np.int64)
+        return {
+            'ids': self.ids[rows], 'vectors': self.vectors[rows], 'digests': self.digests[rows],
+            'types': self.types[rows], 'type_names': np.asarray(self.type_names, dtype=str),
+            'removed': np.asarray([record_id for record_id in changed if record_id not in self._rows], dtype=np.int64)
+        }
+
+    def apply_changes(self, changes: Dict[str, np.ndarray]):
+        """Replay changes taken from another process's index"""
+        removed = changes['removed'].tolist()
+        ids = changes['ids'].tolist()
+        self.remove(removed)
+        if ids:
+            type_names = [str(name) for name in changes['type_names']]
+            self.upsert(ids, changes['vectors'], changes['digests'].tolist(),
+                        [type_names[code] for code in changes['types'].tolist()])
+        # Already persisted by the process that made them
+        self.changed.difference_update(removed + ids)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        n = self.size
+        arrays = {
+            'ids': self.ids[:n], 'vectors': self.vectors[:n], 'digests': self.digests[:n],
+            'types': self.types[:n], 'type_names': np.asarray(self.type_names, dtype=str),
+            'assignments': self.assignments[:n], 'trained_size': np.asarray(self.trained_size)
+        }
+        if self.centroids is not None:
+            arrays['centroids'] = self.centroids
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], ivf_min_rows: int, nprobe: int) -> 'VectorIndex':
+        vectors = arrays['vectors']
+        index = cls(vectors.shape[1], ivf_min_rows=ivf_min_rows, nprobe=nprobe)
+        index.size = len(arrays['ids'])
+        index.ids = arrays['ids'].astype(np.int64)
+        index.vectors = vectors.astype(np.float32)
+        index.digests = arrays['digests'].astype(np.uint64)
+        index.types = arrays['types'].astype(np.int16)
+        index.type_names = [str(name) for name in arrays['type_names']]
+        index.assignments = arrays['assignments'].astype(np.int32)
+        index.centroids = arrays['centroids'] if 'centroids' in arrays else None
+        index.trained_size = int(arrays['trained_size'])
+        index._rows = {int(record_id): row for row, record_id in enumerate(index.ids)}
+        return index
+
+class EmbeddingIndex:
+    """
+    BusinessData embedding index shared by the workers through one file
+
+    The database stays the source of truth: ``sync`` embeds rows added or
+    changed since the index last saw them (skipping rows whose content
+    digest is unchanged), applies deletes and appends the changed rows to a
+    log next to the snapshot file. The snapshot is rewritten only on rebuild
+    or once the log outgrows it. Commits touching BusinessData queue their
+    row IDs for a background sync, so inserts are searchable within seconds.
+    Workers serialize syncs with a file lock and replay only the log frames
+    they have not seen yet, outside the lock searches use.
+    """
+
+    def __init__(self, path: str, embedder: Any, ivf_min_rows: int = 20000, nprobe: int = 8,
+                 batch_size: int = 256, max_chars: int = 2000, sync_delay: float = 1.0,
+                 min_compact_bytes: int = 1 << 20):
+        self.path = path
+        self.embedder = embedder
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.sync_delay = sync_delay
+        self.min_compact_bytes = min_compact_bytes
+        self.app = None
+
+        self._index: Optional[VectorIndex] = None
+        self._meta: Dict[str, Any] = {}
+        self._log = AppendLog(f'{path}.log')
+        self._loaded_mtime = None  # of the snapshot
+        self._snapshot_bytes = 0
+        self._generation = None  # snapshot generation whose log we replay; None to skip the log
+        self._log_offset = None
+        self._needs_snapshot = False
+        self._lock = threading.Lock()  # one sync at a time in this process
+        self._load_lock = threading.Lock()  # one catch-up (or sync) at a time in this process
+        self._index_lock = threading.Lock()  # held briefly for searches and index changes
+        self._pending: set = set()
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {'embedded': 0, 'skipped_unchanged': 0, 'removed': 0, 'syncs': 0, 'failed_syncs': 0}
+
+    def init_app(self, app):
+        """Bind the Flask app, start the sync thread and catch up with rows added while stopped"""
+        self.app = app
+        self._ensure_started()
+        self.request_sync()
+        atexit.register(self.shutdown)
+
+    def search(self, query: str, k: int = 10, data_types: Optional[Sequence[str]] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k BusinessData IDs for a query
+
+        Args:
+            query: Free text describing what the records should be about
+            k: Number of results
+            data_types: Only return rows of these data types (optional; a single name is accepted)
+
+        Returns:
+            (id, cosine similarity) pairs, best first
+        """
+        if isinstance(data_types, str):
+            data_types = [data_types]
+        self._load()
+        with self._index_lock:
+            if self._index is None or not len(self._index):
+                return []
+        vector = self.embedder.embed_query(query)
+        with self._index_lock:
+            return self._index.search(vector, k=k, data_types=data_types) if self._index is not None else []
+
+    def retrieve(self, query: str, k: int = 10, data_types: Optional[Sequence[str]] = None,
+                 min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Top-k BusinessData records for a query (requires an app context)
+
+        Records marked as near-duplicates are skipped. Failures are logged and
+        return no records, so callers can fall back.
+
+        Returns:
+            Record dicts (``to_dict`` plus ``relevance``), best first
+        """
+        try:
+            # Over-fetch so skipped duplicates don't leave the result short
+            hits = [(record_id, score) for record_id, score in self.search(query, 2 * k, data_types) if score > min_score]
+            if not hits:
+                return []
+            rows = {row.id: row for row in BusinessData.query.filter(BusinessData.id.in_([i for i, _ in hits]),
+                                                                     not_duplicate())}
+        except Exception as e:
+            logger.warning(f"Business data retrieval failed: {str(e)}")
+            return []
+        records = []
+        for record_id, score in hits:
+            row = rows.get(record_id)
+            if row is not None:  # deleted since it was indexed, or a duplicate
+                records.append({**row.to_dict(), 'relevance': round(score, 4)})
+        return records[:k]
+
+    def request_sync(self, ids: Optional[Sequence[int]] = None):
+        """Queue a background sync (of specific row IDs, or a catch-up when None)"""
+        self._ensure_started()
+        with self._pending_lock:
+            if ids is None:
+                self._pending.add(None)
+            else:
+                self._pending.update(ids)
+        self._wakeup.set()
+
+    def sync(self, ids: Optional[Sequence[int]] = None, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date with BusinessData (requires an app context)
+
+        Args:
+            ids: Only these rows (inserted, changed or deleted); None catches up
+                with every row added or updated since the last sync
+            rebuild: Discard the index and embed every row again
+
+        Returns:
+            Dictionary with counts of embedded, unchanged and removed rows
+        """
+        with self._lock, self._file_lock(), self._load_lock:
+            self._catch_up()
+            if rebuild or self._index is None:
+                with self._index_lock:
+                    self._index, self._meta = None, {'model': self.embedder.model, 'last_id': 0, 'synced_at': None}
+                self._needs_snapshot = True
+            counts = {'embedded': 0, 'skipped_unchanged': 0, 'removed': 0}
+
+            if ids is not None:
+                ids = sorted(set(ids))
+                rows = db.session.execute(self._columns().where(BusinessData.id.in_(ids))).all()
+                gone = set(ids) - {row.id for row in rows}
+                if gone and self._index is not None:
+                    with self._index_lock:
+                        counts['removed'] = self._index.remove(gone)
+                self._apply(rows, counts)
+            else:
+                for rows in self._changed_batches():
+                    self._apply(rows, counts)
+
+            if any(counts.values()) or rebuild:
+                self._save()
+            for key, value in counts.items():
+                self._stats[key] += value
+            self._stats['syncs'] += 1
+            return {'success': True, **counts, 'indexed': len(self._index) if self._index is not None else 0}
+
+    def _columns(self):
+        return select(BusinessData.id, BusinessData.data_type, BusinessData.source,
+                      BusinessData.data_content, BusinessData.updated_at)
+
+    def _changed_batches(self) -> Iterator[list]:
+        """Rows past the last indexed ID, then rows updated since the last sync, in ID order"""
+        synced_at = self._meta.get('synced_at')
+        condition = BusinessData.id > self._meta.get('last_id', 0)
+        if synced_at is not None:
+            condition = or_(condition, BusinessData.updated_at >= datetime.fromisoformat(synced_at))
+        last_id = 0
+        while True:
+            rows = db.session.execute(self._columns().where(condition, BusinessData.id > last_id)
+                                      .order_by(BusinessData.id).limit(self.batch_size)).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+
+    def _apply(self, rows: list, counts: Dict[str, int]):
+        """Embed the rows whose content digest changed"""
+        texts, digests, keep = [], [], []
+        for row in rows:
+            text = record_text(row.data_type, row.source, row.data_content, self.max_chars)
+            digest = content_digest(text)
+            if self._index is not None and self._index.digest(row.id) == digest:
+                counts['skipped_unchanged'] += 1
+                continue
+            texts.append(text)
+            digests.append(digest)
+            keep.append(row)
+        if keep:
+            vectors = self.embedder.embed(texts)
+            with self._index_lock:
+                if self._index is None:
+                    self._index = VectorIndex(vectors.shape[1], ivf_min_rows=self.ivf_min_rows, nprobe=self.nprobe)
+                self._index.upsert([row.id for row in keep], vectors, digests, [row.data_type for row in keep])
+            counts['embedded'] += len(keep)
+        if rows:
+            self._meta['last_id'] = max(self._meta.get('last_id', 0), max(row.id for row in rows))
+            updated = [row.updated_at for row in rows if row.updated_at is not None]
+            if updated:
+                latest = max(updated).isoformat()
+                self._meta['synced_at'] = max(self._meta.get('synced_at') or latest, latest)
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _load(self):
+        """Catch up with other workers' changes, unless another thread of this process already is"""
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            self._catch_up()
+        finally:
+            self._load_lock.release()
+
+    def _catch_up(self):
+        """Reload a rewritten snapshot, then replay unseen log frames (holding _load_lock, not _index_lock)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            with np.load(self.path, allow_pickle=False) as stored:
+                arrays = {name: stored[name] for name in stored.files}
+            meta = json.loads(str(arrays.pop('meta')))
+            self._loaded_mtime, self._snapshot_bytes, self._log_offset = mtime, os.path.getsize(self.path), None
+            if meta.get('model') != self.embedder.model:
+                # Vectors from another embedding model are not comparable: start over
+                logger.warning(f"Embedding index built with {meta.get('model')}, now {self.embedder.model}; rebuilding")
+                index, meta = None, {'model': self.embedder.model, 'last_id': 0, 'synced_at': None}
+                self._generation, self._needs_snapshot = None, True
+            else:
+                index = VectorIndex.from_arrays(arrays, self.ivf_min_rows, self.nprobe) if 'vectors' in arrays else None
+                self._generation = meta.get('generation', 0)
+            with self._index_lock:
+                self._index, self._meta = index, meta
+
+        tail = self._log.read(self._generation, self._log_offset) if self._generation is not None else None
+        if tail is None:
+            return
+        entries, offset = tail
+        if entries:
+            with self._index_lock:
+                for header, changes in entries:
+                    if self._index is None and len(changes['ids']):
+                        self._index = VectorIndex(changes['vectors'].shape[1], ivf_min_rows=self.ivf_min_rows,
+                                                  nprobe=self.nprobe)
+                    if self._index is not None:
+                        self._index.apply_changes(changes)
+                    self._meta = header['meta']
+        self._log_offset = offset
+
+    def _save(self):
+        """Append this sync's changes to the log, or rewrite the snapshot once the log outgrows it"""
+        self._meta['model'] = self.embedder.model
+        # Only syncs (serialized by _lock) change the index, so it can be written without copying
+        changes = self._index.take_changes() if self._index is not None else None
+        if (self._needs_snapshot or self._generation is None or changes is None
+                or self._log.size() > max(self._snapshot_bytes, self.min_compact_bytes)):
+            self._write_snapshot()
+        else:
+            self._log_offset = self._log.append(self._generation, self._log_offset, {'meta': self._meta}, changes)
+
+    def _write_snapshot(self):
+        generation = time.time_ns()
+        self._meta['generation'] = generation
+        arrays = self._index.to_arrays() if self._index is not None else {}
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as handle:
+            np.savez(handle, meta=np.asarray(json.dumps(self._meta)), **arrays)
+        os.replace(temporary, self.path)
+        # Readers that see the new snapshot before the new log skip the old log's generation
+        self._log_offset = self._log.reset(generation)
+        self._generation = generation
+        self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        self._snapshot_bytes = os.path.getsize(self.path)
+        self._needs_snapshot = False
+
+    def _ensure_started(self):
+        """Start the sync thread in this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._pending_lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='embedding-sync', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            # Let a burst of commits collect into one sync
+            if self._stopping.wait(self.sync_delay):
+                return
+            with self._pending_lock:
+                pending, self._pending = self._pending, set()
+            if not pending or self.app is None:
+                continue
+            try:
+                with self.app.app_context():
+                    if None in pending:
+                        self.sync()
+                    ids = [record_id for record_id in pending if record_id is not None]
+                    if ids:
+                        self.sync(ids)
+            except Exception as e:
+                self._stats['failed_syncs'] += 1
+                logger.error(f"Embedding index sync failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        self._load()
+        with self._index_lock:
+            index = self._index
+            return {
+                'path': self.path,
+                'model': self.embedder.model,
+                'indexed': len(index) if index is not None else 0,
+                'dimensions': index.dim if index is not None else None,
+                'mode': 'ivf' if index is not None and index.centroids is not None else 'flat',
+                'clusters': len(index.centroids) if index is not None and index.centroids is not None else 0,
+                'last_id': self._meta.get('last_id', 0),
+                'synced_at': self._meta.get('synced_at'),
+                'log_bytes': self._log.size(),
+                'pending': len(self._pending),
+                **self._stats
+            }
+
+    def shutdown(self, timeout: float = 2.0):
+        """Stop the sync thread"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+
+def _create_embedder():
+    # OpenAI embeddings are opt-in: every retrieval would otherwise wait on an API call
+    if os.getenv('EMBEDDING_PROVIDER', 'hashing').lower() == 'openai':
+        return OpenAIEmbedder(os.getenv('OPENAI_API_KEY'), os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1'),
+                              model=os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small'),
+                              query_timeout=float(os.getenv('EMBEDDING_QUERY_TIMEOUT_SECONDS', '5')))
+    return HashingEmbedder(dim=int(os.getenv('EMBEDDING_HASH_DIM', '512')))
+
+# Global embedding index instance
+embedding_index = EmbeddingIndex(
+    path=os.getenv('EMBEDDING_INDEX_PATH') or os.path.join(
+        os.path.dirname(os.path.dirname(__file__)), 'database', 'embedding_index.npz'),
+    embedder=_create_embedder(),
+    ivf_min_rows=int(os.getenv('EMBEDDING_IVF_MIN_ROWS', '20000')),
+    nprobe=int(os.getenv('EMBEDDING_IVF_NPROBE', '8'))
+)
+
+@event.listens_for(BusinessData, 'after_insert')
+@event.listens_for(BusinessData, 'after_update')
+@event.listens_for(BusinessData, 'after_delete')
+def _track_business_data(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None and target.id is not None:
+        session.info.setdefault('embedding_ids', set()).add(target.id)
+
+@event.listens_for(Session, 'after_commit')
+def _sync_committed_business_data(session):
+    ids = session.info.pop('embedding_ids', None)
+    if ids:
+        embedding_index.request_sync(ids)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_business_data(session):
+    session.info.pop('embedding_ids', None)
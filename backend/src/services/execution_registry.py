@@ -0,0 +1,301 @@
+"""
+Execution Registry for Agent CEO system
+Tracks workflow executions in-process so callers can wait on completion instead of polling
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {'completed', 'failed', 'canceled'}
+
+class _Execution:
+    """Mutable registry entry for one execution"""
+
+    __slots__ = ('execution_id', 'workflow_id', 'task_id', 'status', 'result', 'error', 'data',
+                 'source', 'created_at', 'updated_at', 'finished_at', 'version', 'polls',
+                 'poll_interval', 'next_poll_at', 'signalled')
+
+    def __init__(self, execution_id: str, first_poll_delay: float, initial_interval: float):
+        now = time.time()
+        self.execution_id = execution_id
+        self.workflow_id = None
+        self.task_id = None
+        self.status = 'running'
+        self.result = None
+        self.error = None
+        self.data = None
+        self.source = None
+        self.created_at = now
+        self.updated_at = now
+        self.finished_at = None
+        self.version = 0
+        self.polls = 0
+        self.poll_interval = initial_interval
+        self.next_poll_at = time.monotonic() + first_poll_delay
+        self.signalled = False
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'execution_id': self.execution_id,
+            'workflow_id': self.workflow_id,
+            'task_id': self.task_id,
+            'status': self.status,
+            'done': self.done,
+            'result': self.result,
+            'error': self.error,
+            'execution_data': self.data,
+            'source': self.source,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+            'finished_at': self.finished_at,
+            'version': self.version,
+            'polls': self.polls
+        }
+
+class ExecutionRegistry:
+    """
+    In-process registry of workflow executions
+
+    Executions are recorded when they are triggered and updated when their
+    completion callback arrives, waking anyone blocked in ``wait``. Running
+    executions that have not heard back are resolved by a fallback poller
+    using ``fetch_status``: the first poll waits ``callback_grace`` past the
+    ``expected_callback`` time, then backs off from ``initial_interval`` to
+    ``max_interval``, giving up after ``max_poll_age``. ``find_signalled``
+    can name executions whose callback was applied by another worker
+    process, so those are fetched right away rather than on the backoff
+    schedule.
+    """
+
+    def __init__(self, fetch_status: Callable[[str], Optional[Dict[str, Any]]],
+                 find_signalled: Optional[Callable[[List[str]], Set[str]]] = None,
+                 expected_callback: float = 30.0, callback_grace: float = 15.0,
+                 initial_interval: float = 2.0, max_interval: float = 60.0,
+                 max_poll_age: float = 3600.0, retention: float = 3600.0,
+                 max_records: int = 10000, tick: float = 1.0):
+        self.fetch_status = fetch_status
+        self.find_signalled = find_signalled
+        self.expected_callback = expected_callback
+        self.callback_grace = callback_grace
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.max_poll_age = max_poll_age
+        self.retention = retention
+        self.max_records = max_records
+        self.tick = tick
+
+        self.app = None
+        self._changed = threading.Condition()
+        self._records: 'OrderedDict[str, _Execution]' = OrderedDict()
+        self._stopping = threading.Event()
+        self._pid = None
+        self._thread = None
+        self._stats = {'tracked': 0, 'callbacks': 0, 'polls': 0, 'poll_errors': 0}
+
+    def init_app(self, app):
+        """Bind the Flask app used for the poller's app context"""
+        self.app = app
+
+    def track(self, execution_id: str, workflow_id: str = None, task_id: Any = None,
+              status: str = 'running', data: Any = None, source: str = 'trigger') -> Dict[str, Any]:
+        """
+        Register an execution, leaving an already-known one's status untouched
+
+        Returns:
+            Snapshot of the execution record
+        """
+        self._ensure_started()
+        with self._changed:
+            record = self._records.get(str(execution_id))
+            if record is None:
+                record = self._insert(str(execution_id))
+                self._stats['tracked'] += 1
+                self._apply(record, status=status, data=data, source=source)
+            record.workflow_id = record.workflow_id or workflow_id
+            record.task_id = record.task_id if record.task_id is not None else task_id
+            self._changed.notify_all()
+            return record.to_dict()
+
+    def update(self, execution_id: str, status: str, result: Any = None, error: Any = None,
+               data: Any = None, source: str = 'callback', workflow_id: str = None,
+               task_id: Any = None) -> Dict[str, Any]:
+        """
+        Record a status change and wake waiters
+
+        Returns:
+            Snapshot of the execution record
+        """
+        self._ensure_started()
+        with self._changed:
+            record = self._records.get(str(execution_id))
+            if record is None:
+                record = self._insert(str(execution_id))
+            if source == 'callback':
+                self._stats['callbacks'] += 1
+            record.workflow_id = workflow_id or record.workflow_id
+            record.task_id = task_id if task_id is not None else record.task_id
+            self._apply(record, status=status, result=result, error=error, data=data, source=source)
+            self._changed.notify_all()
+            return record.to_dict()
+
+    def _insert(self, execution_id: str) -> _Execution:
+        record = _Execution(execution_id, self.expected_callback + self.callback_grace, self.initial_interval)
+        self._records[execution_id] = record
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+        return record
+
+    def _apply(self, record: _Execution, status: str, result: Any = None, error: Any = None,
+               data: Any = None, source: str = None):
+        # A finished execution does not go back to running on a late poll
+        if record.done and status not in TERMINAL_STATUSES:
+            return
+        record.status = status
+        record.result = result if result is not None else record.result
+        record.error = error if error is not None else record.error
+        record.data = data if data is not None else record.data
+        record.source = source
+        record.updated_at = time.time()
+        record.version += 1
+        if record.done and record.finished_at is None:
+            record.finished_at = record.updated_at
+
+    def _prune(self):
+        """Drop finished records past retention"""
+        cutoff = time.time() - self.retention
+        for execution_id in [key for key, record in self._records.items()
+                             if record.done and record.finished_at < cutoff]:
+            del self._records[execution_id]
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Get a snapshot of an execution, or None if it is not tracked"""
+        with self._changed:
+            record = self._records.get(str(execution_id))
+            return record.to_dict() if record else None
+
+    def wait(self, execution_id: str, timeout: float, since_version: int = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until an execution finishes (or changes after ``since_version``)
+
+        Args:
+            execution_id: Execution to wait on
+            timeout: Maximum seconds to block
+            since_version: Return on any change past this version instead of waiting for completion
+
+        Returns:
+            Snapshot of the execution record, or None if it is not tracked
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                record = self._records.get(str(execution_id))
+                if record is None:
+                    return None
+                if record.done or (since_version is not None and record.version > since_version):
+                    return record.to_dict()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return record.to_dict()
+                self._changed.wait(remaining)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get registry counters"""
+        with self._changed:
+            running = sum(1 for record in self._records.values() if not record.done)
+            return {**self._stats, 'tracked_now': len(self._records), 'running': running}
+
+    def _ensure_started(self):
+        """Start the fallback poller for this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+
+        with self._changed:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+
+            # Forked from a parent that already started: its executions are not ours
+            if self._pid is not None:
+                self._records = OrderedDict()
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='execution-poller', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.tick):
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self.poll_once()
+                else:
+                    self.poll_once()
+            except Exception as e:
+                logger.error(f"Execution poller error: {str(e)}")
+
+    def poll_once(self) -> int:
+        """
+        Fetch the status of executions whose poll is due
+
+        Returns:
+            Number of executions fetched
+        """
+        now = time.monotonic()
+        with self._changed:
+            self._prune()
+            running = [record for record in self._records.values() if not record.done]
+            stale_cutoff = time.time() - self.max_poll_age
+            running = [record for record in running if record.created_at >= stale_cutoff]
+
+        if not running:
+            return 0
+
+        signalled = set()
+        if self.find_signalled is not None:
+            try:
+                candidates = [record.execution_id for record in running if not record.signalled]
+                signalled = self.find_signalled(candidates) if candidates else set()
+            except Exception as e:
+                logger.warning(f"Execution signal lookup failed: {str(e)}")
+
+        due = [record for record in running
+               if record.execution_id in signalled or record.next_poll_at <= now]
+
+        for record in due:
+            record.signalled = record.signalled or record.execution_id in signalled
+            self._poll(record)
+        return len(due)
+
+    def _poll(self, record: _Execution):
+        self._stats['polls'] += 1
+        try:
+            status = self.fetch_status(record.execution_id)
+        except Exception as e:
+            self._stats['poll_errors'] += 1
+            logger.warning(f"Polling execution {record.execution_id} failed: {str(e)}")
+            status = None
+
+        with self._changed:
+            record.polls += 1
+            record.next_poll_at = time.monotonic() + record.poll_interval
+            record.poll_interval = min(record.poll_interval * 2, self.max_interval)
+
+            if status and status.get('status') and status['status'] != record.status:
+                self._apply(record, status=status['status'], result=status.get('result'),
+                            error=status.get('error'), data=status.get('data'), source='poll')
+                self._changed.notify_all()
+
+    def shutdown(self):
+        """Stop the fallback poller"""
+        self._stopping.set()
+        with self._changed:
+            self._changed.notify_all()
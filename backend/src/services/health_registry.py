@@ -0,0 +1,282 @@
+"""
+Health Registry for Agent CEO system
+Runs service health probes on a background schedule and serves the results from memory
+"""
+
+import atexit
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def default_is_healthy(result: Any) -> bool:
+    """Treat a probe result as healthy unless it reports failure"""
+    if not isinstance(result, dict):
+        return bool(result)
+    return result.get('success', True) is not False and result.get('service_status', 'healthy') == 'healthy'
+
+class _Probe:
+    """Registered probe with its schedule and last result"""
+
+    def __init__(self, name: str, probe: Callable[[], Any], interval: float, timeout: float,
+                 critical: bool, is_healthy: Callable[[Any], bool]):
+        self.name = name
+        self.probe = probe
+        self.interval = interval
+        self.timeout = timeout
+        self.critical = critical
+        self.is_healthy = is_healthy
+
+        self.next_due = None
+        self.future = None
+        self.started_at = None
+        self.timed_out = False
+        self.status = 'pending'
+        self.result = None
+        self.checked_at = None
+        self.checked_monotonic = None
+        self.duration_ms = None
+        self.runs = 0
+        self.failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = time.monotonic() - self.checked_monotonic if self.checked_monotonic is not None else None
+        return {
+            'name': self.name,
+            'status': self.status,
+            'healthy': self.status == 'healthy',
+            'critical': self.critical,
+            'result': self.result,
+            'checked_at': self.checked_at,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'stale': age is None or age > 2 * self.interval + self.timeout,
+            'duration_ms': self.duration_ms,
+            'interval': self.interval,
+            'timeout': self.timeout,
+            'runs': self.runs,
+            'failures': self.failures
+        }
+
+class HealthRegistry:
+    """
+    Central registry of service health probes
+
+    Each service registers a probe with its own interval and timeout. A
+    single scheduler thread runs due probes on a small pool (inside the
+    Flask app context) and caches the outcome, so health endpoints only read
+    memory. A probe that is still running when it comes due again is not
+    started twice, and one that overruns its timeout is reported as
+    ``timeout`` until it returns.
+    """
+
+    def __init__(self, max_workers: int = 4, min_refresh_interval: float = 30.0):
+        self.max_workers = max_workers
+        self.min_refresh_interval = min_refresh_interval
+
+        self.app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._probes: Dict[str, _Probe] = {}
+        self._schedule = []  # heap of (due_monotonic, name)
+        self._pool = None
+        self._pid = None
+        self._thread = None
+
+    def register(self, name: str, probe: Callable[[], Any], interval: float = 60.0,
+                 timeout: float = 10.0, critical: bool = False,
+                 is_healthy: Callable[[Any], bool] = default_is_healthy):
+        """
+        Register (or replace) a health probe
+
+        Args:
+            name: Probe name, e.g. 'email'
+            probe: Zero-argument callable returning the health payload
+            interval: Seconds between runs
+            timeout: Seconds before a running probe is reported as timed out
+            critical: Whether readiness depends on this probe
+            is_healthy: Maps the probe's payload to healthy/unhealthy
+        """
+        with self._lock:
+            entry = _Probe(name, probe, interval, timeout, critical, is_healthy)
+            self._probes[name] = entry
+            self._schedule_first_run(entry)
+        self._wakeup.set()
+
+    def _schedule_first_run(self, probe: _Probe):
+        # Stagger first runs so probes do not all fire at once on boot
+        self._push(probe, time.monotonic() + random.uniform(0, min(probe.interval, 2.0)))
+
+    def _push(self, probe: _Probe, due: float):
+        probe.next_due = due
+        heapq.heappush(self._schedule, (due, probe.name))
+
+    def init_app(self, app):
+        """Bind the Flask app and start the scheduler"""
+        self.app = app
+        self._ensure_started()
+        atexit.register(self.shutdown)
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """Get the cached result of one probe"""
+        self._ensure_started()
+        with self._lock:
+            probe = self._probes.get(name)
+            return probe.snapshot() if probe else None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get the cached results of all probes"""
+        self._ensure_started()
+        with self._lock:
+            return {name: probe.snapshot() for name, probe in self._probes.items()}
+
+    def refresh(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Run one probe now and wait (up to its timeout) for the result
+
+        A run already in flight is joined rather than started twice, and a
+        probe that started less than ``min_refresh_interval`` seconds ago is
+        served from its last result, so on-demand refreshes cannot drive the
+        live check (SMTP logins, outbound calls) faster than that.
+
+        Returns:
+            The probe's snapshot, or None if it is not registered
+        """
+        self._ensure_started()
+        with self._lock:
+            probe = self._probes.get(name)
+            if probe is None:
+                return None
+            now = time.monotonic()
+            recent = probe.started_at is not None and now - probe.started_at < self.min_refresh_interval
+            if probe.future is None or (probe.future.done() and not recent):
+                probe.started_at = now
+                probe.timed_out = False
+                probe.future = self._pool.submit(self._execute, probe)
+                self._push(probe, probe.started_at + probe.interval)
+            future = probe.future
+
+        try:
+            future.result(timeout=probe.timeout)
+        except Exception:
+            pass  # recorded by _execute, or reported as a timeout by the scheduler
+        return self.get(name)
+
+    def is_alive(self) -> bool:
+        """Whether the scheduler thread is running in this process"""
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def is_ready(self) -> bool:
+        """Whether every critical probe last reported healthy and is not stale"""
+        return all(entry['healthy'] and not entry['stale']
+                   for entry in self.snapshot().values() if entry['critical'])
+
+    def _ensure_started(self):
+        """Start the scheduler for this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+
+            # Forked: results and in-flight futures belong to the parent
+            self._schedule = []
+            for name, probe in list(self._probes.items()):
+                self._probes[name] = _Probe(name, probe.probe, probe.interval, probe.timeout,
+                                            probe.critical, probe.is_healthy)
+                self._schedule_first_run(self._probes[name])
+
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='health-probe')
+            self._thread = threading.Thread(target=self._run, name='health-scheduler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self._mark_timeouts(now)
+
+                while self._schedule and self._schedule[0][0] <= now:
+                    due, name = heapq.heappop(self._schedule)
+                    probe = self._probes.get(name)
+                    if probe is None or probe.next_due != due:
+                        continue  # replaced by a later register()
+                    self._push(probe, now + probe.interval)
+                    if probe.future is not None and not probe.future.done():
+                        continue  # previous run still going
+                    probe.started_at = now
+                    probe.timed_out = False
+                    try:
+                        probe.future = self._pool.submit(self._execute, probe)
+                    except RuntimeError:
+                        # Pool shut down (shutdown() or interpreter exit) while we were scheduling
+                        return
+
+                next_due = self._schedule[0][0] - now if self._schedule else 1.0
+
+            self._wakeup.wait(max(min(next_due, 1.0), 0.01))
+            self._wakeup.clear()
+
+    def _mark_timeouts(self, now: float):
+        for probe in self._probes.values():
+            if (probe.future is not None and not probe.future.done() and not probe.timed_out
+                    and now - probe.started_at > probe.timeout):
+                probe.timed_out = True
+                probe.failures += 1
+                probe.status = 'timeout'
+                probe.result = {'error': f"Probe exceeded {probe.timeout}s"}
+                probe.checked_at = datetime.utcnow().isoformat()
+                probe.checked_monotonic = now
+                logger.warning(f"Health probe {probe.name} timed out after {probe.timeout}s")
+
+    def _execute(self, probe: _Probe):
+        started = time.monotonic()
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    result = probe.probe()
+            else:
+                result = probe.probe()
+            status = 'healthy' if probe.is_healthy(result) else 'unhealthy'
+        except Exception as e:
+            logger.error(f"Health probe {probe.name} failed: {str(e)}")
+            result = {'error': str(e)}
+            status = 'error'
+
+        finished = time.monotonic()
+        with self._lock:
+            probe.runs += 1
+            if status != 'healthy' and not probe.timed_out:
+                probe.failures += 1
+            probe.status = status
+            probe.result = result
+            probe.checked_at = datetime.utcnow().isoformat()
+            probe.checked_monotonic = finished
+            probe.duration_ms = round((finished - started) * 1000, 1)
+
+    def shutdown(self, timeout: float = 2.0):
+        """Stop the scheduler"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._pid != os.getpid():
+            return
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+# Global health registry instance
+health_registry = HealthRegistry(
+    max_workers=int(os.getenv('HEALTH_PROBE_WORKERS', '4')),
+    min_refresh_interval=float(os.getenv('HEALTH_REFRESH_MIN_INTERVAL_SECONDS', '30'))
+)
@@ -0,0 +1,213 @@
+"""
+Resilient HTTP client for Agent CEO system
+Shared keep-alive connection pool with jittered retries and per-host circuit breakers
+"""
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+
+class CircuitOpenError(Exception):
+    """Raised when a host's circuit breaker is open and calls are short-circuited"""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}, retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Opens after ``failure_threshold`` consecutive failures, lets a single
+    trial call through after ``reset_timeout`` seconds (half-open), and
+    closes again when that trial succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """Check whether a call may proceed, claiming the half-open trial slot"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+
+class ResilientHttpClient:
+    """
+    Pooled HTTP client with retries and circuit breaking
+
+    One ``requests.Session`` is shared by all callers so connections to a
+    host are kept alive and reused. Failed calls are retried with
+    full-jitter exponential backoff; non-idempotent requests are only
+    retried when the server provably did not process them (connect timeout,
+    429, 503).
+    """
+
+    def __init__(self, pool_size: int = 20, max_retries: int = 3,
+                 backoff_base: float = 0.25, backoff_max: float = 5.0,
+                 timeout: Tuple[float, float] = (3.05, 30.0),
+                 breaker_threshold: int = 5, breaker_reset: float = 30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Get the circuit breaker for a URL's host"""
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+                self._breakers[host] = breaker
+            return breaker
+
+    def breaker_states(self) -> Dict[str, str]:
+        """Get the breaker state per host"""
+        with self._breakers_lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.state for host, breaker in breakers.items()}
+
+    def request(self, method: str, url: str, retry: bool = True,
+                timeout: Union[float, Tuple[float, float], None] = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the pool
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            retry: Whether to retry transient failures
+            timeout: Override of the (connect, read) timeout
+            **kwargs: Passed to ``requests.Session.request``
+
+        Returns:
+            The final response (which may still be an error status)
+
+        Raises:
+            CircuitOpenError: if the host's breaker is open
+            requests.RequestException: if the last attempt failed without a response
+        """
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        breaker = self.breaker(url)
+        attempts = 1 + (self.max_retries if retry else 0)
+
+        for attempt in range(attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(urlsplit(url).netloc, breaker.retry_in())
+
+            delay = None
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.RequestException as e:
+                breaker.record_failure()
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retryable or attempt == attempts - 1:
+                    raise
+                logger.warning(f"{method} {url} failed ({type(e).__name__}), retrying")
+            except Exception:
+                # Release the half-open trial slot whatever went wrong (e.g. a failing hook)
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+                retryable = response.status_code in RETRY_STATUSES and (
+                    idempotent or response.status_code in (429, 503)
+                )
+                if not retryable or attempt == attempts - 1:
+                    return response
+                delay = _retry_after_seconds(response)
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+def _retry_after_seconds(response: requests.Response, cap: float = 30.0) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date)"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return min(max(float(value), 0.0), cap)
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return min(max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0), cap)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,269 @@
+"""
+JSON Profiler for Agent CEO system
+Streams JSON parse events into a merged schema (types and presence per path, array items merged)
+and a size-capped sample, without building or re-serializing the whole document
+"""
+
+import io
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.services.tracing import traced
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson is in requirements.txt; fall back to json + an iterative walk
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[str, Any]
+
+# ijson event -> schema type name
+VALUE_TYPES = {
+    'start_map': 'object', 'start_array': 'array', 'string': 'string', 'number': 'number',
+    'integer': 'number', 'double': 'number', 'boolean': 'boolean', 'null': 'null'
+}
+
+# Errors raised for malformed documents by either parser
+PARSE_ERRORS = (json.JSONDecodeError,) + ((ijson.JSONError,) if ijson is not None else ())
+
+_END = object()
+
+def walk_events(value: Any) -> Iterator[Event]:
+    """ijson-style (event, value) pairs for an already parsed value, using an explicit stack"""
+    stack = [(None, iter((value,)))]
+    while stack:
+        kind, items = stack[-1]
+        item = next(items, _END)
+        if item is _END:
+            stack.pop()
+            if kind:
+                yield f'end_{kind}', None
+            continue
+        if kind == 'map':
+            key, item = item
+            yield 'map_key', str(key)
+        if isinstance(item, dict):
+            yield 'start_map', None
+            stack.append(('map', iter(item.items())))
+        elif isinstance(item, (list, tuple)):
+            yield 'start_array', None
+            stack.append(('array', iter(item)))
+        elif item is None:
+            yield 'null', None
+        elif isinstance(item, bool):
+            yield 'boolean', item
+        elif isinstance(item, (int, float)):
+            yield 'number', item
+        else:
+            yield 'string', item if isinstance(item, str) else str(item)
+
+class _Frame:
+    """An open object or array while consuming events"""
+    __slots__ = ('kind', 'path', 'depth', 'sample', 'key', 'items')
+
+    def __init__(self, kind: str, path: str, depth: int, sample: Any):
+        self.kind = kind
+        self.path = path
+        self.depth = depth
+        self.sample = sample
+        self.key = None
+        self.items = 0
+
+class JsonProfiler:
+    """Single-pass JSON structure profiler with bounded memory"""
+
+    def __init__(self, max_depth: int = 32, max_paths: int = 500, sample_items: int = 3,
+                 sample_keys: int = 50, sample_chars: int = 4000, string_chars: int = 200):
+        self.max_depth = max_depth
+        self.max_paths = max_paths
+        # Sample limits: items per array, keys per object, total characters, characters per string
+        self.sample_items = sample_items
+        self.sample_keys = sample_keys
+        self.sample_chars = sample_chars
+        self.string_chars = string_chars
+
+    def events(self, source: Any) -> Tuple[Iterator[Event], str]:
+        """
+        Parse events for a JSON source
+
+        Args:
+            source: JSON text, bytes, a binary/text file object, or an already parsed value
+
+        Returns:
+            (events, parser name)
+        """
+        if isinstance(source, str):
+            source = source.encode('utf-8')
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        if hasattr(source, 'read'):
+            if ijson is not None:
+                return ijson.basic_parse(source, use_float=True), 'ijson'
+            return walk_events(json.load(source)), 'json'
+        return walk_events(source), 'parsed'
+
+    @traced()
+    def profile(self, source: Any) -> Dict[str, Any]:
+        """
+        Profile a JSON document in one pass over its parse events
+
+        Schema paths use ``$`` for the root, ``.key`` for object members and ``[]`` for
+        array items, so all items of an array are merged into one entry. Presence is the
+        share of parent objects that contain the key.
+
+        Args:
+            source: JSON text, bytes, a file object or an already parsed value
+
+        Returns:
+            Dictionary with the merged schema, counts and a truncated sample
+
+        Raises:
+            ValueError: if the document is not valid JSON
+        """
+        events, parser = self.events(source)
+        schema: Dict[str, Dict[str, Any]] = {}
+        stack: List[_Frame] = []
+        root: List[Any] = []
+        root_type = None
+        remaining = self.sample_chars
+        counters = {'nodes': 0, 'max_depth': 0, 'depth_limited': 0, 'paths_dropped': 0}
+        truncated = False
+
+        try:
+            for event, value in events:
+                if event == 'map_key':
+                    stack[-1].key = value
+                    continue
+                if event in ('end_map', 'end_array'):
+                    frame = stack.pop()
+                    if frame.kind == 'array' and frame.path in schema:
+                        lengths = schema[frame.path].setdefault('length', {'min': frame.items, 'max': 0, 'total': 0})
+                        lengths['min'] = min(lengths['min'], frame.items)
+                        lengths['max'] = max(lengths['max'], frame.items)
+                        lengths['total'] += frame.items
+                    continue
+
+                kind = VALUE_TYPES.get(event)
+                if kind is None:
+                    continue
+                parent = stack[-1] if stack else None
+                if parent is None:
+                    path, depth = '$', 0
+                    root_type = root_type or kind
+                elif parent.kind == 'array':
+                    path, depth = f'{parent.path}[]', parent.depth + 1
+                    parent.items += 1
+                else:
+                    path, depth = f'{parent.path}.{parent.key}', parent.depth + 1
+                counters['nodes'] += 1
+                counters['max_depth'] = max(counters['max_depth'], depth)
+
+                if depth > self.max_depth:
+                    counters['depth_limited'] += 1
+                else:
+                    owner = parent.path if parent is not None and parent.kind == 'map' else None
+                    self._record(schema, path, owner, kind, value, counters)
+
+                # Attach to the sample when the parent is being sampled and limits allow
+                sample = None
+                if parent is None:
+                    take = True
+                elif parent.sample is None:
+                    take = False
+                else:
+                    full = parent.items > self.sample_items if parent.kind == 'array' \
+                        else len(parent.sample) >= self.sample_keys
+                    take = not full and remaining > 0 and depth <= self.max_depth
+                    truncated = truncated or not take
+                if take:
+                    sample = {} if kind == 'object' else [] if kind == 'array' else self._sample_scalar(value)
+                    remaining -= 2 if kind in ('object', 'array') else len(str(sample)) + 2
+                    if parent is not None and parent.kind == 'map':
+                        remaining -= len(parent.key) + 3
+                    if parent is None:
+                        root.append(sample)
+                    elif parent.kind == 'array':
+                        parent.sample.append(sample)
+                    else:
+                        parent.sample[parent.key] = sample
+
+                if kind in ('object', 'array'):
+                    stack.append(_Frame('map' if kind == 'object' else 'array', path, depth,
+                                        sample if take else None))
+        except PARSE_ERRORS as e:
+            raise ValueError(f'Invalid JSON: {e}') from e
+
+        if not root:
+            raise ValueError('Invalid JSON: empty document')
+        return {
+            'root_type': root_type,
+            'parser': parser,
+            **counters,
+            'schema': self._finish(schema),
+            'sample': root[0],
+            'sample_truncated': truncated or remaining <= 0
+        }
+
+    def _record(self, schema: Dict[str, Dict[str, Any]], path: str, owner: Optional[str], kind: str,
+                value: Any, counters: Dict[str, int]):
+        """Fold one value into its path's statistics (``owner`` is the parent object's path for members)"""
+        stats = schema.get(path)
+        if stats is None:
+            if len(schema) >= self.max_paths:
+                counters['paths_dropped'] += 1
+                return
+            stats = schema[path] = {'count': 0, 'types': {}}
+            if owner is not None:
+                stats['_owner'] = owner
+        stats['count'] += 1
+        stats['types'][kind] = stats['types'].get(kind, 0) + 1
+        if kind == 'number':
+            stats['min'] = value if 'min' not in stats else min(stats['min'], value)
+            stats['max'] = value if 'max' not in stats else max(stats['max'], value)
+        elif kind == 'string':
+            stats['max_length'] = max(stats.get('max_length', 0), len(value))
+            examples = stats.setdefault('examples', [])
+            if len(examples) < 3 and value[:60] not in examples:
+                examples.append(value[:60])
+
+    @staticmethod
+    def _finish(schema: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Presence per path (share of parent objects holding the key) and average array lengths"""
+        for stats in schema.values():
+            owner = stats.pop('_owner', None)
+            objects = schema[owner]['types'].get('object', 0) if owner in schema else 0
+            if objects:
+                stats['presence'] = round(stats['count'] / objects, 4)
+            lengths = stats.get('length')
+            if lengths:
+                arrays = stats['types'].get('array', 0)
+                lengths['avg'] = round(lengths.pop('total') / arrays, 2) if arrays else 0
+        return schema
+
+    def _sample_scalar(self, value: Any) -> Any:
+        if isinstance(value, str) and len(value) > self.string_chars:
+            return value[:self.string_chars] + '…'
+        return value
+
+    def digest(self, profile: Dict[str, Any], max_paths: int = 60) -> Dict[str, Any]:
+        """Prompt-sized view of a profile: totals, the first schema paths and the sample"""
+        schema = profile['schema']
+        return {
+            'root_type': profile['root_type'],
+            'nodes': profile['nodes'],
+            'max_depth': profile['max_depth'],
+            'paths': len(schema),
+            'schema': dict(list(schema.items())[:max_paths]),
+            'sample': profile['sample']
+        }
+
+# Global JSON profiler instance
+json_profiler = JsonProfiler(
+    max_depth=int(os.getenv('JSON_PROFILE_MAX_DEPTH', '32')),
+    max_paths=int(os.getenv('JSON_PROFILE_MAX_PATHS', '500')),
+    sample_chars=int(os.getenv('JSON_PROFILE_SAMPLE_CHARS', '4000'))
+)
@@ -0,0 +1,320 @@
+"""
+LLM Router for Agent CEO system
+Routes generations across (provider, model) candidates using rolling latency and error stats
+"""
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Candidate = Tuple[str, str]  # (provider, model)
+
+class LatencyWindow:
+    """Rolling latency and outcome samples for one (provider, model)"""
+
+    def __init__(self, max_samples: int = 200, max_age: float = 600.0):
+        self.max_age = max_age
+        self._samples = deque(maxlen=max_samples)  # (recorded_at, latency_seconds, ok)
+        self._lock = threading.Lock()
+        self.consecutive_failures = 0
+        self.last_failure_at = None
+
+    def record(self, latency: float, ok: bool):
+        now = time.monotonic()
+        with self._lock:
+            self._samples.append((now, latency, ok))
+            if ok:
+                self.consecutive_failures = 0
+            else:
+                self.consecutive_failures += 1
+                self.last_failure_at = now
+
+    def reset(self):
+        """Forget past samples, e.g. once a failing candidate answers again"""
+        with self._lock:
+            self._samples.clear()
+            self.consecutive_failures = 0
+            self.last_failure_at = None
+
+    def summary(self) -> Dict[str, Any]:
+        """Get sample count, error rate and p50/p95 of successful calls"""
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            samples = [sample for sample in self._samples if sample[0] >= cutoff]
+            consecutive_failures = self.consecutive_failures
+            last_failure_at = self.last_failure_at
+
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            'count': len(samples),
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'p50': _percentile(latencies, 0.50),
+            'p95': _percentile(latencies, 0.95),
+            'consecutive_failures': consecutive_failures,
+            'seconds_since_failure': time.monotonic() - last_failure_at if last_failure_at else None
+        }
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class LLMRouter:
+    """
+    Latency-aware router with failover and optional hedging
+
+    Candidates are ranked per call: ones that are failing (high recent error
+    rate, or several consecutive failures within ``cooldown`` seconds) go
+    last; the rest are ordered by p50 latency inflated by their error rate.
+    Candidates without enough samples yet are assumed as fast as the best
+    measured one and keep the caller's order on ties, so a preferred model
+    is tried (and measured) rather than starved. Once per ``cooldown`` a
+    failing candidate is moved first for a single probe call; if it answers,
+    its window is reset and it is ranked afresh. A failed call fails over to
+    the next candidate.
+
+    With hedging on, if the first candidate has not answered by its own p95
+    a second request goes to the next candidate and whichever succeeds first
+    wins. The loser cannot be aborted mid-request, so its result is simply
+    discarded (its latency is still recorded).
+    """
+
+    def __init__(self, call: Callable[..., Dict[str, Any]], hedge: bool = False,
+                 min_samples: int = 5, hedge_min_samples: int = 20, min_hedge_delay: float = 1.0,
+                 error_threshold: float = 0.5, failure_streak: int = 3, cooldown: float = 30.0,
+                 max_workers: int = 16):
+        self.call = call
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.hedge_min_samples = hedge_min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.error_threshold = error_threshold
+        self.failure_streak = failure_streak
+        self.cooldown = cooldown
+        self.max_workers = max_workers
+
+        self._windows: Dict[Candidate, LatencyWindow] = {}
+        self._windows_lock = threading.Lock()
+        self._probed_at: Dict[Candidate, float] = {}
+        self._pool = None
+        self._pool_pid = None
+        self._stats = {'calls': 0, 'failovers': 0, 'hedges': 0, 'hedge_wins': 0, 'probes': 0}
+
+    def window(self, candidate: Candidate) -> LatencyWindow:
+        with self._windows_lock:
+            window = self._windows.get(candidate)
+            if window is None:
+                window = LatencyWindow()
+                self._windows[candidate] = window
+            return window
+
+    def is_healthy(self, summary: Dict[str, Any]) -> bool:
+        if summary['count'] >= self.min_samples and summary['error_rate'] >= self.error_threshold:
+            return False
+        recently_failed = summary['seconds_since_failure'] is not None and summary['seconds_since_failure'] < self.cooldown
+        return not (summary['consecutive_failures'] >= self.failure_streak and recently_failed)
+
+    def candidate_health(self, candidates: List[Candidate]) -> Dict[str, Dict[str, Any]]:
+        """
+        Passive health of candidates from their recent calls (no requests are made)
+
+        Returns:
+            'provider:model' -> status ('healthy', 'failing' or 'unknown' without samples),
+            sample count and error rate
+        """
+        health = {}
+        for provider, model in candidates:
+            summary = self.window((provider, model)).summary()
+            if not summary['count']:
+                status = 'unknown'
+            else:
+                status = 'healthy' if self.is_healthy(summary) else 'failing'
+            health[f'{provider}:{model}'] = {
+                'status': status,
+                'count': summary['count'],
+                'error_rate': round(summary['error_rate'], 3)
+            }
+        return health
+
+    def rank(self, candidates: List[Candidate]) -> List[Candidate]:
+        """Order candidates best-first for the next call"""
+        summaries = {candidate: self.window(candidate).summary() for candidate in candidates}
+        healthy = {candidate: self.is_healthy(summary) for candidate, summary in summaries.items()}
+
+        expected = {}
+        for candidate, summary in summaries.items():
+            if summary['count'] >= self.min_samples and summary['p50'] is not None:
+                expected[candidate] = summary['p50'] * (1 + summary['error_rate'])
+        optimistic = min((expected[c] for c in expected if healthy[c]), default=0.0)
+
+        ordered = [candidate for _, candidate in sorted(
+            enumerate(candidates),
+            key=lambda indexed: (not healthy[indexed[1]], expected.get(indexed[1], optimistic), indexed[0])
+        )]
+
+        probe = self._claim_probe([c for c in ordered if not healthy[c]], summaries)
+        if probe is not None:
+            ordered.remove(probe)
+            ordered.insert(0, probe)
+        return ordered
+
+    def _claim_probe(self, failing: List[Candidate], summaries: Dict[Candidate, Dict[str, Any]]) -> Optional[Candidate]:
+        """Pick a failing candidate whose cooldown has passed, at most one probe per cooldown each"""
+        now = time.monotonic()
+        with self._windows_lock:
+            for candidate in failing:
+                since_failure = summaries[candidate]['seconds_since_failure']
+                if since_failure is not None and since_failure < self.cooldown:
+                    continue
+                if now - self._probed_at.get(candidate, float('-inf')) < self.cooldown:
+                    continue
+                self._probed_at[candidate] = now
+                self._stats['probes'] += 1
+                return candidate
+        return None
+
+    def generate(self, candidates: List[Candidate], **kwargs) -> Dict[str, Any]:
+        """
+        Run a generation against the best candidate, failing over on errors
+
+        Args:
+            candidates: (provider, model) pairs the caller accepts, in preference order
+            **kwargs: Passed to the provider call
+
+        Returns:
+            The provider result with a 'routing' block describing the attempts
+        """
+        self._stats['calls'] += 1
+        ordered = self.rank(candidates)
+        attempts = []
+        last_error = None
+
+        position = 0
+        while position < len(ordered):
+            primary = ordered[position]
+            hedge_with = ordered[position + 1] if position + 1 < len(ordered) else None
+            hedge_delay = self._hedge_delay(primary) if self.hedge and hedge_with else None
+
+            if hedge_delay is None:
+                result = self._timed_call(primary, kwargs)
+                attempts.append(self._attempt(primary, result))
+                position += 1
+            else:
+                result, used = self._hedged_call(primary, hedge_with, hedge_delay, kwargs, attempts)
+                position += used
+
+            if result.get('success'):
+                result['routing'] = {'attempts': attempts, 'candidates': ordered}
+                return result
+
+            last_error = result.get('error')
+            if position < len(ordered):
+                self._stats['failovers'] += 1
+                logger.warning(f"LLM call to {primary[0]}/{primary[1]} failed, failing over: {last_error}")
+
+        return {
+            'success': False,
+            'error': last_error or 'No LLM candidates available',
+            'text': '',
+            'usage': {},
+            'routing': {'attempts': attempts, 'candidates': ordered}
+        }
+
+    def _hedge_delay(self, candidate: Candidate) -> Optional[float]:
+        summary = self.window(candidate).summary()
+        if summary['count'] < self.hedge_min_samples or summary['p95'] is None:
+            return None
+        return max(summary['p95'], self.min_hedge_delay)
+
+    def _hedged_call(self, primary: Candidate, secondary: Candidate, delay: float,
+                     kwargs: Dict[str, Any], attempts: List[Dict[str, Any]]):
+        """Race primary against a delayed secondary; returns (result, candidates consumed)"""
+        pool = self._get_pool()
+        # Each task runs in a copy of the caller's context so trace spans nest under the request
+        futures = {pool.submit(contextvars.copy_context().run, self._timed_call, primary, kwargs): primary}
+        done, _ = wait(futures, timeout=delay)
+
+        if not done:
+            self._stats['hedges'] += 1
+            futures[pool.submit(contextvars.copy_context().run, self._timed_call, secondary, kwargs)] = secondary
+
+        winner = None
+        result = None
+        pending = set(futures)
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                candidate_result = future.result()
+                attempts.append(self._attempt(futures[future], candidate_result))
+                if winner is None and candidate_result.get('success'):
+                    winner, result = future, candidate_result
+                elif winner is None:
+                    result = candidate_result
+
+        if winner is not None and futures[winner] == secondary:
+            self._stats['hedge_wins'] += 1
+        for future in pending:
+            future.cancel()  # only effective if it has not started yet
+
+        return result, len(futures)
+
+    def _timed_call(self, candidate: Candidate, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        provider, model = candidate
+        started = time.monotonic()
+        try:
+            result = self.call(provider=provider, model=model, **kwargs)
+        except Exception as e:
+            result = {'success': False, 'error': str(e), 'text': '', 'usage': {}}
+        latency = time.monotonic() - started
+        window = self.window(candidate)
+        if result.get('success') and candidate in self._probed_at:
+            # A probed candidate answered: rank it on fresh samples
+            with self._windows_lock:
+                probed = self._probed_at.pop(candidate, None) is not None
+            if probed:
+                window.reset()
+        window.record(latency, bool(result.get('success')))
+        result['latency_ms'] = round(latency * 1000, 1)
+        return result
+
+    def _attempt(self, candidate: Candidate, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'provider': candidate[0],
+            'model': candidate[1],
+            'success': bool(result.get('success')),
+            'latency_ms': result.get('latency_ms'),
+            'error': None if result.get('success') else result.get('error')
+        }
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Get the hedging pool, recreating it after a fork"""
+        with self._windows_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='llm-hedge')
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        """Get router counters and per-candidate latency stats"""
+        with self._windows_lock:
+            windows = dict(self._windows)
+        candidates = {}
+        for (provider, model), window in windows.items():
+            summary = window.summary()
+            candidates[f'{provider}:{model}'] = {
+                'count': summary['count'],
+                'error_rate': round(summary['error_rate'], 3),
+                'p50_ms': round(summary['p50'] * 1000, 1) if summary['p50'] is not None else None,
+                'p95_ms': round(summary['p95'] * 1000, 1) if summary['p95'] is not None else None,
+                'healthy': self.is_healthy(summary)
+            }
+        return {**self._stats, 'hedging': self.hedge, 'candidates': candidates}
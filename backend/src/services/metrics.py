@@ -0,0 +1,282 @@
+"""
+Metrics Service for Agent CEO system
+Prometheus counters and histograms sharded per thread, plus gauges collected at scrape time
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Seconds; request latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Seconds; LLM calls run far longer than ordinary requests
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[str, ...]
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class _Shards:
+    """
+    Per-thread value maps, merged when scraped
+
+    Each thread only ever writes its own dict, so the hot path takes no lock
+    and threads never contend on a shared counter. Shards of threads that
+    have exited are folded into ``retired`` at the next scrape.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Labels, Any]]] = []
+        self._retired: Dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+
+    def local(self) -> Dict[Labels, Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[Labels, Any] = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), values))
+            self._local.values = values
+            return values
+
+    def collect(self, merge: Callable[[Any, Any], Any]) -> Dict[Labels, Any]:
+        with self._lock:
+            live = []
+            for thread, values in self._shards:
+                if thread.is_alive():
+                    live.append((thread, values))
+                else:
+                    for key, value in list(values.items()):
+                        self._retired[key] = merge(self._retired.get(key), value)
+            self._shards = live
+            merged = {key: merge(None, value) for key, value in self._retired.items()}
+            for _, values in live:
+                for key, value in list(values.items()):
+                    merged[key] = merge(merged.get(key), value)
+        return merged
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        values = self._shards.local()
+        values[key] = values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        merged = self._shards.collect(lambda total, value: (total or 0.0) + value)
+        for key, value in sorted(merged.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Bucketed distribution with sum and count"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        values = self._shards.local()
+        row = values.get(key)
+        if row is None:
+            # one slot per bucket, one for +Inf, then the running sum
+            row = values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    @staticmethod
+    def _merge(total: Optional[list], row: list) -> list:
+        if total is None:
+            return list(row)
+        return [a + b for a, b in zip(total, row)]
+
+    def expose(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        merged = self._shards.collect(self._merge)
+        names = self.labelnames + ('le',)
+        for key, row in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(row[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+def family(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, Any], float]],
+           metric_type: str = 'gauge') -> Dict[str, Any]:
+    """
+    A metric family produced by a scrape-time collector
+
+    Args:
+        name: Metric name
+        documentation: HELP text
+        samples: (labels, value) pairs
+        metric_type: 'gauge' or 'counter'
+    """
+    return {'name': name, 'documentation': documentation, 'type': metric_type, 'samples': list(samples)}
+
+class MetricsRegistry:
+    """
+    Metrics exposed on /metrics
+
+    Counters and histograms are updated inline on hot paths. Values that
+    services already track (queue depths, pool usage, cache counters) are
+    read by collectors registered with ``register_collector`` when scraped.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, name: str, collector: Callable[[], Iterable[Dict[str, Any]]]):
+        """
+        Register a scrape-time collector
+
+        Args:
+            name: Collector name; registering the same name again replaces it
+            collector: Zero-argument callable returning ``family(...)`` dicts
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def init_app(self, app):
+        """Time every request by blueprint, route, method and status"""
+        if not self.enabled:
+            return
+        app.before_request(_start_request_timer)
+        app.after_request(_observe_request)
+
+        from src.models.user import db
+
+        def collect_db_pool():
+            pool = db.engine.pool
+            if not hasattr(pool, 'checkedout'):
+                return []
+            size = pool.size()
+            checked_out = pool.checkedout()
+            capacity = size + max(getattr(pool, '_max_overflow', 0), 0)
+            return [
+                family('db_pool_size', 'Configured connection pool size', [({}, size)]),
+                family('db_pool_checked_out', 'Connections currently checked out', [({}, checked_out)]),
+                family('db_pool_overflow', 'Connections open beyond the pool size', [({}, pool.overflow())]),
+                family('db_pool_utilization', 'Checked out connections over pool size plus max overflow',
+                       [({}, checked_out / capacity if capacity else 0.0)])
+            ]
+
+        self.register_collector('db_pool', collect_db_pool)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+
+        # Several collectors may contribute samples to one family (e.g. queue_depth)
+        families: Dict[str, Dict[str, Any]] = {}
+        for collector_name, collector in collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector_name} failed: {e}")
+                continue
+            for item in collected:
+                merged = families.setdefault(item['name'], {**item, 'samples': []})
+                merged['samples'].extend(item['samples'])
+
+        for name, item in families.items():
+            lines.append(f"# HELP {name} {item['documentation']}")
+            lines.append(f"# TYPE {name} {item['type']}")
+            for labels, value in item['samples']:
+                if value is None:
+                    continue
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} "
+                             f"{_format_value(float(value))}")
+        return '\n'.join(lines) + '\n'
+
+# Global metrics registry instance
+metrics = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', 'true').lower() == 'true')
+
+http_request_duration = metrics.histogram(
+    'http_request_duration_seconds',
+    'Request latency by blueprint, route, method and status',
+    ('blueprint', 'route', 'method', 'status')
+)
+
+def _start_request_timer():
+    g._metrics_started = time.perf_counter()
+
+def _observe_request(response):
+    started = g.pop('_metrics_started', None)
+    if started is not None:
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            blueprint=request.blueprint or '',
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
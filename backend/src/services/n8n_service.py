@@ -3,15 +3,37 @@ n8n Integration Service for Agent CEO system
 Handles communication with n8n workflows and automation
 """
 
+import contextvars
 import json
-import requests
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import os
+from src.models.webhook import WebhookReceipt
+from src.services.execution_registry import ExecutionRegistry
+from src.services.health_registry import health_registry
+from src.services.metrics import family, metrics
+from src.services.http_client import ResilientHttpClient
 
 logger = logging.getLogger(__name__)
 
+# n8n execution and callback statuses -> registry statuses
+EXECUTION_STATUS_MAP = {
+    'new': 'running',
+    'running': 'running',
+    'waiting': 'running',
+    'success': 'completed',
+    'succeeded': 'completed',
+    'completed': 'completed',
+    'error': 'failed',
+    'failed': 'failed',
+    'crashed': 'failed',
+    'canceled': 'canceled',
+    'cancelled': 'canceled'
+}
+
 class N8nService:
     """Service for integrating with n8n workflow automation"""
     
@@ -27,6 +49,45 @@ class N8nService:
         
         if self.n8n_api_key:
             self.headers['Authorization'] = f'Bearer {self.n8n_api_key}'
+        
+        # Shared keep-alive pool with retries and a per-host circuit breaker
+        self.http = ResilientHttpClient(
+            pool_size=int(os.getenv('N8N_POOL_SIZE', '20')),
+            max_retries=int(os.getenv('N8N_MAX_RETRIES', '3')),
+            timeout=(float(os.getenv('N8N_CONNECT_TIMEOUT', '3.05')),
+                     float(os.getenv('N8N_READ_TIMEOUT', '30'))),
+            breaker_threshold=int(os.getenv('N8N_BREAKER_THRESHOLD', '5')),
+            breaker_reset=float(os.getenv('N8N_BREAKER_RESET_SECONDS', '30'))
+        )
+        
+        # Concurrency for trigger_many fan-out
+        self.fanout_workers = int(os.getenv('N8N_FANOUT_WORKERS', '8'))
+        self.scrape_chunk_size = int(os.getenv('N8N_SCRAPE_CHUNK_SIZE', '5'))
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        
+        # Executions resolve from completion callbacks; the n8n API is only a fallback
+        self.executions = ExecutionRegistry(
+            fetch_status=self._fetch_execution_status,
+            find_signalled=self._find_signalled_executions,
+            expected_callback=float(os.getenv('N8N_EXECUTION_EXPECTED_SECONDS', '30')),
+            callback_grace=float(os.getenv('N8N_EXECUTION_CALLBACK_GRACE_SECONDS', '15')),
+            initial_interval=float(os.getenv('N8N_EXECUTION_POLL_MIN_SECONDS', '2')),
+            max_interval=float(os.getenv('N8N_EXECUTION_POLL_MAX_SECONDS', '60'))
+        )
+    
+    def init_app(self, app):
+        """Bind the app used by the execution fallback poller"""
+        self.executions.init_app(app)
+    
+    def shutdown(self):
+        """Stop the execution poller and the fan-out pool"""
+        self.executions.shutdown()
+        with self._executor_lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+                self._executor = None
     
     def trigger_workflow(self, workflow_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -47,12 +108,15 @@ class N8nService:
                 'timestamp': datetime.utcnow().isoformat()
             }
             
-            response = requests.post(url, json=payload, headers=self.headers, timeout=30)
+            response = self.http.post(url, json=payload, headers=self.headers)
             
             if response.status_code == 200:
+                execution_id = response.json().get('data', {}).get('id')
+                if execution_id:
+                    self.executions.track(execution_id, workflow_id=workflow_id)
                 return {
                     'success': True,
-                    'execution_id': response.json().get('data', {}).get('id'),
+                    'execution_id': execution_id,
                     'result': response.json()
                 }
             else:
@@ -83,12 +147,16 @@ class N8nService:
         try:
             url = f"{self.webhook_base_url}/{webhook_name}"
             
-            response = requests.post(url, json=data, timeout=30)
+            response = self.http.post(url, json=data)
             
             if response.status_code in [200, 201]:
+                body = response.json() if response.content else {}
+                execution_id = body.get('execution_id') or body.get('executionId') if isinstance(body, dict) else None
+                if execution_id:
+                    self.executions.track(execution_id)
                 return {
                     'success': True,
-                    'response': response.json() if response.content else {}
+                    'response': body
                 }
             else:
                 logger.error(f"n8n webhook trigger failed: {response.status_code} - {response.text}")
@@ -104,6 +172,50 @@ class N8nService:
                 'error': str(e)
             }
     
+    def trigger_many(self, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Trigger several workflows or webhooks concurrently
+        
+        Args:
+            calls: Call specs, each either {'webhook': name, 'data': {...}}
+                   or {'workflow_id': id, 'data': {...}}
+            
+        Returns:
+            Dictionary with per-call results in input order
+        """
+        def run(call: Dict[str, Any]) -> Dict[str, Any]:
+            if call.get('webhook'):
+                return self.trigger_webhook(call['webhook'], call.get('data', {}))
+            if call.get('workflow_id'):
+                return self.trigger_workflow(call['workflow_id'], call.get('data', {}))
+            return {'success': False, 'error': 'Call needs a webhook or workflow_id'}
+        
+        if len(calls) <= 1:
+            results = [run(call) for call in calls]
+        else:
+            # Copy the caller's context per call so trace spans nest under the request
+            executor = self._get_executor()
+            futures = [executor.submit(contextvars.copy_context().run, run, call) for call in calls]
+            results = [future.result() for future in futures]
+        
+        succeeded = sum(1 for result in results if result.get('success'))
+        return {
+            'success': succeeded == len(results),
+            'partial': 0 < succeeded < len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the fan-out pool, recreating it after a fork"""
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.fanout_workers,
+                                                    thread_name_prefix='n8n-fanout')
+                self._executor_pid = os.getpid()
+            return self._executor
+    
     def create_social_media_post(self, platform: str, content: str, 
                                schedule_time: str = None, media_urls: List[str] = None) -> Dict[str, Any]:
         """
@@ -184,17 +296,26 @@ class N8nService:
             data_types: Types of data to extract (contacts, company_info, etc.)
             
         Returns:
-            Dictionary with scraping result
+            Dictionary with per-chunk scraping results (see trigger_many)
         """
         
-        webhook_data = {
-            'action': 'scrape_data',
-            'target_urls': target_urls,
-            'data_types': data_types,
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        timestamp = datetime.utcnow().isoformat()
+        chunks = [target_urls[i:i + self.scrape_chunk_size]
+                  for i in range(0, len(target_urls), self.scrape_chunk_size)]
         
-        return self.trigger_webhook('web-scraping', webhook_data)
+        # One workflow run per chunk of URLs, triggered concurrently
+        return self.trigger_many([
+            {
+                'webhook': 'web-scraping',
+                'data': {
+                    'action': 'scrape_data',
+                    'target_urls': chunk,
+                    'data_types': data_types,
+                    'timestamp': timestamp
+                }
+            }
+            for chunk in chunks
+        ])
     
     def sync_crm_data(self, crm_platform: str, sync_type: str = 'bidirectional') -> Dict[str, Any]:
         """
@@ -226,17 +347,26 @@ class N8nService:
             analysis_types: Types of analysis (pricing, content, social_media, etc.)
             
         Returns:
-            Dictionary with analysis result
+            Dictionary with per-competitor analysis results (see trigger_many)
         """
         
-        webhook_data = {
-            'action': 'analyze_competitors',
-            'competitors': competitors,
-            'analysis_types': analysis_types,
-            'timestamp': datetime.utcnow().isoformat()
-        }
+        timestamp = datetime.utcnow().isoformat()
         
-        return self.trigger_webhook('competitor-analysis', webhook_data)
+        # One workflow run per competitor, triggered concurrently
+        result = self.trigger_many([
+            {
+                'webhook': 'competitor-analysis',
+                'data': {
+                    'action': 'analyze_competitors',
+                    'competitors': [competitor],
+                    'analysis_types': analysis_types,
+                    'timestamp': timestamp
+                }
+            }
+            for competitor in competitors
+        ])
+        result['competitors'] = competitors
+        return result
     
     def schedule_content_calendar(self, content_items: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -270,19 +400,24 @@ class N8nService:
         try:
             url = f"{self.n8n_base_url}/api/v1/executions/{execution_id}"
             
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.http.get(url, headers=self.headers, timeout=(3.05, 10))
             
             if response.status_code == 200:
                 execution_data = response.json()
+                execution = execution_data.get('data') or execution_data
+                status = execution.get('status')
+                if status is None and 'finished' in execution:
+                    status = 'success' if execution['finished'] else 'running'
                 return {
                     'success': True,
-                    'status': execution_data.get('data', {}).get('status'),
+                    'status': status,
                     'execution_data': execution_data
                 }
             else:
                 return {
                     'success': False,
-                    'error': f"HTTP {response.status_code}: {response.text}"
+                    'error': f"HTTP {response.status_code}: {response.text}",
+                    'status_code': response.status_code
                 }
                 
         except Exception as e:
@@ -292,6 +427,52 @@ class N8nService:
                 'error': str(e)
             }
     
+    def record_callback(self, kind: str, payload: Dict[str, Any]):
+        """
+        Update the execution registry from an n8n completion callback
+        
+        Args:
+            kind: Callback kind (task-completed, workflow-error)
+            payload: Webhook JSON body
+        """
+        execution_id = payload.get('execution_id')
+        if not execution_id or kind not in ('task-completed', 'workflow-error'):
+            return
+        
+        if kind == 'workflow-error':
+            self.executions.update(execution_id, 'failed', error=payload.get('error', {}),
+                                   workflow_id=payload.get('workflow_id'), task_id=payload.get('task_id'))
+        else:
+            status = EXECUTION_STATUS_MAP.get(str(payload.get('status', 'completed')).lower(), 'completed')
+            self.executions.update(execution_id, status, result=payload.get('result', {}),
+                                   workflow_id=payload.get('workflow_id'), task_id=payload.get('task_id'))
+    
+    def _fetch_execution_status(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Fallback poll of the n8n API for one execution"""
+        result = self.get_workflow_status(execution_id)
+        if not result.get('success'):
+            return None
+        
+        return {
+            'status': EXECUTION_STATUS_MAP.get(str(result.get('status')).lower(), 'running'),
+            'data': result.get('execution_data')
+        }
+    
+    def _find_signalled_executions(self, execution_ids: List[str]) -> set:
+        """Executions whose completion callback was already applied by any worker"""
+        keys = {}
+        for execution_id in execution_ids:
+            keys[f'task-completed:{execution_id}'] = execution_id
+            keys[f'workflow-error:{execution_id}'] = execution_id
+        
+        key_list = list(keys)
+        signalled = set()
+        for i in range(0, len(key_list), 500):
+            rows = WebhookReceipt.query.with_entities(WebhookReceipt.dedupe_key) \
+                .filter(WebhookReceipt.dedupe_key.in_(key_list[i:i + 500]))
+            signalled.update(keys[key] for (key,) in rows)
+        return signalled
+    
     def list_workflows(self) -> Dict[str, Any]:
         """
         List all available n8n workflows
@@ -302,7 +483,7 @@ class N8nService:
         try:
             url = f"{self.n8n_base_url}/api/v1/workflows"
             
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = self.http.get(url, headers=self.headers, timeout=(3.05, 10))
             
             if response.status_code == 200:
                 workflows = response.json().get('data', [])
@@ -334,7 +515,7 @@ class N8nService:
         try:
             url = f"{self.n8n_base_url}/healthz"
             
-            response = requests.get(url, timeout=5)
+            response = self.http.get(url, retry=False, timeout=5)
             
             if response.status_code == 200:
                 return {
@@ -360,3 +541,9 @@ class N8nService:
 # Global n8n service instance
 n8n_service = N8nService()
 
+health_registry.register('n8n', n8n_service.health_check, interval=30, timeout=10)
+
+metrics.register_collector('n8n_executions', lambda: [
+    family('queue_depth', 'Items waiting in in-process queues',
+           [({'queue': 'n8n_executions'}, n8n_service.executions.stats()['running'])])
+])
@@ -0,0 +1,186 @@
+"""
+n8n Webhook Ingestion Service for Agent CEO system
+Buffers n8n callbacks and applies them to tasks and leads in batches
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from src.models.agent import BusinessData, Task, db
+from src.models.webhook import WebhookReceipt
+from src.services.metrics import family, metrics
+from src.services.n8n_service import n8n_service
+from src.services.webhook_buffer import WebhookBuffer
+
+logger = logging.getLogger(__name__)
+
+TASK_STATUS_MAP = {
+    'completed': 'completed',
+    'success': 'completed',
+    'succeeded': 'completed',
+    'failed': 'failed',
+    'error': 'failed',
+    'crashed': 'failed'
+}
+
+class N8nWebhookService:
+    """Service for ingesting n8n callback webhooks"""
+
+    def __init__(self):
+        default_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'webhook_buffer')
+
+        self.buffer = WebhookBuffer(
+            name='n8n-webhooks',
+            handler=self.apply_batch,
+            directory=os.getenv('N8N_WEBHOOK_BUFFER_DIR', default_dir),
+            max_pending=int(os.getenv('N8N_WEBHOOK_MAX_PENDING', '5000')),
+            batch_size=int(os.getenv('N8N_WEBHOOK_BATCH_SIZE', '200')),
+            fsync=os.getenv('N8N_WEBHOOK_FSYNC', 'false').lower() == 'true',
+            max_attempts=int(os.getenv('N8N_WEBHOOK_MAX_ATTEMPTS', '5'))
+        )
+
+    def init_app(self, app):
+        """Start the buffer's drain thread for this app"""
+        self.buffer.init_app(app)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the drain thread after applying what is still buffered"""
+        self.buffer.shutdown(timeout)
+
+    def ingest(self, kind: str, payload: Dict[str, Any]) -> bool:
+        """
+        Queue a callback for batched processing
+
+        Args:
+            kind: Callback kind (task-completed, workflow-error, lead-generated)
+            payload: Webhook JSON body
+
+        Returns:
+            True if queued, False if it duplicates a recent callback
+
+        Raises:
+            ValueError: when the payload (or a lead-generated ``lead``) is not an object
+            BufferFullError: when the intake is saturated
+        """
+        self.validate(kind, payload)
+        queued = self.buffer.append(kind, payload, dedupe_key=self.dedupe_key(kind, payload))
+        
+        # Wake anyone waiting on this execution without waiting for the drain
+        n8n_service.record_callback(kind, payload)
+        return queued
+
+    def validate(self, kind: str, payload: Any):
+        """Reject callbacks whose body could not be applied, before they are buffered"""
+        if not isinstance(payload, dict):
+            raise ValueError('Webhook body must be a JSON object')
+        if kind == 'lead-generated' and not isinstance(payload.get('lead') or {}, dict):
+            raise ValueError('lead must be a JSON object')
+
+    def dedupe_key(self, kind: str, payload: Dict[str, Any]) -> Optional[str]:
+        """Build the idempotency key for a callback, keyed on execution_id"""
+        execution_id = payload.get('execution_id')
+        if not execution_id:
+            return None
+
+        if kind == 'lead-generated':
+            # One execution can emit many leads
+            lead = payload.get('lead') or {}
+            lead_ref = lead.get('id') or lead.get('email') or ''
+            return f"{kind}:{execution_id}:{lead_ref}"
+
+        return f"{kind}:{execution_id}"
+
+    def apply_batch(self, records: List[Dict[str, Any]]):
+        """
+        Apply a batch of buffered callbacks in a single transaction
+
+        Receipts are written alongside the changes, so a batch replayed after
+        a crash (or delivered to two workers) is applied at most once.
+        """
+        keys = [record['dedupe_key'] for record in records if record.get('dedupe_key')]
+        applied = set()
+        if keys:
+            applied = {
+                key for (key,) in db.session.query(WebhookReceipt.dedupe_key)
+                .filter(WebhookReceipt.dedupe_key.in_(keys))
+            }
+
+        task_updates: Dict[int, Dict[str, Any]] = {}
+        leads = []
+        receipts = []
+
+        for record in records:
+            key = record.get('dedupe_key')
+            if key:
+                if key in applied:
+                    continue
+                applied.add(key)
+                receipts.append(WebhookReceipt(dedupe_key=key, kind=record['kind']))
+
+            payload = record['payload']
+            kind = record['kind']
+
+            if kind in ('task-completed', 'workflow-error'):
+                task_id = payload.get('task_id')
+                if task_id is None:
+                    if kind == 'workflow-error':
+                        logger.warning(f"n8n workflow error without task: {payload.get('workflow_id')}, "
+                                       f"execution: {payload.get('execution_id')}, error: {payload.get('error')}")
+                    continue
+                try:
+                    task_updates[int(task_id)] = record
+                except (TypeError, ValueError):
+                    logger.warning(f"Ignoring n8n callback with invalid task_id: {task_id}")
+
+            elif kind == 'lead-generated':
+                lead = payload.get('lead') or {}
+                business_data = BusinessData(
+                    data_type='lead',
+                    source=payload.get('source', 'n8n_workflow')
+                )
+                business_data.set_data_content(lead)
+                leads.append(business_data)
+
+        if task_updates:
+            for task in Task.query.filter(Task.id.in_(list(task_updates))):
+                self._apply_task_update(task, task_updates[task.id])
+
+        db.session.add_all(leads)
+        db.session.add_all(receipts)
+        db.session.commit()
+
+        if task_updates or leads:
+            logger.info(f"Applied n8n callbacks: {len(task_updates)} task updates, {len(leads)} leads")
+
+    def _apply_task_update(self, task: Task, record: Dict[str, Any]):
+        """Apply a completion or error callback to a task row"""
+        payload = record['payload']
+        now = datetime.utcnow()
+
+        if record['kind'] == 'workflow-error':
+            status = 'failed'
+            n8n_result = {'error': payload.get('error', {})}
+        else:
+            status = TASK_STATUS_MAP.get(str(payload.get('status', 'completed')).lower(), 'completed')
+            n8n_result = payload.get('result', {})
+
+        result = task.get_result()
+        result.update({
+            'n8n': n8n_result,
+            'workflow_id': payload.get('workflow_id'),
+            'execution_id': payload.get('execution_id')
+        })
+
+        task.set_result(result)
+        task.status = status
+        task.started_at = task.started_at or now
+        task.completed_at = now
+
+# Global n8n webhook service instance
+n8n_webhook_service = N8nWebhookService()
+
+metrics.register_collector('n8n_webhooks', lambda: [
+    family('queue_depth', 'Items waiting in in-process queues',
+           [({'queue': 'n8n_webhooks'}, n8n_webhook_service.buffer.stats()['pending'])])
+])
@@ -0,0 +1,269 @@
+"""
+Prompt Builder for Agent CEO system
+Token-aware prompt assembly: compact JSON, prioritized sections and budget truncation
+"""
+
+import json
+import logging
+import math
+import os
+import string
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Input + output context per model family (prefix match, longest first)
+CONTEXT_WINDOWS = {
+    'gpt-4.5': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4o': 128000,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+    'claude-3': 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens held back for chat framing and counting error
+SAFETY_MARGIN = 64
+
+TRUNCATION_MARKER = ' …[truncated]'
+
+def context_window(model: Optional[str]) -> int:
+    """Get the context window for a model"""
+    if model:
+        for prefix in sorted(CONTEXT_WINDOWS, key=len, reverse=True):
+            if model.startswith(prefix):
+                return CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+@lru_cache(maxsize=None)
+def _load_encoding(name: str):
+    """Load a tiktoken encoding once per process, or None to use the approximation"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # Encodings are downloaded on first use; offline hosts fall back
+        logger.warning(f"tiktoken encoding {name} unavailable, approximating token counts: {str(e)}")
+        return None
+
+@lru_cache(maxsize=64)
+def _encoding(model: Optional[str]):
+    """Get the tiktoken encoding for a model"""
+    name = 'cl100k_base'  # Claude and unknown models: close enough for budgeting
+    try:
+        import tiktoken
+        if model and model.startswith(('gpt-', 'o1', 'o3', 'text-')):
+            name = tiktoken.encoding_name_for_model(model)
+    except ImportError:
+        return None
+    except KeyError:
+        pass
+    return _load_encoding(name)
+
+def preload_encodings(models: List[Optional[str]] = None):
+    """Load the encodings for these models now instead of on first use (e.g. before forking workers)"""
+    for model in models or [None]:
+        _encoding(model)
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Count tokens in text for a model (tiktoken, or ~4 characters per token)"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Cut text to at most ``max_tokens`` tokens, marking the cut"""
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model)
+    keep = max(max_tokens - marker_tokens, 0)
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:keep * 4] + TRUNCATION_MARKER
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + TRUNCATION_MARKER
+
+def compact_json(value: Any) -> str:
+    """Serialize for a prompt without indentation or separator padding"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+
+def fit_json(value: Any, max_tokens: int, model: Optional[str] = None) -> str:
+    """
+    Serialize a value compactly within a token limit
+
+    Lists are cut by whole items (keeping the JSON valid and noting how many
+    were kept); anything else is cut as text.
+    """
+    text = compact_json(value)
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    if isinstance(value, list) and value:
+        low, high = 0, len(value)
+        while low < high:
+            mid = (low + high + 1) // 2
+            candidate = f"{compact_json(value[:mid])} (first {mid} of {len(value)} items)"
+            if count_tokens(candidate, model) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        if low > 0:
+            return f"{compact_json(value[:low])} (first {low} of {len(value)} items)"
+
+    return truncate_tokens(text, max_tokens, model)
+
+class PromptSection:
+    """One piece of a prompt"""
+
+    def __init__(self, name: str, value: Any, priority: int = 0, truncatable: bool = True):
+        self.name = name
+        self.value = value
+        self.priority = priority  # lower survives longer
+        self.truncatable = truncatable
+
+class PromptResult:
+    """An assembled prompt and the token accounting behind it"""
+
+    def __init__(self, prompt: str, model: Optional[str], budget: int,
+                 sections: Dict[str, Dict[str, Any]]):
+        self.prompt = prompt
+        self.model = model
+        self.budget = budget
+        self.sections = sections
+        self.tokens = count_tokens(prompt, model)
+        self.template = None  # 'name@vN' when rendered from the prompt registry
+        self.system: List[str] = []  # cacheable system blocks, sent ahead of the prompt
+
+    @property
+    def truncated(self) -> bool:
+        return any(section['truncated'] for section in self.sections.values())
+
+    def report(self) -> Dict[str, Any]:
+        """Token usage summary for API responses and logs"""
+        return {
+            'template': self.template,
+            'system_tokens': sum(count_tokens(block, self.model) for block in self.system),
+            'prompt_tokens': self.tokens,
+            'budget': self.budget,
+            'truncated': self.truncated,
+            'sections': {
+                name: section for name, section in self.sections.items()
+                if section['truncated'] or section['original_tokens'] > 0
+            }
+        }
+
+class PromptBuilder:
+    """
+    Assemble a prompt from sections within a token budget
+
+    The budget is the model's context window minus the completion's
+    ``max_tokens``, capped by ``PROMPT_MAX_INPUT_TOKENS``. When the sections
+    do not fit, the lowest-priority truncatable sections are cut first (lists
+    by whole items, other values as text) until they do; fixed text such as
+    instructions is never cut.
+    """
+
+    def __init__(self, model: Optional[str] = None, max_tokens: int = 1000, budget: Optional[int] = None,
+                 reserved_tokens: int = 0):
+        self.model = model
+        cap = int(os.getenv('PROMPT_MAX_INPUT_TOKENS', '16000'))
+        available = context_window(model) - max_tokens - SAFETY_MARGIN
+        # reserved_tokens: input sent outside the built prompt, e.g. a system prompt
+        self.budget = max(min(budget or cap, cap, available) - reserved_tokens, 0)
+        self.sections: List[PromptSection] = []
+
+    def text(self, value: str) -> 'PromptBuilder':
+        """Add fixed text that is never truncated"""
+        self.sections.append(PromptSection(f'text_{len(self.sections)}', value, truncatable=False))
+        return self
+
+    def section(self, name: str, value: Any, priority: int = 0) -> 'PromptBuilder':
+        """Add a value (structured values are compacted to JSON) that may be truncated"""
+        self.sections.append(PromptSection(name, value, priority=priority))
+        return self
+
+    def build(self) -> PromptResult:
+        rendered = [compact_json(section.value) for section in self.sections]
+        counts = [count_tokens(text, self.model) for text in rendered]
+        originals = list(counts)
+        overflow = sum(counts) - self.budget
+
+        if overflow > 0:
+            order = sorted((i for i, section in enumerate(self.sections) if section.truncatable),
+                           key=lambda i: (-self.sections[i].priority, -counts[i]))
+            for i in order:
+                if overflow <= 0:
+                    break
+                target = max(counts[i] - overflow, 0)
+                rendered[i] = fit_json(self.sections[i].value, target, self.model) if target else ''
+                new_count = count_tokens(rendered[i], self.model)
+                overflow -= counts[i] - new_count
+                counts[i] = new_count
+
+            if overflow > 0:
+                logger.warning(f"Prompt exceeds budget by {overflow} tokens after truncation")
+
+        report = {
+            section.name: {
+                'original_tokens': originals[i],
+                'tokens': counts[i],
+                'truncated': counts[i] < originals[i]
+            }
+            for i, section in enumerate(self.sections) if section.truncatable
+        }
+        return PromptResult(''.join(rendered), self.model, self.budget, report)
+
+Segment = Tuple[str, Optional[str]]  # (literal text, field name or None)
+
+def parse_template(template: str) -> List[Segment]:
+    """Split a ``str.format`` template into literal text and field names"""
+    return [(literal, field_name)
+            for literal, field_name, format_spec, conversion in string.Formatter().parse(template)]
+
+def build_from_segments(segments: List[Segment], fields: Dict[str, Any], model: Optional[str] = None,
+                        max_tokens: int = 1000, priorities: Dict[str, int] = None,
+                        budget: Optional[int] = None, reserved_tokens: int = 0) -> PromptResult:
+    """Render parsed template segments through a PromptBuilder (see ``build_prompt``)"""
+    priorities = priorities or {}
+    builder = PromptBuilder(model=model, max_tokens=max_tokens, budget=budget, reserved_tokens=reserved_tokens)
+    for literal, field_name in segments:
+        if literal:
+            builder.text(literal)
+        if field_name is not None:
+            builder.section(field_name, fields[field_name], priority=priorities.get(field_name, 0))
+    return builder.build()
+
+def build_prompt(template: str, fields: Dict[str, Any], model: Optional[str] = None,
+                 max_tokens: int = 1000, priorities: Dict[str, int] = None,
+                 budget: Optional[int] = None) -> PromptResult:
+    """
+    Render a ``str.format`` template through a PromptBuilder
+
+    Literal template text is kept whole; each ``{field}`` becomes a
+    truncatable section (structured values compacted to JSON), cut in order
+    of ``priorities`` (lower survives longer, default 0) when over budget.
+    Templates rendered repeatedly should be registered in the prompt
+    registry, which parses them once.
+
+    Args:
+        template: Template with named ``{field}`` placeholders
+        fields: Values for the placeholders
+        model: Model the prompt is for (token counting and context window)
+        max_tokens: Completion tokens to reserve
+        priorities: Optional per-field priority
+        budget: Optional tighter input budget
+
+    Returns:
+        PromptResult with the prompt text and token report
+    """
+    return build_from_segments(parse_template(template), fields, model=model, max_tokens=max_tokens,
+                               priorities=priorities, budget=budget)
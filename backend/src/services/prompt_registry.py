@@ -0,0 +1,170 @@
+"""
+Prompt Registry Service for Agent CEO system
+Loads prompt templates once: normalized, versioned and precompiled for rendering
+"""
+
+import hashlib
+import logging
+import re
+import textwrap
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from src.services.prompt_builder import PromptResult, build_from_segments, count_tokens, parse_template
+
+logger = logging.getLogger(__name__)
+
+_BLANK_RUNS = re.compile(r'\n{3,}')
+
+def normalize_template(text: str) -> str:
+    """
+    Normalize template whitespace
+
+    Removes the common indentation left by triple-quoted strings in indented
+    code, trailing spaces and repeated blank lines, so none of it is sent
+    (and billed) on every call. Relative indentation is kept.
+    """
+    text = textwrap.dedent(text)
+    text = '\n'.join(line.rstrip() for line in text.split('\n'))
+    return _BLANK_RUNS.sub('\n\n', text).strip('\n')
+
+class PromptTemplate:
+    """
+    A normalized template, parsed once
+
+    ``system`` holds fixed instruction blocks sent ahead of the rendered
+    prompt, most widely shared first. They never change between calls, so providers can serve them from their prompt cache.
+    """
+
+    def __init__(self, name: str, text: str, version: int = 1, priorities: Dict[str, int] = None,
+                 system: Union[str, List[str], None] = None):
+        self.name = name
+        self.version = version
+        self.text = normalize_template(text)
+        if isinstance(system, str):
+            system = [system]
+        self.system = [normalize_template(block) for block in (system or []) if block]
+        digest = hashlib.sha256('\0'.join(self.system + [self.text]).encode('utf-8'))
+        self.fingerprint = digest.hexdigest()[:12]
+        self.priorities = priorities or {}
+        self.segments = parse_template(self.text)
+        self.fields = [field_name for _, field_name in self.segments if field_name is not None]
+
+        # Identical on every call, so the part provider-side prompt caches can reuse:
+        # the system blocks, or else the literal text up to the first placeholder
+        first_literal = self.segments[0][0] if self.segments else ''
+        self.static_prefix = '\n\n'.join(self.system) if self.system else first_literal
+
+    def render(self, fields: Dict[str, Any], model: Optional[str] = None, max_tokens: int = 1000,
+               budget: Optional[int] = None) -> PromptResult:
+        """
+        Render the template within a model's input budget
+
+        Args:
+            fields: Values for the placeholders (structured values are compacted to JSON)
+            model: Model the prompt is for
+            max_tokens: Completion tokens to reserve
+            budget: Optional tighter input budget
+
+        Returns:
+            PromptResult with the prompt text and token report
+        """
+        missing = [field_name for field_name in self.fields if field_name not in fields]
+        if missing:
+            raise KeyError(f"Prompt {self.name} missing fields: {', '.join(missing)}")
+        system_tokens = sum(count_tokens(block, model) for block in self.system)
+        result = build_from_segments(self.segments, fields, model=model, max_tokens=max_tokens,
+                                     priorities=self.priorities, budget=budget,
+                                     reserved_tokens=system_tokens)
+        result.template = f'{self.name}@v{self.version}'
+        result.system = list(self.system)
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'fingerprint': self.fingerprint,
+            'fields': self.fields,
+            'tokens': count_tokens(self.text),
+            'system_tokens': [count_tokens(block) for block in self.system],
+            'static_prefix_tokens': count_tokens(self.static_prefix)
+        }
+
+class PromptRegistry:
+    """Named prompt templates shared by services and routes"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, text: str, version: int = 1, priorities: Dict[str, int] = None,
+                 system: Union[str, List[str], None] = None) -> PromptTemplate:
+        """
+        Register a template
+
+        Re-registering identical text is a no-op; changing the text of a
+        registered name requires a higher version, so every wording change is
+        traceable in responses and logs.
+
+        Args:
+            name: Dotted template name, e.g. 'strategic.business_analysis'
+            text: ``str.format`` template text
+            version: Template version, bumped whenever the wording changes
+            priorities: Per-field truncation priority (lower survives longer)
+            system: Fixed system block(s) sent ahead of the prompt
+
+        Returns:
+            The registered PromptTemplate
+        """
+        template = PromptTemplate(name, text, version=version, priorities=priorities, system=system)
+        with self._lock:
+            existing = self._templates.get(name)
+            if existing is not None:
+                if existing.fingerprint == template.fingerprint:
+                    return existing
+                if template.version <= existing.version:
+                    raise ValueError(f"Prompt {name} changed without a version bump (v{existing.version})")
+                logger.info(f"Prompt {name} upgraded to v{template.version}")
+            self._templates[name] = template
+        return template
+
+    def register_many(self, namespace: str, templates: Dict[str, Union[str, Dict[str, str]]],
+                      version: int = 1, priorities: Dict[str, int] = None) -> Dict[str, PromptTemplate]:
+        """
+        Register a dict of templates under ``namespace.key``
+
+        Values are either template text or ``{'system': ..., 'prompt': ...}``,
+        whose fixed system text is sent ahead of the prompt.
+
+        Returns:
+            The registered templates keyed as given
+        """
+        registered = {}
+        for key, value in templates.items():
+            if isinstance(value, dict):
+                text, system = value['prompt'], value.get('system')
+            else:
+                text, system = value, None
+            registered[key] = self.register(f'{namespace}.{key}', text, version=version,
+                                            priorities=priorities, system=system)
+        return registered
+
+    def get(self, name: str) -> PromptTemplate:
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt template: {name}")
+
+    def render(self, name: str, fields: Dict[str, Any], **kwargs) -> PromptResult:
+        """Render a registered template (see ``PromptTemplate.render``)"""
+        return self.get(name).render(fields, **kwargs)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Get name, version, fingerprint and token sizes of every template"""
+        with self._lock:
+            templates = list(self._templates.values())
+        return [template.describe() for template in sorted(templates, key=lambda t: t.name)]
+
+# Global prompt registry instance
+prompt_registry = PromptRegistry()
@@ -10,6 +10,7 @@ import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import base64
+from src.services.health_registry import health_registry
 
 logger = logging.getLogger(__name__)
 
@@ -20,13 +21,13 @@ class SocialMediaService:
         # Platform configurations
         self.platforms = {
             'linkedin': {
-                'api_base': 'https://api.linkedin.com/v2',
+                'api_base': os.getenv('LINKEDIN_API_BASE', 'https://api.linkedin.com/v2'),
                 'access_token': os.getenv('LINKEDIN_ACCESS_TOKEN'),
                 'client_id': os.getenv('LINKEDIN_CLIENT_ID'),
                 'client_secret': os.getenv('LINKEDIN_CLIENT_SECRET')
             },
             'twitter': {
-                'api_base': 'https://api.twitter.com/2',
+                'api_base': os.getenv('TWITTER_API_BASE', 'https://api.twitter.com/2'),
                 'bearer_token': os.getenv('TWITTER_BEARER_TOKEN'),
                 'api_key': os.getenv('TWITTER_API_KEY'),
                 'api_secret': os.getenv('TWITTER_API_SECRET'),
@@ -34,12 +35,12 @@ class SocialMediaService:
                 'access_token_secret': os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
             },
             'facebook': {
-                'api_base': 'https://graph.facebook.com/v18.0',
+                'api_base': os.getenv('FACEBOOK_GRAPH_API_BASE', 'https://graph.facebook.com/v18.0'),
                 'access_token': os.getenv('FACEBOOK_ACCESS_TOKEN'),
                 'page_id': os.getenv('FACEBOOK_PAGE_ID')
             },
             'instagram': {
-                'api_base': 'https://graph.facebook.com/v18.0',
+                'api_base': os.getenv('FACEBOOK_GRAPH_API_BASE', 'https://graph.facebook.com/v18.0'),
                 'access_token': os.getenv('INSTAGRAM_ACCESS_TOKEN'),
                 'account_id': os.getenv('INSTAGRAM_ACCOUNT_ID')
             }
@@ -47,12 +48,12 @@ class SocialMediaService:
         
         # Buffer/Hootsuite integration for scheduling
         self.buffer_config = {
-            'api_base': 'https://api.bufferapp.com/1',
+            'api_base': os.getenv('BUFFER_API_BASE', 'https://api.bufferapp.com/1'),
             'access_token': os.getenv('BUFFER_ACCESS_TOKEN')
         }
         
         self.hootsuite_config = {
-            'api_base': 'https://platform.hootsuite.com/v1',
+            'api_base': os.getenv('HOOTSUITE_API_BASE', 'https://platform.hootsuite.com/v1'),
             'access_token': os.getenv('HOOTSUITE_ACCESS_TOKEN')
         }
     
@@ -500,3 +501,5 @@ class SocialMediaService:
 # Global social media service instance
 social_media_service = SocialMediaService()
 
+health_registry.register('social_media', social_media_service.health_check, interval=300, timeout=5)
+
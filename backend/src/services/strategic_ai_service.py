@@ -3,11 +3,16 @@ Strategic AI Service for Agent CEO system
 Specialized service for high-level strategic reasoning using GPT-4.5/Claude 3 Opus
 """
 
-import json
 import logging
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
+import os
 from src.services.ai_service import ai_service
+from src.services.health_registry import health_registry
+from src.services.embedding_index import embedding_index, records_for_prompt
+from src.services.prompt_builder import PromptResult, compact_json
+from src.services.prompt_registry import prompt_registry
+from src.services.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -22,111 +27,336 @@ class StrategicAIService:
         }
         self.default_strategic_provider = 'openai'
         
-        # Strategic reasoning templates
-        self.reasoning_templates = {
-            'business_analysis': """
-            As a strategic business advisor with deep expertise in {industry}, analyze the following business situation:
-            
-            Context: {context}
-            Current Metrics: {metrics}
-            Market Conditions: {market_conditions}
-            
-            Provide a comprehensive strategic analysis including:
-            1. Current situation assessment
-            2. Key opportunities and threats
-            3. Strategic recommendations with rationale
-            4. Risk assessment and mitigation strategies
-            5. Success metrics and KPIs to track
-            6. Timeline for implementation
-            
-            Focus on actionable insights that can drive measurable business growth.
-            """,
-            
-            'competitive_strategy': """
-            As a competitive strategy expert, analyze the competitive landscape and develop strategic recommendations:
-            
-            Company Profile: {company_profile}
-            Competitors: {competitors}
-            Market Position: {market_position}
-            Competitive Intelligence: {competitive_data}
-            
-            Provide strategic recommendations for:
-            1. Competitive positioning and differentiation
-            2. Market share growth strategies
-            3. Competitive advantages to leverage
-            4. Threats to address and defend against
-            5. Strategic partnerships and alliances
-            6. Innovation and product development priorities
-            
-            Ensure recommendations are specific, measurable, and time-bound.
-            """,
-            
-            'growth_strategy': """
-            As a growth strategy consultant, develop a comprehensive growth plan:
-            
-            Current Business State: {current_state}
-            Growth Targets: {growth_targets}
-            Resources Available: {resources}
-            Market Opportunities: {opportunities}
-            Constraints: {constraints}
-            
-            Develop a strategic growth plan including:
-            1. Growth strategy framework and approach
-            2. Market expansion opportunities
-            3. Product/service development roadmap
-            4. Customer acquisition and retention strategies
-            5. Revenue optimization tactics
-            6. Operational scaling requirements
-            7. Investment and resource allocation
-            8. Risk management and contingency planning
-            
-            Prioritize strategies by impact and feasibility.
-            """,
-            
-            'crisis_management': """
-            As a crisis management expert, provide strategic guidance for the following situation:
-            
-            Crisis Description: {crisis_description}
-            Impact Assessment: {impact_assessment}
-            Stakeholders Affected: {stakeholders}
-            Available Resources: {resources}
-            Time Constraints: {time_constraints}
-            
-            Provide a comprehensive crisis management strategy:
-            1. Immediate response actions (next 24-48 hours)
-            2. Short-term stabilization plan (1-4 weeks)
-            3. Medium-term recovery strategy (1-6 months)
-            4. Long-term resilience building
-            5. Communication strategy for all stakeholders
-            6. Risk mitigation and prevention measures
-            7. Success metrics and monitoring plan
-            
-            Focus on preserving business continuity and stakeholder trust.
-            """,
-            
-            'innovation_strategy': """
-            As an innovation strategist, develop a comprehensive innovation roadmap:
-            
-            Industry Context: {industry_context}
-            Technology Trends: {tech_trends}
-            Customer Needs: {customer_needs}
-            Innovation Goals: {innovation_goals}
-            Current Capabilities: {current_capabilities}
-            
-            Create an innovation strategy including:
-            1. Innovation framework and methodology
-            2. Technology adoption roadmap
-            3. Product/service innovation opportunities
-            4. Process and operational innovations
-            5. Partnership and collaboration strategies
-            6. Innovation metrics and success criteria
-            7. Resource allocation and investment plan
-            8. Risk assessment and mitigation
-            
-            Balance breakthrough innovations with incremental improvements.
-            """
-        }
+        # Default provider first; the router fails over (or hedges) to the other
+        self.strategic_candidates = [(self.default_strategic_provider, self.strategic_models[self.default_strategic_provider])] + [
+            (provider, model) for provider, model in self.strategic_models.items()
+            if provider != self.default_strategic_provider
+        ]
+        
+        # Stored BusinessData records retrieved into analysis prompts (0 disables)
+        self.business_records_k = int(os.getenv('STRATEGIC_BUSINESS_RECORDS_K', '5'))
+        
+        # Strategic reasoning templates: fixed instructions go in the (cacheable)
+        # system prompt, variable context in the user prompt
+        self.reasoning_templates = prompt_registry.register_many('strategic', {
+            'business_analysis': {
+                'system': """
+                As a strategic business advisor, analyze the business situation described by the user.
+
+                Provide a comprehensive strategic analysis including:
+                1. Current situation assessment
+                2. Key opportunities and threats
+                3. Strategic recommendations with rationale
+                4. Risk assessment and mitigation strategies
+                5. Success metrics and KPIs to track
+                6. Timeline for implementation
+
+                Focus on actionable insights that can drive measurable business growth.
+                """,
+                'prompt': """
+                Industry: {industry}
+                Context: {context}
+                Current Metrics: {metrics}
+                Market Conditions: {market_conditions}
+                Relevant Business Records: {business_records}
+                """
+            },
+            
+            'competitive_strategy': {
+                'system': """
+                As a competitive strategy expert, analyze the competitive landscape and develop strategic recommendations from the information provided by the user.
+
+                Provide strategic recommendations for:
+                1. Competitive positioning and differentiation
+                2. Market share growth strategies
+                3. Competitive advantages to leverage
+                4. Threats to address and defend against
+                5. Strategic partnerships and alliances
+                6. Innovation and product development priorities
+
+                Ensure recommendations are specific, measurable, and time-bound.
+                """,
+                'prompt': """
+                Company Profile: {company_profile}
+                Competitors: {competitors}
+                Market Position: {market_position}
+                Competitive Intelligence: {competitive_data}
+                Relevant Business Records: {business_records}
+                """
+            },
+            
+            'growth_strategy': {
+                'system': """
+                As a growth strategy consultant, develop a comprehensive growth plan from the business state provided by the user.
+
+                Develop a strategic growth plan including:
+                1. Growth strategy framework and approach
+                2. Market expansion opportunities
+                3. Product/service development roadmap
+                4. Customer acquisition and retention strategies
+                5. Revenue optimization tactics
+                6. Operational scaling requirements
+                7. Investment and resource allocation
+                8. Risk management and contingency planning
+
+                Prioritize strategies by impact and feasibility.
+                """,
+                'prompt': """
+                Current Business State: {current_state}
+                Growth Targets: {growth_targets}
+                Resources Available: {resources}
+                Market Opportunities: {opportunities}
+                Constraints: {constraints}
+                Relevant Business Records: {business_records}
+                """
+            },
+            
+            'crisis_management': {
+                'system': """
+                As a crisis management expert, provide strategic guidance for the situation described by the user.
+
+                Provide a comprehensive crisis management strategy:
+                1. Immediate response actions (next 24-48 hours)
+                2. Short-term stabilization plan (1-4 weeks)
+                3. Medium-term recovery strategy (1-6 months)
+                4. Long-term resilience building
+                5. Communication strategy for all stakeholders
+                6. Risk mitigation and prevention measures
+                7. Success metrics and monitoring plan
+
+                Focus on preserving business continuity and stakeholder trust.
+                """,
+                'prompt': """
+                Crisis Description: {crisis_description}
+                Impact Assessment: {impact_assessment}
+                Stakeholders Affected: {stakeholders}
+                Available Resources: {resources}
+                Time Constraints: {time_constraints}
+                """
+            },
+            
+            'innovation_strategy': {
+                'system': """
+                As an innovation strategist, develop a comprehensive innovation roadmap from the context provided by the user.
+
+                Create an innovation strategy including:
+                1. Innovation framework and methodology
+                2. Technology adoption roadmap
+                3. Product/service innovation opportunities
+                4. Process and operational innovations
+                5. Partnership and collaboration strategies
+                6. Innovation metrics and success criteria
+                7. Resource allocation and investment plan
+                8. Risk assessment and mitigation
+
+                Balance breakthrough innovations with incremental improvements.
+                """,
+                'prompt': """
+                Industry Context: {industry_context}
+                Technology Trends: {tech_trends}
+                Customer Needs: {customer_needs}
+                Innovation Goals: {innovation_goals}
+                Current Capabilities: {current_capabilities}
+                """
+            },
+            
+            'decision_making': {
+                'system': """
+                As a strategic decision advisor, analyze the decision scenario provided by the user and provide recommendations.
+
+                Provide a comprehensive decision analysis including:
+                1. Evaluation of each option against the criteria
+                2. Risk-benefit analysis for each option
+                3. Strategic implications and long-term impact
+                4. Recommended decision with clear rationale
+                5. Implementation considerations
+                6. Success metrics and monitoring plan
+                7. Contingency planning for potential issues
+
+                Use a structured decision-making framework and provide clear, actionable recommendations.
+                """,
+                'prompt': """
+                Decision Context: {decision_context}
+
+                Available Options:
+                {options}
+
+                Decision Criteria: {criteria}
+                """
+            },
+            
+            'market_opportunity': {
+                'system': """
+                As a market strategy expert, analyze the market opportunity described by the user.
+
+                Provide a comprehensive market opportunity analysis including:
+                1. Market size and growth potential assessment
+                2. Market dynamics and key trends
+                3. Competitive landscape analysis
+                4. Strategic fit with company capabilities
+                5. Market entry strategy recommendations
+                6. Resource requirements and investment needs
+                7. Risk assessment and mitigation strategies
+                8. Success metrics and milestones
+                9. Timeline for market entry and scaling
+
+                Focus on actionable insights for strategic market positioning.
+                """,
+                'prompt': """
+                Market Data: {market_data}
+                Company Capabilities: {company_capabilities}
+                Relevant Business Records: {business_records}
+                """
+            },
+            
+            'planning_session': {
+                'system': """
+                As a strategic planning facilitator and business strategist, conduct a comprehensive strategic planning session for the context provided by the user.
+
+                Develop a comprehensive strategic plan including:
+
+                1. SITUATION ANALYSIS
+                   - Current state assessment
+                   - SWOT analysis (Strengths, Weaknesses, Opportunities, Threats)
+                   - Market and competitive analysis
+                   - Stakeholder analysis
+
+                2. STRATEGIC DIRECTION
+                   - Vision and mission alignment
+                   - Strategic objectives and goals
+                   - Value proposition and positioning
+                   - Success criteria and KPIs
+
+                3. STRATEGIC INITIATIVES
+                   - Priority strategic initiatives
+                   - Resource allocation and investment
+                   - Timeline and milestones
+                   - Risk assessment and mitigation
+
+                4. IMPLEMENTATION ROADMAP
+                   - Phase-by-phase implementation plan
+                   - Organizational requirements
+                   - Change management strategy
+                   - Monitoring and evaluation framework
+
+                5. CONTINGENCY PLANNING
+                   - Scenario planning and alternatives
+                   - Risk mitigation strategies
+                   - Adaptive planning mechanisms
+
+                Ensure the plan is comprehensive, actionable, and aligned with business objectives.
+                """,
+                'prompt': """
+                Planning Context: {planning_context}
+                """
+            },
+            
+            'quick_insights': {
+                'system': """
+                As a strategic business advisor, provide immediate strategic insights for the urgent business question asked by the user.
+
+                Provide:
+                1. Key strategic considerations
+                2. Immediate recommendations
+                3. Potential risks and opportunities
+                4. Next steps and timeline
+
+                Keep response focused and actionable for the stated urgency level.
+                """,
+                'prompt': """
+                Question: {business_question}
+                Context: {context}
+                Urgency Level: {urgency}
+                """
+            },
+            
+            'swot_analysis': {
+                'system': """
+                As a strategic analyst, conduct a comprehensive SWOT analysis of the company described by the user.
+
+                Provide a detailed SWOT analysis with:
+
+                STRENGTHS:
+                - Internal capabilities and advantages
+                - Unique value propositions
+                - Competitive advantages
+
+                WEAKNESSES:
+                - Internal limitations and gaps
+                - Areas for improvement
+                - Competitive disadvantages
+
+                OPPORTUNITIES:
+                - Market opportunities
+                - Emerging trends to leverage
+                - Strategic partnerships potential
+
+                THREATS:
+                - Market threats and challenges
+                - Competitive threats
+                - External risks
+
+                For each category, provide specific, actionable insights with strategic implications.
+                """,
+                'prompt': """
+                Company Information: {company_info}
+                Market Context: {market_context}
+                """
+            },
+            
+            'scenario_planning': {
+                'system': """
+                As a scenario planning expert, develop strategic scenarios for planning purposes from the base scenario provided by the user.
+
+                Develop 3-4 distinct scenarios:
+
+                1. OPTIMISTIC SCENARIO
+                   - Best-case assumptions
+                   - Favorable market conditions
+                   - Strategic implications and opportunities
+
+                2. PESSIMISTIC SCENARIO
+                   - Worst-case assumptions
+                   - Challenging market conditions
+                   - Risk mitigation strategies
+
+                3. MOST LIKELY SCENARIO
+                   - Realistic assumptions
+                   - Expected market conditions
+                   - Balanced strategic approach
+
+                4. DISRUPTIVE SCENARIO (if applicable)
+                   - Unexpected market disruptions
+                   - Technology or regulatory changes
+                   - Adaptive strategies required
+
+                For each scenario, provide:
+                - Key assumptions and drivers
+                - Strategic implications
+                - Recommended actions
+                - Success metrics
+                """,
+                'prompt': """
+                Base Scenario: {base_scenario}
+                Key Variables: {variables}
+                Time Horizon: {time_horizon}
+                """
+            }
+        }, version=4, priorities={'business_records': 1})
+    
+    def business_records(self, *topics: Any) -> Any:
+        """Stored business records most relevant to the request topics (the business_records field)"""
+        if self.business_records_k <= 0:
+            return 'not requested'
+        records = embedding_index.retrieve(compact_json(list(topics))[:2000], k=self.business_records_k)
+        return records_for_prompt(records) or 'none found'
+    
+    def render_prompt(self, name: str, fields: Dict[str, Any], max_tokens: int) -> PromptResult:
+        """Render a strategic template within the input budget of the primary strategic model"""
+        return self.reasoning_templates[name].render(fields, model=self.strategic_candidates[0][1],
+                                                     max_tokens=max_tokens)
     
+    @traced()
     def strategic_business_analysis(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Perform comprehensive strategic business analysis
@@ -138,17 +368,22 @@ class StrategicAIService:
             Strategic analysis and recommendations
         """
         try:
-            prompt = self.reasoning_templates['business_analysis'].format(
-                industry=context.get('industry', 'technology'),
-                context=json.dumps(context.get('business_context', {}), indent=2),
-                metrics=json.dumps(context.get('current_metrics', {}), indent=2),
-                market_conditions=json.dumps(context.get('market_conditions', {}), indent=2)
+            built = self.render_prompt(
+                'business_analysis',
+                {
+                    'industry': context.get('industry', 'technology'),
+                    'context': context.get('business_context', {}),
+                    'metrics': context.get('current_metrics', {}),
+                    'market_conditions': context.get('market_conditions', {}),
+                    'business_records': self.business_records(context)
+                },
+                max_tokens=2000
             )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2000,
                 temperature=0.3  # Lower temperature for more focused strategic thinking
             )
@@ -160,6 +395,8 @@ class StrategicAIService:
                     'analysis': result['text'],
                     'context': context,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -169,6 +406,7 @@ class StrategicAIService:
             logger.error(f"Strategic business analysis error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def competitive_strategy_analysis(self, company_profile: Dict[str, Any], 
                                     competitors: List[Dict[str, Any]], 
                                     competitive_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -184,17 +422,22 @@ class StrategicAIService:
             Competitive strategy recommendations
         """
         try:
-            prompt = self.reasoning_templates['competitive_strategy'].format(
-                company_profile=json.dumps(company_profile, indent=2),
-                competitors=json.dumps(competitors, indent=2),
-                market_position=json.dumps(company_profile.get('market_position', {}), indent=2),
-                competitive_data=json.dumps(competitive_data, indent=2)
+            built = self.render_prompt(
+                'competitive_strategy',
+                {
+                    'company_profile': company_profile,
+                    'competitors': competitors,
+                    'market_position': company_profile.get('market_position', {}),
+                    'competitive_data': competitive_data,
+                    'business_records': self.business_records(company_profile, competitors)
+                },
+                max_tokens=2000
             )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2000,
                 temperature=0.3
             )
@@ -207,6 +450,8 @@ class StrategicAIService:
                     'company_profile': company_profile,
                     'competitors_analyzed': len(competitors),
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -216,6 +461,7 @@ class StrategicAIService:
             logger.error(f"Competitive strategy analysis error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def growth_strategy_planning(self, current_state: Dict[str, Any], 
                                growth_targets: Dict[str, Any],
                                resources: Dict[str, Any]) -> Dict[str, Any]:
@@ -231,18 +477,23 @@ class StrategicAIService:
             Growth strategy plan
         """
         try:
-            prompt = self.reasoning_templates['growth_strategy'].format(
-                current_state=json.dumps(current_state, indent=2),
-                growth_targets=json.dumps(growth_targets, indent=2),
-                resources=json.dumps(resources, indent=2),
-                opportunities=json.dumps(current_state.get('market_opportunities', {}), indent=2),
-                constraints=json.dumps(resources.get('constraints', {}), indent=2)
+            built = self.render_prompt(
+                'growth_strategy',
+                {
+                    'current_state': current_state,
+                    'growth_targets': growth_targets,
+                    'resources': resources,
+                    'opportunities': current_state.get('market_opportunities', {}),
+                    'constraints': resources.get('constraints', {}),
+                    'business_records': self.business_records(current_state, growth_targets)
+                },
+                max_tokens=2500
             )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2500,
                 temperature=0.4
             )
@@ -255,6 +506,8 @@ class StrategicAIService:
                     'current_state': current_state,
                     'growth_targets': growth_targets,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -264,6 +517,7 @@ class StrategicAIService:
             logger.error(f"Growth strategy planning error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def crisis_management_strategy(self, crisis_description: str, 
                                  impact_assessment: Dict[str, Any],
                                  stakeholders: List[str],
@@ -281,18 +535,22 @@ class StrategicAIService:
             Crisis management strategy
         """
         try:
-            prompt = self.reasoning_templates['crisis_management'].format(
-                crisis_description=crisis_description,
-                impact_assessment=json.dumps(impact_assessment, indent=2),
-                stakeholders=json.dumps(stakeholders, indent=2),
-                resources=json.dumps(available_resources, indent=2),
-                time_constraints=impact_assessment.get('time_constraints', 'Immediate response required')
+            built = self.render_prompt(
+                'crisis_management',
+                {
+                    'crisis_description': crisis_description,
+                    'impact_assessment': impact_assessment,
+                    'stakeholders': stakeholders,
+                    'resources': available_resources,
+                    'time_constraints': impact_assessment.get('time_constraints', 'Immediate response required')
+                },
+                max_tokens=2000
             )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2000,
                 temperature=0.2  # Very focused for crisis situations
             )
@@ -306,6 +564,8 @@ class StrategicAIService:
                     'impact_assessment': impact_assessment,
                     'stakeholders': stakeholders,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -315,6 +575,7 @@ class StrategicAIService:
             logger.error(f"Crisis management strategy error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def innovation_strategy_development(self, industry_context: Dict[str, Any],
                                       tech_trends: List[str],
                                       customer_needs: Dict[str, Any],
@@ -332,18 +593,22 @@ class StrategicAIService:
             Innovation strategy and roadmap
         """
         try:
-            prompt = self.reasoning_templates['innovation_strategy'].format(
-                industry_context=json.dumps(industry_context, indent=2),
-                tech_trends=json.dumps(tech_trends, indent=2),
-                customer_needs=json.dumps(customer_needs, indent=2),
-                innovation_goals=json.dumps(innovation_goals, indent=2),
-                current_capabilities=json.dumps(industry_context.get('current_capabilities', {}), indent=2)
+            built = self.render_prompt(
+                'innovation_strategy',
+                {
+                    'industry_context': industry_context,
+                    'tech_trends': tech_trends,
+                    'customer_needs': customer_needs,
+                    'innovation_goals': innovation_goals,
+                    'current_capabilities': industry_context.get('current_capabilities', {})
+                },
+                max_tokens=2500
             )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2500,
                 temperature=0.5  # Slightly higher for creative innovation thinking
             )
@@ -357,6 +622,8 @@ class StrategicAIService:
                     'tech_trends': tech_trends,
                     'innovation_goals': innovation_goals,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -366,6 +633,7 @@ class StrategicAIService:
             logger.error(f"Innovation strategy development error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def strategic_decision_making(self, decision_context: Dict[str, Any],
                                 options: List[Dict[str, Any]],
                                 criteria: Dict[str, Any]) -> Dict[str, Any]:
@@ -381,32 +649,20 @@ class StrategicAIService:
             Decision analysis and recommendations
         """
         try:
-            prompt = f"""
-            As a strategic decision advisor, analyze the following decision scenario and provide recommendations:
-            
-            Decision Context: {json.dumps(decision_context, indent=2)}
-            
-            Available Options:
-            {json.dumps(options, indent=2)}
-            
-            Decision Criteria: {json.dumps(criteria, indent=2)}
-            
-            Provide a comprehensive decision analysis including:
-            1. Evaluation of each option against the criteria
-            2. Risk-benefit analysis for each option
-            3. Strategic implications and long-term impact
-            4. Recommended decision with clear rationale
-            5. Implementation considerations
-            6. Success metrics and monitoring plan
-            7. Contingency planning for potential issues
-            
-            Use a structured decision-making framework and provide clear, actionable recommendations.
-            """
+            built = self.render_prompt(
+                'decision_making',
+                {
+                    'decision_context': decision_context,
+                    'options': options,
+                    'criteria': criteria
+                },
+                max_tokens=2000
+            )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2000,
                 temperature=0.3
             )
@@ -420,6 +676,8 @@ class StrategicAIService:
                     'options_evaluated': len(options),
                     'criteria': criteria,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -429,6 +687,7 @@ class StrategicAIService:
             logger.error(f"Strategic decision making error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def market_opportunity_analysis(self, market_data: Dict[str, Any],
                                   company_capabilities: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -442,30 +701,20 @@ class StrategicAIService:
             Market opportunity analysis and recommendations
         """
         try:
-            prompt = f"""
-            As a market strategy expert, analyze the following market opportunity:
-            
-            Market Data: {json.dumps(market_data, indent=2)}
-            Company Capabilities: {json.dumps(company_capabilities, indent=2)}
-            
-            Provide a comprehensive market opportunity analysis including:
-            1. Market size and growth potential assessment
-            2. Market dynamics and key trends
-            3. Competitive landscape analysis
-            4. Strategic fit with company capabilities
-            5. Market entry strategy recommendations
-            6. Resource requirements and investment needs
-            7. Risk assessment and mitigation strategies
-            8. Success metrics and milestones
-            9. Timeline for market entry and scaling
-            
-            Focus on actionable insights for strategic market positioning.
-            """
+            built = self.render_prompt(
+                'market_opportunity',
+                {
+                    'market_data': market_data,
+                    'company_capabilities': company_capabilities,
+                    'business_records': self.business_records(market_data, company_capabilities)
+                },
+                max_tokens=2000
+            )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=2000,
                 temperature=0.4
             )
@@ -478,6 +727,8 @@ class StrategicAIService:
                     'market_data': market_data,
                     'company_capabilities': company_capabilities,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -487,6 +738,7 @@ class StrategicAIService:
             logger.error(f"Market opportunity analysis error: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    @traced()
     def strategic_planning_session(self, planning_context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Conduct a comprehensive strategic planning session
@@ -498,49 +750,18 @@ class StrategicAIService:
             Comprehensive strategic plan
         """
         try:
-            prompt = f"""
-            As a strategic planning facilitator and business strategist, conduct a comprehensive strategic planning session:
-            
-            Planning Context: {json.dumps(planning_context, indent=2)}
-            
-            Develop a comprehensive strategic plan including:
-            
-            1. SITUATION ANALYSIS
-               - Current state assessment
-               - SWOT analysis (Strengths, Weaknesses, Opportunities, Threats)
-               - Market and competitive analysis
-               - Stakeholder analysis
-            
-            2. STRATEGIC DIRECTION
-               - Vision and mission alignment
-               - Strategic objectives and goals
-               - Value proposition and positioning
-               - Success criteria and KPIs
-            
-            3. STRATEGIC INITIATIVES
-               - Priority strategic initiatives
-               - Resource allocation and investment
-               - Timeline and milestones
-               - Risk assessment and mitigation
-            
-            4. IMPLEMENTATION ROADMAP
-               - Phase-by-phase implementation plan
-               - Organizational requirements
-               - Change management strategy
-               - Monitoring and evaluation framework
-            
-            5. CONTINGENCY PLANNING
-               - Scenario planning and alternatives
-               - Risk mitigation strategies
-               - Adaptive planning mechanisms
-            
-            Ensure the plan is comprehensive, actionable, and aligned with business objectives.
-            """
+            built = self.render_prompt(
+                'planning_session',
+                {
+                    'planning_context': planning_context
+                },
+                max_tokens=3000
+            )
             
             result = ai_service.generate_text(
-                prompt=prompt,
-                provider=self.default_strategic_provider,
-                model=self.strategic_models[self.default_strategic_provider],
+                prompt=built.prompt,
+                system=built.system,
+                candidates=self.strategic_candidates,
                 max_tokens=3000,
                 temperature=0.4
             )
@@ -552,6 +773,8 @@ class StrategicAIService:
                     'strategic_plan': result['text'],
                     'planning_context': planning_context,
                     'model_used': result.get('model'),
+                    'prompt_usage': built.report(),
+                    'prompt_cache': result.get('prompt_cache'),
                     'generated_at': datetime.utcnow().isoformat()
                 }
             else:
@@ -561,6 +784,30 @@ class StrategicAIService:
             logger.error(f"Strategic planning session error: {str(e)}")
             return {'success': False, 'error': str(e)}
 
+    def health_check(self) -> Dict[str, Any]:
+        """
+        Check strategic AI capabilities from the router's recent call outcomes
+        
+        Degraded only when every strategic candidate is failing, since calls
+        fail over between them. No test generation is spent.
+        
+        Returns:
+            Dictionary with health status
+        """
+        candidates = ai_service.router.candidate_health(self.strategic_candidates)
+        failing = bool(candidates) and all(entry['status'] == 'failing' for entry in candidates.values())
+        
+        return {
+            'service_status': 'degraded' if failing else 'healthy',
+            'strategic_models_available': self.strategic_models,
+            'default_provider': self.default_strategic_provider,
+            'candidates': candidates,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
 # Global strategic AI service instance
 strategic_ai_service = StrategicAIService()
 
+# Reads router stats only, so it is cheap to run often
+health_registry.register('strategic', strategic_ai_service.health_check, interval=30, timeout=5)
+
@@ -0,0 +1,181 @@
+"""
+Stale-while-revalidate cache for Agent CEO system
+Serves aggregate status payloads from memory while refreshing them in the background
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict
+
+from src.services.metrics import family, metrics
+
+logger = logging.getLogger(__name__)
+
+# Every SWRCache, for the metrics collector
+_caches: 'weakref.WeakSet[SWRCache]' = weakref.WeakSet()
+
+_probe_pool = None
+_probe_pool_pid = None
+_probe_pool_lock = threading.Lock()
+
+def _get_probe_pool() -> ThreadPoolExecutor:
+    """Get the shared probe pool, recreating it after a fork"""
+    global _probe_pool, _probe_pool_pid
+    with _probe_pool_lock:
+        if _probe_pool is None or _probe_pool_pid != os.getpid():
+            _probe_pool = ThreadPoolExecutor(max_workers=int(os.getenv('PROBE_POOL_SIZE', '8')),
+                                             thread_name_prefix='probe')
+            _probe_pool_pid = os.getpid()
+        return _probe_pool
+
+def run_probes(probes: Dict[str, Callable[[], Any]], timeouts: Dict[str, float] = None,
+               default_timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Run probes concurrently, each bounded by its own timeout
+
+    A probe that overruns is reported as timed out; its thread is left to
+    finish on its own since Python threads cannot be cancelled, so probes
+    should still carry their own I/O timeouts.
+
+    Args:
+        probes: Mapping of name to zero-argument callable
+        timeouts: Optional per-probe timeout in seconds
+        default_timeout: Timeout for probes not listed in ``timeouts``
+
+    Returns:
+        Mapping of name to probe result (or an error/timeout result)
+    """
+    timeouts = timeouts or {}
+    started = time.monotonic()
+    pool = _get_probe_pool()
+    futures = {name: pool.submit(probe) for name, probe in probes.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = timeouts.get(name, default_timeout) - (time.monotonic() - started)
+        done, _ = wait([future], timeout=max(remaining, 0))
+        if not done:
+            results[name] = {'success': False, 'status': 'timeout',
+                             'error': f"Probe exceeded {timeouts.get(name, default_timeout)}s"}
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error(f"Probe {name} failed: {str(e)}")
+            results[name] = {'success': False, 'status': 'error', 'error': str(e)}
+    return results
+
+class SWRCache:
+    """
+    Single-value stale-while-revalidate cache
+
+    Within ``ttl`` the cached value is served as is. After that the stale
+    value is still served immediately while one background refresh runs;
+    concurrent callers never trigger more than one load at a time. Only the
+    very first call (or a call after a failed first load) waits on the loader.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], ttl: float = 15.0):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded_at = None
+        self._refreshing = None  # Event set when the in-flight load finishes
+        self._refreshing_pid = None
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0}
+        _caches.add(self)
+
+    def get(self) -> Dict[str, Any]:
+        """
+        Get the cached value, refreshing it if needed
+
+        Returns:
+            Dictionary with 'value' and 'cache' metadata (age, stale)
+        """
+        with self._lock:
+            if self._refreshing is not None and self._refreshing_pid != os.getpid():
+                # Forked mid-refresh: the loading thread does not exist here
+                self._refreshing = None
+
+            if self._loaded_at is not None:
+                age = time.monotonic() - self._loaded_at
+                stale = age >= self.ttl
+                if stale:
+                    self._stats['stale_hits'] += 1
+                    if self._refreshing is None:
+                        self._refreshing = threading.Event()
+                        self._refreshing_pid = os.getpid()
+                        threading.Thread(target=self._refresh, name=f'{self.name}-refresh', daemon=True).start()
+                else:
+                    self._stats['hits'] += 1
+                return {'value': self._value, 'cache': {'age': round(age, 3), 'stale': stale}}
+
+            self._stats['misses'] += 1
+            loading = self._refreshing
+            if loading is None:
+                self._refreshing = threading.Event()
+                self._refreshing_pid = os.getpid()
+
+        if loading is not None:
+            # Another caller is already loading the first value
+            loading.wait()
+            with self._lock:
+                if self._loaded_at is not None:
+                    age = time.monotonic() - self._loaded_at
+                    return {'value': self._value, 'cache': {'age': round(age, 3), 'stale': False}}
+            return {'value': None, 'cache': {'age': None, 'stale': True}}
+
+        self._refresh()
+        with self._lock:
+            return {'value': self._value, 'cache': {'age': 0.0, 'stale': self._loaded_at is None}}
+
+    def _refresh(self):
+        try:
+            value = self.loader()
+            with self._lock:
+                self._value = value
+                self._loaded_at = time.monotonic()
+                self._stats['refreshes'] += 1
+        except Exception as e:
+            logger.error(f"Refreshing {self.name} failed: {str(e)}")
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+        finally:
+            with self._lock:
+                event, self._refreshing = self._refreshing, None
+            if event is not None:
+                event.set()
+
+    def invalidate(self):
+        """Force the next call to refresh"""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._loaded_at -= self.ttl
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        with self._lock:
+            return {**self._stats, 'ttl': self.ttl}
+
+def _collect_cache_metrics():
+    requests, ratios = [], []
+    for cache in list(_caches):
+        stats = cache.stats()
+        for result in ('hits', 'stale_hits', 'misses'):
+            requests.append(({'cache': cache.name, 'result': result}, stats[result]))
+        served = stats['hits'] + stats['stale_hits']
+        total = served + stats['misses']
+        ratios.append(({'cache': cache.name}, served / total if total else None))
+    return [
+        family('cache_requests_total', 'Cache lookups by cache and result', requests, metric_type='counter'),
+        family('cache_hit_ratio', 'Share of lookups served from cache (fresh or stale)', ratios)
+    ]
+
+metrics.register_collector('swr_cache', _collect_cache_metrics)
@@ -0,0 +1,312 @@
+"""
+Tabular Stats Service for Agent CEO system
+Streaming CSV and Excel readers feeding one chunked statistics accumulator, so large files are
+profiled in a single pass with bounded memory
+"""
+
+import io
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from src.services.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DESCRIBE_PERCENTILES = (25, 50, 75)
+
+class StreamingStats:
+    """
+    describe()-style statistics merged across DataFrame chunks
+
+    Counts, missing values, means and variances (Chan et al. merge) and min/max are exact;
+    quartiles come from a per-column reservoir sample once a column exceeds ``reservoir_size``.
+    """
+
+    def __init__(self, sample_rows: int = 10, reservoir_size: int = 10000, seed: int = 0):
+        self.sample_rows = sample_rows
+        self.reservoir_size = reservoir_size
+        self.rows = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, set] = {}
+        self.missing: Dict[str, int] = {}
+        self.numeric: Dict[str, Dict[str, Any]] = {}
+        self.sample: List[Dict[str, Any]] = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold one chunk into the statistics"""
+        if chunk.empty:
+            return
+        for column in chunk.columns:
+            if column not in self.missing:
+                self.columns.append(column)
+                self.dtypes[column] = set()
+                # Columns first seen in a later chunk were missing in every earlier row
+                self.missing[column] = self.rows
+        for column in self.columns:
+            if column not in chunk.columns:
+                self.missing[column] += len(chunk)
+                continue
+            series = chunk[column]
+            missing = int(series.isna().sum())
+            self.missing[column] += missing
+            if missing < len(series):
+                # All-empty chunks carry no type information
+                self.dtypes[column].add(str(series.dtype))
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy(dtype=float, na_value=np.nan)
+                self._fold(column, values[~np.isnan(values)])
+
+        if len(self.sample) < self.sample_rows:
+            head = chunk.head(self.sample_rows - len(self.sample))
+            self.sample.extend(json.loads(head.to_json(orient='records', date_format='iso')))
+        self.rows += len(chunk)
+
+    def _fold(self, column: str, values: np.ndarray):
+        if not len(values):
+            return
+        stats = self.numeric.setdefault(column, {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf,
+                                                 'max': -np.inf, 'reservoir': np.empty(0)})
+        count, mean = len(values), float(values.mean())
+        total = stats['count'] + count
+        delta = mean - stats['mean']
+        stats['m2'] += float(((values - mean) ** 2).sum()) + delta ** 2 * stats['count'] * count / total
+        stats['mean'] += delta * count / total
+        stats['min'] = min(stats['min'], float(values.min()))
+        stats['max'] = max(stats['max'], float(values.max()))
+
+        # Reservoir sampling (algorithm R), vectorized over the chunk
+        reservoir = stats['reservoir']
+        free = self.reservoir_size - len(reservoir)
+        if free > 0:
+            reservoir = np.concatenate([reservoir, values[:free]])
+        rest = values[max(free, 0):]
+        if len(rest):
+            seen = stats['count'] + max(free, 0)
+            slots = self._rng.integers(0, seen + np.arange(1, len(rest) + 1))
+            keep = slots < self.reservoir_size
+            reservoir[slots[keep]] = rest[keep]
+        stats['reservoir'] = reservoir
+        stats['count'] = total
+
+    @staticmethod
+    def _dtype(seen: set) -> str:
+        """One dtype for a column whose chunks were inferred differently"""
+        if len(seen) == 1:
+            return next(iter(seen))
+        if not seen:
+            return 'object'
+        if seen and all(dtype.startswith(('int', 'float', 'uint')) for dtype in seen):
+            return 'float64'
+        return 'object'
+
+    def summary(self) -> Dict[str, Any]:
+        """Statistics in the shape of the original DataFrame-based summary"""
+        numeric_summary = {}
+        for column, stats in self.numeric.items():
+            count = stats['count']
+            quartiles = np.percentile(stats['reservoir'], DESCRIBE_PERCENTILES) if count else [np.nan] * 3
+            numeric_summary[column] = {
+                'count': float(count),
+                'mean': stats['mean'],
+                'std': (stats['m2'] / (count - 1)) ** 0.5 if count > 1 else None,
+                'min': stats['min'],
+                **{f'{p}%': float(q) for p, q in zip(DESCRIBE_PERCENTILES, quartiles)},
+                'max': stats['max']
+            }
+        return {
+            'row_count': self.rows,
+            'column_count': len(self.columns),
+            'columns': list(self.columns),
+            'data_types': {column: self._dtype(self.dtypes[column]) for column in self.columns},
+            'missing_values': dict(self.missing),
+            'numeric_summary': numeric_summary,
+            'quartiles_estimated': any(s['count'] > self.reservoir_size for s in self.numeric.values())
+        }
+
+class TabularReader:
+    """Chunked CSV and row-streamed Excel readers with row and column limits"""
+
+    def __init__(self, chunk_rows: int = 20000, max_rows: int = 1000000, max_columns: int = 200):
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self.max_columns = max_columns
+
+    def _limited(self, chunks: Iterator[pd.DataFrame], limits: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """Apply the row and column limits to a chunk stream, noting what was cut in ``limits``"""
+        rows = 0
+        for chunk in chunks:
+            if len(chunk.columns) > self.max_columns:
+                limits['columns_truncated'] = True
+                chunk = chunk.iloc[:, :self.max_columns]
+            if rows + len(chunk) > self.max_rows:
+                limits['rows_truncated'] = True
+                chunk = chunk.iloc[:self.max_rows - rows]
+            rows += len(chunk)
+            if len(chunk):
+                yield chunk
+            if rows >= self.max_rows:
+                return
+
+    @traced()
+    def profile_csv(self, source: Union[str, bytes, IO], sample_rows: int = 10) -> Dict[str, Any]:
+        """
+        Profile CSV text, bytes or a file object chunk by chunk
+
+        Args:
+            source: CSV content or an open file
+            sample_rows: Rows to keep as the sample
+
+        Returns:
+            Statistics dictionary with a 'sample' of the first rows
+        """
+        if isinstance(source, str):
+            source = io.StringIO(source)
+        elif isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        stats = StreamingStats(sample_rows=sample_rows)
+        limits = {'rows_truncated': False, 'columns_truncated': False}
+        with pd.read_csv(source, chunksize=self.chunk_rows, low_memory=False) as reader:
+            for chunk in self._limited(reader, limits):
+                stats.update(chunk)
+        return {**stats.summary(), **limits, 'sample': stats.sample}
+
+    @traced()
+    def profile_excel(self, source: Union[str, IO[bytes]], sheet_names: Optional[Sequence[str]] = None,
+                      sample_rows: int = 10) -> Dict[str, Any]:
+        """
+        Profile every sheet of a workbook in one streaming pass
+
+        Uses python-calamine when installed, otherwise openpyxl in read-only mode
+        (.xls files without calamine fall back to pandas).
+
+        Args:
+            source: Path to the workbook or a seekable binary stream
+            sheet_names: Sheets to profile (default: all)
+            sample_rows: Rows to keep as the sample of each sheet
+
+        Returns:
+            Dictionary with the sheet names, the reader used and per-sheet statistics
+        """
+        available, sheets, engine, close = self._open_workbook(source)
+        try:
+            missing = [name for name in sheet_names or [] if name not in available]
+            if missing:
+                raise ValueError(f"Worksheet(s) not found: {', '.join(missing)}")
+            profiles = {}
+            for name in sheet_names or available:
+                stats = StreamingStats(sample_rows=sample_rows)
+                limits = {'rows_truncated': False, 'columns_truncated': False}
+                for chunk in self._limited(self._sheet_chunks(sheets(name), limits), limits):
+                    stats.update(chunk)
+                profiles[name] = {**stats.summary(), **limits, 'sample': stats.sample}
+        finally:
+            close()
+        return {'sheets_available': available, 'engine': engine, 'sheets': profiles}
+
+    def _open_workbook(self, source: Union[str, IO[bytes]]):
+        """(sheet names, sheet name -> row iterator, engine, close)"""
+        try:
+            from python_calamine import CalamineWorkbook
+        except ImportError:
+            CalamineWorkbook = None
+        if CalamineWorkbook is not None:
+            workbook = CalamineWorkbook.from_path(source) if isinstance(source, str) \
+                else CalamineWorkbook.from_filelike(source)
+            return (list(workbook.sheet_names), lambda name: workbook.get_sheet_by_name(name).iter_rows(),
+                    'calamine', workbook.close)
+        if self._is_xls(source):
+            excel = pd.ExcelFile(source)
+
+            def rows(name):
+                frame = excel.parse(name, header=None, nrows=self.max_rows + 1)
+                yield from frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None)
+            return list(excel.sheet_names), rows, 'pandas', excel.close
+
+        import openpyxl
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        return (list(workbook.sheetnames),
+                lambda name: workbook[name].iter_rows(max_col=self.max_columns + 1, values_only=True),
+                'openpyxl', workbook.close)
+
+    @staticmethod
+    def _is_xls(source: Union[str, IO[bytes]]) -> bool:
+        """Legacy .xls (OLE2 compound file) rather than .xlsx"""
+        if isinstance(source, str):
+            return source.lower().endswith('.xls')
+        position = source.tell()
+        magic = source.read(8)
+        source.seek(position)
+        return magic == b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+    def _sheet_chunks(self, rows: Iterator[Sequence[Any]], limits: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """DataFrame chunks from raw sheet rows: the first non-blank row is the header, blank rows are dropped"""
+        header = None
+        buffer: List[Sequence[Any]] = []
+        for row in rows:
+            if header is None:
+                values = [None if value == '' else value for value in row[:self.max_columns + 1]]
+                present = [i for i, value in enumerate(values) if value is not None]
+                if not present:
+                    continue
+                # Sheets without stored dimensions pad rows with empty cells; the header sets the width
+                if present[-1] >= self.max_columns:
+                    limits['columns_truncated'] = True
+                header = self._header(values[:min(present[-1] + 1, self.max_columns)])
+                width = len(header)
+                continue
+            buffer.append(row[:width])
+            if len(buffer) >= self.chunk_rows:
+                yield self._frame(buffer, header)
+                buffer = []
+        if buffer:
+            yield self._frame(buffer, header)
+
+    @staticmethod
+    def _header(values: Sequence[Any]) -> List[str]:
+        """Column names as pandas would produce them (Unnamed: i, duplicates suffixed .1, .2, ...)"""
+        names, seen = [], {}
+        for i, value in enumerate(values):
+            name = f'Unnamed: {i}' if value is None else str(value).strip()
+            if name in seen:
+                seen[name] += 1
+                name = f'{name}.{seen[name]}'
+            else:
+                seen[name] = 0
+            names.append(name)
+        return names
+
+    @staticmethod
+    def _frame(rows: List[Sequence[Any]], header: List[str]) -> pd.DataFrame:
+        width = len(header)
+        rows = [tuple(row) + (None,) * (width - len(row)) if len(row) < width else row for row in rows]
+        # Empty cells arrive as None (openpyxl) or '' (calamine)
+        frame = pd.DataFrame.from_records(rows, columns=header).replace('', None).dropna(how='all')
+        frame = frame.infer_objects()
+        for column in frame.columns[frame.dtypes == object]:
+            # Date cells come back as datetime/date objects
+            present = frame[column].dropna()
+            if len(present) and isinstance(present.iloc[0], (datetime, date)):
+                try:
+                    frame[column] = pd.to_datetime(frame[column])
+                except (TypeError, ValueError):
+                    pass
+        # Excel stores every number as a float; whole-number columns read as integers, as in pandas
+        for column in frame.select_dtypes(include='float').columns:
+            values = frame[column]
+            if values.notna().all() and (values % 1 == 0).all():
+                frame[column] = values.astype('int64')
+        return frame
+
+# Global tabular reader instance
+tabular_reader = TabularReader(
+    chunk_rows=int(os.getenv('TABULAR_CHUNK_ROWS', '20000')),
+    max_rows=int(os.getenv('TABULAR_MAX_ROWS', '1000000')),
+    max_columns=int(os.getenv('TABULAR_MAX_COLUMNS', '200'))
+)
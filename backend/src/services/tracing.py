@@ -0,0 +1,544 @@
+"""
+Tracing Service for Agent CEO system
+Opt-in per-request spans (SQL, outbound HTTP, service methods) with OTLP/JSON export and on-demand profiling
+"""
+
+import atexit
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+STATEMENT_MAX_CHARS = 500
+
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_WHITESPACE = re.compile(r'\s+')
+
+class Span:
+    """One timed operation inside a trace"""
+
+    __slots__ = ('span_id', 'parent_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'status', 'message')
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int = SPAN_KIND_INTERNAL,
+                 start_ns: Optional[int] = None, attributes: Dict[str, Any] = None):
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.message = ''
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def fail(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.message = f'{type(error).__name__}: {error}'[:500]
+
+class Trace:
+    """Spans of one request, plus running totals for the response headers"""
+
+    def __init__(self, trace_id: str, max_spans: int, remote_parent_id: Optional[str] = None):
+        self.trace_id = trace_id
+        self.remote_parent_id = remote_parent_id
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.root: Optional[Span] = None
+        self.totals = {'db.count': 0, 'db.duration_ms': 0.0, 'http.count': 0, 'http.duration_ms': 0.0}
+        self._lock = threading.Lock()  # spans also arrive from pool threads
+
+    def add(self, span: Span, total: Optional[str] = None):
+        with self._lock:
+            if total:
+                self.totals[f'{total}.count'] += 1
+                self.totals[f'{total}.duration_ms'] += span.duration_ms
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+    def summary(self) -> Dict[str, Any]:
+        root = self.root
+        return {
+            'trace_id': self.trace_id,
+            'name': root.name if root else None,
+            'started_at': root.start_ns / 1e9 if root else None,
+            'duration_ms': round(root.duration_ms, 2) if root else None,
+            'status_code': root.attributes.get('http.status_code') if root else None,
+            'spans': len(self.spans),
+            'dropped_spans': self.dropped,
+            'db_queries': self.totals['db.count'],
+            'db_ms': round(self.totals['db.duration_ms'], 2),
+            'http_calls': self.totals['http.count'],
+            'http_ms': round(self.totals['http.duration_ms'], 2)
+        }
+
+# (trace, current span) for the code running now; copied into pool threads with contextvars.copy_context()
+_current: ContextVar[Optional[Tuple[Trace, Span]]] = ContextVar('trace_current_span', default=None)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+def _strip_query(url: str) -> str:
+    """Drop query string and credentials, which may carry API keys"""
+    parts = urlsplit(url)
+    netloc = parts.netloc.rsplit('@', 1)[-1]
+    return urlunsplit((parts.scheme, netloc, parts.path, '', ''))
+
+class Tracer:
+    """
+    Request tracer
+
+    When enabled, every sampled request gets a root span; SQL statements,
+    outbound ``requests`` calls and ``traced`` service methods made while
+    serving it become child spans. Finished traces are kept in a ring
+    buffer for /api/debug/traces and, if an OTLP/HTTP endpoint is
+    configured, exported in the background as OTLP JSON.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0, buffer_size: int = 200,
+                 max_spans: int = 500, slow_ms: float = 0.0, service_name: str = 'agent-ceo-backend',
+                 otlp_endpoint: Optional[str] = None, export_interval: float = 5.0,
+                 debug_token: Optional[str] = None, profiling_enabled: bool = False, profile_buffer_size: int = 20):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+        self.slow_ms = slow_ms
+        self.service_name = service_name
+        self.otlp_endpoint = otlp_endpoint
+        self.export_interval = export_interval
+        self.debug_token = debug_token
+        self.profiling_enabled = profiling_enabled
+        self._traces: deque = deque(maxlen=buffer_size)
+        self._profiles: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._profile_buffer_size = profile_buffer_size
+        self._lock = threading.Lock()
+        self._export_queue: deque = deque(maxlen=buffer_size * 5)
+        self._exporter: Optional[threading.Thread] = None
+        self._exporter_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._hooks_installed = False
+        self._stats = {'traces': 0, 'kept': 0, 'exported': 0, 'export_failures': 0, 'profiles': 0}
+
+    def init_app(self, app):
+        """Install request hooks, SQL/HTTP instrumentation and the exporter"""
+        if not (self.enabled or self.profiling_enabled):
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if self.enabled:
+            self._install_hooks()
+        logger.info(f"Tracing enabled={self.enabled} sample_rate={self.sample_rate} profiling={self.profiling_enabled}")
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """
+        Time a block as a child of the current span
+
+        A no-op outside a sampled request, so service code can call it
+        unconditionally.
+        """
+        current = _current.get()
+        if current is None:
+            yield None
+            return
+        trace, parent = current
+        span = Span(name, parent.span_id, kind=kind, attributes=attributes)
+        token = _current.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            trace.add(span)
+
+    def _record(self, name: str, kind: int, start_ns: int, attributes: Dict[str, Any],
+                error: Optional[BaseException] = None, total: Optional[str] = None):
+        """Add an already finished span under the current span"""
+        current = _current.get()
+        if current is None:
+            return
+        trace, parent = current
+        span = Span(name, parent.span_id, kind=kind, start_ns=start_ns, attributes=attributes)
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.fail(error)
+        trace.add(span, total=total)
+
+    def current_trace_id(self) -> Optional[str]:
+        current = _current.get()
+        return current[0].trace_id if current else None
+
+    def _install_hooks(self):
+        if self._hooks_installed:
+            return
+        self._hooks_installed = True
+
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_db_error)
+
+        original_send = requests.Session.send
+        tracer = self
+
+        @wraps(original_send)
+        def traced_send(session, prepared, **kwargs):
+            if _current.get() is None:
+                return original_send(session, prepared, **kwargs)
+            start_ns = time.time_ns()
+            attributes = {'http.method': prepared.method, 'http.url': _strip_query(prepared.url)}
+            error = None
+            try:
+                response = original_send(session, prepared, **kwargs)
+                attributes['http.status_code'] = response.status_code
+                return response
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                host = urlsplit(prepared.url).hostname or ''
+                tracer._record(f'HTTP {prepared.method} {host}', SPAN_KIND_CLIENT, start_ns,
+                               attributes, error=error, total='http')
+
+        requests.Session.send = traced_send
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault('trace_query_start', []).append(time.time_ns())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('trace_query_start')
+        if not starts or _current.get() is None:
+            return
+        self._record_query(starts.pop(), statement, conn, executemany)
+
+    def _handle_db_error(self, exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get('trace_query_start') if conn is not None else None
+        if not starts or _current.get() is None:
+            return
+        self._record_query(starts.pop(), exception_context.statement or '', conn, False,
+                           error=exception_context.original_exception)
+
+    def _record_query(self, start_ns: int, statement: str, conn, executemany: bool,
+                      error: Optional[BaseException] = None):
+        statement = _WHITESPACE.sub(' ', statement).strip()
+        operation = statement.split(' ', 1)[0].upper() if statement else 'SQL'
+        attributes = {
+            'db.system': conn.engine.dialect.name,
+            'db.statement': statement[:STATEMENT_MAX_CHARS],
+            'db.executemany': executemany or None
+        }
+        self._record(f'db {operation}', SPAN_KIND_CLIENT, start_ns, attributes, error=error, total='db')
+
+    def authorized(self) -> bool:
+        """Debug endpoints and profiling need TRACE_DEBUG_TOKEN, or debug mode when it is unset"""
+        if self.debug_token:
+            supplied = request.headers.get('X-Debug-Token', '')
+            return hmac.compare_digest(supplied.encode('utf-8'), self.debug_token.encode('utf-8'))
+        return bool(current_app.debug)
+
+    def _before_request(self):
+        if self.enabled:
+            self._start_trace()
+        if self.profiling_enabled and request.headers.get('X-Profile') and self.authorized():
+            g._profiler = self._start_profiler()
+
+    def _start_trace(self):
+        trace_id, remote_parent, forced = None, None, False
+        match = _TRACEPARENT.match(request.headers.get('traceparent', '').strip().lower())
+        if match:
+            trace_id, remote_parent = match.group(1), match.group(2)
+            forced = int(match.group(3), 16) & 1 == 1
+        if not forced and random.random() >= self.sample_rate:
+            return
+
+        trace = Trace(trace_id or os.urandom(16).hex(), self.max_spans, remote_parent_id=remote_parent)
+        rule = request.url_rule.rule if request.url_rule else request.path
+        trace.root = Span(f'{request.method} {rule}', remote_parent, kind=SPAN_KIND_SERVER, attributes={
+            'http.method': request.method,
+            'http.route': rule,
+            'http.target': request.path,
+            'http.user_agent': request.user_agent.string or None
+        })
+        g._trace_state = (_current.set((trace, trace.root)), trace)
+
+    def _after_request(self, response):
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profile_id = self._finish_profiler(profiler)
+            response.headers['X-Profile-Id'] = profile_id
+            current = _current.get()
+            if current is not None:
+                current[0].root.attributes['profile.id'] = profile_id
+
+        state = g.get('_trace_state')
+        if state is None:
+            return response
+        trace, root = state[1], state[1].root
+        root.attributes['http.status_code'] = response.status_code
+        if response.status_code >= 500:
+            root.status = STATUS_ERROR
+        root.end_ns = time.time_ns()
+
+        totals = trace.totals
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={totals["db.duration_ms"]:.1f};desc="{totals["db.count"]} queries"',
+            f'http;dur={totals["http.duration_ms"]:.1f};desc="{totals["http.count"]} calls"',
+            f'total;dur={root.duration_ms:.1f}'
+        ])
+        return response
+
+    def _teardown_request(self, error=None):
+        state = g.pop('_trace_state', None)
+        if state is None:
+            return
+        token, trace = state
+        root = trace.root
+        _current.reset(token)
+        if error is not None:
+            root.fail(error)
+        if root.end_ns is None:
+            root.end_ns = time.time_ns()
+        root.attributes.update({
+            'db.query_count': trace.totals['db.count'],
+            'db.duration_ms': round(trace.totals['db.duration_ms'], 3),
+            'http.client_count': trace.totals['http.count'],
+            'http.client_duration_ms': round(trace.totals['http.duration_ms'], 3)
+        })
+        self._finish_trace(trace)
+
+    def _finish_trace(self, trace: Trace):
+        with self._lock:
+            self._stats['traces'] += 1
+            if trace.root.duration_ms < self.slow_ms:
+                return
+            self._stats['kept'] += 1
+            self._traces.append(trace)
+            if self.otlp_endpoint:
+                self._export_queue.append(trace)
+        if self.otlp_endpoint:
+            self._ensure_exporter()
+
+    def _start_profiler(self):
+        try:
+            from pyinstrument import Profiler
+            profiler = Profiler(interval=0.001, async_mode='disabled')
+        except ImportError:
+            profiler = cProfile.Profile()
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.enable()
+            else:
+                profiler.start()
+        except Exception as e:
+            logger.warning(f"Could not start profiler: {e}")
+            return None
+        return profiler
+
+    def _finish_profiler(self, profiler) -> str:
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(50)
+            profile = {'format': 'text', 'body': out.getvalue()}
+        else:
+            profiler.stop()
+            profile = {'format': 'html', 'body': profiler.output_html()}
+        profile_id = uuid.uuid4().hex
+        profile.update({
+            'path': request.path,
+            'method': request.method,
+            'created_at': time.time(),
+            'trace_id': self.current_trace_id()
+        })
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self._profile_buffer_size:
+                self._profiles.popitem(last=False)
+            self._stats['profiles'] += 1
+        return profile_id
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def to_otlp(self, traces: List[Trace]) -> Dict[str, Any]:
+        """Render traces as an OTLP/JSON ExportTraceServiceRequest"""
+        spans = []
+        for trace in traces:
+            with trace._lock:
+                trace_spans = [trace.root] + list(trace.spans)
+            for span in trace_spans:
+                spans.append({
+                    'traceId': trace.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': span.kind,
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns or span.start_ns),
+                    'attributes': _otlp_attributes(span.attributes),
+                    'status': {'code': span.status, 'message': span.message} if span.message else {'code': span.status}
+                })
+        return {
+            'resourceSpans': [{
+                'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': spans
+                }]
+            }]
+        }
+
+    def recent(self, limit: int = 50, min_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """Summaries of the most recent finished traces, newest first"""
+        with self._lock:
+            traces = list(self._traces)
+        summaries = [trace.summary() for trace in reversed(traces)]
+        return [summary for summary in summaries if (summary['duration_ms'] or 0) >= min_ms][:limit]
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            for trace in self._traces:
+                if trace.trace_id == trace_id:
+                    return trace
+        return None
+
+    def export(self, min_ms: float = 0.0) -> Dict[str, Any]:
+        """OTLP/JSON of every buffered trace at least ``min_ms`` long"""
+        with self._lock:
+            traces = [trace for trace in self._traces if trace.root.duration_ms >= min_ms]
+        return self.to_otlp(traces)
+
+    def _ensure_exporter(self):
+        if self._exporter is not None and self._exporter.is_alive() and self._exporter_pid == os.getpid():
+            return
+        with self._lock:
+            if self._exporter is not None and self._exporter.is_alive() and self._exporter_pid == os.getpid():
+                return
+            self._stop.clear()
+            self._exporter = threading.Thread(target=self._run_exporter, name='trace-exporter', daemon=True)
+            self._exporter_pid = os.getpid()
+            self._exporter.start()
+
+    def _run_exporter(self):
+        while not self._stop.wait(self.export_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """POST queued traces to the OTLP/HTTP endpoint; returns the number of traces sent"""
+        batch = []
+        while self._export_queue:
+            try:
+                batch.append(self._export_queue.popleft())
+            except IndexError:
+                break
+        if not batch or not self.otlp_endpoint:
+            return 0
+        try:
+            response = requests.post(self.otlp_endpoint, json=self.to_otlp(batch), timeout=10)
+            response.raise_for_status()
+            self._stats['exported'] += len(batch)
+            return len(batch)
+        except Exception as e:
+            self._stats['export_failures'] += 1
+            logger.warning(f"Trace export to {self.otlp_endpoint} failed, dropping {len(batch)} traces: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'buffered': len(self._traces), 'export_queue': len(self._export_queue),
+                    'enabled': self.enabled, 'sample_rate': self.sample_rate,
+                    'profiling_enabled': self.profiling_enabled}
+
+    def shutdown(self, timeout: float = 5.0):
+        """Stop the exporter after a last flush"""
+        self._stop.set()
+        if self._exporter is not None and self._exporter_pid == os.getpid():
+            self._exporter.join(timeout)
+        self.flush()
+
+def traced(name: Optional[str] = None, **attributes):
+    """
+    Decorator recording each call as a span of the current request
+
+    Args:
+        name: Span name; defaults to ``module.qualname`` of the function
+        attributes: Static attributes added to every span
+    """
+    def decorator(func):
+        span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with tracer.span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Global tracer instance
+tracer = Tracer(
+    enabled=os.getenv('TRACING_ENABLED', 'false').lower() == 'true',
+    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '1.0')),
+    buffer_size=int(os.getenv('TRACE_BUFFER_SIZE', '200')),
+    max_spans=int(os.getenv('TRACE_MAX_SPANS', '500')),
+    slow_ms=float(os.getenv('TRACE_SLOW_MS', '0')),
+    service_name=os.getenv('TRACE_SERVICE_NAME', 'agent-ceo-backend'),
+    otlp_endpoint=os.getenv('TRACE_OTLP_ENDPOINT') or None,
+    export_interval=float(os.getenv('TRACE_EXPORT_SECONDS', '5')),
+    debug_token=os.getenv('TRACE_DEBUG_TOKEN') or None,
+    profiling_enabled=os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+)
+atexit.register(tracer.shutdown, 2.0)
@@ -0,0 +1,146 @@
+"""
+Upload Service for Agent CEO system
+Spools multipart file uploads to memory or disk while hashing them, enforces the upload size
+limit while the body is read, and hands parsers a rewound stream with guaranteed cleanup
+"""
+
+import hashlib
+import io
+import logging
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Dict, Iterator, Optional
+
+from flask import Request
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries and form fields on top of the file size limit
+MULTIPART_OVERHEAD = 64 * 1024
+
+def too_large_message(limit: int) -> str:
+    return f'File exceeds the {limit / (1024 * 1024):.3g} MB upload limit'
+
+class HashingSpool(SpooledTemporaryFile):
+    """SpooledTemporaryFile that hashes and counts bytes as they are written, up to a limit"""
+
+    def __init__(self, max_size: int, limit: Optional[int] = None):
+        super().__init__(max_size=max_size, mode='w+b')
+        self.limit = limit
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.limit is not None and self.size > self.limit:
+            raise RequestEntityTooLarge(too_large_message(self.limit))
+        self._sha256.update(data)
+        return super().write(data)
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    @property
+    def on_disk(self) -> bool:
+        return self._rolled
+
+class Upload:
+    """A received file: a rewound binary stream plus its name, size and hash"""
+
+    def __init__(self, filename: str, stream: IO[bytes], size: int, sha256: str, on_disk: bool):
+        self.filename = filename
+        self.extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        self.stream = stream
+        self.size = size
+        self.sha256 = sha256
+        self.on_disk = on_disk
+
+    def describe(self) -> Dict[str, Any]:
+        return {'filename': self.filename, 'size': self.size, 'sha256': self.sha256, 'spooled_to_disk': self.on_disk}
+
+class UploadService:
+    """Spooled, hashed and size-limited handling of multipart uploads"""
+
+    def __init__(self, max_bytes: int = 100 * 1024 * 1024, spool_bytes: int = 8 * 1024 * 1024,
+                 read_chunk: int = 1024 * 1024):
+        self.max_bytes = max_bytes
+        # Uploads up to spool_bytes stay in memory; larger ones roll over to a temporary file
+        self.spool_bytes = spool_bytes
+        self.read_chunk = read_chunk
+
+    def stream_factory(self, total_content_length: Optional[int], content_type: Optional[str],
+                       filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        """werkzeug stream factory: each file part is written straight into a HashingSpool"""
+        return HashingSpool(max_size=self.spool_bytes, limit=self.max_bytes)
+
+    def limit_request(self, request: Request):
+        """
+        Cap this request's body before the form is parsed
+
+        A larger Content-Length is rejected without reading the body; chunked bodies
+        are cut off by werkzeug (and by HashingSpool) once they pass the limit.
+        """
+        request.max_content_length = self.max_bytes + MULTIPART_OVERHEAD
+
+    def too_large(self) -> Dict[str, str]:
+        """Error body for a 413"""
+        return {'error': too_large_message(self.max_bytes)}
+
+    @contextmanager
+    def receive(self, file: FileStorage) -> Iterator[Upload]:
+        """
+        Yield an Upload for a received file and close its stream afterwards, whatever happens
+
+        Args:
+            file: File from ``request.files``
+
+        Raises:
+            RequestEntityTooLarge: if the file is over the limit
+        """
+        stream = file.stream
+        try:
+            if isinstance(stream, HashingSpool):
+                size, sha256, on_disk = stream.size, stream.sha256, stream.on_disk
+            else:
+                # Streams from another factory (or built by hand): hash them in one read-through
+                size, sha256, on_disk = self._hash_stream(stream)
+            stream.seek(0)
+            yield Upload(secure_filename(file.filename or ''), stream, size, sha256, on_disk)
+        finally:
+            try:
+                file.close()
+            except Exception as e:
+                logger.warning(f"Failed to close upload stream: {str(e)}")
+
+    def _hash_stream(self, stream: IO[bytes]):
+        stream.seek(0)
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = stream.read(self.read_chunk)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > self.max_bytes:
+                raise RequestEntityTooLarge(too_large_message(self.max_bytes))
+            digest.update(chunk)
+        return size, digest.hexdigest(), not isinstance(stream, io.BytesIO)
+
+class UploadRequest(Request):
+    """Request class whose multipart file parts are spooled and hashed by the upload service"""
+
+    def _get_file_stream(self, total_content_length: Optional[int], content_type: Optional[str],
+                         filename: Optional[str] = None, content_length: Optional[int] = None) -> IO[bytes]:
+        return upload_service.stream_factory(total_content_length, content_type, filename, content_length)
+
+# Global upload service instance
+upload_service = UploadService(
+    max_bytes=settings.upload_max_bytes,
+    spool_bytes=settings.upload_spool_bytes
+)
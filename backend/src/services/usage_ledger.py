@@ -0,0 +1,378 @@
+"""
+Usage Ledger Service for Agent CEO system
+Records tokens, latency and cost of every LLM call, buffered in memory and flushed in batches
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import case, func, insert
+
+from src.models.user import db
+from src.models.usage import LLMUsage
+from src.services.metrics import LLM_BUCKETS, family, metrics
+
+logger = logging.getLogger(__name__)
+
+# USD per million tokens: input, output, cache read, cache write (prefix match, longest first)
+DEFAULT_PRICES = {
+    'gpt-4.5': {'input': 75.0, 'output': 150.0, 'cached': 37.5, 'cache_write': 75.0},
+    'gpt-4o': {'input': 2.5, 'output': 10.0, 'cached': 1.25, 'cache_write': 2.5},
+    'gpt-4-turbo': {'input': 10.0, 'output': 30.0, 'cached': 10.0, 'cache_write': 10.0},
+    'gpt-4': {'input': 30.0, 'output': 60.0, 'cached': 30.0, 'cache_write': 30.0},
+    'gpt-3.5-turbo': {'input': 0.5, 'output': 1.5, 'cached': 0.5, 'cache_write': 0.5},
+    'claude-3-opus': {'input': 15.0, 'output': 75.0, 'cached': 1.5, 'cache_write': 18.75},
+    'claude-3-sonnet': {'input': 3.0, 'output': 15.0, 'cached': 0.3, 'cache_write': 3.75},
+    'claude-3-haiku': {'input': 0.25, 'output': 1.25, 'cached': 0.03, 'cache_write': 0.3},
+    'text-embedding-3-small': {'input': 0.02, 'output': 0.0, 'cached': 0.02, 'cache_write': 0.02},
+    'text-embedding-3-large': {'input': 0.13, 'output': 0.0, 'cached': 0.13, 'cache_write': 0.13},
+}
+
+llm_request_duration = metrics.histogram(
+    'llm_request_duration_seconds',
+    'LLM provider call latency by provider, model and outcome',
+    ('provider', 'model', 'outcome'),
+    buckets=LLM_BUCKETS
+)
+llm_tokens = metrics.counter('llm_tokens_total', 'LLM tokens by provider, model and kind', ('provider', 'model', 'kind'))
+
+# Attribution for calls made inside the current request/task (route, call_site, agent_id)
+_usage_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar('llm_usage_scope', default=None)
+
+@contextmanager
+def usage_scope(**attributes):
+    """
+    Attribute LLM calls made inside the block, e.g. ``usage_scope(agent_id=3)``
+
+    Nested scopes add to (and override) the enclosing one.
+    """
+    token = _usage_scope.set({**(_usage_scope.get() or {}), **attributes})
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+def capture_scope(call_site: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Snapshot attribution in the calling thread
+
+    Taken before work moves to pool threads (routing, hedging), where neither
+    the request nor context variables are visible. An explicit ``usage_scope``
+    call_site wins over the one passed here.
+    """
+    scope = dict(_usage_scope.get() or {})
+    if 'route' not in scope and has_request_context() and request.url_rule is not None:
+        scope['route'] = request.url_rule.rule
+    if call_site and 'call_site' not in scope:
+        scope['call_site'] = call_site
+    return scope
+
+def usage_from_langchain(response) -> Dict[str, int]:
+    """Normalize a LangChain message's usage_metadata into ledger token counts"""
+    usage = getattr(response, 'usage_metadata', None) or {}
+    details = usage.get('input_token_details') or {}
+    return {
+        'prompt_tokens': usage.get('input_tokens') or 0,
+        'completion_tokens': usage.get('output_tokens') or 0,
+        'cached_tokens': details.get('cache_read') or 0,
+        'cache_write_tokens': details.get('cache_creation') or 0
+    }
+
+class UsageLedger:
+    """
+    Low-overhead LLM usage recorder
+
+    ``record`` only appends a dict to an in-memory buffer; a background
+    thread inserts buffered rows in batches. When the database is unavailable
+    rows are retried with backoff, and once the buffer is full new rows are
+    dropped (and counted) rather than blocking callers.
+    """
+
+    GROUPS = {
+        'route': LLMUsage.route,
+        'call_site': LLMUsage.call_site,
+        'agent': LLMUsage.agent_id,
+        'provider': LLMUsage.provider,
+        'model': LLMUsage.model,
+        'day': func.date(LLMUsage.created_at)
+    }
+
+    def __init__(self, enabled: bool = True, max_buffer: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 5.0, prices: Dict[str, Dict[str, float]] = None):
+        self.enabled = enabled
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prices = prices or DEFAULT_PRICES
+        self.app = None
+
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._failures = 0
+        self._stats = {'recorded': 0, 'flushed': 0, 'dropped': 0, 'failed_flushes': 0}
+
+    def init_app(self, app):
+        """Bind the Flask app used for the flush thread's app context"""
+        self.app = app
+        if self.enabled:
+            self._ensure_started()
+            atexit.register(self.shutdown)
+
+    def price(self, model: str) -> Optional[Dict[str, float]]:
+        for prefix in sorted(self.prices, key=len, reverse=True):
+            if model.startswith(prefix):
+                return self.prices[prefix]
+        return None
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int,
+                      cached_tokens: int = 0, cache_write_tokens: int = 0) -> float:
+        """Estimate the USD cost of a call; 0.0 for models without a price"""
+        price = self.price(model)
+        if price is None:
+            return 0.0
+        uncached = max(prompt_tokens - cached_tokens - cache_write_tokens, 0)
+        cost = (uncached * price['input'] + cached_tokens * price['cached']
+                + cache_write_tokens * price['cache_write'] + completion_tokens * price['output'])
+        return round(cost / 1_000_000, 6)
+
+    def record(self, provider: str, model: str, usage: Dict[str, int], latency_ms: Optional[float],
+               success: bool = True, scope: Optional[Dict[str, Any]] = None):
+        """
+        Buffer one call's usage
+
+        Args:
+            provider: Provider name (openai, anthropic)
+            model: Model name
+            usage: prompt_tokens (including cached), completion_tokens, cached_tokens, cache_write_tokens
+            latency_ms: Wall time of the provider call
+            success: Whether the call succeeded
+            scope: Attribution from ``capture_scope`` (defaults to the current scope)
+        """
+        prompt_tokens = usage.get('prompt_tokens') or 0
+        completion_tokens = usage.get('completion_tokens') or 0
+        cached_tokens = usage.get('cached_tokens') or 0
+        cache_write_tokens = usage.get('cache_write_tokens') or 0
+
+        if latency_ms is not None:
+            llm_request_duration.observe(latency_ms / 1000, provider=provider, model=model,
+                                         outcome='success' if success else 'error')
+        for kind, count in (('prompt', prompt_tokens), ('completion', completion_tokens),
+                            ('cached', cached_tokens), ('cache_write', cache_write_tokens)):
+            if count:
+                llm_tokens.inc(count, provider=provider, model=model, kind=kind)
+
+        if not self.enabled:
+            return
+        self._ensure_started()
+
+        scope = scope if scope is not None else capture_scope()
+        row = {
+            'created_at': datetime.utcnow(),
+            'route': scope.get('route'),
+            'call_site': scope.get('call_site'),
+            'agent_id': scope.get('agent_id'),
+            'provider': provider,
+            'model': model,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'cached_tokens': cached_tokens,
+            'cache_write_tokens': cache_write_tokens,
+            'latency_ms': round(latency_ms, 1) if latency_ms is not None else None,
+            'cost_usd': self.estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens, cache_write_tokens),
+            'success': success
+        }
+
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._stats['dropped'] += 1
+                return
+            self._buffer.append(row)
+            self._stats['recorded'] += 1
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        """Start the flush thread in this process (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Rows buffered before the fork belong to the parent
+                self._buffer = deque()
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='llm-usage-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                if self.app is not None:
+                    with self.app.app_context():
+                        self.flush()
+                else:
+                    self.flush()
+            except Exception as e:
+                self._failures += 1
+                backoff = min(2 ** self._failures, 60)
+                logger.error(f"LLM usage flush failed, retrying in {backoff}s: {str(e)}")
+                self._stopping.wait(backoff)
+
+    def flush(self) -> int:
+        """
+        Insert all buffered rows (requires an app context)
+
+        Returns:
+            Number of rows written
+
+        Raises:
+            Exception: when the insert fails; the batch is put back first
+        """
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return written
+
+            try:
+                db.session.execute(insert(LLMUsage), batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    room = self.max_buffer - len(self._buffer)
+                    self._buffer.extendleft(reversed(batch[:max(room, 0)]))
+                    self._stats['dropped'] += max(len(batch) - room, 0)
+                    self._stats['failed_flushes'] += 1
+                raise
+
+            self._failures = 0
+            written += len(batch)
+            with self._lock:
+                self._stats['flushed'] += len(batch)
+
+    def summary(self, group_by: str = 'route', days: int = 7, limit: int = 50) -> Dict[str, Any]:
+        """
+        Aggregate recorded usage
+
+        Args:
+            group_by: route, call_site, agent, provider, model or day
+            days: Look-back window in days
+            limit: Maximum groups returned (most expensive first; days in order)
+
+        Returns:
+            Per-group call counts, token totals, cost and latency
+        """
+        if group_by not in self.GROUPS:
+            return {'success': False, 'error': f"group_by must be one of: {', '.join(self.GROUPS)}"}
+
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Serving LLM usage without unflushed rows: {str(e)}")
+
+        key = self.GROUPS[group_by].label('key')
+        total_cost = func.sum(LLMUsage.cost_usd)
+        query = db.session.query(
+            key,
+            func.count(LLMUsage.id),
+            func.sum(case((LLMUsage.success.is_(False), 1), else_=0)),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.completion_tokens),
+            func.sum(LLMUsage.cached_tokens),
+            total_cost,
+            func.avg(LLMUsage.latency_ms),
+            func.max(LLMUsage.latency_ms)
+        ).filter(
+            LLMUsage.created_at >= datetime.utcnow() - timedelta(days=days)
+        ).group_by(self.GROUPS[group_by])
+        query = query.order_by(key) if group_by == 'day' else query.order_by(total_cost.desc())
+
+        groups = []
+        for row in query.limit(limit).all():
+            groups.append({
+                group_by: str(row[0]) if group_by == 'day' else row[0],
+                'calls': row[1],
+                'failed_calls': int(row[2] or 0),
+                'prompt_tokens': int(row[3] or 0),
+                'completion_tokens': int(row[4] or 0),
+                'cached_tokens': int(row[5] or 0),
+                'cost_usd': round(row[6] or 0.0, 4),
+                'avg_latency_ms': round(row[7], 1) if row[7] is not None else None,
+                'max_latency_ms': row[8]
+            })
+
+        return {
+            'success': True,
+            'group_by': group_by,
+            'days': days,
+            'groups': groups,
+            'total_cost_usd': round(sum(group['cost_usd'] for group in groups), 4),
+            'ledger': self.stats()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, 'buffered': len(self._buffer), 'enabled': self.enabled}
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the flush thread and write what is still buffered"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    self.flush()
+        except Exception as e:
+            logger.error(f"Final LLM usage flush failed, {len(self._buffer)} rows lost: {str(e)}")
+
+def _load_prices() -> Dict[str, Dict[str, float]]:
+    """Default prices, overridden per model prefix by LLM_PRICES (JSON)"""
+    prices = dict(DEFAULT_PRICES)
+    override = os.getenv('LLM_PRICES')
+    if override:
+        try:
+            prices.update(json.loads(override))
+        except ValueError as e:
+            logger.error(f"Ignoring invalid LLM_PRICES: {str(e)}")
+    return prices
+
+# Global usage ledger instance
+usage_ledger = UsageLedger(
+    enabled=os.getenv('LLM_USAGE_LEDGER_ENABLED', 'true').lower() == 'true',
+    max_buffer=int(os.getenv('LLM_USAGE_MAX_BUFFER', '10000')),
+    batch_size=int(os.getenv('LLM_USAGE_BATCH_SIZE', '500')),
+    flush_interval=float(os.getenv('LLM_USAGE_FLUSH_SECONDS', '5')),
+    prices=_load_prices()
+)
+
+metrics.register_collector('usage_ledger', lambda: [
+    family('queue_depth', 'Items waiting in in-process queues',
+           [({'queue': 'llm_usage'}, usage_ledger.stats()['buffered'])])
+])
@@ -0,0 +1,355 @@
+"""
+Write-ahead webhook buffer for Agent CEO system
+Acknowledges inbound webhooks immediately and applies them in batches off the request path
+"""
+
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class BufferFullError(Exception):
+    """Raised when the buffer is at capacity; callers should answer 429"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Webhook buffer full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class WebhookBuffer:
+    """
+    Durable, batching intake queue for webhook payloads
+
+    Every accepted record is appended to a per-process write-ahead log before
+    it is acknowledged. A background thread drains the in-memory queue in
+    batches through ``handler`` (inside the Flask app context) and checkpoints
+    the WAL offset after each successful batch. On startup, logs left behind
+    by dead processes are adopted and replayed, so an accepted webhook is not
+    lost on a crash or restart.
+
+    A record that keeps failing is retried on its own (so one bad payload does
+    not hold back its batch) and, after ``max_attempts`` failed attempts, moved
+    to a dead-letter file next to the WAL.
+    """
+
+    def __init__(self, name: str, handler: Callable[[List[Dict[str, Any]]], None],
+                 directory: str, max_pending: int = 5000, batch_size: int = 200,
+                 flush_interval: float = 0.5, fsync: bool = False, dedupe_size: int = 50000,
+                 max_attempts: int = 5):
+        self.name = name
+        self.handler = handler
+        self.directory = directory
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.dedupe_size = dedupe_size
+        self.max_attempts = max(1, max_attempts)
+
+        self.app = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._pid = None
+        self._thread = None
+        self._wal = None
+        self._queue = deque()  # (end_offset, record)
+        self._seen = OrderedDict()  # recent dedupe keys, bounded
+        self._drain_rate = float(batch_size)  # records/second, smoothed
+        self._failures = 0
+        self._isolate = 0  # records left to retry one at a time after a failed batch
+        self._stats = {'accepted': 0, 'duplicates': 0, 'rejected': 0, 'applied': 0, 'failed_batches': 0,
+                       'dead_lettered': 0}
+
+    def init_app(self, app):
+        """Bind the Flask app used for the drain thread's app context"""
+        self.app = app
+        self._ensure_started()
+        atexit.register(self.shutdown)
+
+    def append(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> bool:
+        """
+        Durably enqueue a webhook payload
+
+        Returns:
+            True if queued, False if ``dedupe_key`` was already seen recently
+
+        Raises:
+            BufferFullError: when the queue is at capacity
+        """
+        self._ensure_started()
+
+        with self._lock:
+            if dedupe_key and dedupe_key in self._seen:
+                self._stats['duplicates'] += 1
+                return False
+
+            if len(self._queue) >= self.max_pending:
+                self._stats['rejected'] += 1
+                raise BufferFullError(self._retry_after())
+
+            record = {'kind': kind, 'dedupe_key': dedupe_key, 'payload': payload, 'received_at': time.time()}
+            end_offset = self._write(record)
+            self._queue.append((end_offset, record))
+            self._remember(dedupe_key)
+            self._stats['accepted'] += 1
+
+        self._wakeup.set()
+        return True
+
+    def _write(self, record: Dict[str, Any]) -> int:
+        """Append one record to the WAL and return the offset after it"""
+        self._wal.write(json.dumps(record, default=str) + '\n')
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        return self._wal.tell()
+
+    def _remember(self, dedupe_key: Optional[str]):
+        if not dedupe_key:
+            return
+        self._seen[dedupe_key] = None
+        if len(self._seen) > self.dedupe_size:
+            self._seen.popitem(last=False)
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        return max(1, min(60, math.ceil(len(self._queue) / max(self._drain_rate, 1.0))))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get buffer counters and current backlog"""
+        with self._lock:
+            return {
+                **self._stats,
+                'pending': len(self._queue),
+                'max_pending': self.max_pending,
+                'drain_rate': round(self._drain_rate, 1),
+                'wal_path': self._wal_path(os.getpid()),
+                'dead_letter_path': self._dead_letter_path()
+            }
+
+    def _ensure_started(self):
+        """Open this process's WAL and start the drain thread (fork-safe)"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+
+            # Forked from a parent that already started: drop inherited state
+            self._pid = os.getpid()
+            self._queue = deque()
+            self._seen = OrderedDict()
+            self._stopping.clear()
+
+            os.makedirs(self.directory, exist_ok=True)
+            self._open_wal()
+            self._adopt_orphans()
+
+            self._thread = threading.Thread(target=self._run, name=f'{self.name}-drain', daemon=True)
+            self._thread.start()
+
+    def _wal_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f'{self.name}-{pid}.wal')
+
+    def _open_wal(self):
+        """Open this process's WAL, replaying anything past its checkpoint"""
+        path = self._wal_path(self._pid)
+        pending = self._read_pending(path) if os.path.exists(path) else []
+
+        self._wal = open(path, 'w', encoding='utf-8')
+        self._write_checkpoint(0)
+        for record in pending:
+            self._queue.append((self._write(record), record))
+            self._remember(record.get('dedupe_key'))
+
+    def _adopt_orphans(self):
+        """Replay WALs left by processes that are no longer running"""
+        suffix = '.wal'
+        prefix = f'{self.name}-'
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith(prefix) and filename.endswith(suffix)):
+                continue
+            try:
+                pid = int(filename[len(prefix):-len(suffix)])
+            except ValueError:
+                continue
+            if pid == self._pid or _process_alive(pid):
+                continue
+
+            path = os.path.join(self.directory, filename)
+            claimed = f'{path}.{self._pid}.adopting'
+            try:
+                os.rename(path, claimed)  # atomic: only one sibling wins
+            except OSError:
+                continue
+
+            pending = self._read_pending(claimed, checkpoint_path=self._checkpoint_path(path))
+            for record in pending:
+                self._queue.append((self._write(record), record))
+                self._remember(record.get('dedupe_key'))
+
+            for leftover in (claimed, self._checkpoint_path(path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            if pending:
+                logger.info(f"Recovered {len(pending)} buffered webhooks from {filename}")
+
+    def _read_pending(self, path: str, checkpoint_path: str = None) -> List[Dict[str, Any]]:
+        """Read the records after a WAL's checkpoint, skipping a torn last line"""
+        offset = self._read_checkpoint(checkpoint_path or self._checkpoint_path(path))
+        records = []
+        with open(path, 'r', encoding='utf-8') as wal:
+            wal.seek(offset)
+            for line in wal:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt WAL entry in {path}")
+        return records
+
+    def _dead_letter_path(self) -> str:
+        return os.path.join(self.directory, f'{self.name}.deadletter.jsonl')
+
+    def _checkpoint_path(self, wal_path: str) -> str:
+        return wal_path[:-len('.wal')] + '.ckpt'
+
+    def _read_checkpoint(self, path: str) -> int:
+        try:
+            with open(path, 'r') as checkpoint:
+                return int(checkpoint.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, offset: int):
+        path = self._checkpoint_path(self._wal_path(self._pid))
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as checkpoint:
+            checkpoint.write(str(offset))
+        os.replace(tmp_path, path)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self.drain_once():
+                pass
+
+    def drain_once(self) -> bool:
+        """
+        Apply one batch from the queue
+
+        Returns:
+            True if a batch was applied and more work may be waiting
+        """
+        with self._lock:
+            size = 1 if self._isolate else self.batch_size
+            batch = [self._queue.popleft() for _ in range(min(size, len(self._queue)))]
+
+        if not batch:
+            self._compact()
+            return False
+
+        started = time.monotonic()
+        try:
+            records = [record for _, record in batch]
+            if self.app is not None:
+                with self.app.app_context():
+                    self.handler(records)
+            else:
+                self.handler(records)
+        except Exception as e:
+            self._fail(batch, e)
+            return False
+
+        self._failures = 0
+        self._isolate = max(self._isolate - len(batch), 0)
+        elapsed = max(time.monotonic() - started, 1e-3)
+        with self._lock:
+            self._write_checkpoint(batch[-1][0])
+            self._stats['applied'] += len(batch)
+            self._drain_rate = 0.8 * self._drain_rate + 0.2 * (len(batch) / elapsed)
+        return True
+
+    def _fail(self, batch: List, error: Exception):
+        """Count a failed attempt on each record, dead-letter the exhausted ones and requeue the rest"""
+        retry, dead = [], []
+        for entry in batch:
+            record = entry[1]
+            record['attempts'] = record.get('attempts', 0) + 1
+            (dead if record['attempts'] >= self.max_attempts else retry).append(entry)
+
+        if dead:
+            self._dead_letter([record for _, record in dead], error)
+
+        with self._lock:
+            self._queue.extendleft(reversed(retry))
+            self._stats['failed_batches'] += 1
+            self._stats['dead_lettered'] += len(dead)
+            if dead and (not retry or retry[0][0] > dead[-1][0]):
+                # Nothing before the dead records is still pending
+                self._write_checkpoint(dead[-1][0])
+
+        # Retry what is left of a failed batch one record at a time
+        if len(batch) > 1:
+            self._isolate = len(retry)
+        else:
+            self._isolate = max(self._isolate - len(dead), 0)
+        if not retry:
+            self._failures = 0
+            return
+
+        self._failures += 1
+        backoff = min(2 ** self._failures, 30)
+        logger.error(f"Webhook batch of {len(batch)} failed, retrying in {backoff}s: {str(error)}")
+        self._stopping.wait(backoff)
+
+    def _dead_letter(self, records: List[Dict[str, Any]], error: Exception):
+        """Append records that exhausted their attempts to the dead-letter file"""
+        failed_at = time.time()
+        with open(self._dead_letter_path(), 'a', encoding='utf-8') as dead_letter:
+            for record in records:
+                dead_letter.write(json.dumps({**record, 'error': str(error), 'failed_at': failed_at}, default=str) + '\n')
+                logger.error(f"Dead-lettered {record['kind']} webhook {record.get('dedupe_key') or ''} "
+                             f"after {record['attempts']} attempts: {str(error)}")
+
+    def _compact(self):
+        """Truncate the WAL once everything in it has been applied"""
+        with self._lock:
+            if self._queue or self._wal is None or self._wal.tell() == 0:
+                return
+            self._wal.seek(0)
+            self._wal.truncate()
+            self._write_checkpoint(0)
+
+    def shutdown(self, timeout: float = 10.0):
+        """Stop the drain thread after a best-effort final drain"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+
+        deadline = time.monotonic() + timeout
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+        while self._queue and time.monotonic() < deadline:
+            if not self.drain_once():
+                break
+
+def _process_alive(pid: int) -> bool:
+    """Check whether a process id is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,17 @@
+"""
+WSGI entry point for Agent CEO backend
+Production serving: gunicorn -c gunicorn.conf.py src.wsgi:app (from backend/)
+"""
+
+from src.main import app, shutdown_background_services, start_background_services
+from src.services.ai_service import ai_service
+from src.services.prompt_builder import preload_encodings
+
+# Read-only state that would otherwise load on the first request of every worker.
+# With preload_app this runs once in the gunicorn master and is shared after fork.
+preload_encodings([None] + [model for provider in ai_service.providers.values() for model in provider['models']])
+
+# Conventional name for WSGI servers that look for ``application``
+application = app
+
+__all__ = ['app', 'application', 'start_background_services', 'shutdown_background_services']
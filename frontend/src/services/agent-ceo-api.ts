@@ -77,6 +77,25 @@ export interface DataAnalysisResult {
   generated_at: string;
 }
 
+export interface AnalysisJob {
+  id: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  stage: string;
+  progress: number;
+  filename: string;
+  error?: string;
+  created_at: string;
+  finished_at?: string;
+}
+
+export interface AnalysisJobSubmission {
+  job_id: string;
+  status: AnalysisJob['status'];
+  deduplicated: boolean;
+  status_url: string;
+  result_url: string;
+}
+
 export class AgentCEOApiClient {
   private config: AgentCEOConfig;
 
@@ -289,11 +308,40 @@ export class AgentCEOApiClient {
     formData.append('focus_area', analysisContext.focus_area);
     formData.append('business_goals', analysisContext.business_goals);
 
-    return this.request<DataAnalysisResult>('/api/data-analysis/upload', {
+    // The upload returns a background job; poll it until the analysis is ready
+    const submitted = await this.request<AnalysisJobSubmission>('/api/data-analysis/upload', {
       method: 'POST',
       body: formData,
       headers: {}, // Let browser set Content-Type for FormData
     });
+    if (!submitted.success || !submitted.data) {
+      return { success: false, error: submitted.error };
+    }
+
+    return this.waitForAnalysisJob(submitted.data.job_id);
+  }
+
+  async getAnalysisJob(jobId: string): Promise<ApiResponse<{ job: AnalysisJob }>> {
+    return this.request<{ job: AnalysisJob }>(`/api/data-analysis/jobs/${jobId}`);
+  }
+
+  async waitForAnalysisJob(
+    jobId: string,
+    pollIntervalMs: number = 2000,
+    maxWaitMs: number = 600000
+  ): Promise<ApiResponse<DataAnalysisResult>> {
+    const deadline = Date.now() + maxWaitMs;
+    while (Date.now() < deadline) {
+      const status = await this.getAnalysisJob(jobId);
+      if (!status.success || !status.data) {
+        return { success: false, error: status.error };
+      }
+      if (status.data.job.status === 'succeeded' || status.data.job.status === 'failed') {
+        return this.request<DataAnalysisResult>(`/api/data-analysis/jobs/${jobId}/result`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+    }
+    return { success: false, error: `Analysis job ${jobId} is still running` };
   }
 
   async analyzeCSV(data: {